@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Aula_Livre.settings')
+# Sob ASGI, as leituras mais acessadas usam as views assíncronas (ROOT_URLCONF = Aula_Livre.urls_asgi).
+os.environ.setdefault('AULA_LIVRE_ASGI', '1')
 
 application = get_asgi_application()
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -25,16 +26,21 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primeiro da lista: mede a latência total da requisição (ver core/middleware.py e /api/metrics/).
+    'core.middleware.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    # Réplica de leitura: fixa no primário, por alguns segundos, o cliente que acabou de escrever.
+    'core.middleware.LeituraPrimarioMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'Aula_Livre.urls'
+# O asgi.py liga AULA_LIVRE_ASGI: as leituras mais acessadas passam para as views assíncronas (core/views_async.py).
+ROOT_URLCONF = 'Aula_Livre.urls_asgi' if os.environ.get('AULA_LIVRE_ASGI') == '1' else 'Aula_Livre.urls'
 
 TEMPLATES = [
     {   
@@ -58,9 +64,75 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Banco de testes em arquivo (e não em memória): os testes de concorrência abrem uma conexão por thread,
+        # o que o modo "shared cache" do SQLite em memória não suporta sem erros de "table is locked".
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
+# Modo SQLite de alta concorrência, para produção (ver core/concorrencia.py): AULA_LIVRE_SQLITE_CONCORRENTE=1 liga
+# WAL, synchronous=NORMAL e busy_timeout em cada conexão nova e BEGIN IMMEDIATE nas transações.
+SQLITE_CONCORRENTE = os.environ.get('AULA_LIVRE_SQLITE_CONCORRENTE') == '1'
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('AULA_LIVRE_SQLITE_BUSY_TIMEOUT_MS', '5000'))
+if SQLITE_CONCORRENTE:
+    DATABASES['default']['OPTIONS'] = {'transaction_mode': 'IMMEDIATE'}
+
+# Réplica de leitura (opcional, ver core/roteamento.py)
+# AULA_LIVRE_DB_LEITURA com o caminho de uma cópia do banco (atualizada pelo comando sincronizar_replica ou por
+# replicação contínua, ex.: LiteFS) liga o roteamento: GETs dos ViewSets de leitura e do dashboard leem da réplica.
+# Depois de uma escrita, o mesmo cliente lê do primário por AULA_LIVRE_JANELA_PRIMARIO segundos, que devem cobrir
+# o atraso da réplica. Sem a variável, o alias aponta para o próprio banco principal e não é usado.
+BANCO_LEITURA = 'leitura' if os.environ.get('AULA_LIVRE_DB_LEITURA') else None
+JANELA_LEITURA_PRIMARIO = int(os.environ.get('AULA_LIVRE_JANELA_PRIMARIO', '10'))
+DATABASES['leitura'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': os.environ.get('AULA_LIVRE_DB_LEITURA') or DATABASES['default']['NAME'],
+    # Nos testes, a réplica é um segundo arquivo SQLite, criado só para os testes que a pedem (databases=...).
+    'TEST': {
+        'NAME': BASE_DIR / 'test_db_leitura.sqlite3',
+    },
+}
+DATABASE_ROUTERS = ['core.roteamento.RoteadorLeitura']
+
+# Cache (Django cache framework)
+# Padrão: memória local do processo. Para compartilhar entre workers na mesma máquina, defina
+# AULA_LIVRE_CACHE_DIR com um diretório gravável (FileBasedCache). A invalidação usa as versões do
+# banco (VersaoDados), então continua coerente entre processos em qualquer um dos backends.
+if os.environ.get('AULA_LIVRE_CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['AULA_LIVRE_CACHE_DIR'],
+            'TIMEOUT': 3600,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'aula-livre',
+            'TIMEOUT': 3600,
+        }
+    }
+
+# Django REST Framework
+# Limite por IP da verificação pública de certificados (core/throttling.py): escolas verificam em lote.
+REST_FRAMEWORK = {
+    'DEFAULT_THROTTLE_RATES': {
+        'verificacao_certificado': os.environ.get('AULA_LIVRE_LIMITE_VERIFICACAO', '60/min'),
+    },
+}
+
+# Métricas do Prometheus (/api/metrics/): o scrape se autentica com 'Authorization: Bearer <token>'. Sem
+# AULA_LIVRE_TOKEN_METRICAS definido, apenas administradores logados leem as métricas.
+TOKEN_METRICAS = os.environ.get('AULA_LIVRE_TOKEN_METRICAS', '')
+
+# Importação em lote pela API (POST /api/importar/<tipo>/): processos de hash de senha por upload. O pool nasce
+# dentro do worker web, então fica pequeno; importações grandes usam o comando importar_dados (--processos).
+PROCESSOS_IMPORTACAO_HTTP = int(os.environ.get('AULA_LIVRE_PROCESSOS_IMPORTACAO', '2'))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
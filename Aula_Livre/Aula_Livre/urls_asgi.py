@@ -0,0 +1,13 @@
+"""
+URL configuration used when the project is served by asgi.py.
+
+Same routes as Aula_Livre/urls.py, but the hot GET endpoints are served by the
+async views of core/views_async.py (see core/urls_async.py).
+"""
+from django.contrib import admin
+from django.urls import path, include
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('', include('core.urls_async'))
+]
@@ -2,4 +2,12 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'core'
\ No newline at end of file
+    name = 'core'
+
+    def ready(self):
+        # Registra os sinais de versionamento (ETags) e invalidação.
+        from . import signals  # noqa: F401
+        # Configuração das conexões SQLite no modo de alta concorrência (sinal connection_created).
+        from . import concorrencia  # noqa: F401
+        # Contador de queries das métricas, instalado em cada conexão (sinal connection_created).
+        from . import middleware  # noqa: F401
@@ -0,0 +1,114 @@
+"""
+Arquivamento do histórico em tabelas frias (comando arquivar_historico).
+
+Decisão: A unidade arquivada é o horário. Um horário anterior ao horizonte, sem agendamento pendente
+(AGENDADO/CONFIRMADO) e sem aula CONCLUIDO ainda sem certificado sai de Disponibilidade junto com seus agendamentos (CONCLUIDO/CANCELADO), avaliações e
+certificados, em lotes de ids com uma transação curta cada (INSERT ... SELECT + DELETE por tabela). As cópias mantêm os ids e as FKs entre si, de modo
+que nenhuma referência fica órfã. A exclusão nas tabelas quentes é um DELETE direto: QuerySet.delete() dispararia
+os sinais de exclusão, que estornariam resumos (core/resumos.py) e horas (core/horas.py) já contabilizados.
+As listagens padrão passam a varrer só as tabelas quentes; ?incluir_historico=1 junta o arquivo.
+"""
+import datetime
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from . import busca
+from .models import (
+    Agendamento, AgendamentoArquivado, Avaliacao, AvaliacaoArquivada, Certificado, CertificadoArquivado,
+    Disponibilidade, DisponibilidadeArquivada, VersaoDados,
+)
+
+HORIZONTE = datetime.timedelta(days=180)
+LOTE = 500
+STATUS_PENDENTES = ('AGENDADO', 'CONFIRMADO')
+
+# Tabela quente -> tabela fria, na ordem de cópia (pais antes dos filhos).
+ARQUIVOS = {
+    Disponibilidade: DisponibilidadeArquivada,
+    Agendamento: AgendamentoArquivado,
+    Avaliacao: AvaliacaoArquivada,
+    Certificado: CertificadoArquivado,
+}
+MODELOS_ARQUIVO = tuple(ARQUIVOS.values())
+NOMES_ARQUIVO = {quente.__name__: frio.__name__ for quente, frio in ARQUIVOS.items()}
+
+
+def fontes(modelos, nome):
+    """
+    [tabela quente, tabela fria] de um modelo, para agregações que precisam do histórico completo
+    (reconstruir() de resumos e horas). Com modelos históricos (migrações), usa só os que foram passados.
+    """
+    if not modelos:
+        quente = next(modelo for modelo in ARQUIVOS if modelo.__name__ == nome)
+        return [quente, ARQUIVOS[quente]]
+    return [modelos[chave] for chave in (nome, NOMES_ARQUIVO[nome]) if chave in modelos]
+
+
+def arquivaveis(limite):
+    # Horários anteriores a 'limite' (data) sem agendamento pendente e sem aula concluída à espera do certificado:
+    # o certificado só é emitido na tabela quente (download_certificado, que também lança as horas).
+    pendentes = Agendamento.objects.filter(disponibilidade=OuterRef('pk'), status__in=STATUS_PENDENTES)
+    sem_certificado = Agendamento.objects.filter(disponibilidade=OuterRef('pk'), status='CONCLUIDO').exclude(
+        Exists(Certificado.objects.filter(agendamento=OuterRef('pk')))
+    )
+    return Disponibilidade.objects.filter(data__lt=limite).exclude(Exists(pendentes)).exclude(Exists(sem_certificado))
+
+
+def _copiar(modelo, filtro, agora):
+    # INSERT ... SELECT: as linhas são copiadas dentro do banco (mesmos ids e colunas), sem passar pelo Python.
+    frio = ARQUIVOS[modelo]
+    nome = connection.ops.quote_name
+    colunas = [campo.column for campo in modelo._meta.concrete_fields]
+    sql, params = modelo.objects.filter(filtro).order_by().values(*colunas).query.sql_with_params()
+    if any(campo.name == 'arquivado_em' for campo in frio._meta.concrete_fields):
+        colunas = [*colunas, 'arquivado_em']
+        sql, params = f'SELECT origem.*, %s FROM ({sql}) origem', (connection.ops.adapt_datetimefield_value(agora), *params)
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {nome(frio._meta.db_table)} ({", ".join(map(nome, colunas))}) {sql}', params)
+        return cursor.rowcount
+
+
+def _apagar(modelo, filtro):
+    # DELETE direto, sem o coletor do ORM: nenhum sinal de exclusão (resumos, horas, busca, caches) é disparado.
+    sql, params = modelo.objects.filter(filtro).order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {connection.ops.quote_name(modelo._meta.db_table)} WHERE id IN ({sql})', params)
+
+
+def mover(horarios, agora):
+    """Move os horários (ids) e tudo o que depende deles para o arquivo. Retorna {tabela: linhas movidas}."""
+    filtros = {
+        Disponibilidade: Q(pk__in=horarios),
+        Agendamento: Q(disponibilidade_id__in=horarios),
+        Avaliacao: Q(agendamento__disponibilidade_id__in=horarios),
+        Certificado: Q(agendamento__disponibilidade_id__in=horarios),
+    }
+    # Cópia dos pais para os filhos (FKs do arquivo); exclusão dos filhos para os pais (FKs das tabelas quentes).
+    movidos = {modelo._meta.model_name: _copiar(modelo, filtro, agora) for modelo, filtro in filtros.items()}
+    for modelo, filtro in reversed(filtros.items()):
+        _apagar(modelo, filtro)
+    busca.remover(busca.HORARIO, horarios)
+    return movidos
+
+
+def arquivar(horizonte=HORIZONTE, lote=LOTE, agora=None):
+    """Arquiva, em lotes, os horários anteriores a hoje - horizonte. Retorna as contagens por tabela e de lotes."""
+    agora = agora or timezone.now()
+    limite = timezone.localdate(agora) - horizonte
+    candidatos = arquivaveis(limite)
+    resultado = {'limite': limite.isoformat(), 'lotes': 0, **{modelo._meta.model_name: 0 for modelo in ARQUIVOS}}
+    ultimo = 0
+    while True:
+        with transaction.atomic():
+            # Reavaliado dentro da transação: um horário que ganhou agendamento pendente no meio tempo fica.
+            ids = list(candidatos.filter(pk__gt=ultimo).order_by('pk').values_list('pk', flat=True)[:lote])
+            if not ids:
+                return resultado
+            for tabela, quantidade in mover(ids, agora).items():
+                resultado[tabela] += quantidade
+            # Escritas diretas não disparam sinais: versões manuais (ETags e caches das duas pontas).
+            VersaoDados.incrementar(*ARQUIVOS, *MODELOS_ARQUIVO)
+        resultado['lotes'] += 1
+        ultimo = ids[-1]
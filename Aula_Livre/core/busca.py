@@ -0,0 +1,169 @@
+"""
+Busca textual (FTS5 do SQLite) sobre disciplinas, horários e professores.
+
+Decisão: Um único índice invertido 'core_busca' (tabela virtual FTS5) guarda um documento por objeto,
+com o tokenizador unicode61 + remove_diacritics: "matematica" encontra "Matemática" e "revisao" encontra
+"Revisão". O rowid codifica (id do objeto, tipo), de modo que atualizar/remover um documento é uma busca
+pela chave primária, sem varrer o índice. A sincronização acontece nos sinais (core/signals.py), dentro
+da mesma transação da escrita; cargas em lote usam reconstruir() (comando reconstruir_busca).
+"""
+import re
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+TABELA = 'core_busca'
+
+DISCIPLINA = 'disciplina'
+HORARIO = 'horario'
+PROFESSOR = 'professor'
+TIPOS = (DISCIPLINA, HORARIO, PROFESSOR)
+
+# rowid = id * FATOR + código do tipo.
+CODIGOS = {DISCIPLINA: 1, HORARIO: 2, PROFESSOR: 3}
+FATOR = 4
+
+# Pesos do bm25 por coluna (tipo, titulo, conteudo): casar no título vale mais que na descrição.
+PESOS = (0.0, 10.0, 1.0)
+MAX_PALAVRAS = 8
+LOTE = 2000
+
+SQL_CRIAR = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA} USING fts5("
+    "tipo UNINDEXED, titulo, conteudo, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+SQL_REMOVER_TABELA = f'DROP TABLE IF EXISTS {TABELA}'
+
+
+def suportada(conexao=connection):
+    # FTS5 é exclusivo do SQLite (o banco do projeto); em outros bancos a busca fica desativada.
+    return conexao.vendor == 'sqlite'
+
+
+def rowid(tipo, objeto_id):
+    return objeto_id * FATOR + CODIGOS[tipo]
+
+
+# --- DOCUMENTOS (o que é indexado de cada modelo) ---
+
+def _texto(*partes):
+    return ' '.join(parte for parte in partes if parte)
+
+
+def documento(tipo, objeto):
+    # (titulo, conteudo) do objeto; funciona também com os modelos históricos das migrações.
+    if tipo == DISCIPLINA:
+        return objeto.nome, _texto(objeto.descricao)
+    if tipo == HORARIO:
+        return _texto(objeto.assunto), _texto(objeto.descricao, objeto.nivel)
+    return objeto.nome, ''
+
+
+# --- SINCRONIZAÇÃO ---
+
+def indexar(tipo, objetos):
+    """Grava (ou regrava) os documentos dos objetos no índice."""
+    objetos = list(objetos)
+    if not objetos or not suportada():
+        return
+    linhas = [(rowid(tipo, objeto.pk), tipo, *documento(tipo, objeto)) for objeto in objetos]
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {TABELA} WHERE rowid = %s', [(linha[0],) for linha in linhas])
+        cursor.executemany(f'INSERT INTO {TABELA} (rowid, tipo, titulo, conteudo) VALUES (%s, %s, %s, %s)', linhas)
+
+
+def remover(tipo, ids):
+    ids = list(ids)
+    if not ids or not suportada():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {TABELA} WHERE rowid = %s', [(rowid(tipo, pk),) for pk in ids])
+
+
+def querysets_indexados(modelos=None):
+    # {tipo: queryset} com tudo o que deve estar no índice. 'modelos' permite passar os modelos históricos.
+    if modelos is None:
+        from .models import Disciplina, Disponibilidade, Usuario
+        modelos = {DISCIPLINA: Disciplina, HORARIO: Disponibilidade, PROFESSOR: Usuario}
+    return {
+        DISCIPLINA: modelos[DISCIPLINA].objects.only('id', 'nome', 'descricao'),
+        HORARIO: modelos[HORARIO].objects.only('id', 'assunto', 'descricao', 'nivel'),
+        PROFESSOR: modelos[PROFESSOR].objects.filter(tipo='PROFESSOR').only('id', 'nome'),
+    }
+
+
+def reconstruir(modelos=None, lote=LOTE):
+    """Apaga e recria o índice inteiro em lotes. Retorna a quantidade de documentos por tipo."""
+    if not suportada():
+        return {}
+    contagens = {}
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABELA}')
+        for tipo, queryset in querysets_indexados(modelos).items():
+            contagens[tipo] = 0
+            objetos = queryset.order_by('id').iterator(chunk_size=lote)
+            while True:
+                pedaco = [objeto for _, objeto in zip(range(lote), objetos)]
+                if not pedaco:
+                    break
+                linhas = [(rowid(tipo, objeto.pk), tipo, *documento(tipo, objeto)) for objeto in pedaco]
+                with connection.cursor() as cursor:
+                    cursor.executemany(
+                        f'INSERT INTO {TABELA} (rowid, tipo, titulo, conteudo) VALUES (%s, %s, %s, %s)', linhas
+                    )
+                contagens[tipo] += len(linhas)
+        with connection.cursor() as cursor:
+            # Junta os segmentos do FTS5 em um só (consultas mais rápidas após a carga em lote).
+            cursor.execute(f"INSERT INTO {TABELA} ({TABELA}) VALUES ('optimize')")
+    return contagens
+
+
+# --- CONSULTA ---
+
+def montar_consulta(termo):
+    """
+    Converte o texto do usuário em uma consulta FTS5 segura: cada palavra vira um prefixo entre aspas
+    ("revis"* "enem"*), todas obrigatórias. Palavras de uma letra são descartadas.
+    """
+    palavras = [palavra for palavra in re.findall(r'\w+', termo or '') if len(palavra) > 1]
+    return ' '.join(f'"{palavra}"*' for palavra in palavras[:MAX_PALAVRAS])
+
+
+def buscar(consulta, tipos=TIPOS, limite=20):
+    """
+    Executa a consulta (já montada por montar_consulta) e retorna os resultados ordenados por relevância (bm25).
+    Horários só entram se ainda estiverem livres e no futuro.
+    """
+    agora = timezone.localtime()
+    marcadores = ', '.join(['%s'] * len(tipos))
+    sql = f"""
+        SELECT rowid, tipo, titulo, snippet({TABELA}, 2, '', '', '…', 16), bm25({TABELA}, {', '.join(map(str, PESOS))}) AS pontuacao
+        FROM {TABELA}
+        WHERE {TABELA} MATCH %s AND tipo IN ({marcadores})
+          AND (tipo != %s OR EXISTS (
+              SELECT 1 FROM core_disponibilidade d
+              WHERE d.id = {TABELA}.rowid / {FATOR} AND d.disponivel
+                AND (d.data > %s OR (d.data = %s AND d.horario_inicio >= %s))
+          ))
+        ORDER BY pontuacao
+        LIMIT %s
+    """
+    hoje, hora = agora.date().isoformat(), agora.time().isoformat(timespec='seconds')
+    parametros = [consulta, *tipos, HORARIO, hoje, hoje, hora, limite]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, parametros)
+        linhas = cursor.fetchall()
+
+    return [
+        {
+            'tipo': tipo,
+            'id': chave // FATOR,
+            'titulo': titulo,
+            'trecho': trecho,
+            # bm25 é negativo (menor = mais relevante): exposto invertido, maior = melhor.
+            'relevancia': -pontuacao,
+        }
+        for chave, tipo, titulo, trecho, pontuacao in linhas
+    ]
@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from .models import Disciplina, VersaoDados
+
+
+def chave_versionada(prefixo, modelos):
+    # A chave embute a versão (e o instante da última escrita) de cada tabela da qual o valor depende.
+    # Qualquer escrita gera uma chave nova: a invalidação é imediata e vale para todos os workers,
+    # pois a versão vem do banco. As entradas antigas simplesmente expiram pelo TIMEOUT.
+    return _montar_chave(prefixo, VersaoDados.obter(*modelos))
+
+
+def _montar_chave(prefixo, versoes):
+    partes = [prefixo]
+    for tabela, versao, atualizado_em in versoes:
+        marca = atualizado_em.timestamp() if atualizado_em else 0
+        partes.append(f'{tabela}:{versao}:{marca}')
+    return '|'.join(partes)
+
+
+def obter_ou_calcular(prefixo, modelos, calcular, timeout=None):
+    chave = chave_versionada(prefixo, modelos)
+    valor = cache.get(chave)
+    if valor is None:
+        valor = calcular()
+        cache.set(chave, valor, timeout)
+    return valor
+
+
+async def aobter_ou_calcular(prefixo, modelos, calcular, timeout=None):
+    # Versão assíncrona (leituras sob ASGI): mesmas chaves, então o cache é compartilhado com a versão síncrona.
+    # 'calcular' é uma corrotina.
+    chave = _montar_chave(prefixo, await VersaoDados.aobter(*modelos))
+    valor = await cache.aget(chave)
+    if valor is None:
+        valor = await calcular()
+        await cache.aset(chave, valor, timeout)
+    return valor
+
+
+def _vinculos_professor_disciplina():
+    return Disciplina.professores.through.objects.order_by('id').values_list('usuario_id', 'disciplina__nome')
+
+
+def _agrupar_disciplinas(vinculos):
+    mapa = {}
+    for professor_id, nome in vinculos:
+        mapa.setdefault(professor_id, []).append(nome)
+    return mapa
+
+
+def mapa_professor_disciplinas():
+    # Mapeamento professor -> [nomes das disciplinas], usado pelo catálogo no lugar do prefetch de 'disciplinas'.
+    return obter_ou_calcular(
+        'professor_disciplinas', (Disciplina,), lambda: _agrupar_disciplinas(_vinculos_professor_disciplina())
+    )
+
+
+async def amapa_professor_disciplinas():
+    async def calcular():
+        return _agrupar_disciplinas([vinculo async for vinculo in _vinculos_professor_disciplina()])
+
+    return await aobter_ou_calcular('professor_disciplinas', (Disciplina,), calcular)
+
+
+class CacheMixin:
+    # Mixin para ViewSets de leitura quase estática: guarda o resultado serializado de list/retrieve no cache.
+    modelos_cache = ()
+
+    def list(self, request, *args, **kwargs):
+        chave = f'{self.basename}:list:{request.get_full_path()}'
+        dados = obter_ou_calcular(chave, self.modelos_cache, lambda: super(CacheMixin, self).list(request, *args, **kwargs).data)
+        return Response(dados)
+
+    def retrieve(self, request, *args, **kwargs):
+        # A query string entra na chave: ?fields= muda o conteúdo da resposta.
+        chave = f'{self.basename}:detail:{request.get_full_path()}'
+        dados = obter_ou_calcular(chave, self.modelos_cache, lambda: super(CacheMixin, self).retrieve(request, *args, **kwargs).data)
+        return Response(dados)
+
+
+AUSENTE = object() # Retorno de CacheLRU.obter() quando a chave não está no cache (ou expirou).
+
+
+class CacheLRU:
+    """
+    Cache em memória do processo, limitado em entradas (descarta a usada há mais tempo) e com validade (TTL)
+    por entrada. Para leituras muito repetidas que não precisam ir ao cache compartilhado nem ao banco.
+    """
+
+    def __init__(self, capacidade, ttl):
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self._itens = OrderedDict() # chave -> (expira_em, valor), do menos para o mais recente.
+        self._trava = threading.Lock()
+
+    def obter(self, chave):
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is None:
+                return AUSENTE
+            expira_em, valor = item
+            if expira_em <= time.monotonic():
+                del self._itens[chave]
+                return AUSENTE
+            self._itens.move_to_end(chave)
+            return valor
+
+    def guardar(self, chave, valor):
+        with self._trava:
+            self._itens[chave] = (time.monotonic() + self.ttl, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.capacidade:
+                self._itens.popitem(last=False)
+
+    def descartar(self, chave):
+        with self._trava:
+            self._itens.pop(chave, None)
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+
+    def __len__(self):
+        return len(self._itens)
+
+
+# Verificação pública de certificados: acertos e códigos inexistentes ficam em caches separados,
+# para que uma enxurrada de códigos inválidos não expulse os certificados verdadeiros.
+# Emissão/exclusão de certificados descarta o código nos dois (core/signals.py), mas só no worker que fez a
+# escrita: o TTL curto também nos acertos limita a 60 s o tempo em que outro worker confirma um certificado excluído.
+VALIDADE_VERIFICACAO = 60
+certificados_verificados = CacheLRU(capacidade=10000, ttl=VALIDADE_VERIFICACAO)
+codigos_inexistentes = CacheLRU(capacidade=10000, ttl=VALIDADE_VERIFICACAO)
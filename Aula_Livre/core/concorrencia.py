@@ -0,0 +1,65 @@
+"""
+Modo SQLite de alta concorrência (AULA_LIVRE_SQLITE_CONCORRENTE=1) e retentativa das escritas do motor de reservas.
+
+Decisão: Configuração na criação de cada conexão (sinal connection_created) e no início de cada transação:
+  - busy_timeout: quem encontra o banco travado espera até SQLITE_BUSY_TIMEOUT_MS em vez de falhar na hora;
+  - journal_mode=WAL: leitores não bloqueiam o escritor nem são bloqueados por ele;
+  - synchronous=NORMAL: em WAL, fsync só nos checkpoints (uma queda de energia pode perder as últimas
+    transações confirmadas, mas não corrompe o banco);
+  - BEGIN IMMEDIATE (OPTIONS['transaction_mode'] em settings.py): a transação pega a trava de escrita logo no
+    início. Com o BEGIN padrão (DEFERRED), duas transações que leem e depois tentam escrever entram em impasse,
+    e o SQLite responde "database is locked" na hora, sem esperar o busy_timeout.
+O que ainda escapar (espera esgotada em um pico) é repetido algumas vezes, com espera exponencial, pelas views
+do motor de reservas (repetir_se_bloqueado). Esgotadas as tentativas, o cliente recebe 503 e não um erro 500.
+"""
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .exceptions import BancoOcupado
+
+TENTATIVAS = 4
+ESPERA_BASE = 0.05 # Segundos antes da 2ª tentativa; dobra a cada nova tentativa (com variação aleatória).
+
+
+@receiver(connection_created)
+def configurar_conexao(sender, connection, **kwargs):
+    if not settings.SQLITE_CONCORRENTE or connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        # busy_timeout antes do journal_mode: a troca para WAL também precisa da trava do arquivo.
+        cursor.execute(f'PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}')
+        cursor.execute('PRAGMA journal_mode = WAL')
+        cursor.execute('PRAGMA synchronous = NORMAL')
+
+
+def bloqueado(erro):
+    # SQLITE_BUSY / SQLITE_LOCKED chegam como OperationalError, identificados só pela mensagem.
+    mensagem = str(erro).lower()
+    return 'locked' in mensagem or 'busy' in mensagem
+
+
+def repetir_se_bloqueado(funcao):
+    """
+    Repete a operação (até TENTATIVAS vezes) quando o banco responde "locked"/"busy". Só é seguro porque a
+    transação da tentativa falha é desfeita por inteiro: dentro de uma transação externa o erro sobe na hora.
+    """
+    @wraps(funcao)
+    def envolvida(*args, **kwargs):
+        tentativa = 1
+        while True:
+            try:
+                return funcao(*args, **kwargs)
+            except OperationalError as erro:
+                if not bloqueado(erro) or transaction.get_connection().in_atomic_block:
+                    raise
+                if tentativa >= TENTATIVAS:
+                    raise BancoOcupado() from erro
+            time.sleep(ESPERA_BASE * 2 ** (tentativa - 1) * random.uniform(0.5, 1.5))
+            tentativa += 1
+    return envolvida
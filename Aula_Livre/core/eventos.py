@@ -0,0 +1,129 @@
+import asyncio
+import itertools
+import threading
+from collections import deque
+
+from django.db import transaction
+
+# Tipos de evento de Disponibilidade enviados pelo stream SSE.
+ABERTO = 'aberto'        # Horário novo publicado.
+RESERVADO = 'reservado'  # Um aluno reservou o horário.
+LIBERADO = 'liberado'    # Cancelamento/rejeição devolveu o horário.
+REMOVIDO = 'removido'    # Horário excluído pelo professor.
+FECHADO = 'fechado'      # Horário passou sem reserva (encerrado pelo job de expiração).
+RESSINCRONIZAR = 'ressincronizar' # O assinante ficou para trás: o cliente deve recarregar a lista.
+
+
+class Assinatura:
+    # Fila de um assinante, presa ao event loop que a criou (a entrega usa call_soon_threadsafe).
+
+    def __init__(self, canal, loop, filtro, capacidade):
+        self.canal = canal
+        self.loop = loop
+        self.filtro = filtro
+        self.fila = asyncio.Queue(maxsize=capacidade)
+
+    def _entregar(self, evento):
+        # Executa dentro do event loop do assinante.
+        try:
+            self.fila.put_nowait(evento)
+        except asyncio.QueueFull:
+            # Assinante lento: descarta a fila e pede ressincronização em vez de crescer sem limite.
+            while not self.fila.empty():
+                self.fila.get_nowait()
+            self.fila.put_nowait({'id': evento['id'], 'tipo': RESSINCRONIZAR, 'dados': {}})
+
+    async def proximo(self, timeout=None):
+        # Retorna o próximo evento ou None se o timeout expirar (usado para o heartbeat).
+        try:
+            return await asyncio.wait_for(self.fila.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def cancelar(self):
+        self.canal._remover(self)
+
+
+class CanalEventos:
+    """
+    Fan-out em memória do processo (sem Redis): cada publicação é copiada para a fila
+    de todos os assinantes cujo filtro aceita o evento. Mantém um histórico curto para
+    que clientes reconectando com Last-Event-ID não percam eventos.
+    """
+
+    def __init__(self, historico=1000, capacidade_fila=256):
+        self._trava = threading.Lock()
+        self._assinantes = set()
+        self._historico = deque(maxlen=historico)
+        self._ids = itertools.count(1)
+        self.capacidade_fila = capacidade_fila
+
+    def assinar(self, filtro=None, ultimo_id=None):
+        # Deve ser chamado de dentro de um event loop em execução (view async).
+        assinatura = Assinatura(self, asyncio.get_running_loop(), filtro or (lambda dados: True), self.capacidade_fila)
+        with self._trava:
+            self._assinantes.add(assinatura)
+            pendentes = [e for e in self._historico if ultimo_id is not None and e['id'] > ultimo_id]
+        for evento in pendentes:
+            if assinatura.filtro(evento['dados']):
+                assinatura._entregar(evento)
+        return assinatura
+
+    def _remover(self, assinatura):
+        with self._trava:
+            self._assinantes.discard(assinatura)
+
+    @property
+    def total_assinantes(self):
+        with self._trava:
+            return len(self._assinantes)
+
+    def publicar(self, tipo, dados):
+        # Thread-safe: pode ser chamado de views síncronas, comandos ou callbacks on_commit.
+        with self._trava:
+            evento = {'id': next(self._ids), 'tipo': tipo, 'dados': dados}
+            self._historico.append(evento)
+            assinantes = list(self._assinantes)
+
+        for assinatura in assinantes:
+            if not assinatura.filtro(dados):
+                continue
+            try:
+                assinatura.loop.call_soon_threadsafe(assinatura._entregar, evento)
+            except RuntimeError:
+                # Event loop encerrado (conexão já fechada): remove o assinante órfão.
+                self._remover(assinatura)
+        return evento
+
+
+canal_disponibilidades = CanalEventos()
+
+
+def dados_disponibilidade(disponibilidade):
+    # Payload do evento: o suficiente para o explorar.js inserir/remover o card sem nova requisição.
+    disciplina = disponibilidade.disciplina if disponibilidade.disciplina_id else None
+    return {
+        'id': disponibilidade.id,
+        'professor': disponibilidade.professor_id,
+        'disciplina': disponibilidade.disciplina_id,
+        'disciplina_nome': disciplina.nome if disciplina else None,
+        'assunto': disponibilidade.assunto,
+        'nivel': disponibilidade.nivel,
+        'descricao': disponibilidade.descricao,
+        'data': disponibilidade.data.isoformat() if disponibilidade.data else None,
+        'horario_inicio': disponibilidade.horario_inicio.isoformat() if disponibilidade.horario_inicio else None,
+        'disponivel': disponibilidade.disponivel,
+    }
+
+
+def publicar_ao_confirmar(tipo, disponibilidades):
+    # Publica somente depois do COMMIT: um rollback (ex: conflito na reserva) não gera evento fantasma.
+    lista = [dados_disponibilidade(d) for d in disponibilidades]
+    if not lista:
+        return
+
+    def publicar():
+        for dados in lista:
+            canal_disponibilidades.publicar(tipo, dados)
+
+    transaction.on_commit(publicar)
@@ -0,0 +1,30 @@
+from django.core.exceptions import ValidationError
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HorarioIndisponivel(ValidationError):
+    # Erro de concorrência do motor de reservas: outro aluno reservou o horário primeiro.
+    # Herda de ValidationError para manter compatibilidade com quem já tratava o erro do Agendamento.save().
+    pass
+
+
+class ArquivoInvalido(ValueError):
+    # Erro no arquivo de importação como um todo (formato desconhecido, colunas obrigatórias ausentes, JSON quebrado).
+    # Erros de uma linha só não usam exceção: vão para o relatório da importação (ver core/importacao.py).
+    pass
+
+
+class ConflitoAgendamento(APIException):
+    # Versão HTTP do HorarioIndisponivel: o pedido perdedor recebe 409 (Conflict) em vez de um erro 500.
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Este horário já foi reservado por outro aluno.'
+    default_code = 'conflito_agendamento'
+
+
+class BancoOcupado(APIException):
+    # O banco seguiu travado por escritas concorrentes mesmo após as retentativas (core/concorrencia.py).
+    # 503 diz ao cliente que pode tentar de novo, em vez de um erro 500 genérico.
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Muitos agendamentos ao mesmo tempo. Tente novamente em instantes.'
+    default_code = 'banco_ocupado'
@@ -0,0 +1,133 @@
+"""
+Expiração e reconciliação periódica de agendamentos e horários (comando expirar_agendamentos, via cron).
+
+Decisão: Três passos idempotentes, todos com UPDATEs por conjunto em lotes de ids (uma transação curta por
+lote, sem Agendamento.save() por linha), de modo que rodar a cada minuto, ou duas execuções sobrepostas, é seguro:
+  1. cancela os agendamentos ainda AGENDADO cuja aula começa antes do prazo (o professor não confirmou a tempo);
+  2. encerra (disponivel=False) os horários livres que já passaram, tirando-os das listas e do índice parcial;
+  3. corrige a flag 'disponivel' dos horários futuros que discordam dos agendamentos ativos.
+Cada UPDATE repete o filtro do passo no WHERE: uma linha alterada por outra requisição entre a leitura dos ids e a
+escrita é simplesmente ignorada.
+"""
+import datetime
+import time
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .eventos import FECHADO, LIBERADO, RESERVADO, publicar_ao_confirmar
+from .models import STATUS_ATIVOS, Agendamento, Disponibilidade, VersaoDados
+
+PRAZO_CONFIRMACAO = datetime.timedelta(hours=2)
+LOTE = 1000
+
+
+def antes_de(momento, prefixo=''):
+    # Q dos horários que começam antes de 'momento' (data + horario_inicio, no fuso local).
+    momento = timezone.localtime(momento)
+    data, hora = momento.date(), momento.time().replace(microsecond=0)
+    return Q(**{f'{prefixo}data__lt': data}) | Q(**{f'{prefixo}data': data, f'{prefixo}horario_inicio__lt': hora})
+
+
+def _ocupado():
+    return Exists(Agendamento.objects.filter(disponibilidade=OuterRef('pk'), status__in=STATUS_ATIVOS))
+
+
+def _em_lotes(queryset, lote, atualizar, modelos):
+    """
+    Percorre o queryset em lotes de ids crescentes; cada lote é atualizado em sua própria transação
+    por atualizar(queryset do lote), que retorna quantas linhas mudou. Retorna o total alterado.
+    """
+    total, ultimo = 0, 0
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.filter(pk__gt=ultimo).order_by('pk').values_list('pk', flat=True)[:lote])
+            if not ids:
+                return total
+            alterados = atualizar(queryset.filter(pk__in=ids))
+            if alterados:
+                # UPDATE por queryset não dispara sinais: versão manual, no mesmo commit do lote.
+                VersaoDados.incrementar(*modelos)
+            total += alterados
+        ultimo = ids[-1]
+
+
+def _liberar(horarios, agora):
+    # Devolve ao catálogo os horários futuros sem agendamento ativo (regra de reversão do cancelamento).
+    livres = horarios.filter(~antes_de(agora), ~_ocupado(), disponivel=False)
+    ids = list(livres.values_list('pk', flat=True))
+    if not ids:
+        return 0
+    liberados = Disponibilidade.objects.filter(pk__in=ids, disponivel=False).update(disponivel=True)
+    publicar_ao_confirmar(LIBERADO, Disponibilidade.objects.filter(pk__in=ids).select_related('disciplina'))
+    return liberados
+
+
+def expirar_pendentes(agora, prazo=PRAZO_CONFIRMACAO, lote=LOTE):
+    """Passo 1: cancela os agendamentos AGENDADO de aulas que começam antes de agora + prazo. Retorna (cancelados, liberados)."""
+    pendentes = Agendamento.objects.filter(antes_de(agora + prazo, 'disponibilidade__'), status='AGENDADO')
+    liberados = 0
+
+    def atualizar(lote_agendamentos):
+        nonlocal liberados
+        horarios = list(lote_agendamentos.values_list('disponibilidade_id', flat=True))
+        cancelados = lote_agendamentos.update(status='CANCELADO')
+        if cancelados:
+            liberados += _liberar(Disponibilidade.objects.filter(pk__in=horarios), agora)
+        return cancelados
+
+    return _em_lotes(pendentes, lote, atualizar, (Agendamento, Disponibilidade)), liberados
+
+
+def encerrar_passados(agora, lote=LOTE):
+    """Passo 2: marca como indisponíveis os horários livres que já começaram."""
+    passados = Disponibilidade.objects.filter(antes_de(agora), disponivel=True)
+
+    def encerrar(horarios):
+        ids = list(horarios.values_list('pk', flat=True))
+        encerrados = Disponibilidade.objects.filter(pk__in=ids, disponivel=True).update(disponivel=False)
+        if encerrados:
+            # Telas abertas tiram o horário da lista sem esperar o próximo recarregamento.
+            publicar_ao_confirmar(FECHADO, Disponibilidade.objects.filter(pk__in=ids).select_related('disciplina'))
+        return encerrados
+
+    return _em_lotes(passados, lote, encerrar, (Disponibilidade,))
+
+
+def reconciliar(agora, lote=LOTE):
+    """Passo 3: horários futuros marcados como livres mas com agendamento ativo (e vice-versa). Retorna (ocupados, liberados)."""
+    futuros = Disponibilidade.objects.exclude(antes_de(agora))
+
+    def ocupar(horarios):
+        ids = list(horarios.values_list('pk', flat=True))
+        ocupados = Disponibilidade.objects.filter(_ocupado(), pk__in=ids, disponivel=True).update(disponivel=False)
+        if ocupados:
+            publicar_ao_confirmar(RESERVADO, Disponibilidade.objects.filter(pk__in=ids).select_related('disciplina'))
+        return ocupados
+
+    ocupados = _em_lotes(futuros.filter(_ocupado(), disponivel=True), lote, ocupar, (Disponibilidade,))
+    liberados = _em_lotes(
+        futuros.filter(~_ocupado(), disponivel=False), lote, lambda horarios: _liberar(horarios, agora), (Disponibilidade,)
+    )
+    return ocupados, liberados
+
+
+def executar(prazo=PRAZO_CONFIRMACAO, lote=LOTE, agora=None):
+    """Roda os três passos e retorna as contagens e a duração (em segundos) de cada um."""
+    agora = agora or timezone.now()
+    resultado = {'executado_em': agora.isoformat(), 'duracao_s': {}}
+
+    inicio = time.perf_counter()
+    resultado['agendamentos_expirados'], resultado['horarios_liberados_na_expiracao'] = expirar_pendentes(agora, prazo, lote)
+    resultado['duracao_s']['expiracao'] = round(time.perf_counter() - inicio, 3)
+
+    inicio = time.perf_counter()
+    resultado['horarios_passados_encerrados'] = encerrar_passados(agora, lote)
+    resultado['duracao_s']['encerramento'] = round(time.perf_counter() - inicio, 3)
+
+    inicio = time.perf_counter()
+    resultado['flags_corrigidas_ocupado'], resultado['flags_corrigidas_livre'] = reconciliar(agora, lote)
+    resultado['duracao_s']['reconciliacao'] = round(time.perf_counter() - inicio, 3)
+
+    return resultado
@@ -0,0 +1,150 @@
+"""
+Exportações em streaming (CSV ou NDJSON) de agendamentos, avaliações e certificados, para a coordenação.
+
+Decisão: Cada exportação é uma projeção .values_list() com os JOINs até aluno, professor e disciplina,
+lida com .iterator(chunk_size=...) e escrita na resposta em blocos à medida que chega do banco. A memória
+do processo fica constante qualquer que seja o número de linhas (nada de serializer nem lista completa).
+Sob ASGI a mesma leitura vira um iterador assíncrono: o Django serviria um iterador síncrono acumulando tudo antes.
+"""
+import csv
+import datetime
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import (
+    Agendamento, AgendamentoArquivado, Avaliacao, AvaliacaoArquivada, Certificado, CertificadoArquivado,
+)
+
+LOTE = 2000
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def _colunas_da_aula(prefixo):
+    # Colunas comuns: a aula (horário), o aluno, o professor e a disciplina, a partir do caminho até o Agendamento.
+    horario = f'{prefixo}disponibilidade__'
+    return {
+        'agendamento_id': f'{prefixo}id',
+        'data_aula': f'{horario}data',
+        'hora_aula': f'{horario}horario_inicio',
+        'aluno_id': f'{prefixo}aluno_id',
+        'aluno_nome': f'{prefixo}aluno__nome',
+        'professor_id': f'{horario}professor_id',
+        'professor_nome': f'{horario}professor__nome',
+        'disciplina_id': f'{horario}disciplina_id',
+        'disciplina_nome': f'{horario}disciplina__nome',
+    }
+
+
+# nome -> (modelo, modelo arquivado, caminho até o Agendamento, {coluna: caminho do .values_list()}).
+EXPORTACOES = {
+    'agendamentos': (Agendamento, AgendamentoArquivado, '', {
+        **_colunas_da_aula(''),
+        'status': 'status',
+        'assunto': 'disponibilidade__assunto',
+    }),
+    'avaliacoes': (Avaliacao, AvaliacaoArquivada, 'agendamento__', {
+        'id': 'id',
+        'tipo_avaliador': 'tipo_avaliador',
+        'nota': 'nota',
+        'comentario': 'comentario',
+        'criado_em': 'criado_em',
+        **_colunas_da_aula('agendamento__'),
+    }),
+    'certificados': (Certificado, CertificadoArquivado, 'agendamento__', {
+        'id': 'id',
+        'codigo_validacao': 'codigo_validacao',
+        'data_emissao': 'data_emissao',
+        'horas': 'horas',
+        **_colunas_da_aula('agendamento__'),
+    }),
+}
+
+
+def querysets(nome, filtros, incluir_historico=False):
+    """
+    Querysets da exportação (tabela quente e, se pedido, o histórico arquivado), já filtrados e projetados.
+    'filtros' usa as chaves de, ate (datas da aula), professor e disciplina.
+    """
+    modelo, arquivado, caminho, colunas = EXPORTACOES[nome]
+    horario = f'{caminho}disponibilidade__'
+    condicoes = {
+        lookup: filtros[chave]
+        for chave, lookup in (
+            ('de', f'{horario}data__gte'), ('ate', f'{horario}data__lte'),
+            ('professor', f'{horario}professor_id'), ('disciplina', f'{horario}disciplina_id'),
+        )
+        if filtros.get(chave) is not None
+    }
+    modelos = (modelo, arquivado) if incluir_historico else (modelo,)
+    return [m.objects.filter(**condicoes).order_by('pk').values_list(*colunas.values()) for m in modelos]
+
+
+# --- FORMATAÇÃO ---
+
+class _Eco:
+    # "Arquivo" do csv.writer que só devolve o que recebeu: cada writerow vira uma string.
+    def write(self, valor):
+        return valor
+
+
+def formatador(nome, formato):
+    """Retorna (cabeçalho, função linha -> texto) para o formato pedido."""
+    colunas = list(EXPORTACOES[nome][3])
+    if formato == 'csv':
+        escritor = csv.writer(_Eco())
+        return escritor.writerow(colunas), lambda linha: escritor.writerow([_texto(valor) for valor in linha])
+    codificador = DjangoJSONEncoder(ensure_ascii=False)
+    return '', lambda linha: codificador.encode(dict(zip(colunas, linha))) + '\n'
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, (datetime.date, datetime.time)):
+        return valor.isoformat()
+    return valor
+
+
+# --- STREAMING ---
+
+def linhas(consultas, cabecalho, formatar, lote=LOTE):
+    """Gerador síncrono: o cabeçalho e depois blocos de até 'lote' linhas formatadas."""
+    if cabecalho:
+        yield cabecalho
+    for consulta in consultas:
+        bloco = []
+        for linha in consulta.iterator(chunk_size=lote):
+            bloco.append(formatar(linha))
+            if len(bloco) >= lote:
+                yield ''.join(bloco)
+                bloco = []
+        if bloco:
+            yield ''.join(bloco)
+
+
+async def alinhas(consultas, cabecalho, formatar, lote=LOTE):
+    """
+    Versão assíncrona de linhas(), para respostas servidas sob ASGI. Cada bloco é lido do mesmo
+    .iterator() em uma thread (sync_to_async): o aiterator() do Django 5.2 executa a query de um
+    values_list() dentro do event loop e é recusado (SynchronousOnlyOperation).
+    """
+    if cabecalho:
+        yield cabecalho
+    for consulta in consultas:
+        registros = consulta.iterator(chunk_size=lote) # Gerador: a query só roda no primeiro bloco.
+        while True:
+            bloco = await sync_to_async(_proximo_bloco)(registros, lote)
+            if bloco:
+                yield ''.join(map(formatar, bloco))
+            if len(bloco) < lote:
+                break
+
+
+def _proximo_bloco(registros, lote):
+    return list(islice(registros, lote))
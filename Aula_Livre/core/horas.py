@@ -0,0 +1,133 @@
+"""
+Livro-razão das horas voluntárias.
+
+Decisão: A emissão de um Certificado (download_certificado, síncrono ou assíncrono) lança as horas, na mesma
+transação e com UPDATE ... SET horas = horas + delta, em três níveis materializados:
+  - HorasVoluntarias (usuário, disciplina, mês): relatório individual e filtros finos;
+  - HorasPorUsuarioAno (usuário, ano): ranking anual de voluntários;
+  - HorasPorDisciplinaMes (papel, disciplina, mês): totais e séries da plataforma.
+Os relatórios nunca percorrem Certificado -> Agendamento -> Disponibilidade -> Usuario. reconstruir()
+(comando reconstruir_horas) refaz os três níveis a partir dos Certificados (cargas em lote ou desvios).
+"""
+from decimal import Decimal
+from itertools import product
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+from . import arquivo
+from .models import Agendamento, HorasPorDisciplinaMes, HorasPorUsuarioAno, HorasVoluntarias, VersaoDados
+
+LOTE = 2000
+MODELOS = {modelo.__name__: modelo for modelo in (HorasVoluntarias, HorasPorUsuarioAno, HorasPorDisciplinaMes)}
+
+# Campos que identificam a linha de cada nível.
+CAMPOS_CHAVE = {
+    'HorasVoluntarias': ('usuario_id', 'papel', 'disciplina_id', 'mes'),
+    'HorasPorUsuarioAno': ('usuario_id', 'papel', 'ano'),
+    'HorasPorDisciplinaMes': ('papel', 'disciplina_id', 'mes'),
+}
+
+
+def chaves(usuario_id, papel, disciplina_id, mes):
+    # Linha de cada nível que recebe um lançamento deste participante: [(nome do modelo, {campo: valor})].
+    valores = {
+        'HorasVoluntarias': (usuario_id, papel, disciplina_id, mes),
+        'HorasPorUsuarioAno': (usuario_id, papel, mes.year),
+        'HorasPorDisciplinaMes': (papel, disciplina_id, mes),
+    }
+    return [(nome, dict(zip(campos, valores[nome]))) for nome, campos in CAMPOS_CHAVE.items()]
+
+
+def participantes(agendamento_id):
+    # [(usuario_id, papel, disciplina_id, mes)] do professor e do aluno da aula, ou [] se ela já não existir.
+    linha = (
+        Agendamento.objects.filter(pk=agendamento_id)
+        .values_list('aluno_id', 'disponibilidade__professor_id', 'disponibilidade__disciplina_id', 'disponibilidade__data')
+        .first()
+    )
+    if linha is None:
+        return []
+    aluno_id, professor_id, disciplina_id, data = linha
+    mes = data.replace(day=1)
+    return [(professor_id, 'PROFESSOR', disciplina_id, mes), (aluno_id, 'ALUNO', disciplina_id, mes)]
+
+
+def lancar(agendamento_id, horas, sinal=1):
+    """Lança (sinal=1) ou estorna (sinal=-1) as horas de um certificado nos três níveis, para o professor e o aluno."""
+    for participante in participantes(agendamento_id):
+        for nome, chave in chaves(*participante):
+            modelo = MODELOS[nome]
+            if sinal > 0:
+                # Restrição única por chave (models.py): quem perde a corrida do INSERT relê a linha do outro.
+                modelo.objects.get_or_create(**chave)
+            # No estorno sem linha (ex.: usuário sendo excluído em cascata) não há nada a atualizar.
+            modelo.objects.filter(**chave).update(horas=F('horas') + sinal * horas, certificados=F('certificados') + sinal)
+    VersaoDados.incrementar(*MODELOS.values()) # UPDATE por queryset não dispara sinais: versão manual.
+
+
+def dados_certificado(certificado):
+    # Campos do Certificado que afetam o livro (comparados antes/depois de cada gravação).
+    return {'agendamento_id': certificado.agendamento_id, 'horas': Decimal(str(certificado.horas))}
+
+
+def certificado_alterado(anterior, atual):
+    """Estorna a versão anterior do certificado (se houver) e lança a atual (se houver)."""
+    if anterior == atual:
+        return
+    for dados, sinal in ((anterior, -1), (atual, 1)):
+        if dados is not None:
+            lancar(dados['agendamento_id'], dados['horas'], sinal)
+
+
+# --- RECONSTRUÇÃO ---
+
+def calcular(modelos=None):
+    """
+    Agrega os três níveis do zero a partir dos Certificados (tabela quente e histórico arquivado).
+    Retorna {nome do modelo: {valores de CAMPOS_CHAVE: {'horas': ..., 'certificados': ...}}}.
+    """
+    niveis = {nome: {} for nome in MODELOS}
+    fontes = arquivo.fontes(modelos, 'Certificado')
+    for fonte, (papel, caminho) in product(fontes, (('PROFESSOR', 'agendamento__disponibilidade__professor'), ('ALUNO', 'agendamento__aluno'))):
+        agregados = (
+            fonte.objects.order_by().values(
+                usuario=F(caminho), disciplina=F('agendamento__disponibilidade__disciplina'),
+                mes_aula=TruncMonth('agendamento__disponibilidade__data'),
+            )
+            .annotate(total=Sum('horas'), quantidade=Count('id'))
+        )
+        for linha in agregados:
+            for nome, chave in chaves(linha['usuario'], papel, linha['disciplina'], linha['mes_aula']):
+                item = niveis[nome].setdefault(tuple(chave.values()), {'horas': Decimal(0), 'certificados': 0})
+                item['horas'] += linha['total']
+                item['certificados'] += linha['quantidade']
+    return niveis
+
+
+def reconstruir(modelos=None, lote=LOTE):
+    """Recalcula e regrava os três níveis. Retorna quantas linhas existem e quantas estavam divergentes."""
+    modelos = modelos or {}
+    resultado = {'linhas': 0, 'corrigidas': 0}
+    with transaction.atomic():
+        for nome, novas in calcular(modelos).items():
+            modelo = modelos.get(nome, MODELOS[nome])
+            campos = CAMPOS_CHAVE[nome]
+            existentes = {}
+            for linha in modelo.objects.values(*campos, 'horas', 'certificados'):
+                atual = existentes.setdefault(tuple(linha[campo] for campo in campos), {'horas': Decimal(0), 'certificados': 0})
+                atual['horas'] += linha['horas']
+                atual['certificados'] += linha['certificados']
+            resultado['corrigidas'] += sum(
+                1 for chave in novas.keys() | existentes.keys() if novas.get(chave) != existentes.get(chave)
+            )
+
+            modelo.objects.all().delete()
+            modelo.objects.bulk_create(
+                [modelo(**dict(zip(campos, chave)), **valores) for chave, valores in novas.items()], batch_size=lote
+            )
+            resultado['linhas'] += len(novas)
+        if not modelos:
+            VersaoDados.incrementar(*MODELOS.values())
+    return resultado
@@ -0,0 +1,372 @@
+"""
+Importação em lote de usuários e horários (onboarding de escolas parceiras): comando importar_dados e
+POST /api/importar/<tipo>/.
+
+Decisão: O arquivo (CSV, NDJSON ou array JSON) é lido registro a registro, sem ser carregado inteiro, e processado
+em lotes de LOTE linhas. Cada lote é validado com um número fixo de queries (e-mails já cadastrados, professores e
+horários existentes buscados de uma vez), as senhas aprovadas viram hash em um pool de processos (o PBKDF2 é CPU
+puro: threads ficariam presas no GIL) e as linhas aprovadas são gravadas com bulk_create em uma transação por lote.
+Uma linha inválida não derruba as demais: ela entra no relatório com o número da linha e as mensagens por campo.
+Lotes já gravados continuam gravados se o arquivo quebrar no meio; o relatório diz até onde a importação chegou.
+"""
+import csv
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from . import busca
+from .eventos import ABERTO, publicar_ao_confirmar
+from .exceptions import ArquivoInvalido
+from .models import Disciplina, Disponibilidade, Usuario, VersaoDados
+from .serializers import ImportacaoDisponibilidadeSerializer, ImportacaoUsuarioSerializer
+
+LOTE = 500
+MIN_POOL = 8 # Com menos senhas que isso no lote, o hash roda no próprio processo (subir o pool custa mais).
+TAMANHO_BLOCO = 64 * 1024 # Leitura incremental do array JSON.
+SEPARADOR_LISTA = ';' # Listas em uma célula de CSV (ex.: disciplinas="Matemática;Física").
+
+FORMATOS = ('csv', 'ndjson', 'json')
+EXTENSOES = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.json': 'json'}
+
+
+def formato_do_arquivo(nome, formato=None):
+    """Formato pedido explicitamente ou, na falta dele, deduzido da extensão do arquivo."""
+    if formato:
+        if formato not in FORMATOS:
+            raise ArquivoInvalido(f'Formato desconhecido. Use um de: {", ".join(FORMATOS)}.')
+        return formato
+    formato = EXTENSOES.get(os.path.splitext(nome or '')[1].lower())
+    if formato is None:
+        raise ArquivoInvalido(f'Não foi possível deduzir o formato pela extensão. Use um de: {", ".join(FORMATOS)}.')
+    return formato
+
+
+# --- LEITURA (um registro por vez) ---
+
+def registros(arquivo, formato, colunas=()):
+    """
+    Gera (número da linha, registro) a partir de um arquivo de texto aberto. No array JSON o "número da linha"
+    é a posição do objeto no array. Registros que não são objetos JSON saem como None (erro da linha, não do arquivo).
+    """
+    if formato == 'csv':
+        return _csv(arquivo, colunas)
+    if formato == 'ndjson':
+        return _ndjson(arquivo)
+    return _array_json(arquivo)
+
+
+def _csv(arquivo, colunas):
+    leitor = csv.DictReader(arquivo)
+    if leitor.fieldnames is None:
+        raise ArquivoInvalido('Arquivo vazio.')
+    ausentes = [coluna for coluna in colunas if coluna not in leitor.fieldnames]
+    if ausentes:
+        raise ArquivoInvalido(f'Colunas obrigatórias ausentes: {", ".join(ausentes)}.')
+    for registro in leitor:
+        # Célula vazia = campo não informado; colunas a mais (chave None) são ignoradas.
+        registro = {chave: valor.strip() for chave, valor in registro.items() if chave and valor and valor.strip()}
+        if 'disciplinas' in registro:
+            registro['disciplinas'] = [nome.strip() for nome in registro['disciplinas'].split(SEPARADOR_LISTA) if nome.strip()]
+        yield leitor.line_num, registro
+
+
+def _ndjson(arquivo):
+    for numero, texto in enumerate(arquivo, start=1):
+        if not texto.strip():
+            continue
+        try:
+            registro = json.loads(texto)
+        except ValueError:
+            registro = None
+        yield numero, registro if isinstance(registro, dict) else None
+
+
+def _array_json(arquivo, tamanho=TAMANHO_BLOCO):
+    # Array JSON lido em blocos: cada elemento é decodificado (raw_decode) assim que estiver completo no buffer.
+    decodificador = json.JSONDecoder()
+    buffer, numero, esperando_valor = '', 0, True
+    fim_do_arquivo = False
+
+    def ler():
+        nonlocal buffer, fim_do_arquivo
+        bloco = arquivo.read(tamanho)
+        fim_do_arquivo = not bloco
+        buffer += bloco
+
+    ler()
+    buffer = buffer.lstrip()
+    if not buffer.startswith('['):
+        raise ArquivoInvalido('O arquivo JSON deve conter um array de objetos.')
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip()
+        if not buffer:
+            if fim_do_arquivo:
+                raise ArquivoInvalido('Array JSON incompleto.')
+            ler()
+            continue
+        if esperando_valor:
+            if buffer[0] == ']' and numero == 0:
+                return
+            try:
+                valor, fim = decodificador.raw_decode(buffer)
+            except ValueError:
+                if fim_do_arquivo:
+                    raise ArquivoInvalido(f'JSON inválido no registro {numero + 1}.')
+                ler() # Elemento ainda incompleto no buffer.
+                continue
+            numero += 1
+            buffer, esperando_valor = buffer[fim:], False
+            yield numero, valor if isinstance(valor, dict) else None
+        elif buffer[0] == ',':
+            buffer, esperando_valor = buffer[1:], True
+        elif buffer[0] == ']':
+            return
+        else:
+            raise ArquivoInvalido(f'JSON inválido após o registro {numero}.')
+
+
+# --- VALIDAÇÃO (por lote) ---
+
+def _erro(linha, erros):
+    return {'linha': linha, 'erros': erros}
+
+
+def _formato_das_linhas(lote, serializer_class, erros):
+    # Primeira passada: tipos e formatos de cada linha, sem tocar no banco. Retorna [(linha, dados validados)].
+    # Um único serializer para o lote (run_validation em vez de is_valid): instanciar um por linha copia
+    # todos os campos a cada vez e dominava o tempo de validação.
+    serializer = serializer_class()
+    validos = []
+    for linha, registro in lote:
+        if registro is None:
+            erros.append(_erro(linha, {'non_field_errors': ['Registro inválido: esperado um objeto JSON.']}))
+            continue
+        try:
+            validos.append((linha, serializer.run_validation(registro)))
+        except serializers.ValidationError as erro:
+            erros.append(_erro(linha, erro.detail))
+    return validos
+
+
+def validar_usuarios(lote, estado, erros):
+    """Valida um lote de usuários: formato, senha, e-mail repetido (arquivo ou banco) e disciplinas existentes."""
+    validos = _formato_das_linhas(lote, ImportacaoUsuarioSerializer, erros)
+    cadastrados = set(
+        Usuario.objects.filter(email__in=[dados['email'] for _, dados in validos]).values_list('email', flat=True)
+    )
+    aprovados = []
+    for linha, dados in validos:
+        problemas = {}
+        email = dados['email']
+        if email in cadastrados:
+            problemas['email'] = ['Já existe um usuário com este e-mail.']
+        elif email in estado['vistos']:
+            problemas['email'] = [f'E-mail repetido no arquivo (linha {estado["vistos"][email]}).']
+        desconhecidas = [nome for nome in dados.get('disciplinas', ()) if nome.casefold() not in estado['disciplinas']]
+        if desconhecidas:
+            problemas['disciplinas'] = [f'Disciplina não encontrada: {nome}.' for nome in desconhecidas]
+        if problemas:
+            erros.append(_erro(linha, problemas))
+        else:
+            estado['vistos'][email] = linha
+            aprovados.append((linha, dados))
+    return aprovados
+
+
+def validar_disponibilidades(lote, estado, erros):
+    """Valida um lote de horários: formato, professor cadastrado, disciplina existente e horário repetido (arquivo ou banco)."""
+    validos = _formato_das_linhas(lote, ImportacaoDisponibilidadeSerializer, erros)
+    professores = {
+        email: (pk, tipo)
+        for email, pk, tipo in Usuario.objects.filter(email__in={dados['professor'] for _, dados in validos})
+        .values_list('email', 'pk', 'tipo')
+    }
+    ids = [pk for pk, tipo in professores.values() if tipo == 'PROFESSOR']
+    existentes = set(
+        Disponibilidade.objects.filter(professor_id__in=ids, data__in={dados['data'] for _, dados in validos})
+        .values_list('professor_id', 'data', 'horario_inicio')
+    )
+    aprovados = []
+    for linha, dados in validos:
+        problemas = {}
+        professor_id, tipo = professores.get(dados['professor'], (None, None))
+        if professor_id is None:
+            problemas['professor'] = ['Professor não encontrado.']
+        elif tipo != 'PROFESSOR':
+            problemas['professor'] = ['O usuário informado não é professor.']
+        nome_disciplina = dados.get('disciplina')
+        if nome_disciplina and nome_disciplina.casefold() not in estado['disciplinas']:
+            problemas['disciplina'] = [f'Disciplina não encontrada: {nome_disciplina}.']
+        chave = (professor_id, dados['data'], dados['horario_inicio'])
+        if not problemas:
+            if chave in existentes:
+                problemas['horario_inicio'] = ['O professor já tem um horário nesta data e hora.']
+            elif chave in estado['vistos']:
+                problemas['horario_inicio'] = [f'Horário repetido no arquivo (linha {estado["vistos"][chave]}).']
+        if problemas:
+            erros.append(_erro(linha, problemas))
+        else:
+            estado['vistos'][chave] = linha
+            aprovados.append((linha, {**dados, 'professor_id': professor_id}))
+    return aprovados
+
+
+# --- GRAVAÇÃO (uma transação por lote) ---
+
+def _inserir(modelo, linhas_objetos, erros):
+    """
+    bulk_create do lote. Se o banco recusar (ex.: e-mail cadastrado por outra requisição depois da validação),
+    regrava linha a linha, cada uma em seu savepoint, para apontar as culpadas. Retorna [(linha, objeto criado)].
+    """
+    try:
+        with transaction.atomic():
+            criados = modelo.objects.bulk_create([objeto for _, objeto in linhas_objetos])
+            return [(linha, objeto) for (linha, _), objeto in zip(linhas_objetos, criados)]
+    except IntegrityError:
+        pass
+    criados = []
+    for linha, objeto in linhas_objetos:
+        try:
+            with transaction.atomic():
+                modelo.objects.bulk_create([objeto])
+            criados.append((linha, objeto))
+        except IntegrityError:
+            erros.append(_erro(linha, {'non_field_errors': ['Conflito com um registro gravado durante a importação.']}))
+    return criados
+
+
+def gravar_usuarios(aprovados, estado, erros, hashear):
+    senhas = hashear([dados['senha'] for _, dados in aprovados])
+    linhas_objetos = [
+        (linha, Usuario(username=dados['email'], email=dados['email'], nome=dados['nome'], tipo=dados['tipo'], password=senha))
+        for (linha, dados), senha in zip(aprovados, senhas)
+    ]
+    disciplinas = {linha: dados.get('disciplinas', ()) for linha, dados in aprovados}
+    with transaction.atomic():
+        criados = _inserir(Usuario, linhas_objetos, erros)
+        Vinculo = Disciplina.professores.through
+        vinculos = {
+            (estado['disciplinas'][nome.casefold()].pk, usuario.pk)
+            for linha, usuario in criados for nome in disciplinas[linha]
+        }
+        Vinculo.objects.bulk_create([Vinculo(disciplina_id=disciplina, usuario_id=usuario) for disciplina, usuario in vinculos])
+        # bulk_create não dispara sinais: versão (ETags e caches) e índice de busca manuais.
+        VersaoDados.incrementar(Usuario, *((Disciplina,) if vinculos else ()))
+        busca.indexar(busca.PROFESSOR, [usuario for _, usuario in criados if usuario.tipo == 'PROFESSOR'])
+    return len(criados)
+
+
+def gravar_disponibilidades(aprovados, estado, erros, hashear):
+    linhas_objetos = [
+        (linha, Disponibilidade(
+            professor_id=dados['professor_id'],
+            disciplina=estado['disciplinas'].get(dados.get('disciplina', '').casefold()),
+            assunto=dados.get('assunto'),
+            nivel=dados.get('nivel'),
+            descricao=dados.get('descricao'),
+            link=dados.get('link'),
+            data=dados['data'],
+            horario_inicio=dados['horario_inicio'],
+        ))
+        for linha, dados in aprovados
+    ]
+    with transaction.atomic():
+        criados = [horario for _, horario in _inserir(Disponibilidade, linhas_objetos, erros)]
+        VersaoDados.incrementar(Disponibilidade) # Mesmo tratamento da recorrência: versão, índice e eventos manuais.
+        busca.indexar(busca.HORARIO, criados)
+        publicar_ao_confirmar(ABERTO, criados)
+    return len(criados)
+
+
+# tipo -> (colunas obrigatórias do CSV, validação do lote, gravação do lote).
+IMPORTACOES = {
+    'usuarios': (('nome', 'email', 'senha', 'tipo'), validar_usuarios, gravar_usuarios),
+    'disponibilidades': (('professor', 'data', 'horario_inicio'), validar_disponibilidades, gravar_disponibilidades),
+}
+
+
+# --- HASH DE SENHAS ---
+
+def pool_de_hash(processos):
+    # 'spawn': processos limpos, sem herdar conexões abertas nem as threads do servidor (fork é inseguro com threads).
+    # make_password só precisa das settings (DJANGO_SETTINGS_MODULE é herdado do ambiente).
+    return ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context('spawn'))
+
+
+def hashear(senhas, executor=None, processos=1):
+    """Hash das senhas na ordem recebida, no pool (se houver) ou no próprio processo."""
+    if executor is None:
+        return [make_password(senha) for senha in senhas]
+    return list(executor.map(make_password, senhas, chunksize=max(1, len(senhas) // (processos * 4))))
+
+
+# --- ORQUESTRAÇÃO ---
+
+def importar(tipo, arquivo, formato, lote=LOTE, processos=None, simular=False):
+    """
+    Importa o arquivo (já aberto em modo texto) em lotes. Com simular=True só valida (nada é gravado nem
+    transformado em hash). Retorna o relatório: contagens, erros por linha, duração por fase e linhas/s.
+    """
+    colunas, validar, gravar = IMPORTACOES[tipo]
+    processos = processos or os.cpu_count() or 1
+    resultado = {
+        'tipo': tipo, 'simulacao': simular, 'linhas': 0, 'validas': 0, 'importadas': 0, 'rejeitadas': 0, 'lotes': 0,
+        'duracao_s': {'leitura_validacao': 0.0, 'hash_senhas': 0.0, 'gravacao': 0.0},
+    }
+    duracao = resultado['duracao_s']
+    erros = []
+    estado = {'vistos': {}, 'disciplinas': {disciplina.nome.casefold(): disciplina for disciplina in Disciplina.objects.all()}}
+    executor = None
+
+    def hashear_lote(senhas):
+        nonlocal executor
+        inicio = time.perf_counter()
+        if processos > 1 and len(senhas) >= MIN_POOL:
+            if executor is None:
+                executor = pool_de_hash(processos) # Criado uma vez, no primeiro lote que compensa, e reaproveitado.
+            senhas = hashear(senhas, executor, processos)
+        else:
+            senhas = hashear(senhas)
+        duracao['hash_senhas'] += time.perf_counter() - inicio
+        return senhas
+
+    inicio_total = time.perf_counter()
+    try:
+        linhas = registros(arquivo, formato, colunas)
+        while True:
+            inicio = time.perf_counter()
+            bloco = list(islice(linhas, lote))
+            if not bloco:
+                break
+            aprovados = validar(bloco, estado, erros)
+            duracao['leitura_validacao'] += time.perf_counter() - inicio
+            resultado['linhas'] += len(bloco)
+            resultado['validas'] += len(aprovados)
+            resultado['lotes'] += 1
+            if aprovados and not simular:
+                resultado['importadas'] += gravar(aprovados, estado, erros, hashear_lote)
+    except (ArquivoInvalido, UnicodeDecodeError) as erro:
+        # Os lotes anteriores já foram gravados: o relatório registra o erro e até onde a leitura chegou.
+        resultado['erro_arquivo'] = str(erro) if isinstance(erro, ArquivoInvalido) else 'O arquivo deve estar em UTF-8.'
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # Tempo de gravação = total menos as outras fases (gravar() inclui o hash das senhas).
+    total = time.perf_counter() - inicio_total
+    duracao['gravacao'] = max(0.0, total - duracao['leitura_validacao'] - duracao['hash_senhas'])
+    for fase in duracao:
+        duracao[fase] = round(duracao[fase], 3)
+    duracao['total'] = round(total, 3)
+    resultado['rejeitadas'] = len(erros)
+    resultado['linhas_por_s'] = round(resultado['linhas'] / total, 1) if total else None
+    resultado['erros'] = sorted(erros, key=lambda erro: erro['linha'])
+    return resultado
@@ -0,0 +1,32 @@
+import datetime
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import arquivo
+
+
+class Command(BaseCommand):
+    help = (
+        'Move para as tabelas de histórico os horários anteriores ao horizonte (sem agendamento pendente), '
+        'com seus agendamentos, avaliações e certificados. Pode ser interrompido e repetido: cada lote é uma transação.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=arquivo.HORIZONTE.days,
+            help='Horizonte: arquiva horários com data anterior a hoje menos N dias.',
+        )
+        parser.add_argument('--lote', type=int, default=arquivo.LOTE, help='Horários movidos por transação.')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote deve ser maior que zero.')
+        if options['dias'] < 0:
+            raise CommandError('--dias não pode ser negativo.')
+
+        inicio = time.perf_counter()
+        resultado = arquivo.arquivar(horizonte=datetime.timedelta(days=options['dias']), lote=options['lote'])
+        resultado['duracao_s'] = round(time.perf_counter() - inicio, 2)
+        self.stdout.write(json.dumps(resultado, indent=2))
@@ -0,0 +1,165 @@
+import json
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.management.commands.popular_dados import DOMINIO_SEED, SENHA_SEED
+from core.models import Agendamento, Disponibilidade, Usuario
+
+
+def percentil(valores_ordenados, p):
+    # Percentil pelo método "nearest rank".
+    if not valores_ordenados:
+        return None
+    indice = max(0, min(len(valores_ordenados) - 1, round(p / 100 * len(valores_ordenados)) - 1))
+    return valores_ordenados[indice]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark dos principais endpoints da API sobre os dados de popular_dados. '
+        'Reporta p50/p95/p99, queries por requisição e throughput em JSON.'
+    )
+
+    CENARIOS = ('professores', 'agendamentos_aluno', 'agendamentos_professor', 'reserva', 'login', 'certificado')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requisicoes', type=int, default=200, help='Requisições por cenário.')
+        parser.add_argument('--aquecimento', type=int, default=10, help='Requisições descartadas antes de medir.')
+        parser.add_argument('--cenarios', nargs='+', choices=self.CENARIOS, default=list(self.CENARIOS))
+        parser.add_argument('--semente', type=int, default=42)
+        parser.add_argument('--saida', help='Arquivo para gravar o JSON (além do stdout).')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['semente'])
+        self.professores = list(Usuario.objects.filter(email__endswith=DOMINIO_SEED, tipo='PROFESSOR').values_list('id', flat=True))
+        self.alunos = list(Usuario.objects.filter(email__endswith=DOMINIO_SEED, tipo='ALUNO').values_list('id', flat=True))
+        if not self.professores or not self.alunos:
+            raise CommandError('Nenhum dado gerado encontrado. Rode "python manage.py popular_dados" antes.')
+
+        host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*',) and not h.startswith('.')), 'localhost')
+        self.client = Client(HTTP_HOST=host)
+
+        resultado = {
+            'executado_em': timezone.now().isoformat(),
+            'requisicoes_por_cenario': options['requisicoes'],
+            'dataset': {
+                'professores': len(self.professores),
+                'alunos': len(self.alunos),
+                'disponibilidades': Disponibilidade.objects.count(),
+                'agendamentos': Agendamento.objects.count(),
+            },
+            'cenarios': {},
+        }
+        for nome in options['cenarios']:
+            preparar = getattr(self, f'preparar_{nome}')
+            requisicoes, limpar = preparar(options['requisicoes'] + options['aquecimento'])
+            try:
+                resultado['cenarios'][nome] = self.medir(requisicoes, options['aquecimento'])
+            finally:
+                limpar()
+
+        saida = json.dumps(resultado, indent=2)
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                arquivo.write(saida)
+        self.stdout.write(saida)
+
+    def medir(self, requisicoes, aquecimento):
+        latencias, queries, status = [], [], {}
+        inicio_total = None
+        for i, requisicao in enumerate(requisicoes):
+            if i == aquecimento:
+                inicio_total = time.perf_counter()
+            with CaptureQueriesContext(connection) as ctx:
+                inicio = time.perf_counter()
+                response = requisicao()
+                latencia = time.perf_counter() - inicio
+            if i < aquecimento:
+                continue
+            latencias.append(latencia * 1000)
+            queries.append(len(ctx.captured_queries))
+            status[str(response.status_code)] = status.get(str(response.status_code), 0) + 1
+
+        duracao = time.perf_counter() - inicio_total if inicio_total else 0
+        latencias.sort()
+        return {
+            'requisicoes': len(latencias),
+            'status': status,
+            'p50_ms': round(percentil(latencias, 50), 3),
+            'p95_ms': round(percentil(latencias, 95), 3),
+            'p99_ms': round(percentil(latencias, 99), 3),
+            'media_ms': round(statistics.fmean(latencias), 3),
+            'queries_por_requisicao': round(statistics.fmean(queries), 2),
+            'queries_max': max(queries),
+            'throughput_rps': round(len(latencias) / duracao, 1) if duracao else None,
+        }
+
+    # --- Cenários: cada um devolve (lista de chamadas, função de limpeza) ---
+
+    def logar(self, user_id):
+        self.client.force_login(Usuario.objects.get(id=user_id))
+
+    def preparar_professores(self, n):
+        self.client.logout()
+        return [lambda: self.client.get('/api/professores/', {'disponivel': 'true'})] * n, lambda: None
+
+    def preparar_agendamentos_aluno(self, n):
+        aluno_id = self.rng.choice(self.alunos)
+        self.logar(aluno_id)
+        return [lambda: self.client.get('/api/agendamentos/', {'aluno_id': aluno_id})] * n, lambda: None
+
+    def preparar_agendamentos_professor(self, n):
+        professor_id = self.rng.choice(self.professores)
+        self.logar(professor_id)
+        return [lambda: self.client.get('/api/agendamentos/', {'professor_id': professor_id})] * n, lambda: None
+
+    def preparar_reserva(self, n):
+        # Reserva horários futuros livres; ao final, os agendamentos criados são desfeitos.
+        livres = list(
+            Disponibilidade.objects.filter(disponivel=True, data__gte=timezone.localdate())
+            .values_list('id', flat=True)[:n]
+        )
+        if not livres:
+            raise CommandError('Não há horários futuros livres para o cenário de reserva.')
+        aluno_id = self.rng.choice(self.alunos)
+        self.logar(aluno_id)
+
+        def reservar(slot_id):
+            return lambda: self.client.post(
+                '/api/agendamentos/', {'aluno': aluno_id, 'disponibilidade': slot_id, 'status': 'AGENDADO'},
+                content_type='application/json'
+            )
+
+        def limpar():
+            Agendamento.objects.filter(aluno_id=aluno_id, disponibilidade_id__in=livres).delete()
+            Disponibilidade.objects.filter(id__in=livres).update(disponivel=True)
+
+        return [reservar(livres[i % len(livres)]) for i in range(n)], limpar
+
+    def preparar_login(self, n):
+        emails = list(Usuario.objects.filter(id__in=self.rng.sample(self.alunos, k=min(50, len(self.alunos)))).values_list('email', flat=True))
+
+        def login(email):
+            return lambda: self.client.post('/api/login/', {'email': email, 'senha': SENHA_SEED}, content_type='application/json')
+
+        return [login(emails[i % len(emails)]) for i in range(n)], self.client.logout
+
+    def preparar_certificado(self, n):
+        concluidos = list(
+            Agendamento.objects.filter(status='CONCLUIDO', aluno__email__endswith=DOMINIO_SEED)
+            .values_list('id', 'aluno_id')[:n]
+        )
+        if not concluidos:
+            raise CommandError('Não há aulas concluídas para o cenário de certificado.')
+        _, aluno_id = concluidos[0]
+        self.logar(aluno_id)
+        meus = [a for a, dono in concluidos if dono == aluno_id]
+        return [lambda a=meus[i % len(meus)]: self.client.get(f'/api/certificado/{a}/download/') for i in range(n)], lambda: None
@@ -0,0 +1,181 @@
+import asyncio
+import io
+import json
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from core.management.commands.benchmark_api import percentil
+from core.management.commands.popular_dados import DOMINIO_SEED
+from core.models import Agendamento, Disponibilidade, Usuario
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara throughput e latência de cauda das leituras mais acessadas com requisições concorrentes: '
+        'WSGI com as views síncronas x ASGI com as views assíncronas (core/views_async.py), sobre os mesmos dados.'
+    )
+
+    CENARIOS = ('professores', 'agendamentos', 'disciplinas', 'certificado')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concorrencia', type=int, default=32, help='Requisições simultâneas (threads no WSGI, tarefas no ASGI).')
+        parser.add_argument('--requisicoes', type=int, default=400, help='Requisições por cenário e por servidor.')
+        parser.add_argument('--aquecimento', type=int, default=20, help='Requisições descartadas antes de medir.')
+        parser.add_argument('--cenarios', nargs='+', choices=self.CENARIOS, default=list(self.CENARIOS))
+        parser.add_argument('--saida', help='Arquivo para gravar o JSON (além do stdout).')
+
+    def handle(self, *args, **options):
+        if options['concorrencia'] < 1 or options['requisicoes'] < 1:
+            raise CommandError('--concorrencia e --requisicoes devem ser maiores que zero.')
+
+        concluido = (
+            Agendamento.objects.filter(status='CONCLUIDO', aluno__email__endswith=DOMINIO_SEED)
+            .values_list('id', 'aluno_id').first()
+        )
+        if concluido is None:
+            raise CommandError('Nenhum dado gerado encontrado. Rode "python manage.py popular_dados" antes.')
+        agendamento_id, aluno_id = concluido
+
+        # Os dois servidores recebem exatamente as mesmas requisições, com a sessão do mesmo aluno.
+        self.host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*',) and not h.startswith('.')), 'localhost')
+        client = Client(HTTP_HOST=self.host)
+        client.force_login(Usuario.objects.get(id=aluno_id))
+        self.cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+        urls = {
+            'professores': '/api/professores/?disponivel=true',
+            'agendamentos': f'/api/agendamentos/?aluno_id={aluno_id}',
+            'disciplinas': '/api/disciplinas/',
+            'certificado': f'/api/certificado/{agendamento_id}/download/',
+        }
+
+        resultado = {
+            'executado_em': timezone.now().isoformat(),
+            'concorrencia': options['concorrencia'],
+            'requisicoes_por_cenario': options['requisicoes'],
+            'dataset': {
+                'professores': Usuario.objects.filter(tipo='PROFESSOR').count(),
+                'disponibilidades': Disponibilidade.objects.count(),
+                'agendamentos': Agendamento.objects.count(),
+            },
+            'cenarios': {},
+        }
+        total = options['requisicoes'] + options['aquecimento']
+        for nome in options['cenarios']:
+            url = urls[nome]
+            resultado['cenarios'][nome] = {
+                'url': url,
+                'wsgi_sync': self.medir_wsgi(url, total, options['aquecimento'], options['concorrencia']),
+                'asgi_async': self.medir_asgi(url, total, options['aquecimento'], options['concorrencia']),
+            }
+
+        saida = json.dumps(resultado, indent=2)
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                arquivo.write(saida)
+        self.stdout.write(saida)
+
+    # --- WSGI: handler síncrono chamado por um pool de threads (como um servidor WSGI multithread) ---
+
+    def medir_wsgi(self, url, total, aquecimento, concorrencia):
+        caminho, query = self._separar(url)
+        handler = WSGIHandler()
+
+        def requisicao(_):
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': caminho, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+                'SERVER_NAME': self.host, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': self.host, 'HTTP_COOKIE': self.cookie, 'HTTP_ACCEPT': 'application/json',
+                'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(b''),
+                'wsgi.errors': sys.stderr, 'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+            }
+            status = []
+            inicio = time.perf_counter()
+            response = handler(environ, lambda linha, cabecalhos: status.append(int(linha.split()[0])))
+            try:
+                b''.join(response)
+            finally:
+                response.close()
+            return time.perf_counter() - inicio, status[0]
+
+        with override_settings(ROOT_URLCONF='Aula_Livre.urls'):
+            with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+                list(executor.map(requisicao, range(aquecimento)))
+                inicio = time.perf_counter()
+                medidas = list(executor.map(requisicao, range(total - aquecimento)))
+                duracao = time.perf_counter() - inicio
+        return self.resumir(medidas, duracao)
+
+    # --- ASGI: handler assíncrono com N tarefas concorrentes no mesmo event loop (como o uvicorn) ---
+
+    def medir_asgi(self, url, total, aquecimento, concorrencia):
+        caminho, query = self._separar(url)
+        handler = ASGIHandler()
+
+        async def requisicao(limite):
+            escopo = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+                'path': caminho, 'raw_path': caminho.encode(), 'query_string': query.encode(), 'root_path': '',
+                'headers': [(b'host', self.host.encode()), (b'cookie', self.cookie.encode()), (b'accept', b'application/json')],
+                'client': ('127.0.0.1', 0), 'server': (self.host, 80),
+            }
+            enviado = asyncio.Event()
+            status = []
+
+            async def receive():
+                if not enviado.is_set():
+                    enviado.set()
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await asyncio.Event().wait() # O cliente nunca desconecta durante a medição.
+
+            async def send(mensagem):
+                if mensagem['type'] == 'http.response.start':
+                    status.append(mensagem['status'])
+
+            async with limite:
+                inicio = time.perf_counter()
+                await handler(escopo, receive, send)
+                return time.perf_counter() - inicio, status[0]
+
+        async def rodada(quantidade):
+            limite = asyncio.Semaphore(concorrencia)
+            return await asyncio.gather(*(requisicao(limite) for _ in range(quantidade)))
+
+        async def executar():
+            await rodada(aquecimento)
+            inicio = time.perf_counter()
+            medidas = await rodada(total - aquecimento)
+            return medidas, time.perf_counter() - inicio
+
+        with override_settings(ROOT_URLCONF='Aula_Livre.urls_asgi'):
+            medidas, duracao = asyncio.run(executar())
+        return self.resumir(medidas, duracao)
+
+    def _separar(self, url):
+        partes = urlsplit(url)
+        return partes.path, partes.query
+
+    def resumir(self, medidas, duracao):
+        latencias = sorted(latencia * 1000 for latencia, _ in medidas)
+        status = {}
+        for _, codigo in medidas:
+            status[str(codigo)] = status.get(str(codigo), 0) + 1
+        return {
+            'requisicoes': len(latencias),
+            'status': status,
+            'p50_ms': round(percentil(latencias, 50), 3),
+            'p95_ms': round(percentil(latencias, 95), 3),
+            'p99_ms': round(percentil(latencias, 99), 3),
+            'media_ms': round(statistics.fmean(latencias), 3),
+            'throughput_rps': round(len(latencias) / duracao, 1) if duracao else None,
+        }
@@ -0,0 +1,215 @@
+import datetime
+import json
+import multiprocessing
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+# Os modelos e a API são importados dentro das funções: este módulo é reimportado pelos processos filhos
+# (multiprocessing 'spawn') antes do django.setup().
+
+TEMPO_MAXIMO_S = 600
+
+MODOS = {
+    # modo -> (AULA_LIVRE_SQLITE_CONCORRENTE, journal_mode do arquivo durante a rodada)
+    'padrao': ('0', 'delete'),
+    'concorrente': ('1', 'wal'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de carga multiprocesso do motor de reservas no SQLite: cada processo é um aluno que, em ciclos, '
+        'lista a agenda, reserva um horário disputado, o professor confirma e o aluno cancela. Compara o modo '
+        'padrão com o modo de alta concorrência (WAL, BEGIN IMMEDIATE e retentativas): vazão e taxa de erros.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processos', type=int, default=8, help='Processos simultâneos (um aluno por processo).')
+        parser.add_argument('--ciclos', type=int, default=30, help='Ciclos reserva/confirmação/cancelamento por processo.')
+        parser.add_argument('--horarios', type=int, default=None, help='Horários disputados. Padrão: 2 por processo.')
+        parser.add_argument('--modo', choices=[*MODOS, 'ambos'], default='ambos', help='Configuração medida.')
+        parser.add_argument('--manter-dados', action='store_true', help='Não apaga os usuários/horários criados.')
+
+    def handle(self, *args, **options):
+        from core.models import Disponibilidade, Usuario
+
+        processos, ciclos = options['processos'], options['ciclos']
+        horarios = options['horarios'] or processos * 2
+        if processos < 1 or ciclos < 1 or horarios < 1:
+            raise CommandError('--processos, --ciclos e --horarios devem ser maiores que zero.')
+        if connection.vendor != 'sqlite':
+            raise CommandError('O teste de carga mede o modo SQLite: o banco padrão precisa ser SQLite.')
+
+        # Massa de dados isolada (prefixo único) para não colidir com dados reais.
+        prefixo = f'carga-{uuid.uuid4().hex[:8]}'
+        professor = Usuario.objects.create(
+            username=f'{prefixo}-prof@bench.local', email=f'{prefixo}-prof@bench.local', nome='Professor Carga', tipo='PROFESSOR'
+        )
+        alunos = Usuario.objects.bulk_create([
+            Usuario(username=f'{prefixo}-aluno{i}@bench.local', email=f'{prefixo}-aluno{i}@bench.local',
+                    nome=f'Aluno Carga {i}', tipo='ALUNO')
+            for i in range(processos)
+        ])
+        data = datetime.date.today() + datetime.timedelta(days=400)
+        slots = Disponibilidade.objects.bulk_create([
+            Disponibilidade(professor=professor, data=data + datetime.timedelta(days=i // 10), horario_inicio=datetime.time(8 + i % 10, 0))
+            for i in range(horarios)
+        ])
+
+        banco = str(connection.settings_dict['NAME'])
+        journal_original = self.journal_mode(banco)
+        modos = list(MODOS) if options['modo'] == 'ambos' else [options['modo']]
+        resultado = {'processos': processos, 'ciclos': ciclos, 'horarios': horarios, 'modos': {}}
+        try:
+            for modo in modos:
+                resultado['modos'][modo] = self.rodar(
+                    modo, banco, professor.pk, [aluno.pk for aluno in alunos], [slot.pk for slot in slots], ciclos
+                )
+        finally:
+            self.journal_mode(banco, journal_original)
+            if not options['manter_dados']:
+                Usuario.objects.filter(email__startswith=prefixo).delete()
+
+        self.stdout.write(json.dumps(resultado, indent=2))
+
+    def journal_mode(self, banco, modo=None):
+        # Troca (ou só lê) o journal_mode do arquivo. O WAL é persistente: sem isto, a rodada "padrao" depois
+        # de uma "concorrente" mediria WAL. A troca exige que nenhuma outra conexão esteja aberta.
+        connection.close()
+        conexao = sqlite3.connect(banco, timeout=30)
+        try:
+            return conexao.execute(f'PRAGMA journal_mode = {modo}' if modo else 'PRAGMA journal_mode').fetchone()[0]
+        finally:
+            conexao.close()
+
+    def rodar(self, modo, banco, professor_id, alunos, slots, ciclos):
+        from core.models import Agendamento, Disponibilidade, VersaoDados
+
+        # Cada modo parte do mesmo estado: um cancelamento que falhou na rodada anterior deixaria o horário preso.
+        Agendamento.objects.filter(disponibilidade_id__in=slots).delete()
+        Disponibilidade.objects.filter(pk__in=slots).update(disponivel=True)
+        VersaoDados.incrementar(Disponibilidade)
+
+        variavel, journal = MODOS[modo]
+        self.journal_mode(banco, journal)
+
+        contexto = multiprocessing.get_context('spawn')
+        barreira = contexto.Barrier(len(alunos) + 1) # Todos começam juntos; o +1 é o cronômetro do processo pai.
+        fila = contexto.Queue()
+        anterior = os.environ.get('AULA_LIVRE_SQLITE_CONCORRENTE')
+        os.environ['AULA_LIVRE_SQLITE_CONCORRENTE'] = variavel # Herdado pelos filhos: settings.py lê na importação.
+        try:
+            trabalhadores = [
+                contexto.Process(target=trabalhar, args=(banco, professor_id, aluno_id, slots, ciclos, semente, barreira, fila))
+                for semente, aluno_id in enumerate(alunos)
+            ]
+            for trabalhador in trabalhadores:
+                trabalhador.start()
+        finally:
+            if anterior is None:
+                os.environ.pop('AULA_LIVRE_SQLITE_CONCORRENTE', None)
+            else:
+                os.environ['AULA_LIVRE_SQLITE_CONCORRENTE'] = anterior
+
+        try:
+            barreira.wait()
+        except threading.BrokenBarrierError:
+            pass # Um filho falhou antes de começar: o placar dele traz a mensagem.
+        inicio = time.perf_counter()
+        try:
+            placares = [fila.get(timeout=TEMPO_MAXIMO_S) for _ in trabalhadores]
+        except queue.Empty:
+            raise CommandError(f'Os processos não terminaram em {TEMPO_MAXIMO_S} s.')
+        duracao = time.perf_counter() - inicio
+        for trabalhador in trabalhadores:
+            trabalhador.join()
+        if any('falha' in placar for placar in placares):
+            raise CommandError(next(placar['falha'] for placar in placares if 'falha' in placar))
+
+        totais = {chave: sum(placar[chave] for placar in placares) for chave in ('escritas_ok', 'conflitos', 'erros', 'leituras')}
+        latencias = sorted(latencia for placar in placares for latencia in placar['latencias_ms'])
+        escritas = totais['escritas_ok'] + totais['conflitos'] + totais['erros']
+        return {
+            **totais,
+            'status_erros': dict(sum((Counter(placar['status_erros']) for placar in placares), Counter())),
+            'duracao_s': round(duracao, 3),
+            'escritas_por_s': round(totais['escritas_ok'] / duracao, 1) if duracao else None,
+            'taxa_de_erros': round(totais['erros'] / escritas, 4) if escritas else 0.0,
+            'p50_escrita_ms': latencias[len(latencias) // 2] if latencias else None,
+            'p99_escrita_ms': latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))] if latencias else None,
+        }
+
+
+def trabalhar(banco, professor_id, aluno_id, slots, ciclos, semente, barreira, fila):
+    """Processo filho: um aluno repetindo o ciclo listar -> reservar -> (professor) confirmar -> cancelar."""
+    try:
+        placar = _ciclos(banco, professor_id, aluno_id, slots, ciclos, semente, barreira)
+    except Exception as erro: # Falha do próprio teste (não da aplicação): o pai aborta com a mensagem.
+        placar = {'falha': f'{type(erro).__name__}: {erro}'}
+        barreira.abort()
+    fila.put(placar)
+
+
+def _ciclos(banco, professor_id, aluno_id, slots, ciclos, semente, barreira):
+    import django
+    from django.conf import settings
+
+    # Mesmo arquivo do processo pai (ex.: o banco de testes), antes de qualquer conexão ser aberta.
+    settings.DATABASES['default']['NAME'] = banco
+    settings.ALLOWED_HOSTS = ['*']
+    django.setup()
+
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    from core import concorrencia
+    from core.models import Usuario
+
+    if not settings.SQLITE_CONCORRENTE:
+        concorrencia.TENTATIVAS = 1 # Linha de base: o comportamento de antes, sem retentativas.
+
+    aluno, professor = Usuario.objects.get(pk=aluno_id), Usuario.objects.get(pk=professor_id)
+    cliente_aluno = APIClient(raise_request_exception=False)
+    cliente_aluno.force_authenticate(user=aluno)
+    cliente_professor = APIClient(raise_request_exception=False)
+    cliente_professor.force_authenticate(user=professor)
+    rng = random.Random(semente)
+    lista = reverse('agendamento-list')
+    placar = {'escritas_ok': 0, 'conflitos': 0, 'erros': 0, 'leituras': 0, 'status_erros': {}, 'latencias_ms': []}
+
+    def escrever(requisicao):
+        inicio = time.perf_counter()
+        response = requisicao()
+        placar['latencias_ms'].append(round((time.perf_counter() - inicio) * 1000, 2))
+        if response.status_code < 300:
+            placar['escritas_ok'] += 1
+        elif response.status_code in (400, 409):
+            placar['conflitos'] += 1 # Regra de negócio: horário já reservado por outro aluno.
+        else:
+            placar['erros'] += 1
+            chave = str(response.status_code)
+            placar['status_erros'][chave] = placar['status_erros'].get(chave, 0) + 1
+        return response
+
+    barreira.wait()
+    for _ in range(ciclos):
+        cliente_aluno.get(lista, {'aluno_id': aluno_id, 'fields': 'id,status'})
+        placar['leituras'] += 1
+        response = escrever(lambda: cliente_aluno.post(
+            lista, {'aluno': aluno_id, 'disponibilidade': rng.choice(slots)}, format='json'
+        ))
+        if response.status_code != 201:
+            continue
+        detalhe = reverse('agendamento-detail', args=[response.data['id']])
+        escrever(lambda: cliente_professor.patch(detalhe, {'status': 'CONFIRMADO'}, format='json'))
+        escrever(lambda: cliente_aluno.patch(detalhe, {'status': 'CANCELADO'}, format='json'))
+    return placar
@@ -0,0 +1,114 @@
+import datetime
+import json
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.exceptions import HorarioIndisponivel
+from core.models import Agendamento, Disponibilidade, Usuario
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark de concorrência do motor de reservas: dispara N reservas paralelas '
+        'no MESMO horário e confere que exatamente uma vence.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16, help='Reservas paralelas por horário.')
+        parser.add_argument('--rodadas', type=int, default=10, help='Quantidade de horários disputados.')
+        parser.add_argument('--manter-dados', action='store_true', help='Não apaga os usuários/horários criados.')
+
+    def handle(self, *args, **options):
+        threads, rodadas = options['threads'], options['rodadas']
+        if threads < 1 or rodadas < 1:
+            raise CommandError('--threads e --rodadas devem ser maiores que zero.')
+
+        # Massa de dados isolada (prefixo único) para não colidir com dados reais.
+        prefixo = f'bench-{uuid.uuid4().hex[:8]}'
+        professor = Usuario.objects.create(
+            username=f'{prefixo}-prof@bench.local', email=f'{prefixo}-prof@bench.local',
+            nome='Professor Benchmark', tipo='PROFESSOR'
+        )
+        Usuario.objects.bulk_create([
+            Usuario(username=f'{prefixo}-aluno{i}@bench.local', email=f'{prefixo}-aluno{i}@bench.local',
+                    nome=f'Aluno Benchmark {i}', tipo='ALUNO')
+            for i in range(threads)
+        ])
+        alunos = list(Usuario.objects.filter(email__startswith=f'{prefixo}-aluno'))
+
+        try:
+            resultado = self.executar(professor, alunos, rodadas)
+        finally:
+            if not options['manter_dados']:
+                Usuario.objects.filter(email__startswith=prefixo).delete()
+
+        self.stdout.write(json.dumps(resultado, indent=2))
+        if resultado['rodadas_invalidas']:
+            raise CommandError(f"{resultado['rodadas_invalidas']} rodada(s) sem exatamente um vencedor.")
+
+    def executar(self, professor, alunos, rodadas):
+        totais = {'vencedores': 0, 'conflitos': 0, 'erros': 0}
+        rodadas_invalidas = 0
+        duracao_total = 0.0
+        data_base = datetime.date.today() + datetime.timedelta(days=365)
+
+        for rodada in range(rodadas):
+            disponibilidade = Disponibilidade.objects.create(
+                professor=professor, data=data_base + datetime.timedelta(days=rodada),
+                horario_inicio=datetime.time(9, 0)
+            )
+            placar, duracao = self.disputar(disponibilidade, alunos)
+            duracao_total += duracao
+            for chave in totais:
+                totais[chave] += placar[chave]
+
+            # Invariante: exatamente um agendamento ativo e o horário travado.
+            disponibilidade.refresh_from_db()
+            ativos = Agendamento.objects.filter(disponibilidade=disponibilidade).count()
+            if placar['vencedores'] != 1 or ativos != 1 or disponibilidade.disponivel:
+                rodadas_invalidas += 1
+
+        tentativas = rodadas * len(alunos)
+        return {
+            'threads': len(alunos),
+            'rodadas': rodadas,
+            'tentativas': tentativas,
+            **totais,
+            'rodadas_invalidas': rodadas_invalidas,
+            'duracao_s': round(duracao_total, 4),
+            'tentativas_por_segundo': round(tentativas / duracao_total, 1) if duracao_total else None,
+            'reservas_por_segundo': round(totais['vencedores'] / duracao_total, 1) if duracao_total else None,
+        }
+
+    def disputar(self, disponibilidade, alunos):
+        # Todas as threads esperam na barreira e disparam a reserva ao mesmo tempo.
+        barreira = threading.Barrier(len(alunos))
+        placar = {'vencedores': 0, 'conflitos': 0, 'erros': 0}
+        trava_placar = threading.Lock()
+
+        def reservar(aluno):
+            chave = 'erros'
+            try:
+                barreira.wait()
+                Agendamento(aluno=aluno, disponibilidade_id=disponibilidade.id).save()
+                chave = 'vencedores'
+            except HorarioIndisponivel:
+                chave = 'conflitos'
+            except Exception:
+                chave = 'erros'
+            finally:
+                connection.close() # Cada thread abre a sua própria conexão com o banco.
+                with trava_placar:
+                    placar[chave] += 1
+
+        workers = [threading.Thread(target=reservar, args=(aluno,)) for aluno in alunos]
+        inicio = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return placar, time.perf_counter() - inicio
@@ -0,0 +1,96 @@
+import datetime
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from core.models import Agendamento, Avaliacao, Disciplina, Disponibilidade, Usuario
+from core.serializers import AgendamentoSerializer, AvaliacaoSerializer, DisponibilidadeSerializer
+from core.views import agendamentos_otimizados
+
+
+class Command(BaseCommand):
+    help = (
+        'Microbenchmark da serialização de listagens: serializer normal x modo rápido (.values()), '
+        'em linhas/s, conferindo que o JSON gerado é idêntico. Os dados são criados e descartados (rollback).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int, default=10000, help='Linhas por listagem.')
+        parser.add_argument('--repeticoes', type=int, default=3, help='Medições por caminho (vale a melhor).')
+
+    def handle(self, *args, **options):
+        linhas, repeticoes = options['linhas'], options['repeticoes']
+        if linhas < 1 or repeticoes < 1:
+            raise CommandError('--linhas e --repeticoes devem ser maiores que zero.')
+
+        with transaction.atomic():
+            professor, aluno = self.popular(linhas)
+            request = Request(RequestFactory().get('/'))
+            request.user = aluno
+            contexto = {'request': request}
+
+            listagens = {
+                'agendamentos': (AgendamentoSerializer, lambda: agendamentos_otimizados(aluno).filter(aluno=aluno)),
+                'disponibilidades': (
+                    DisponibilidadeSerializer,
+                    lambda: Disponibilidade.objects.select_related('professor', 'disciplina').filter(professor=professor),
+                ),
+                'avaliacoes': (
+                    AvaliacaoSerializer,
+                    lambda: Avaliacao.objects.select_related(
+                        'agendamento__aluno', 'agendamento__disponibilidade__professor', 'agendamento__disponibilidade__disciplina'
+                    ).filter(agendamento__aluno=aluno),
+                ),
+            }
+            resultado = {'linhas': linhas, 'listagens': {}}
+            for nome, (serializer_class, queryset) in listagens.items():
+                padrao, tempo_padrao = self.medir(lambda: serializer_class(queryset(), many=True, context=contexto).data, repeticoes)
+                rapida, tempo_rapido = self.medir(lambda: serializer_class.lista_rapida(queryset(), contexto), repeticoes)
+                resultado['listagens'][nome] = {
+                    'serializer_linhas_por_s': round(len(padrao) / tempo_padrao),
+                    'rapido_linhas_por_s': round(len(rapida) / tempo_rapido),
+                    'aceleracao': round(tempo_padrao / tempo_rapido, 2),
+                    'json_identico': JSONRenderer().render(padrao) == JSONRenderer().render(rapida),
+                }
+            transaction.set_rollback(True)
+
+        self.stdout.write(json.dumps(resultado, indent=2))
+
+    def medir(self, funcao, repeticoes):
+        # Inclui a query: é o custo real de uma listagem. Vale o melhor tempo entre as repetições.
+        melhor = None
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            dados = funcao()
+            duracao = time.perf_counter() - inicio
+            melhor = duracao if melhor is None else min(melhor, duracao)
+        return dados, melhor
+
+    def popular(self, linhas):
+        professor = Usuario.objects.create(username='bench-serial-prof@bench.local', email='bench-serial-prof@bench.local', nome='Professor Benchmark', tipo='PROFESSOR')
+        aluno = Usuario.objects.create(username='bench-serial-aluno@bench.local', email='bench-serial-aluno@bench.local', nome='Aluno Benchmark', tipo='ALUNO')
+        disciplina = Disciplina.objects.create(nome='Benchmark')
+        inicio = datetime.date(2030, 1, 1)
+        # Metade dos horários sem disciplina, para exercitar os campos com FK nula.
+        horarios = Disponibilidade.objects.bulk_create([
+            Disponibilidade(
+                professor=professor, disciplina=disciplina if i % 2 else None, assunto=f'Assunto {i}',
+                data=inicio + datetime.timedelta(days=i // 10), horario_inicio=datetime.time(8 + i % 10, 0),
+                link=f'https://meet.jit.si/bench-{i}', disponivel=False,
+            )
+            for i in range(linhas)
+        ])
+        estados = ('AGENDADO', 'CONFIRMADO', 'CONCLUIDO', 'CANCELADO')
+        agendamentos = Agendamento.objects.bulk_create([
+            Agendamento(aluno=aluno, disponibilidade=horario, status=estados[i % 4]) for i, horario in enumerate(horarios)
+        ])
+        Avaliacao.objects.bulk_create([
+            Avaliacao(agendamento=agendamento, tipo_avaliador='ALUNO', nota=1 + i % 5, comentario='Boa aula')
+            for i, agendamento in enumerate(agendamentos)
+        ])
+        return professor, aluno
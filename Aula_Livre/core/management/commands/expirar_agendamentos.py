@@ -0,0 +1,32 @@
+import datetime
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import expiracao
+
+
+class Command(BaseCommand):
+    help = (
+        'Cancela agendamentos não confirmados a tempo, encerra horários livres que já passaram e corrige flags '
+        '"disponivel" divergentes dos agendamentos ativos. Idempotente: pode rodar pelo cron a cada minuto.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--prazo-horas', type=float, default=expiracao.PRAZO_CONFIRMACAO.total_seconds() / 3600,
+            help='Agendamentos AGENDADO de aulas que começam em menos de N horas são cancelados (0 = só aulas já iniciadas).',
+        )
+        parser.add_argument('--lote', type=int, default=expiracao.LOTE, help='Linhas alteradas por UPDATE/transação.')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote deve ser maior que zero.')
+        if options['prazo_horas'] < 0:
+            raise CommandError('--prazo-horas não pode ser negativo.')
+
+        inicio = time.perf_counter()
+        resultado = expiracao.executar(prazo=datetime.timedelta(hours=options['prazo_horas']), lote=options['lote'])
+        resultado['duracao_s']['total'] = round(time.perf_counter() - inicio, 3)
+        self.stdout.write(json.dumps(resultado, indent=2))
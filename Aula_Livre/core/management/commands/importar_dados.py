@@ -0,0 +1,48 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import importacao
+from core.exceptions import ArquivoInvalido
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa usuários ou horários de um arquivo CSV, NDJSON ou array JSON (onboarding de escolas parceiras), '
+        'em lotes: cada lote é validado, tem as senhas transformadas em hash em paralelo e é gravado em uma transação. '
+        'Imprime o relatório com os erros por linha e a vazão (linhas/s).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=sorted(importacao.IMPORTACOES), help='O que o arquivo contém.')
+        parser.add_argument('arquivo', help='Caminho do arquivo (UTF-8).')
+        parser.add_argument(
+            '--formato', choices=importacao.FORMATOS,
+            help='Formato do arquivo. Padrão: deduzido da extensão (.csv, .ndjson/.jsonl, .json).',
+        )
+        parser.add_argument('--lote', type=int, default=importacao.LOTE, help='Linhas validadas e gravadas por transação.')
+        parser.add_argument(
+            '--processos', type=int, default=None,
+            help='Processos do pool de hash de senhas. Padrão: número de CPUs (1 = sem pool).',
+        )
+        parser.add_argument('--simular', action='store_true', help='Só valida e gera o relatório; nada é gravado.')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote deve ser maior que zero.')
+        if options['processos'] is not None and options['processos'] < 1:
+            raise CommandError('--processos deve ser maior que zero.')
+        try:
+            formato = importacao.formato_do_arquivo(options['arquivo'], options['formato'])
+            # utf-8-sig: aceita o BOM das planilhas exportadas pelo Excel. newline='' é exigido pelo módulo csv.
+            with open(options['arquivo'], encoding='utf-8-sig', newline='') as arquivo:
+                resultado = importacao.importar(
+                    options['tipo'], arquivo, formato,
+                    lote=options['lote'], processos=options['processos'], simular=options['simular'],
+                )
+        except (ArquivoInvalido, OSError) as erro:
+            raise CommandError(str(erro))
+
+        self.stdout.write(json.dumps(resultado, indent=2, ensure_ascii=False))
+        if 'erro_arquivo' in resultado:
+            raise CommandError(resultado['erro_arquivo'])
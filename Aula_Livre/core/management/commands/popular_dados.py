@@ -0,0 +1,171 @@
+import datetime
+import json
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core import busca, horas, resumos
+from core.models import (
+    Agendamento, Avaliacao, Certificado, Disciplina, Disponibilidade, Usuario, VersaoDados,
+)
+
+DOMINIO_SEED = '@seed.aulalivre'
+SENHA_SEED = 'senha-seed-123' # Senha de todos os usuários gerados (usada pelo benchmark de login).
+
+DISCIPLINAS = [
+    'Matemática', 'Português', 'Física', 'Química', 'Biologia', 'História',
+    'Geografia', 'Inglês', 'Redação', 'Filosofia', 'Sociologia', 'Artes',
+]
+NIVEIS = ['Fundamental 1', 'Fundamental 2', 'Ensino Médio', 'Pré-Vestibular', 'Superior']
+ASSUNTOS = ['Revisão ENEM', 'Exercícios', 'Tira-dúvidas', 'Introdução', 'Lista de exercícios', 'Simulado']
+
+
+class Command(BaseCommand):
+    help = (
+        'Popula o banco com uma massa de dados realista para benchmarks (bulk_create em lotes). '
+        'Use --escala para multiplicar os volumes padrão.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', type=float, default=1.0, help='Multiplicador dos volumes padrão (ex: 0.01).')
+        parser.add_argument('--professores', type=int, default=2000)
+        parser.add_argument('--alunos', type=int, default=8000)
+        parser.add_argument('--disponibilidades', type=int, default=200000)
+        parser.add_argument('--agendamentos', type=int, default=120000, help='Máximo de horários reservados.')
+        parser.add_argument('--lote', type=int, default=5000, help='Tamanho de cada bulk_create.')
+        parser.add_argument('--semente', type=int, default=42, help='Semente do gerador aleatório (reprodutível).')
+        parser.add_argument('--limpar', action='store_true', help='Remove os dados gerados anteriormente antes de popular.')
+
+    def handle(self, *args, **options):
+        self.lote = options['lote']
+        self.rng = random.Random(options['semente'])
+        escala = options['escala']
+        qtd = {
+            chave: max(1, int(options[chave] * escala))
+            for chave in ('professores', 'alunos', 'disponibilidades', 'agendamentos')
+        }
+
+        existentes = Usuario.objects.filter(email__endswith=DOMINIO_SEED)
+        if existentes.exists():
+            if not options['limpar']:
+                raise CommandError('Já existem dados gerados no banco. Use --limpar para recriá-los.')
+            existentes.delete()
+
+        inicio = time.perf_counter()
+        contagens = {}
+        disciplinas = self.criar_disciplinas()
+        professores, alunos = self.criar_usuarios(qtd['professores'], qtd['alunos'])
+        contagens['usuarios'] = len(professores) + len(alunos)
+
+        self.vincular_professores(disciplinas, professores)
+        slots = self.criar_disponibilidades(qtd['disponibilidades'], professores, disciplinas)
+        contagens['disponibilidades'] = len(slots)
+
+        agendamentos = self.criar_agendamentos(qtd['agendamentos'], slots, alunos)
+        contagens['agendamentos'] = len(agendamentos)
+        concluidos = [ag for ag in agendamentos if ag.status == 'CONCLUIDO']
+        contagens['avaliacoes'] = self.criar_avaliacoes(concluidos)
+        contagens['certificados'] = self.criar_certificados(concluidos)
+
+        # bulk_create não dispara sinais: invalida ETags e caches e reconstrói índice de busca, resumos e livro de horas.
+        VersaoDados.incrementar(Usuario, Disciplina, Disponibilidade, Agendamento, Avaliacao, Certificado)
+        busca.reconstruir()
+        resumos.reconstruir()
+        horas.reconstruir()
+
+        contagens['duracao_s'] = round(time.perf_counter() - inicio, 2)
+        self.stdout.write(json.dumps(contagens, indent=2))
+
+    # --- Geradores (cada um grava em lotes, um lote por transação) ---
+
+    def gravar(self, modelo, objetos):
+        criados = []
+        for i in range(0, len(objetos), self.lote):
+            with transaction.atomic():
+                criados.extend(modelo.objects.bulk_create(objetos[i:i + self.lote]))
+        return criados
+
+    def criar_disciplinas(self):
+        disciplinas = []
+        for nome in DISCIPLINAS:
+            disciplina, _ = Disciplina.objects.get_or_create(nome=nome)
+            disciplinas.append(disciplina)
+        return disciplinas
+
+    def criar_usuarios(self, qtd_professores, qtd_alunos):
+        # Um único hash de senha para todos: o custo do PBKDF2 não entra no tempo de carga.
+        senha = make_password(SENHA_SEED)
+        usuarios = [
+            Usuario(username=f'prof{i}{DOMINIO_SEED}', email=f'prof{i}{DOMINIO_SEED}', password=senha,
+                    nome=f'Professor Seed {i}', tipo='PROFESSOR')
+            for i in range(qtd_professores)
+        ] + [
+            Usuario(username=f'aluno{i}{DOMINIO_SEED}', email=f'aluno{i}{DOMINIO_SEED}', password=senha,
+                    nome=f'Aluno Seed {i}', tipo='ALUNO')
+            for i in range(qtd_alunos)
+        ]
+        criados = self.gravar(Usuario, usuarios)
+        return criados[:qtd_professores], criados[qtd_professores:]
+
+    def vincular_professores(self, disciplinas, professores):
+        Vinculo = Disciplina.professores.through
+        vinculos = [
+            Vinculo(disciplina_id=disciplina.id, usuario_id=professor.id)
+            for professor in professores
+            for disciplina in self.rng.sample(disciplinas, k=self.rng.randint(1, 3))
+        ]
+        self.gravar(Vinculo, vinculos)
+
+    def criar_disponibilidades(self, quantidade, professores, disciplinas):
+        # Um ano de histórico e três meses de agenda futura.
+        hoje = timezone.localdate()
+        slots = []
+        for _ in range(quantidade):
+            dias = self.rng.randint(-365, 90)
+            slots.append(Disponibilidade(
+                professor_id=self.rng.choice(professores).id,
+                disciplina_id=self.rng.choice(disciplinas).id,
+                assunto=self.rng.choice(ASSUNTOS),
+                nivel=self.rng.choice(NIVEIS),
+                data=hoje + datetime.timedelta(days=dias),
+                horario_inicio=datetime.time(self.rng.randint(7, 21), self.rng.choice((0, 30))),
+            ))
+        return self.gravar(Disponibilidade, slots)
+
+    def criar_agendamentos(self, quantidade, slots, alunos):
+        # Cada horário é reservado no máximo uma vez (mesma regra do motor de reservas).
+        hoje = timezone.localdate()
+        escolhidos = self.rng.sample(slots, k=min(quantidade, len(slots)))
+        agendamentos = []
+        for slot in escolhidos:
+            if slot.data < hoje:
+                status = self.rng.choices(['CONCLUIDO', 'CANCELADO'], weights=[85, 15])[0]
+            else:
+                status = self.rng.choice(['AGENDADO', 'CONFIRMADO'])
+            agendamentos.append(Agendamento(aluno_id=self.rng.choice(alunos).id, disponibilidade_id=slot.id, status=status))
+
+        reservados = [ag.disponibilidade_id for ag in agendamentos if ag.status != 'CANCELADO']
+        for i in range(0, len(reservados), self.lote):
+            with transaction.atomic():
+                Disponibilidade.objects.filter(id__in=reservados[i:i + self.lote]).update(disponivel=False)
+        return self.gravar(Agendamento, agendamentos)
+
+    def criar_avaliacoes(self, concluidos):
+        avaliacoes = []
+        for ag in concluidos:
+            if self.rng.random() < 0.7:
+                avaliacoes.append(Avaliacao(agendamento_id=ag.id, tipo_avaliador='ALUNO', nota=self.rng.choices(range(1, 6), weights=[2, 3, 10, 35, 50])[0]))
+            if self.rng.random() < 0.5:
+                avaliacoes.append(Avaliacao(agendamento_id=ag.id, tipo_avaliador='PROFESSOR', nota=self.rng.randint(3, 5)))
+        return len(self.gravar(Avaliacao, avaliacoes))
+
+    def criar_certificados(self, concluidos):
+        certificados = [
+            Certificado(agendamento_id=ag.id, codigo_validacao=f'AL-SEED-{ag.id}', horas=self.rng.choice((1, 1.5, 2)))
+            for ag in concluidos if self.rng.random() < 0.6
+        ]
+        return len(self.gravar(Certificado, certificados))
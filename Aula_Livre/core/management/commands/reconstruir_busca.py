@@ -0,0 +1,27 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import busca
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstrói em lote o índice de busca textual (FTS5) de disciplinas, horários e professores. '
+        'Use após cargas que não disparam sinais (bulk_create, importações, restauração de backup).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=busca.LOTE, help='Documentos gravados por INSERT em lote.')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote deve ser maior que zero.')
+        if not busca.suportada():
+            raise CommandError('A busca textual exige o SQLite (FTS5).')
+
+        inicio = time.perf_counter()
+        contagens = busca.reconstruir(lote=options['lote'])
+        contagens['duracao_s'] = round(time.perf_counter() - inicio, 2)
+        self.stdout.write(json.dumps(contagens, indent=2))
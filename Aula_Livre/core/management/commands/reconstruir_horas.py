@@ -0,0 +1,25 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import horas
+
+
+class Command(BaseCommand):
+    help = (
+        'Refaz a partir dos Certificados o livro de horas voluntárias (usuário x disciplina x mês) '
+        'e informa quantas linhas estavam divergentes. Use após cargas em lote ou para corrigir desvios.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=horas.LOTE, help='Linhas gravadas por bulk_create.')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote deve ser maior que zero.')
+
+        inicio = time.perf_counter()
+        resultado = horas.reconstruir(lote=options['lote'])
+        resultado['duracao_s'] = round(time.perf_counter() - inicio, 2)
+        self.stdout.write(json.dumps(resultado, indent=2))
@@ -0,0 +1,25 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import resumos
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula do zero os resumos de avaliações (média, histograma de estrelas e aulas concluídas) '
+        'e informa quantos estavam divergentes. Use após cargas em lote ou para corrigir desvios.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=resumos.LOTE, help='Resumos gravados por bulk_create.')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote deve ser maior que zero.')
+
+        inicio = time.perf_counter()
+        resultado = resumos.reconstruir(lote=options['lote'])
+        resultado['duracao_s'] = round(time.perf_counter() - inicio, 2)
+        self.stdout.write(json.dumps(resultado, indent=2))
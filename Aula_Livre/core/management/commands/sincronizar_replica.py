@@ -0,0 +1,43 @@
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Copia o banco principal para a réplica de leitura (AULA_LIVRE_DB_LEITURA) com a API de backup do SQLite: '
+        'cópia consistente, feita com o primário em uso. Pensado para o cron quando não há replicação contínua.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--paginas', type=int, default=-1,
+            help='Páginas copiadas por passo (-1 = tudo em um passo; valores menores liberam o primário entre os passos).',
+        )
+
+    def handle(self, *args, **options):
+        alias = settings.BANCO_LEITURA
+        if not alias:
+            raise CommandError('Réplica de leitura não configurada: defina AULA_LIVRE_DB_LEITURA.')
+        origem, destino = connections['default'], connections[alias]
+        if origem.vendor != 'sqlite' or destino.vendor != 'sqlite':
+            raise CommandError('A cópia por backup só existe para SQLite; use a replicação do próprio banco.')
+        if origem.settings_dict['NAME'] == destino.settings_dict['NAME']:
+            raise CommandError('A réplica aponta para o mesmo arquivo do banco principal.')
+        if options['paginas'] == 0:
+            raise CommandError('--paginas não pode ser zero.')
+
+        inicio = time.perf_counter()
+        origem.ensure_connection()
+        destino.ensure_connection()
+        # Escreve por cima da réplica: leitores da réplica esperam o passo terminar, os do primário não são afetados.
+        origem.connection.backup(destino.connection, pages=options['paginas'])
+        self.stdout.write(json.dumps({
+            'replica': str(destino.settings_dict['NAME']),
+            'bytes': os.path.getsize(destino.settings_dict['NAME']),
+            'duracao_s': round(time.perf_counter() - inicio, 3),
+        }, indent=2))
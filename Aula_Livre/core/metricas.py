@@ -0,0 +1,102 @@
+import threading
+from collections import defaultdict
+
+# Limites (em segundos) dos buckets do histograma de latência, no padrão do Prometheus.
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _SerieRota:
+    # Agregado de uma combinação (rota, método). Atualizado sempre sob a trava do registro.
+    __slots__ = ('por_status', 'buckets', 'soma_latencia', 'contagem', 'queries', 'tempo_db')
+
+    def __init__(self):
+        self.por_status = defaultdict(int)
+        self.buckets = [0] * len(BUCKETS_LATENCIA)
+        self.soma_latencia = 0.0
+        self.contagem = 0
+        self.queries = 0
+        self.tempo_db = 0.0
+
+
+class RegistroMetricas:
+    """
+    Registro em memória do processo (um por worker). Cada requisição faz uma única
+    atualização sob a trava, então o custo por requisição é O(número de buckets).
+    """
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._series = {}
+
+    def registrar(self, rota, metodo, status, latencia, queries, tempo_db):
+        with self._trava:
+            serie = self._series.get((rota, metodo))
+            if serie is None:
+                serie = self._series[(rota, metodo)] = _SerieRota()
+            serie.por_status[status] += 1
+            serie.contagem += 1
+            serie.soma_latencia += latencia
+            serie.queries += queries
+            serie.tempo_db += tempo_db
+            for i, limite in enumerate(BUCKETS_LATENCIA):
+                if latencia <= limite:
+                    serie.buckets[i] += 1
+
+    def limpar(self):
+        with self._trava:
+            self._series.clear()
+
+    def exportar(self):
+        # Formato de exposição em texto do Prometheus (version 0.0.4).
+        with self._trava:
+            series = {
+                chave: (dict(s.por_status), list(s.buckets), s.soma_latencia, s.contagem, s.queries, s.tempo_db)
+                for chave, s in self._series.items()
+            }
+
+        linhas = [
+            '# HELP aula_livre_http_requests_total Total de requisições HTTP por rota, método e status.',
+            '# TYPE aula_livre_http_requests_total counter',
+        ]
+        for (rota, metodo), (por_status, *_) in sorted(series.items()):
+            for codigo, total in sorted(por_status.items()):
+                linhas.append(f'aula_livre_http_requests_total{{{_rotulos(rota, metodo)},status="{codigo}"}} {total}')
+
+        linhas += [
+            '# HELP aula_livre_http_request_duration_seconds Latência das requisições HTTP.',
+            '# TYPE aula_livre_http_request_duration_seconds histogram',
+        ]
+        for (rota, metodo), (_, buckets, soma, contagem, _, _) in sorted(series.items()):
+            rotulos = _rotulos(rota, metodo)
+            for limite, total in zip(BUCKETS_LATENCIA, buckets):
+                linhas.append(f'aula_livre_http_request_duration_seconds_bucket{{{rotulos},le="{limite}"}} {total}')
+            linhas.append(f'aula_livre_http_request_duration_seconds_bucket{{{rotulos},le="+Inf"}} {contagem}')
+            linhas.append(f'aula_livre_http_request_duration_seconds_sum{{{rotulos}}} {soma:.6f}')
+            linhas.append(f'aula_livre_http_request_duration_seconds_count{{{rotulos}}} {contagem}')
+
+        linhas += [
+            '# HELP aula_livre_db_queries_total Total de queries SQL executadas pelas requisições.',
+            '# TYPE aula_livre_db_queries_total counter',
+        ]
+        for (rota, metodo), (*_, queries, _) in sorted(series.items()):
+            linhas.append(f'aula_livre_db_queries_total{{{_rotulos(rota, metodo)}}} {queries}')
+
+        linhas += [
+            '# HELP aula_livre_db_query_duration_seconds_total Tempo total gasto no banco pelas requisições.',
+            '# TYPE aula_livre_db_query_duration_seconds_total counter',
+        ]
+        for (rota, metodo), (*_, tempo_db) in sorted(series.items()):
+            linhas.append(f'aula_livre_db_query_duration_seconds_total{{{_rotulos(rota, metodo)}}} {tempo_db:.6f}')
+
+        return '\n'.join(linhas) + '\n'
+
+
+def _escapar(valor):
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _rotulos(rota, metodo):
+    return f'route="{_escapar(rota)}",method="{_escapar(metodo)}"'
+
+
+registro = RegistroMetricas()
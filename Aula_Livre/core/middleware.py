@@ -0,0 +1,128 @@
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .metricas import registro
+from .roteamento import fixar_no_primario
+
+
+class _ContadorQueries:
+    # Queries e tempo de banco de uma requisição, medidos sem depender de DEBUG=True.
+    __slots__ = ('queries', 'tempo')
+
+    def __init__(self):
+        self.queries = 0
+        self.tempo = 0.0
+
+
+# Métodos com série própria nas métricas; qualquer outro vira 'OTHER' (o método vem do cliente, sem limite de valores).
+METODOS_METRICAS = frozenset({'GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS'})
+
+# Contador da requisição em andamento. O asgiref copia o contexto para as threads do sync_to_async,
+# então as queries do ORM assíncrono e das views síncronas caem no contador certo sem instalar nada por requisição.
+_contador_atual = ContextVar('contador_queries', default=None)
+
+
+def _contar_queries(execute, sql, params, many, context):
+    # execute_wrapper permanente de cada conexão: fora de uma requisição medida, só repassa a query.
+    contador = _contador_atual.get()
+    if contador is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        contador.tempo += time.perf_counter() - inicio
+        contador.queries += 1
+
+
+@receiver(connection_created)
+def instalar_contador(sender, connection, **kwargs):
+    # No início da lista: quem usa `with connection.execute_wrapper(...)` empilha e desempilha no fim dela.
+    # O sinal se repete a cada reconexão do mesmo wrapper de conexão, daí a verificação.
+    if _contar_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _contar_queries)
+
+
+class MetricasMiddleware:
+    """
+    Mede cada requisição por rota resolvida e método HTTP: contagem, latência,
+    número de queries e tempo de banco. Os dados ficam no registro do processo
+    (core/metricas.py) e são expostos em /api/metrics/ no formato do Prometheus.
+    """
+
+    # Compatível com os dois modos: sob ASGI não força a troca para thread antes das views assíncronas.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        contador = _ContadorQueries()
+        inicio = time.perf_counter()
+
+        token = _contador_atual.set(contador)
+        try:
+            response = self.get_response(request)
+        finally:
+            _contador_atual.reset(token)
+
+        self._registrar(request, response, time.perf_counter() - inicio, contador)
+        return response
+
+    async def __acall__(self, request):
+        contador = _ContadorQueries()
+        inicio = time.perf_counter()
+
+        # Só marca o contexto: nenhuma ida extra à thread do banco por requisição.
+        token = _contador_atual.set(contador)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _contador_atual.reset(token)
+
+        self._registrar(request, response, time.perf_counter() - inicio, contador)
+        return response
+
+    @staticmethod
+    def _registrar(request, response, latencia, contador):
+        # Usa o padrão da rota (ex: 'api/certificado/<int:agendamento_id>/download/') e não a URL real,
+        # para manter a cardinalidade das séries limitada.
+        match = getattr(request, 'resolver_match', None)
+        rota = match.route if match else 'nao_resolvida'
+        metodo = request.method if request.method in METODOS_METRICAS else 'OTHER'
+        registro.registrar(rota, metodo, response.status_code, latencia, contador.queries, contador.tempo)
+
+
+class LeituraPrimarioMiddleware:
+    """
+    Read-your-writes com réplica de leitura: depois de qualquer requisição de escrita (POST, PUT, PATCH,
+    DELETE), o cliente recebe o cookie que mantém as próximas leituras no primário (ver core/roteamento.py).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return fixar_no_primario(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return fixar_no_primario(request, await self.get_response(request))
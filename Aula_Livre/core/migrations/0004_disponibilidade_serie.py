@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 09:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_avaliacao_tipo_avaliador_alter_avaliacao_agendamento_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='disponibilidade',
+            name='serie',
+            field=models.UUIDField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.9 on 2026-10-18 09:45
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_versaodados'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='agendamento',
+            index=models.Index(fields=['aluno', 'status'], name='agend_aluno_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='agendamento',
+            index=models.Index(fields=['disponibilidade', 'status'], name='agend_disp_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='disponibilidade',
+            index=models.Index(fields=['professor', 'data', 'horario_inicio'], name='disp_professor_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='disponibilidade',
+            index=models.Index(condition=models.Q(('disponivel', True)), fields=['data', 'horario_inicio'], name='disp_livres_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='disponibilidade',
+            index=models.Index(models.F('disciplina'), django.db.models.functions.comparison.Collate('nivel', 'NOCASE'), models.F('data'), name='disp_disciplina_nivel_idx'),
+        ),
+    ]
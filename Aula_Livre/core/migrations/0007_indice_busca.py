@@ -0,0 +1,31 @@
+from django.db import migrations
+
+from core import busca
+
+
+def criar_indice(apps, schema_editor):
+    if not busca.suportada(schema_editor.connection):
+        return
+    schema_editor.execute(busca.SQL_CRIAR)
+    # Indexa os dados já existentes com os modelos históricos.
+    busca.reconstruir({
+        busca.DISCIPLINA: apps.get_model('core', 'Disciplina'),
+        busca.HORARIO: apps.get_model('core', 'Disponibilidade'),
+        busca.PROFESSOR: apps.get_model('core', 'Usuario'),
+    })
+
+
+def remover_indice(apps, schema_editor):
+    if busca.suportada(schema_editor.connection):
+        schema_editor.execute(busca.SQL_REMOVER_TABELA)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_indices_de_acesso'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
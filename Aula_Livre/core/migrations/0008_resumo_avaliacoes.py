@@ -0,0 +1,46 @@
+# Generated by Django 5.2.9 on 2026-10-18 09:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+from core import resumos
+
+
+def calcular_resumos(apps, schema_editor):
+    # Resumos dos dados já existentes, com os modelos históricos.
+    resumos.reconstruir({nome: apps.get_model('core', nome) for nome in ('Avaliacao', 'Agendamento', 'ResumoAvaliacoes')})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_indice_busca'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoAvaliacoes',
+            fields=[
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumo_avaliacoes', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('papel', models.CharField(choices=[('ALUNO', 'Aluno'), ('PROFESSOR', 'Professor')], max_length=20)),
+                ('total_avaliacoes', models.IntegerField(default=0)),
+                ('soma_notas', models.IntegerField(default=0)),
+                ('media', models.FloatField(blank=True, null=True)),
+                ('estrelas_1', models.IntegerField(default=0)),
+                ('estrelas_2', models.IntegerField(default=0)),
+                ('estrelas_3', models.IntegerField(default=0)),
+                ('estrelas_4', models.IntegerField(default=0)),
+                ('estrelas_5', models.IntegerField(default=0)),
+                ('aulas_concluidas', models.IntegerField(default=0)),
+                ('atualizado_em', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Resumo de Avaliações',
+                'verbose_name_plural': 'Resumos de Avaliações',
+                'indexes': [models.Index(fields=['papel', '-media', '-total_avaliacoes'], name='resumo_ranking_media_idx'), models.Index(fields=['papel', '-total_avaliacoes'], name='resumo_ranking_total_idx'), models.Index(fields=['papel', '-aulas_concluidas'], name='resumo_ranking_aulas_idx')],
+            },
+        ),
+        migrations.RunPython(calcular_resumos, migrations.RunPython.noop),
+    ]
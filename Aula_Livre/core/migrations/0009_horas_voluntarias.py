@@ -0,0 +1,73 @@
+# Generated by Django 5.2.9 on 2026-10-18 09:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from core import horas
+
+
+def calcular_horas(apps, schema_editor):
+    # Livro dos certificados já emitidos, com os modelos históricos.
+    horas.reconstruir({nome: apps.get_model('core', nome) for nome in ('Certificado', *horas.MODELOS)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_resumo_avaliacoes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HorasPorDisciplinaMes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('papel', models.CharField(choices=[('ALUNO', 'Aluno'), ('PROFESSOR', 'Professor')], max_length=20)),
+                ('mes', models.DateField()),
+                ('horas', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('certificados', models.IntegerField(default=0)),
+                ('disciplina', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.disciplina')),
+            ],
+            options={
+                'verbose_name': 'Horas por Disciplina e Mês',
+                'verbose_name_plural': 'Horas por Disciplina e Mês',
+                'indexes': [models.Index(fields=['papel', 'mes', 'disciplina'], name='horas_papel_mes_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HorasPorUsuarioAno',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('papel', models.CharField(choices=[('ALUNO', 'Aluno'), ('PROFESSOR', 'Professor')], max_length=20)),
+                ('ano', models.PositiveSmallIntegerField()),
+                ('horas', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('certificados', models.IntegerField(default=0)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='horas_por_ano', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Horas por Usuário e Ano',
+                'verbose_name_plural': 'Horas por Usuário e Ano',
+                'indexes': [models.Index(fields=['ano', 'papel', '-horas'], name='horas_ano_papel_idx')],
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'ano'), name='horas_usuario_ano_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HorasVoluntarias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('papel', models.CharField(choices=[('ALUNO', 'Aluno'), ('PROFESSOR', 'Professor')], max_length=20)),
+                ('mes', models.DateField()),
+                ('horas', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('certificados', models.IntegerField(default=0)),
+                ('disciplina', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='core.disciplina')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='horas_voluntarias', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Horas Voluntárias',
+                'verbose_name_plural': 'Horas Voluntárias',
+                'indexes': [models.Index(fields=['usuario', 'mes'], name='horas_usuario_mes_idx'), models.Index(fields=['mes', 'papel'], name='horas_mes_papel_idx')],
+            },
+        ),
+        migrations.RunPython(calcular_horas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:08
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_horas_voluntarias'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgendamentoArquivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('AGENDADO', 'Aguardando Confirmação'), ('CONFIRMADO', 'Confirmado'), ('CONCLUIDO', 'Concluído'), ('CANCELADO', 'Cancelado')], max_length=20)),
+                ('arquivado_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('aluno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Agendamento Arquivado',
+                'verbose_name_plural': 'Agendamentos Arquivados',
+            },
+        ),
+        migrations.CreateModel(
+            name='AvaliacaoArquivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('tipo_avaliador', models.CharField(choices=[('ALUNO', 'Aluno'), ('PROFESSOR', 'Professor')], max_length=20)),
+                ('nota', models.IntegerField(choices=[(1, '1'), (2, '2'), (3, '3'), (4, '4'), (5, '5')])),
+                ('comentario', models.TextField(blank=True, null=True)),
+                ('criado_em', models.DateTimeField()),
+                ('agendamento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='avaliacao_set', to='core.agendamentoarquivado')),
+            ],
+            options={
+                'verbose_name': 'Avaliação Arquivada',
+                'verbose_name_plural': 'Avaliações Arquivadas',
+            },
+        ),
+        migrations.CreateModel(
+            name='CertificadoArquivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('codigo_validacao', models.CharField(max_length=64, unique=True)),
+                ('data_emissao', models.DateTimeField()),
+                ('horas', models.DecimalField(decimal_places=2, default=1.0, max_digits=4)),
+                ('agendamento', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='certificado', to='core.agendamentoarquivado')),
+            ],
+            options={
+                'verbose_name': 'Certificado Arquivado',
+                'verbose_name_plural': 'Certificados Arquivados',
+            },
+        ),
+        migrations.CreateModel(
+            name='DisponibilidadeArquivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('assunto', models.CharField(blank=True, max_length=100, null=True)),
+                ('nivel', models.CharField(blank=True, max_length=50, null=True)),
+                ('descricao', models.TextField(blank=True, null=True)),
+                ('link', models.URLField(blank=True, null=True)),
+                ('data', models.DateField()),
+                ('horario_inicio', models.TimeField()),
+                ('disponivel', models.BooleanField(default=False)),
+                ('serie', models.UUIDField(blank=True, null=True)),
+                ('arquivado_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('disciplina', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.disciplina')),
+                ('professor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Disponibilidade Arquivada',
+                'verbose_name_plural': 'Disponibilidades Arquivadas',
+            },
+        ),
+        migrations.AddField(
+            model_name='agendamentoarquivado',
+            name='disponibilidade',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.disponibilidadearquivada'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:56
+
+from django.db import migrations, models
+
+from core import horas
+
+
+def regravar_horas(apps, schema_editor):
+    # Junta eventuais linhas duplicadas (lançamentos concorrentes) antes das restrições únicas.
+    horas.reconstruir({nome: apps.get_model('core', nome) for nome in ('Certificado', 'CertificadoArquivado', *horas.MODELOS)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_historico_arquivado'),
+    ]
+
+    operations = [
+        migrations.RunPython(regravar_horas, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='horasporusuarioano',
+            name='horas_usuario_ano_unico',
+        ),
+        migrations.AddConstraint(
+            model_name='horaspordisciplinames',
+            constraint=models.UniqueConstraint(condition=models.Q(('disciplina__isnull', False)), fields=('papel', 'disciplina', 'mes'), name='horas_disc_mes_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='horaspordisciplinames',
+            constraint=models.UniqueConstraint(condition=models.Q(('disciplina__isnull', True)), fields=('papel', 'mes'), name='horas_geral_mes_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='horasporusuarioano',
+            constraint=models.UniqueConstraint(fields=('usuario', 'papel', 'ano'), name='horas_usuario_papel_ano_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='horasvoluntarias',
+            constraint=models.UniqueConstraint(condition=models.Q(('disciplina__isnull', False)), fields=('usuario', 'papel', 'disciplina', 'mes'), name='horas_usuario_disc_mes_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='horasvoluntarias',
+            constraint=models.UniqueConstraint(condition=models.Q(('disciplina__isnull', True)), fields=('usuario', 'papel', 'mes'), name='horas_usuario_geral_mes_unico'),
+        ),
+    ]
@@ -0,0 +1,94 @@
+import hashlib
+
+from django.utils import timezone
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import VersaoDados
+
+
+def resposta_condicional(request, modelos, gerar_resposta, extra=''):
+    """
+    GET condicional (ETag / Last-Modified) a partir das versões das tabelas envolvidas.
+    O ETag é calculado SEM rodar o serializer: se o cliente já tem a versão atual, respondemos 304.
+    """
+    versoes = VersaoDados.obter(*modelos)
+    formato = getattr(getattr(request, 'accepted_renderer', None), 'format', '')
+    etag, last_modified, nao_modificado = validadores(request, request.user, formato, versoes, extra)
+
+    if nao_modificado:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = gerar_resposta()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+    return aplicar_validadores(response, etag, last_modified)
+
+
+def validadores(request, user, formato, versoes, extra=''):
+    # Retorna (etag, last_modified, nao_modificado). Compartilhado pelas versões síncrona e assíncrona (views_async.py).
+    # A chave inclui a URL completa (filtros/paginação), o formato e o usuário (respostas variam por perfil).
+    chave = '|'.join(
+        [request.get_full_path(), formato, str(user.pk or 0), getattr(user, 'tipo', ''), extra]
+        + [f'{tabela}:{versao}' for tabela, versao, _ in versoes]
+    )
+    etag = '"%s"' % hashlib.sha1(chave.encode()).hexdigest()
+    datas = [atualizado_em for _, _, atualizado_em in versoes if atualizado_em]
+    last_modified = int(max(datas).timestamp()) if datas else None
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        # Comparação forte: o ETag do cliente precisa ser idêntico (If-None-Match tem precedência).
+        nao_modificado = etag in parse_etags(if_none_match) or if_none_match.strip() == '*'
+    else:
+        desde = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        nao_modificado = bool(desde and last_modified and last_modified <= desde)
+    return etag, last_modified, nao_modificado
+
+
+def minuto_atual():
+    # 'extra' das respostas que comparam com o relógio (ex.: só horários futuros): nenhuma tabela muda quando um
+    # horário passa, então o ETag muda a cada minuto. Filtros só por data usam timezone.localdate().
+    return timezone.localtime().strftime('%Y-%m-%dT%H:%M')
+
+
+def aplicar_validadores(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    # O navegador guarda a resposta, mas sempre revalida (If-None-Match) antes de reutilizá-la.
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+class ETagMixin:
+    # Mixin para ViewSets: list/retrieve respondem 304 quando nenhuma tabela de 'modelos_etag' mudou.
+    modelos_etag = ()
+
+    def extra_etag(self, request):
+        # O que, além das tabelas, muda a resposta (ex.: o relógio nos filtros de horários futuros).
+        return ''
+
+    def list(self, request, *args, **kwargs):
+        return resposta_condicional(
+            request, self.modelos_etag, lambda: super(ETagMixin, self).list(request, *args, **kwargs), self.extra_etag(request)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return resposta_condicional(
+            request, self.modelos_etag, lambda: super(ETagMixin, self).retrieve(request, *args, **kwargs), self.extra_etag(request)
+        )
+
+
+class ListagemRapidaMixin:
+    # Mixin para ViewSets: list() usa o modo rápido do serializer (ListaRapidaMixin, .values() + nomes anotados).
+    # Cai no list() normal se houver paginação ou se o serializer não suportar algum campo.
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        if self.paginator is None and hasattr(serializer_class, 'lista_rapida'):
+            queryset = self.filter_queryset(self.get_queryset())
+            dados = serializer_class.lista_rapida(queryset, self.get_serializer_context())
+            if dados is not None:
+                return Response(dados)
+        return super().list(request, *args, **kwargs)
@@ -1,6 +1,22 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 from django.contrib.auth.models import AbstractUser
-from django.core.exceptions import ValidationError
+from django.db.models import F
+from django.db.models.functions import Collate
+from django.utils import timezone
+
+from .eventos import LIBERADO, RESERVADO, publicar_ao_confirmar
+from .exceptions import HorarioIndisponivel
+
+# Status que ocupam o horário (a Disponibilidade fica com disponivel=False enquanto o agendamento estiver nesses estados).
+STATUS_ATIVOS = ('AGENDADO', 'CONFIRMADO', 'CONCLUIDO')
+
+# Máquina de estados das ações do professor: status de destino -> status de origem permitidos.
+TRANSICOES_STATUS = {
+    'CONFIRMADO': ('AGENDADO',),
+    'CONCLUIDO': ('CONFIRMADO',),
+    'CANCELADO': ('AGENDADO', 'CONFIRMADO'),
+}
 
 class Usuario(AbstractUser):
     # Base do nosso sistema de autenticação customizada. Herdamos AbstractUser para usar o framework de segurança do Django (hashing de senha, etc.).
@@ -44,6 +60,18 @@ class Disponibilidade(models.Model):
     data = models.DateField()
     horario_inicio = models.TimeField()
     disponivel = models.BooleanField(default=True) # Flag de controle de overbooking.
+    # Identificador da série de horários recorrentes (criados em lote pelo endpoint de recorrência).
+    serie = models.UUIDField(blank=True, null=True, db_index=True)
+
+    class Meta:
+        # Índices dos caminhos de acesso reais (agenda do professor, catálogo/busca de livres, filtro por disciplina/nível).
+        indexes = [
+            models.Index(fields=['professor', 'data', 'horario_inicio'], name='disp_professor_data_idx'),
+            # Parcial: só os horários livres, já na ordem "mais próximo primeiro" da busca e da tela Explorar.
+            models.Index(fields=['data', 'horario_inicio'], condition=Q(disponivel=True), name='disp_livres_data_idx'),
+            # 'nivel' com COLLATE NOCASE: o filtro ?nivel= é case-insensitive (LIKE no SQLite) e assim ainda usa o índice.
+            models.Index(F('disciplina'), Collate('nivel', 'NOCASE'), F('data'), name='disp_disciplina_nivel_idx'),
+        ]
 
     def __str__(self):
         return f"{self.professor} - {self.data} às {self.horario_inicio}"
@@ -67,31 +95,72 @@ class Agendamento(models.Model):
     class Meta:
         # Chave de integridade: Garante que um aluno só possa reservar UM agendamento por Disponibilidade específica (horário).
         unique_together = ('aluno', 'disponibilidade')
+        # Listagens por status: do aluno (aluno + status) e do professor (JOIN pela disponibilidade + status).
+        indexes = [
+            models.Index(fields=['aluno', 'status'], name='agend_aluno_status_idx'),
+            models.Index(fields=['disponibilidade', 'status'], name='agend_disp_status_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # Este método encapsula toda a lógica transacional do agendamento, agindo como um "hook" de regra de negócio.
-        
-        # Lógica de criação (executada apenas na primeira vez):
-        if not self.pk: 
-            # 1. Checagem e Bloqueio Transacional: Evita a condição de corrida (overbooking).
-            if not self.disponibilidade.disponivel:
-                raise ValidationError("Este horário já foi reservado por outro aluno.")
-            
-            self.disponibilidade.disponivel = False # Trava o horário para agendamentos futuros.
-            
-            # 2. INOVAÇÃO: Geração Dinâmica de Sala Virtual (Jitsi Meet).
-            # Se o professor não forneceu um link, criamos um link único baseado no ID da Disponibilidade.
-            if not self.disponibilidade.link:
-                self.disponibilidade.link = f"https://meet.jit.si/AulaLivre-{self.disponibilidade.id}"
-            
-            self.disponibilidade.save() # Persiste a trava e o link na disponibilidade.
-
-        # Lógica de cancelamento: Libera o horário na Disponibilidade para que possa ser re-agendado (regra de reversão).
-        if self.status == 'CANCELADO':
-            self.disponibilidade.disponivel = True
-            self.disponibilidade.save()
-            
-        super().save(*args, **kwargs)
+        # Motor de reservas atômico: reserva, reativação e cancelamento acontecem na MESMA transação do INSERT/UPDATE.
+        # A trava do horário é um UPDATE condicional (WHERE disponivel = TRUE): apenas um pedido concorrente vence.
+        with transaction.atomic():
+            status_anterior = None
+            if not self.pk:
+                # Lógica de criação: só reserva se o novo agendamento já nasce ativo.
+                if self.status in STATUS_ATIVOS:
+                    self._reservar_horario()
+            else:
+                # Lógica de transição: compara com o status persistido (linha travada até o fim da transação).
+                status_anterior = (
+                    Agendamento.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values_list('status', flat=True)
+                    .first()
+                )
+                if status_anterior == 'CANCELADO' and self.status in STATUS_ATIVOS:
+                    # Reativação: o horário precisa estar livre novamente.
+                    self._reservar_horario()
+                elif status_anterior in STATUS_ATIVOS and self.status == 'CANCELADO':
+                    # Lógica de cancelamento: Libera o horário na Disponibilidade para que possa ser re-agendado (regra de reversão).
+                    self._liberar_horario()
+
+            super().save(*args, **kwargs)
+
+            # Resumos (ResumoAvaliacoes): a aula entrou ou saiu do status CONCLUIDO.
+            concluida = (self.status == 'CONCLUIDO') - (status_anterior == 'CONCLUIDO')
+            if concluida:
+                from .resumos import aulas_concluidas
+                aulas_concluidas([(self.aluno_id, self.disponibilidade.professor_id)], sinal=concluida)
+
+    def _reservar_horario(self):
+        # 1. Bloqueio Transacional: UPDATE condicional evita a condição de corrida (overbooking).
+        reservado = Disponibilidade.objects.filter(pk=self.disponibilidade_id, disponivel=True).update(disponivel=False)
+        if not reservado:
+            raise HorarioIndisponivel("Este horário já foi reservado por outro aluno.")
+
+        # 2. INOVAÇÃO: Geração Dinâmica de Sala Virtual (Jitsi Meet).
+        # Se o professor não forneceu um link, criamos um link único baseado no ID da Disponibilidade.
+        link_padrao = f"https://meet.jit.si/AulaLivre-{self.disponibilidade_id}"
+        Disponibilidade.objects.filter(
+            Q(link__isnull=True) | Q(link=''), pk=self.disponibilidade_id
+        ).update(link=link_padrao)
+
+        VersaoDados.incrementar(Disponibilidade) # UPDATE por queryset não dispara sinais: versão manual.
+
+        # Mantém a instância em memória coerente com o banco (usada pelos serializers na resposta).
+        disponibilidade = self.disponibilidade
+        disponibilidade.disponivel = False
+        if not disponibilidade.link:
+            disponibilidade.link = link_padrao
+        publicar_ao_confirmar(RESERVADO, [disponibilidade]) # Stream SSE: o card some da tela Explorar.
+
+    def _liberar_horario(self):
+        Disponibilidade.objects.filter(pk=self.disponibilidade_id).update(disponivel=True)
+        VersaoDados.incrementar(Disponibilidade)
+        self.disponibilidade.disponivel = True
+        publicar_ao_confirmar(LIBERADO, [self.disponibilidade])
 
     def __str__(self):
         disc_nome = self.disponibilidade.disciplina.nome if self.disponibilidade.disciplina else "Geral"
@@ -129,4 +198,215 @@ class Avaliacao(models.Model):
         unique_together = ('agendamento', 'tipo_avaliador')
 
     def __str__(self):
-        return f"Avaliação de {self.tipo_avaliador} - Nota {self.nota}"
\ No newline at end of file
+        return f"Avaliação de {self.tipo_avaliador} - Nota {self.nota}"
+
+class ResumoAvaliacoes(models.Model):
+    # Agregados desnormalizados das avaliações RECEBIDAS por um usuário (professor: notas dos alunos;
+    # aluno: notas dos professores) e das suas aulas concluídas. Evita agregar a tabela de Avaliações
+    # (3 JOINs) a cada requisição: é mantido de forma incremental (ver core/resumos.py).
+    usuario = models.OneToOneField(Usuario, on_delete=models.CASCADE, primary_key=True, related_name='resumo_avaliacoes')
+    papel = models.CharField(max_length=20, choices=Usuario.TIPO_CHOICES) # Cópia de Usuario.tipo: o ranking filtra sem JOIN.
+    total_avaliacoes = models.IntegerField(default=0)
+    soma_notas = models.IntegerField(default=0)
+    media = models.FloatField(null=True, blank=True) # NULL enquanto não houver avaliações.
+    estrelas_1 = models.IntegerField(default=0)
+    estrelas_2 = models.IntegerField(default=0)
+    estrelas_3 = models.IntegerField(default=0)
+    estrelas_4 = models.IntegerField(default=0)
+    estrelas_5 = models.IntegerField(default=0)
+    aulas_concluidas = models.IntegerField(default=0)
+    atualizado_em = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Resumo de Avaliações"
+        verbose_name_plural = "Resumos de Avaliações"
+        # Ranking de professores: papel + ordenação pela média (ou pelo volume).
+        indexes = [
+            models.Index(fields=['papel', '-media', '-total_avaliacoes'], name='resumo_ranking_media_idx'),
+            models.Index(fields=['papel', '-total_avaliacoes'], name='resumo_ranking_total_idx'),
+            models.Index(fields=['papel', '-aulas_concluidas'], name='resumo_ranking_aulas_idx'),
+        ]
+
+    def __str__(self):
+        return f"Resumo de {self.usuario_id}: {self.media} ({self.total_avaliacoes})"
+
+class HorasVoluntarias(models.Model):
+    # Livro-razão materializado das horas certificadas: uma linha por (usuário, disciplina, mês da aula),
+    # para o professor (horas lecionadas) e para o aluno (horas assistidas). Os relatórios somam estas
+    # linhas em vez de percorrer Certificado -> Agendamento -> Disponibilidade -> Usuario (ver core/horas.py).
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='horas_voluntarias')
+    papel = models.CharField(max_length=20, choices=Usuario.TIPO_CHOICES)
+    disciplina = models.ForeignKey(Disciplina, on_delete=models.SET_NULL, null=True, blank=True) # NULL = Tira-Dúvidas / Geral.
+    mes = models.DateField() # Primeiro dia do mês da aula.
+    horas = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    certificados = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Horas Voluntárias"
+        verbose_name_plural = "Horas Voluntárias"
+        # Uma linha por chave do livro (core/horas.py). disciplina NULL não repete no UNIQUE comum: restrição parcial à parte.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['usuario', 'papel', 'disciplina', 'mes'], condition=Q(disciplina__isnull=False), name='horas_usuario_disc_mes_unico'
+            ),
+            models.UniqueConstraint(fields=['usuario', 'papel', 'mes'], condition=Q(disciplina__isnull=True), name='horas_usuario_geral_mes_unico'),
+        ]
+        # Relatório individual: (usuario, mes); relatório geral por usuário em um intervalo de meses: (mes, papel).
+        indexes = [
+            models.Index(fields=['usuario', 'mes'], name='horas_usuario_mes_idx'),
+            models.Index(fields=['mes', 'papel'], name='horas_mes_papel_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario_id} {self.mes:%Y-%m}: {self.horas}h"
+
+class HorasPorUsuarioAno(models.Model):
+    # Consolidação do livro por (usuário, ano): ranking anual de voluntários sem somar os meses.
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='horas_por_ano')
+    papel = models.CharField(max_length=20, choices=Usuario.TIPO_CHOICES)
+    ano = models.PositiveSmallIntegerField()
+    horas = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    certificados = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Horas por Usuário e Ano"
+        verbose_name_plural = "Horas por Usuário e Ano"
+        constraints = [models.UniqueConstraint(fields=['usuario', 'papel', 'ano'], name='horas_usuario_papel_ano_unico')]
+        indexes = [models.Index(fields=['ano', 'papel', '-horas'], name='horas_ano_papel_idx')]
+
+    def __str__(self):
+        return f"{self.usuario_id} {self.ano}: {self.horas}h"
+
+class HorasPorDisciplinaMes(models.Model):
+    # Consolidação do livro por (papel, disciplina, mês): totais e séries da plataforma em poucas centenas de linhas.
+    papel = models.CharField(max_length=20, choices=Usuario.TIPO_CHOICES)
+    disciplina = models.ForeignKey(Disciplina, on_delete=models.SET_NULL, null=True, blank=True)
+    mes = models.DateField()
+    horas = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    certificados = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Horas por Disciplina e Mês"
+        verbose_name_plural = "Horas por Disciplina e Mês"
+        constraints = [
+            models.UniqueConstraint(fields=['papel', 'disciplina', 'mes'], condition=Q(disciplina__isnull=False), name='horas_disc_mes_unico'),
+            models.UniqueConstraint(fields=['papel', 'mes'], condition=Q(disciplina__isnull=True), name='horas_geral_mes_unico'),
+        ]
+        indexes = [models.Index(fields=['papel', 'mes', 'disciplina'], name='horas_papel_mes_idx')]
+
+    def __str__(self):
+        return f"{self.papel} {self.disciplina_id} {self.mes:%Y-%m}: {self.horas}h"
+
+# --- HISTÓRICO FRIO (ver core/arquivo.py) ---
+# Horários antigos, com seus agendamentos, avaliações e certificados, saem das tabelas quentes para estas.
+# Mesmos ids e mesmos nomes de campos das originais: as referências entre elas continuam válidas (FKs
+# dentro do arquivo) e serializers/agregações leem os dois lados com os mesmos caminhos.
+
+class DisponibilidadeArquivada(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    professor = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='+')
+    disciplina = models.ForeignKey(Disciplina, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    assunto = models.CharField(max_length=100, blank=True, null=True)
+    nivel = models.CharField(max_length=50, blank=True, null=True)
+    descricao = models.TextField(blank=True, null=True)
+    link = models.URLField(max_length=200, blank=True, null=True)
+    data = models.DateField()
+    horario_inicio = models.TimeField()
+    disponivel = models.BooleanField(default=False)
+    serie = models.UUIDField(blank=True, null=True)
+    arquivado_em = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Disponibilidade Arquivada"
+        verbose_name_plural = "Disponibilidades Arquivadas"
+
+    def __str__(self):
+        return f"{self.professor_id} - {self.data} às {self.horario_inicio} (arquivada)"
+
+class AgendamentoArquivado(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    aluno = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='+')
+    disponibilidade = models.ForeignKey(DisponibilidadeArquivada, on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=Agendamento._meta.get_field('status').choices)
+    arquivado_em = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Agendamento Arquivado"
+        verbose_name_plural = "Agendamentos Arquivados"
+
+    def __str__(self):
+        return f"Agendamento {self.id} ({self.status}, arquivado)"
+
+class AvaliacaoArquivada(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    # related_name igual ao reverso de Agendamento -> Avaliacao: o AgendamentoSerializer lê os dois do mesmo jeito.
+    agendamento = models.ForeignKey(AgendamentoArquivado, on_delete=models.CASCADE, related_name='avaliacao_set')
+    tipo_avaliador = models.CharField(max_length=20, choices=[('ALUNO', 'Aluno'), ('PROFESSOR', 'Professor')])
+    nota = models.IntegerField(choices=[(i, str(i)) for i in range(1, 6)])
+    comentario = models.TextField(blank=True, null=True)
+    criado_em = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Avaliação Arquivada"
+        verbose_name_plural = "Avaliações Arquivadas"
+
+    def __str__(self):
+        return f"Avaliação de {self.tipo_avaliador} - Nota {self.nota} (arquivada)"
+
+class CertificadoArquivado(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    agendamento = models.OneToOneField(AgendamentoArquivado, on_delete=models.CASCADE, related_name='certificado')
+    codigo_validacao = models.CharField(max_length=64, unique=True) # A verificação pública continua encontrando o código.
+    data_emissao = models.DateTimeField()
+    horas = models.DecimalField(max_digits=4, decimal_places=2, default=1.0)
+
+    class Meta:
+        verbose_name = "Certificado Arquivado"
+        verbose_name_plural = "Certificados Arquivados"
+
+    def __str__(self):
+        return f"Certificado {self.codigo_validacao} (arquivado)"
+
+class VersaoDados(models.Model):
+    # Versão de alteração por tabela: incrementada a cada escrita (sinais + chamadas manuais nos UPDATEs em lote).
+    # Base dos ETags/Last-Modified da API: responder 304 custa uma leitura desta tabela, sem rodar o serializer.
+    # Fica no banco (e não na memória do processo) para ser coerente entre vários workers.
+    tabela = models.CharField(max_length=100, unique=True)
+    versao = models.PositiveBigIntegerField(default=0)
+    atualizado_em = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Versão de Dados"
+        verbose_name_plural = "Versões de Dados"
+
+    def __str__(self):
+        return f"{self.tabela} v{self.versao}"
+
+    @classmethod
+    def incrementar(cls, *modelos):
+        for modelo in modelos:
+            tabela = modelo._meta.label_lower
+            atualizados = cls.objects.filter(tabela=tabela).update(versao=F('versao') + 1, atualizado_em=timezone.now())
+            if not atualizados:
+                cls.objects.get_or_create(tabela=tabela, defaults={'versao': 1})
+
+    @classmethod
+    def obter(cls, *modelos):
+        # Retorna [(tabela, versao, atualizado_em)] na ordem dos modelos pedidos, em UMA query.
+        tabelas = [modelo._meta.label_lower for modelo in modelos]
+        registros = {v.tabela: v for v in cls.objects.filter(tabela__in=tabelas)}
+        return cls._ordenar(tabelas, registros)
+
+    @classmethod
+    async def aobter(cls, *modelos):
+        # Versão assíncrona de obter() (ORM assíncrono), usada pelas leituras servidas sob ASGI.
+        tabelas = [modelo._meta.label_lower for modelo in modelos]
+        registros = {v.tabela: v async for v in cls.objects.filter(tabela__in=tabelas)}
+        return cls._ordenar(tabelas, registros)
+
+    @staticmethod
+    def _ordenar(tabelas, registros):
+        return [
+            (tabela, registros[tabela].versao, registros[tabela].atualizado_em) if tabela in registros else (tabela, 0, None)
+            for tabela in tabelas
+        ]
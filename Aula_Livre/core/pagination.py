@@ -0,0 +1,10 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ProfessorCursorPagination(CursorPagination):
+    # Paginação por cursor para o catálogo de professores (tela Explorar).
+    # O cursor é estável mesmo com inserções concorrentes e não usa OFFSET (custo constante por página).
+    page_size = 12
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = 'id'
@@ -0,0 +1,153 @@
+"""
+Manutenção incremental dos resumos de avaliações (ResumoAvaliacoes).
+
+Decisão: Cada escrita de Avaliacao (criação, edição, exclusão) e cada aula que entra ou sai do status
+CONCLUIDO aplica um delta com UPDATE ... SET campo = campo + delta (F()), na mesma transação da escrita.
+Assim a média, o histograma de estrelas e as aulas concluídas nunca exigem agregar a tabela de Avaliações.
+Cargas em lote (bulk_create) e eventuais desvios são corrigidos por reconstruir() (comando reconstruir_resumos).
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast, NullIf
+from django.utils import timezone
+
+from . import arquivo
+from .models import Agendamento, ResumoAvaliacoes, VersaoDados
+
+ESTRELAS = range(1, 6)
+CAMPOS = (
+    'papel', 'total_avaliacoes', 'soma_notas', 'media',
+    *(f'estrelas_{nota}' for nota in ESTRELAS), 'aulas_concluidas',
+)
+LOTE = 2000
+
+# Quem recebe a nota: tipo do avaliador -> (papel do avaliado, caminho até ele a partir da Avaliação).
+AVALIADOS = {
+    'ALUNO': ('PROFESSOR', 'agendamento__disponibilidade__professor'),
+    'PROFESSOR': ('ALUNO', 'agendamento__aluno'),
+}
+
+
+# --- DELTAS ---
+
+def registrar(usuario_id, papel, nota=None, sinal=1, aulas=0):
+    """
+    Aplica um delta ao resumo do usuário: uma avaliação com 'nota' entrando (sinal=1) ou saindo (sinal=-1),
+    e/ou 'aulas' concluídas a mais (ou a menos). O resumo é criado no primeiro delta positivo.
+    """
+    campos = {'atualizado_em': timezone.now()}
+    if nota is not None:
+        total = F('total_avaliacoes') + sinal
+        soma = F('soma_notas') + sinal * nota
+        campos.update({
+            'total_avaliacoes': total,
+            'soma_notas': soma,
+            'media': Cast(soma, FloatField()) / NullIf(total, 0),
+            f'estrelas_{nota}': F(f'estrelas_{nota}') + sinal,
+        })
+    if aulas:
+        campos['aulas_concluidas'] = F('aulas_concluidas') + aulas
+
+    atualizados = ResumoAvaliacoes.objects.filter(usuario_id=usuario_id).update(**campos)
+    incremento = sinal > 0 if nota is not None else aulas > 0
+    if not atualizados and incremento:
+        # Sem resumo ainda: nada a decrementar; em um incremento, cria a linha zerada e aplica o delta.
+        ResumoAvaliacoes.objects.get_or_create(usuario_id=usuario_id, defaults={'papel': papel})
+        ResumoAvaliacoes.objects.filter(usuario_id=usuario_id).update(**campos)
+    VersaoDados.incrementar(ResumoAvaliacoes) # UPDATE por queryset não dispara sinais: versão manual.
+
+
+def avaliado(agendamento_id, tipo_avaliador):
+    # (usuario_id, papel) de quem recebeu a avaliação, ou None se o agendamento já não existir.
+    linha = Agendamento.objects.filter(pk=agendamento_id).values_list('aluno_id', 'disponibilidade__professor_id').first()
+    if linha is None:
+        return None
+    aluno_id, professor_id = linha
+    return (professor_id, 'PROFESSOR') if tipo_avaliador == 'ALUNO' else (aluno_id, 'ALUNO')
+
+
+def dados_avaliacao(avaliacao):
+    # Campos da Avaliação que afetam os resumos (comparados antes/depois de cada gravação).
+    return {'agendamento_id': avaliacao.agendamento_id, 'tipo_avaliador': avaliacao.tipo_avaliador, 'nota': avaliacao.nota}
+
+
+def avaliacao_alterada(anterior, atual):
+    """Retira a versão anterior da avaliação (se houver) e soma a atual (se houver)."""
+    if anterior == atual:
+        return
+    for dados, sinal in ((anterior, -1), (atual, 1)):
+        if dados is None:
+            continue
+        alvo = avaliado(dados['agendamento_id'], dados['tipo_avaliador'])
+        if alvo is not None:
+            registrar(*alvo, nota=int(dados['nota']), sinal=sinal)
+
+
+def aulas_concluidas(pares, sinal=1):
+    """Soma (ou subtrai) aulas concluídas para uma lista de pares (aluno_id, professor_id)."""
+    for papel, contagem in (('ALUNO', Counter(aluno for aluno, _ in pares)), ('PROFESSOR', Counter(prof for _, prof in pares))):
+        for usuario_id, quantidade in contagem.items():
+            registrar(usuario_id, papel, aulas=sinal * quantidade)
+
+
+# --- RECONSTRUÇÃO (correção de desvios) ---
+
+def calcular(modelos=None):
+    """
+    Agrega os resumos do zero a partir das Avaliações e Agendamentos, somando as tabelas quentes e as do
+    histórico arquivado (core/arquivo.py). Retorna {usuario_id: {campo: valor}}.
+    """
+    resumos = {}
+
+    def resumo(usuario_id, papel):
+        vazio = dict.fromkeys(CAMPOS, 0)
+        vazio.update(papel=papel, media=None)
+        return resumos.setdefault(usuario_id, vazio)
+
+    histograma = {f'estrelas_{nota}': Count('id', filter=Q(nota=nota)) for nota in ESTRELAS}
+    for fonte in arquivo.fontes(modelos, 'Avaliacao'):
+        for avaliador, (papel, caminho) in AVALIADOS.items():
+            linhas = (
+                fonte.objects.order_by().filter(tipo_avaliador=avaliador).values(avaliado_id=F(caminho))
+                .annotate(total_avaliacoes=Count('id'), soma_notas=Sum('nota'), **histograma)
+            )
+            for linha in linhas:
+                item = resumo(linha.pop('avaliado_id'), papel)
+                for campo, valor in linha.items():
+                    item[campo] += valor
+
+    for fonte in arquivo.fontes(modelos, 'Agendamento'):
+        for papel, caminho in (('PROFESSOR', 'disponibilidade__professor'), ('ALUNO', 'aluno')):
+            linhas = fonte.objects.order_by().filter(status='CONCLUIDO').values(avaliado_id=F(caminho)).annotate(aulas=Count('id'))
+            for linha in linhas:
+                resumo(linha['avaliado_id'], papel)['aulas_concluidas'] += linha['aulas']
+
+    for item in resumos.values():
+        if item['total_avaliacoes']:
+            item['media'] = item['soma_notas'] / item['total_avaliacoes']
+    return resumos
+
+
+def reconstruir(modelos=None, lote=LOTE):
+    """
+    Recalcula todos os resumos e regrava a tabela. Retorna quantos resumos existem e quantos
+    estavam divergentes (valores diferentes, faltando ou sobrando).
+    """
+    modelos = modelos or {}
+    Resumo = modelos.get('ResumoAvaliacoes', ResumoAvaliacoes)
+    with transaction.atomic():
+        novos = calcular(modelos)
+        existentes = {linha.pop('usuario_id'): linha for linha in Resumo.objects.values('usuario_id', *CAMPOS)}
+        corrigidos = sum(1 for usuario_id in novos.keys() | existentes.keys() if novos.get(usuario_id) != existentes.get(usuario_id))
+
+        agora = timezone.now()
+        Resumo.objects.all().delete()
+        Resumo.objects.bulk_create(
+            [Resumo(usuario_id=usuario_id, atualizado_em=agora, **campos) for usuario_id, campos in novos.items()],
+            batch_size=lote,
+        )
+        if Resumo is ResumoAvaliacoes:
+            VersaoDados.incrementar(ResumoAvaliacoes)
+    return {'resumos': len(novos), 'corrigidos': corrigidos}
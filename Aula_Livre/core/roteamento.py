@@ -0,0 +1,92 @@
+"""
+Roteamento de leituras para a réplica (alias settings.BANCO_LEITURA, ligado por AULA_LIVRE_DB_LEITURA).
+
+Decisão: O roteador não adivinha nada sozinho: ele só manda leituras para a réplica dentro de um contexto
+aberto pela view (ContextVar, que acompanha a requisição também nas threads do sync_to_async). Entram nesse
+contexto apenas os métodos seguros dos ViewSets de leitura e do dashboard (LeituraReplicaMixin e em_replica).
+Escritas vão sempre para o 'default', assim como a tabela de sessões (um login precisa valer na hora).
+Read-your-writes: toda requisição de escrita deixa um cookie que fixa o cliente no primário por
+JANELA_LEITURA_PRIMARIO segundos, tempo que deve cobrir o atraso da réplica. Um cookie e não a sessão,
+para que a marcação não custe uma escrita no banco a cada POST.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+COOKIE_PRIMARIO = 'aula_livre_primario'
+APPS_SEMPRE_NO_PRIMARIO = ('sessions',)
+
+_banco_leitura = ContextVar('banco_leitura', default=None)
+
+
+class RoteadorLeitura:
+    """DATABASE_ROUTERS: leituras no alias do contexto atual (se houver), escritas sempre no primário."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in APPS_SEMPRE_NO_PRIMARIO:
+            return 'default'
+        return _banco_leitura.get()
+
+    def db_for_write(self, model, **hints):
+        # Também para objetos lidos da réplica: o save() de uma instância nunca volta para ela.
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True # Primário e réplica têm os mesmos dados.
+
+
+@contextmanager
+def lendo_de(alias):
+    """Leituras do ORM dentro do bloco vão para 'alias' (None = comportamento padrão, primário)."""
+    token = _banco_leitura.set(alias)
+    try:
+        yield
+    finally:
+        _banco_leitura.reset(token)
+
+
+def fixado_no_primario(request):
+    # Cookie com o instante (timestamp) até o qual o cliente lê do primário, gravado após cada escrita.
+    try:
+        return float(request.COOKIES.get(COOKIE_PRIMARIO, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def banco_de_leitura(request):
+    """Alias de leitura para a requisição: a réplica em métodos seguros fora da janela pós-escrita; senão None."""
+    alias = settings.BANCO_LEITURA
+    if not alias or request.method not in SAFE_METHODS or fixado_no_primario(request):
+        return None
+    return alias
+
+
+def fixar_no_primario(request, response):
+    """Após uma requisição de escrita, fixa o cliente no primário pela janela configurada."""
+    if not settings.BANCO_LEITURA or request.method in SAFE_METHODS:
+        return response
+    janela = settings.JANELA_LEITURA_PRIMARIO
+    response.set_cookie(COOKIE_PRIMARIO, f'{time.time() + janela:.3f}', max_age=janela, httponly=True, samesite='Lax')
+    return response
+
+
+# --- INTEGRAÇÃO COM AS VIEWS ---
+
+class LeituraReplicaMixin:
+    # Mixin para ViewSets: GET/HEAD/OPTIONS leem da réplica (quando configurada); os demais métodos, do primário.
+    def dispatch(self, request, *args, **kwargs):
+        with lendo_de(banco_de_leitura(request)):
+            return super().dispatch(request, *args, **kwargs)
+
+
+def em_replica(view):
+    """Mesmo efeito do LeituraReplicaMixin para views de função (aplicado sob o @api_view)."""
+    @wraps(view)
+    def envolvida(request, *args, **kwargs):
+        with lendo_de(banco_de_leitura(request)):
+            return view(request, *args, **kwargs)
+    return envolvida
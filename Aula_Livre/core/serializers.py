@@ -1,14 +1,132 @@
+import datetime
+import uuid
+
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password # Importação essencial para validar a senha
-from .models import Disciplina, Agendamento, Avaliacao, Usuario, Disponibilidade
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from . import busca, resumos
+from .eventos import ABERTO, LIBERADO, publicar_ao_confirmar
+from .models import (
+    Disciplina, Agendamento, AgendamentoArquivado, Avaliacao, AvaliacaoArquivada, Usuario, Disponibilidade, ResumoAvaliacoes,
+    VersaoDados, TRANSICOES_STATUS,
+)
+
+class CamposDinamicosMixin:
+    """
+    Sparse fieldsets nas leituras (GET): ?fields=id,nome limita os campos da resposta e
+    ?expand=... escolhe quais campos aninhados/caros ('campos_expansiveis') entram.
+    Sem os parâmetros, a resposta é a completa de sempre (compatível com o frontend).
+    Os ViewSets consultam campos_pedidos()/inclui() para pular JOINs e prefetches não usados.
+    """
+    campos_expansiveis = ()
+
+    @classmethod
+    def campos_pedidos(cls, request):
+        # Nomes dos campos renderizados nesta requisição, ou None quando a resposta é a completa.
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return None
+        params = getattr(request, 'query_params', request.GET)
+        if 'fields' not in params and 'expand' not in params:
+            return None
+
+        def lista(parametro):
+            return {nome.strip() for nome in params.get(parametro, '').split(',') if nome.strip()}
+
+        campos = lista('fields') if 'fields' in params else set(cls.Meta.fields) - set(cls.campos_expansiveis)
+        return campos | (lista('expand') & set(cls.campos_expansiveis))
+
+    @classmethod
+    def inclui(cls, request, *nomes):
+        # True se ALGUM dos campos será renderizado (usado para decidir JOINs/prefetches no get_queryset).
+        campos = cls.campos_pedidos(request)
+        return campos is None or any(nome in campos for nome in nomes)
+
+    def get_fields(self):
+        campos = super().get_fields()
+        # Só o serializer raiz da resposta (ou o filho direto de um many=True) é recortado; os aninhados ficam completos.
+        raiz = self.parent is None or (isinstance(self.parent, serializers.ListSerializer) and self.parent.parent is None)
+        pedidos = self.campos_pedidos(self.context.get('request')) if raiz else None
+        if pedidos is not None:
+            for nome in list(campos):
+                if nome not in pedidos:
+                    campos.pop(nome)
+        return campos
 
-class DisciplinaSerializer(serializers.ModelSerializer):
+# Campos cuja representação é o próprio valor vindo do banco (dispensam o to_representation no modo rápido).
+CAMPOS_IDENTIDADE = (
+    serializers.PrimaryKeyRelatedField, serializers.ReadOnlyField, serializers.IntegerField,
+    serializers.CharField, serializers.BooleanField,
+)
+
+class ListaRapidaMixin:
+    """
+    Modo de leitura rápido para listagens: as linhas vêm de um .values() com os nomes relacionados
+    (ex: 'disponibilidade__professor__nome') e cada campo é convertido sem montar objetos de modelo
+    nem resolver 'source' pontuado linha a linha. O JSON é idêntico ao do serializer normal,
+    que continua sendo o fallback (lista_rapida devolve None quando algum campo não é suportado).
+    """
+    # Campos calculados (SerializerMethodField): nome -> (caminhos do .values() que ele lê, função em lote).
+    # A função recebe (linhas, contexto, queryset) e devolve a lista de valores na ordem das linhas.
+    campos_rapidos = {}
+
+    @classmethod
+    def lista_rapida(cls, queryset, context=None):
+        serializer = cls(context=context or {}) # Instância raiz: respeita o recorte de ?fields=/?expand=.
+        colunas = []
+        caminhos = []
+        for nome, campo in serializer.fields.items():
+            if campo.write_only:
+                continue
+            if nome in cls.campos_rapidos:
+                lidos, funcao = cls.campos_rapidos[nome]
+                caminhos.extend(lidos)
+                colunas.append((nome, None, None, (), funcao))
+                continue
+            if isinstance(campo, (serializers.SerializerMethodField, serializers.BaseSerializer)) or not campo.source_attrs:
+                return None
+            partes = campo.source_attrs
+            caminho = '__'.join(partes)
+            # Como no DRF: se uma FK intermediária anulável for nula, o campo é omitido da linha.
+            checagens = []
+            modelo = cls.Meta.model
+            for i, parte in enumerate(partes[:-1]):
+                campo_modelo = modelo._meta.get_field(parte)
+                if campo_modelo.null:
+                    checagens.append('__'.join(partes[:i + 1]))
+                modelo = campo_modelo.related_model
+            conversor = None if isinstance(campo, CAMPOS_IDENTIDADE) else campo.to_representation
+            caminhos.append(caminho)
+            caminhos.extend(checagens)
+            colunas.append((nome, caminho, conversor, checagens, None))
+
+        linhas = list(queryset.prefetch_related(None).values(*dict.fromkeys(caminhos)))
+        calculados = {
+            nome: funcao(linhas, serializer.context, queryset)
+            for nome, _, _, _, funcao in colunas if funcao is not None
+        }
+
+        resultado = []
+        for i, linha in enumerate(linhas):
+            item = {}
+            for nome, caminho, conversor, checagens, funcao in colunas:
+                if funcao is not None:
+                    item[nome] = calculados[nome][i]
+                    continue
+                if checagens and any(linha[checagem] is None for checagem in checagens):
+                    continue
+                valor = linha[caminho]
+                item[nome] = valor if valor is None or conversor is None else conversor(valor)
+            resultado.append(item)
+        return resultado
+
+class DisciplinaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     # Serializer padrão para CRUD básico de Disciplinas.
     class Meta:
         model = Disciplina
         fields = ['id', 'nome', 'descricao']
 
-class DisponibilidadeSerializer(serializers.ModelSerializer):
+class DisponibilidadeSerializer(ListaRapidaMixin, CamposDinamicosMixin, serializers.ModelSerializer):
     # Otimização de Leitura: Usa 'source' para aninhar nomes de modelos relacionados (Professor/Disciplina).
     # Isso permite ao frontend exibir os nomes sem fazer requisições HTTP extras.
     disciplina_nome = serializers.CharField(source='disciplina.nome', read_only=True)
@@ -16,12 +134,135 @@ class DisponibilidadeSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Disponibilidade
-        fields = ['id', 'professor', 'professor_nome', 'disciplina', 'disciplina_nome', 'assunto', 'nivel', 'descricao', 'link', 'data', 'horario_inicio', 'disponivel']
+        fields = ['id', 'professor', 'professor_nome', 'disciplina', 'disciplina_nome', 'assunto', 'nivel', 'descricao', 'link', 'data', 'horario_inicio', 'disponivel', 'serie']
+        read_only_fields = ['serie']
+
+class RecorrenciaSerializer(serializers.Serializer):
+    # Geração de horários recorrentes: um padrão semanal (dias + horário) aplicado a um intervalo de datas.
+    # Todos os horários da série são gravados com um único bulk_create, dentro de uma transação.
+    MAX_HORARIOS = 500 # Limite de segurança por requisição.
+
+    disciplina = serializers.PrimaryKeyRelatedField(queryset=Disciplina.objects.all(), allow_null=True, required=False)
+    assunto = serializers.CharField(max_length=100, allow_blank=True, required=False)
+    nivel = serializers.CharField(max_length=50, allow_blank=True, required=False)
+    descricao = serializers.CharField(allow_blank=True, required=False)
+    link = serializers.URLField(max_length=200, allow_blank=True, required=False)
+    # Dias da semana no padrão do Python: 0 = Segunda ... 6 = Domingo.
+    dias_semana = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=6), allow_empty=False
+    )
+    horario_inicio = serializers.TimeField()
+    data_inicio = serializers.DateField()
+    data_fim = serializers.DateField()
+
+    def validate(self, attrs):
+        if attrs['data_fim'] < attrs['data_inicio']:
+            raise serializers.ValidationError({'data_fim': 'A data final deve ser posterior à data inicial.'})
+
+        dias = set(attrs['dias_semana'])
+        datas = []
+        data = attrs['data_inicio']
+        while data <= attrs['data_fim']:
+            if data.weekday() in dias:
+                datas.append(data)
+                if len(datas) > self.MAX_HORARIOS:
+                    raise serializers.ValidationError(f'A série excede o limite de {self.MAX_HORARIOS} horários.')
+            data += datetime.timedelta(days=1)
+
+        if not datas:
+            raise serializers.ValidationError('Nenhuma data do intervalo corresponde aos dias da semana informados.')
+        attrs['datas'] = datas
+        return attrs
+
+    def create(self, validated_data):
+        professor = validated_data['professor']
+        horario = validated_data['horario_inicio']
+        datas = validated_data['datas']
+        serie = uuid.uuid4()
+
+        with transaction.atomic():
+            # Checagem de colisão com os horários já existentes do professor (mesma data e mesmo horário).
+            conflitos = list(
+                Disponibilidade.objects.filter(professor=professor, horario_inicio=horario, data__in=datas)
+                .order_by('data').values_list('data', flat=True)
+            )
+            if conflitos:
+                raise serializers.ValidationError({
+                    'conflitos': [f'Já existe um horário em {data.isoformat()} às {horario.strftime("%H:%M")}.' for data in conflitos]
+                })
+
+            VersaoDados.incrementar(Disponibilidade) # bulk_create não dispara post_save: versão, índice de busca e eventos manuais.
+            criados = Disponibilidade.objects.bulk_create([
+                Disponibilidade(
+                    professor=professor,
+                    disciplina=validated_data.get('disciplina'),
+                    assunto=validated_data.get('assunto'),
+                    nivel=validated_data.get('nivel'),
+                    descricao=validated_data.get('descricao'),
+                    link=validated_data.get('link') or None,
+                    data=data,
+                    horario_inicio=horario,
+                    serie=serie,
+                )
+                for data in datas
+            ])
+            busca.indexar(busca.HORARIO, criados)
+            publicar_ao_confirmar(ABERTO, criados)
+            return criados
+
+class ImportacaoUsuarioSerializer(serializers.Serializer):
+    # Uma linha do arquivo de importação de usuários (ver core/importacao.py). Só o formato de cada campo:
+    # e-mails repetidos ou já cadastrados e nomes de disciplinas são checados para o lote inteiro de uma vez.
+    nome = serializers.CharField(max_length=100)
+    email = serializers.EmailField(max_length=254)
+    senha = serializers.CharField(trim_whitespace=False)
+    tipo = serializers.ChoiceField(choices=Usuario.TIPO_CHOICES)
+    disciplinas = serializers.ListField(child=serializers.CharField(max_length=50), required=False)
+
+    def validate(self, attrs):
+        if attrs.get('disciplinas') and attrs['tipo'] != 'PROFESSOR':
+            raise serializers.ValidationError({'disciplinas': 'Apenas professores têm disciplinas.'})
+        # Mesmas regras de senha do cadastro (settings.AUTH_PASSWORD_VALIDATORS), incluindo a similaridade com o e-mail.
+        usuario = Usuario(username=attrs['email'], email=attrs['email'], nome=attrs['nome'], tipo=attrs['tipo'])
+        try:
+            validate_password(attrs['senha'], usuario)
+        except DjangoValidationError as erro:
+            raise serializers.ValidationError({'senha': list(erro.messages)})
+        return attrs
+
+class ImportacaoDisponibilidadeSerializer(serializers.Serializer):
+    # Uma linha do arquivo de importação de horários: o professor vem pelo e-mail e a disciplina pelo nome,
+    # pois os ids ainda não existem na planilha da escola parceira.
+    professor = serializers.EmailField(max_length=254)
+    disciplina = serializers.CharField(max_length=50, required=False)
+    assunto = serializers.CharField(max_length=100, required=False)
+    nivel = serializers.CharField(max_length=50, required=False)
+    descricao = serializers.CharField(required=False)
+    link = serializers.URLField(max_length=200, required=False)
+    data = serializers.DateField()
+    horario_inicio = serializers.TimeField()
+
+class ResumoAvaliacoesSerializer(serializers.ModelSerializer):
+    # Avaliações RECEBIDAS pelo usuário (média, volume e histograma de estrelas) e aulas concluídas.
+    media = serializers.SerializerMethodField()
+    estrelas = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ResumoAvaliacoes
+        fields = ['media', 'total_avaliacoes', 'estrelas', 'aulas_concluidas']
+
+    def get_media(self, obj):
+        return round(obj.media, 2) if obj.media is not None else None
 
-class UsuarioSerializer(serializers.ModelSerializer):
+    def get_estrelas(self, obj):
+        return {str(nota): getattr(obj, f'estrelas_{nota}') for nota in range(1, 6)}
+
+class UsuarioSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     # Aninhamento de Relacionamentos: Reduz o número de chamadas da API no Dashboard/Explorar.
-    disciplinas = serializers.StringRelatedField(many=True, read_only=True)
+    disciplinas = serializers.SerializerMethodField()
     disponibilidades = DisponibilidadeSerializer(source='disponibilidade_set', many=True, read_only=True)
+    avaliacoes = serializers.SerializerMethodField()
+    campos_expansiveis = ('disciplinas', 'disponibilidades', 'avaliacoes')
     
     # REGRA DE SEGURANÇA CRÍTICA: 
     # 1. 'write_only=True' garante que a senha seja enviada, mas NUNCA retornada na resposta da API.
@@ -30,7 +271,23 @@ class UsuarioSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Usuario
-        fields = ['id', 'nome', 'email', 'senha', 'tipo', 'disciplinas', 'disponibilidades']
+        fields = ['id', 'nome', 'email', 'senha', 'tipo', 'disciplinas', 'disponibilidades', 'avaliacoes']
+
+    def get_disciplinas(self, obj):
+        # Nomes das disciplinas do usuário. O catálogo de professores injeta no contexto o mapeamento
+        # professor -> disciplinas vindo do cache (evita uma query/prefetch por página).
+        mapa = self.context.get('mapa_disciplinas')
+        if mapa is not None:
+            return mapa.get(obj.id, [])
+        return [str(disciplina) for disciplina in obj.disciplinas.all()]
+
+    def get_avaliacoes(self, obj):
+        # Resumo desnormalizado (ver core/resumos.py). Sem avaliações nem aulas concluídas ainda: resumo zerado.
+        try:
+            resumo = obj.resumo_avaliacoes
+        except ResumoAvaliacoes.DoesNotExist:
+            resumo = ResumoAvaliacoes(usuario_id=obj.pk, papel=obj.tipo)
+        return ResumoAvaliacoesSerializer(resumo).data
 
     def create(self, validated_data):
         # Customização do Cadastro: Garante que a senha seja salva com hashing seguro.
@@ -49,7 +306,7 @@ class UsuarioSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
-class AvaliacaoSerializer(serializers.ModelSerializer):
+class AvaliacaoSerializer(ListaRapidaMixin, CamposDinamicosMixin, serializers.ModelSerializer):
     # Serialização Complexa: Projeta dados contextuais (nomes) de múltiplos modelos relacionados.
     # Essencial para a exibição no dashboard do professor/aluno.
     nome_aluno = serializers.CharField(source='agendamento.aluno.nome', read_only=True)
@@ -61,7 +318,36 @@ class AvaliacaoSerializer(serializers.ModelSerializer):
         # Incluímos 'tipo_avaliador' para diferenciar se a nota foi dada pelo Aluno ou Professor (Avaliação Mútua).
         fields = ['id', 'agendamento', 'nota', 'comentario', 'tipo_avaliador', 'criado_em', 'nome_aluno', 'nome_professor', 'disciplina_nome']
 
-class AgendamentoSerializer(serializers.ModelSerializer):
+DISCIPLINA_PADRAO = "Tira-Dúvidas / Geral"
+STATUS_COM_LINK = ('CONFIRMADO', 'CONCLUIDO')
+
+# --- Campos calculados do AgendamentoSerializer no modo rápido (mesmas regras dos get_*) ---
+
+def _disciplinas_rapidas(linhas, contexto, queryset):
+    return [
+        linha['disponibilidade__disciplina__nome'] if linha['disponibilidade__disciplina'] is not None else DISCIPLINA_PADRAO
+        for linha in linhas
+    ]
+
+def _links_rapidos(linhas, contexto, queryset):
+    return [linha['disponibilidade__link'] if linha['status'] in STATUS_COM_LINK else None for linha in linhas]
+
+def _avaliacoes_do_usuario(modelo, linhas, contexto, queryset):
+    # Uma única query para as avaliações do usuário logado, com o agendamento filtrado por subquery.
+    request = contexto.get('request')
+    if not (request and request.user.is_authenticated):
+        return [None] * len(linhas)
+    avaliacoes = modelo.objects.filter(agendamento__in=queryset.values('id'), tipo_avaliador=request.user.tipo)
+    por_agendamento = {item['agendamento']: item for item in AvaliacaoSerializer.lista_rapida(avaliacoes)}
+    return [por_agendamento.get(linha['id']) for linha in linhas]
+
+def _avaliacoes_rapidas(linhas, contexto, queryset):
+    return _avaliacoes_do_usuario(Avaliacao, linhas, contexto, queryset)
+
+def _avaliacoes_arquivadas_rapidas(linhas, contexto, queryset):
+    return _avaliacoes_do_usuario(AvaliacaoArquivada, linhas, contexto, queryset)
+
+class AgendamentoSerializer(ListaRapidaMixin, CamposDinamicosMixin, serializers.ModelSerializer):
     # Projeção de Campos: Mapeia informações da Disponibilidade para a lista de Agendamentos.
     disciplina_nome = serializers.SerializerMethodField()
     professor_nome = serializers.CharField(source='disponibilidade.professor.nome', read_only=True)
@@ -74,6 +360,12 @@ class AgendamentoSerializer(serializers.ModelSerializer):
     # Campos de Lógica de Negócio (métodos customizados).
     link_aula = serializers.SerializerMethodField() # Regra de segurança para mostrar o link.
     avaliacao = serializers.SerializerMethodField() # Aninhamento condicional da avaliação.
+    campos_expansiveis = ('link_aula', 'avaliacao')
+    campos_rapidos = {
+        'disciplina_nome': (('disponibilidade__disciplina', 'disponibilidade__disciplina__nome'), _disciplinas_rapidas),
+        'link_aula': (('status', 'disponibilidade__link'), _links_rapidos),
+        'avaliacao': (('id',), _avaliacoes_rapidas),
+    }
 
     class Meta:
         model = Agendamento
@@ -93,17 +385,10 @@ class AgendamentoSerializer(serializers.ModelSerializer):
         if agendamento_existente:
             # LÓGICA DE RE-AGENDAMENTO (Regra de Negócio).
             # Se o agendamento existe e foi CANCELADO, ele é reativado em vez de criar um novo.
+            # O re-bloqueio da disponibilidade é atômico e fica a cargo do Agendamento.save().
             if agendamento_existente.status == 'CANCELADO':
-                if not disponibilidade.disponivel:
-                     raise serializers.ValidationError("Horário não disponível.")
-
                 agendamento_existente.status = 'AGENDADO'
-                agendamento_existente.save() 
-                
-                # Re-bloqueio manual da disponibilidade para consistência.
-                disponibilidade.disponivel = False
-                disponibilidade.save()
-                
+                agendamento_existente.save()
                 return agendamento_existente
             
             # Erro: Se o agendamento já está ativo, impede a duplicidade.
@@ -115,11 +400,11 @@ class AgendamentoSerializer(serializers.ModelSerializer):
         # Tratamento de Nulo: Retorna um nome padrão ('Tira-Dúvidas / Geral') se não houver disciplina vinculada.
         if obj.disponibilidade and obj.disponibilidade.disciplina:
             return obj.disponibilidade.disciplina.nome
-        return "Tira-Dúvidas / Geral"
+        return DISCIPLINA_PADRAO
 
     def get_link_aula(self, obj):
         # REGRA DE SEGURANÇA: O link da sala virtual só é exposto se a aula tiver sido CONFIRMADA ou CONCLUÍDA.
-        if obj.status in ['CONFIRMADO', 'CONCLUIDO']:
+        if obj.status in STATUS_COM_LINK:
             return obj.disponibilidade.link
         return None
 
@@ -132,9 +417,80 @@ class AgendamentoSerializer(serializers.ModelSerializer):
             # Se sou PROFESSOR, busco apenas avaliações com tipo_avaliador='PROFESSOR'
             # Se sou ALUNO, busco apenas avaliações com tipo_avaliador='ALUNO'
             # Isso garante que eu não veja a avaliação do outro como se fosse a minha.
-            minha_avaliacao = obj.avaliacao_set.filter(tipo_avaliador=request.user.tipo).first()
+            # Se a ViewSet já fez o Prefetch ('minhas_avaliacoes'), reaproveitamos sem nova query ao banco.
+            if hasattr(obj, 'minhas_avaliacoes'):
+                minha_avaliacao = obj.minhas_avaliacoes[0] if obj.minhas_avaliacoes else None
+            else:
+                minha_avaliacao = obj.avaliacao_set.filter(tipo_avaliador=request.user.tipo).first()
             
             if minha_avaliacao:
                 return AvaliacaoSerializer(minha_avaliacao).data
         
-        return None
\ No newline at end of file
+        return None
+
+class AgendamentoArquivadoSerializer(AgendamentoSerializer):
+    # Somente leitura (?incluir_historico=1): o histórico frio tem os mesmos campos, então o JSON é o mesmo.
+    campos_rapidos = {**AgendamentoSerializer.campos_rapidos, 'avaliacao': (('id',), _avaliacoes_arquivadas_rapidas)}
+
+    class Meta(AgendamentoSerializer.Meta):
+        model = AgendamentoArquivado
+
+class AcaoEmLoteSerializer(serializers.Serializer):
+    # Ações do Dashboard do Professor aplicadas a VÁRIOS agendamentos em uma única transação.
+    # Usa UPDATEs por conjunto (set-based) em vez de um Agendamento.save() por linha.
+    MAX_IDS = 500
+
+    ACOES = {
+        'confirmar': 'CONFIRMADO',
+        'rejeitar': 'CANCELADO',
+        'concluir': 'CONCLUIDO',
+    }
+
+    acao = serializers.ChoiceField(choices=list(ACOES))
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=MAX_IDS)
+
+    def save(self, professor):
+        novo_status = self.ACOES[self.validated_data['acao']]
+        origens = TRANSICOES_STATUS[novo_status]
+        ids = list(dict.fromkeys(self.validated_data['ids'])) # Remove duplicados preservando a ordem.
+        resultados = {}
+
+        with transaction.atomic():
+            linhas = {
+                linha['id']: linha
+                for linha in Agendamento.objects.select_for_update()
+                .filter(id__in=ids)
+                .values('id', 'status', 'aluno_id', 'disponibilidade_id', 'disponibilidade__professor_id')
+            }
+
+            validos = []
+            for ag_id in ids:
+                linha = linhas.get(ag_id)
+                if linha is None:
+                    resultados[ag_id] = {'id': ag_id, 'ok': False, 'detail': 'Agendamento não encontrado.'}
+                elif linha['disponibilidade__professor_id'] != professor.id:
+                    resultados[ag_id] = {'id': ag_id, 'ok': False, 'detail': 'Agendamento de outro professor.'}
+                elif linha['status'] not in origens:
+                    resultados[ag_id] = {'id': ag_id, 'ok': False, 'detail': f"Transição inválida: {linha['status']} -> {novo_status}."}
+                else:
+                    validos.append(ag_id)
+
+            # 1 UPDATE para os agendamentos; o filtro por status de origem protege contra mudanças concorrentes.
+            Agendamento.objects.filter(id__in=validos, status__in=origens).update(status=novo_status)
+            if validos:
+                VersaoDados.incrementar(Agendamento)
+
+            # UPDATE em lote não passa pelo Agendamento.save(): aulas concluídas somadas nos resumos manualmente.
+            if novo_status == 'CONCLUIDO' and validos:
+                resumos.aulas_concluidas([(linhas[ag_id]['aluno_id'], professor.id) for ag_id in validos])
+
+            # Regra de reversão (mesma do Agendamento.save()): cancelar libera o horário para novos agendamentos.
+            if novo_status == 'CANCELADO' and validos:
+                liberados = Disponibilidade.objects.filter(id__in=[linhas[ag_id]['disponibilidade_id'] for ag_id in validos])
+                liberados.update(disponivel=True)
+                VersaoDados.incrementar(Disponibilidade)
+                publicar_ao_confirmar(LIBERADO, liberados.select_related('disciplina'))
+
+        for ag_id in validos:
+            resultados[ag_id] = {'id': ag_id, 'ok': True, 'status': novo_status}
+        return [resultados[ag_id] for ag_id in ids]
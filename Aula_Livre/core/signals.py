@@ -0,0 +1,148 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import busca, horas, resumos
+from .cache import certificados_verificados, codigos_inexistentes
+from .eventos import ABERTO, REMOVIDO, publicar_ao_confirmar
+from .models import Agendamento, Avaliacao, Certificado, Disciplina, Disponibilidade, Usuario, VersaoDados
+
+# Modelos cujas escritas mudam as respostas da API (e, portanto, os ETags).
+MODELOS_VERSIONADOS = (Usuario, Disciplina, Disponibilidade, Agendamento, Avaliacao, Certificado)
+
+
+def incrementar_versao(sender, **kwargs):
+    # O login só atualiza 'last_login', que nenhuma resposta da API expõe: não invalida os ETags.
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    VersaoDados.incrementar(sender)
+
+
+for modelo in MODELOS_VERSIONADOS:
+    post_save.connect(incrementar_versao, sender=modelo, dispatch_uid=f'versao_save_{modelo._meta.label_lower}')
+    post_delete.connect(incrementar_versao, sender=modelo, dispatch_uid=f'versao_delete_{modelo._meta.label_lower}')
+
+
+@receiver(m2m_changed, sender=Disciplina.professores.through)
+def incrementar_versao_professores(sender, action, **kwargs):
+    # Vínculo Professor <-> Disciplina aparece no catálogo de professores e na lista de disciplinas.
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        VersaoDados.incrementar(Disciplina, Usuario)
+
+
+@receiver(post_save, sender=Disponibilidade)
+def publicar_horario_criado(sender, instance, created, **kwargs):
+    # Stream SSE: horário novo aparece na tela Explorar sem recarregar a lista.
+    if created:
+        publicar_ao_confirmar(ABERTO, [instance])
+
+
+@receiver(post_delete, sender=Disponibilidade)
+def publicar_horario_removido(sender, instance, **kwargs):
+    publicar_ao_confirmar(REMOVIDO, [instance])
+
+
+# --- ÍNDICE DE BUSCA (FTS5) ---
+
+def _sem_texto_alterado(kwargs):
+    # Mesma exceção do versionamento: o login não altera nenhum texto indexado.
+    update_fields = kwargs.get('update_fields')
+    return bool(update_fields) and set(update_fields) == {'last_login'}
+
+
+@receiver(post_save, sender=Disciplina)
+def indexar_disciplina(sender, instance, **kwargs):
+    busca.indexar(busca.DISCIPLINA, [instance])
+
+
+@receiver(post_save, sender=Disponibilidade)
+def indexar_horario(sender, instance, **kwargs):
+    busca.indexar(busca.HORARIO, [instance])
+
+
+@receiver(post_save, sender=Usuario)
+def indexar_professor(sender, instance, **kwargs):
+    if _sem_texto_alterado(kwargs):
+        return
+    # Apenas professores são pesquisáveis; um usuário que deixou de ser professor sai do índice.
+    if instance.tipo == 'PROFESSOR':
+        busca.indexar(busca.PROFESSOR, [instance])
+    else:
+        busca.remover(busca.PROFESSOR, [instance.pk])
+
+
+@receiver(post_delete, sender=Disciplina)
+def desindexar_disciplina(sender, instance, **kwargs):
+    busca.remover(busca.DISCIPLINA, [instance.pk])
+
+
+@receiver(post_delete, sender=Disponibilidade)
+def desindexar_horario(sender, instance, **kwargs):
+    busca.remover(busca.HORARIO, [instance.pk])
+
+
+@receiver(post_delete, sender=Usuario)
+def desindexar_professor(sender, instance, **kwargs):
+    busca.remover(busca.PROFESSOR, [instance.pk])
+
+
+# --- RESUMOS DE AVALIAÇÕES (ResumoAvaliacoes) ---
+
+@receiver(pre_save, sender=Avaliacao)
+def guardar_avaliacao_anterior(sender, instance, **kwargs):
+    # Edição: guarda a versão persistida para retirar o delta antigo no post_save.
+    instance._resumo_anterior = None
+    if instance.pk:
+        instance._resumo_anterior = (
+            Avaliacao.objects.filter(pk=instance.pk).values('agendamento_id', 'tipo_avaliador', 'nota').first()
+        )
+
+
+@receiver(post_save, sender=Avaliacao)
+def atualizar_resumo_avaliacao(sender, instance, **kwargs):
+    resumos.avaliacao_alterada(getattr(instance, '_resumo_anterior', None), resumos.dados_avaliacao(instance))
+
+
+@receiver(post_delete, sender=Avaliacao)
+def retirar_resumo_avaliacao(sender, instance, **kwargs):
+    resumos.avaliacao_alterada(resumos.dados_avaliacao(instance), None)
+
+
+@receiver(post_delete, sender=Agendamento)
+def retirar_aula_concluida(sender, instance, **kwargs):
+    if instance.status == 'CONCLUIDO':
+        professor_id = Disponibilidade.objects.filter(pk=instance.disponibilidade_id).values_list('professor_id', flat=True).first()
+        if professor_id is not None:
+            resumos.aulas_concluidas([(instance.aluno_id, professor_id)], sinal=-1)
+
+
+# --- LIVRO DE HORAS VOLUNTÁRIAS (HorasVoluntarias) ---
+
+@receiver(pre_save, sender=Certificado)
+def guardar_certificado_anterior(sender, instance, **kwargs):
+    instance._horas_anterior = None
+    if instance.pk:
+        instance._horas_anterior = Certificado.objects.filter(pk=instance.pk).values('agendamento_id', 'horas').first()
+
+
+@receiver(post_save, sender=Certificado)
+def lancar_horas_certificado(sender, instance, **kwargs):
+    # Emissão (download_certificado) ou ajuste de horas: o delta vai para o livro do professor e do aluno.
+    horas.certificado_alterado(getattr(instance, '_horas_anterior', None), horas.dados_certificado(instance))
+
+
+@receiver(post_delete, sender=Certificado)
+def estornar_horas_certificado(sender, instance, **kwargs):
+    horas.certificado_alterado(horas.dados_certificado(instance), None)
+
+
+# --- CACHE DA VERIFICAÇÃO PÚBLICA DE CERTIFICADOS ---
+
+def descartar_certificado_verificado(sender, instance, **kwargs):
+    # Um código recém-emitido pode estar no cache negativo; um excluído, no cache de acertos.
+    certificados_verificados.descartar(instance.codigo_validacao)
+    codigos_inexistentes.descartar(instance.codigo_validacao)
+
+
+post_save.connect(descartar_certificado_verificado, sender=Certificado, dispatch_uid='verificacao_save_certificado')
+post_delete.connect(descartar_certificado_verificado, sender=Certificado, dispatch_uid='verificacao_delete_certificado')
@@ -1,7 +1,43 @@
+import asyncio
+import csv
+import datetime
+import io
+import json
+import os
+import tempfile
+import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import check_password
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.http import QueryDict
+from django.contrib.sessions.models import Session
+from django.db import OperationalError, connection, connections, router, transaction
+from django.db.models.query import QuerySet
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
+from django.test import AsyncClient, AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
 from rest_framework.test import APITestCase
-from .models import Disciplina
+from . import concorrencia, horas, importacao, resumos, roteamento
+from .cache import AUSENTE, VALIDADE_VERIFICACAO, CacheLRU, certificados_verificados, codigos_inexistentes
+from .eventos import CanalEventos, RESSINCRONIZAR, canal_disponibilidades
+from .exceptions import BancoOcupado, HorarioIndisponivel
+from .metricas import registro as registro_metricas
+from .models import (
+    Disciplina, Usuario, Disponibilidade, Agendamento, Avaliacao, Certificado, HorasVoluntarias, HorasPorUsuarioAno, HorasPorDisciplinaMes,
+    ResumoAvaliacoes, VersaoDados,
+    AgendamentoArquivado, AvaliacaoArquivada, CertificadoArquivado, DisponibilidadeArquivada,
+)
+from .serializers import AgendamentoSerializer, AvaliacaoSerializer, DisponibilidadeSerializer
+from .throttling import VerificacaoCertificadoThrottle
+from .views import ProfessorViewSet, filtrar_horarios, stream_disponibilidades
 
 class DisciplinaCRUDTests(APITestCase):
 
@@ -61,4 +97,2236 @@ class DisciplinaCRUDTests(APITestCase):
         
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Disciplina.objects.count(), 0)
-# Create your tests here.
+
+
+class AgendamentoQueryCountTests(APITestCase):
+
+    def setUp(self):
+        """
+        Cria um professor, uma disciplina e um aluno logado.
+        Os agendamentos são criados sob demanda por criar_agendamentos().
+        """
+        self.professor = Usuario.objects.create_user(
+            username='prof@teste.com', email='prof@teste.com', password='senha-forte-123',
+            nome='Prof. Ana', tipo='PROFESSOR'
+        )
+        self.aluno = Usuario.objects.create_user(
+            username='aluno@teste.com', email='aluno@teste.com', password='senha-forte-123',
+            nome='Aluno Beto', tipo='ALUNO'
+        )
+        self.disciplina = Disciplina.objects.create(nome='Matemática')
+        self.url_list = reverse('agendamento-list')
+        self.client.force_authenticate(user=self.aluno)
+
+    def criar_agendamentos(self, quantidade):
+        # Cada agendamento recebe a sua própria disponibilidade e uma avaliação de cada lado (Aluno e Professor).
+        inicio = Disponibilidade.objects.count()
+        for i in range(inicio, inicio + quantidade):
+            disp = Disponibilidade.objects.create(
+                professor=self.professor, disciplina=self.disciplina,
+                data=datetime.date(2030, 1, 1) + datetime.timedelta(days=i),
+                horario_inicio=datetime.time(10, 0)
+            )
+            ag = Agendamento.objects.create(aluno=self.aluno, disponibilidade=disp, status='CONCLUIDO')
+            Avaliacao.objects.create(agendamento=ag, tipo_avaliador='ALUNO', nota=5)
+            Avaliacao.objects.create(agendamento=ag, tipo_avaliador='PROFESSOR', nota=4)
+
+    def contar_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), response
+
+    def test_listagem_com_numero_fixo_de_queries(self):
+        """Teste (N+1): O número de queries da listagem não cresce com o número de linhas"""
+        self.criar_agendamentos(2)
+        queries_poucas, _ = self.contar_queries(self.url_list)
+
+        self.criar_agendamentos(20)
+        queries_muitas, response = self.contar_queries(self.url_list)
+
+        self.assertEqual(len(response.data), 22)
+        self.assertEqual(queries_poucas, queries_muitas)
+
+    def test_filtro_por_professor_com_numero_fixo_de_queries(self):
+        """Teste (N+1): O filtro ?professor_id= mantém o número de queries constante"""
+        url = f'{self.url_list}?professor_id={self.professor.id}'
+        self.criar_agendamentos(2)
+        queries_poucas, _ = self.contar_queries(url)
+
+        self.criar_agendamentos(15)
+        queries_muitas, _ = self.contar_queries(url)
+
+        self.assertEqual(queries_poucas, queries_muitas)
+
+    def test_avaliacao_prefetch_retorna_apenas_a_do_usuario(self):
+        """Teste: A avaliação aninhada é a do próprio usuário logado (Avaliação Mútua)"""
+        self.criar_agendamentos(1)
+        _, response = self.contar_queries(self.url_list)
+        self.assertEqual(response.data[0]['avaliacao']['tipo_avaliador'], 'ALUNO')
+        self.assertEqual(response.data[0]['avaliacao']['nota'], 5)
+        self.assertEqual(response.data[0]['avaliacao']['nome_professor'], 'Prof. Ana')
+
+        self.client.force_authenticate(user=self.professor)
+        _, response = self.contar_queries(self.url_list)
+        self.assertEqual(response.data[0]['avaliacao']['tipo_avaliador'], 'PROFESSOR')
+
+    def test_detalhe_com_numero_fixo_de_queries(self):
+        """Teste (N+1): O detalhe usa o mesmo queryset otimizado da listagem"""
+        self.criar_agendamentos(1)
+        ag = Agendamento.objects.first()
+        url = reverse('agendamento-detail', args=[ag.id])
+        # force_authenticate dispensa a sessão: versões (ETag) + 1 query principal + 1 prefetch de avaliações.
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.data['disciplina_nome'], 'Matemática')
+
+
+class ProfessorCatalogoTests(APITestCase):
+
+    def setUp(self):
+        """
+        Massa de dados do catálogo: dois professores de disciplinas diferentes,
+        com horários passados, futuros, livres e já reservados.
+        """
+        self.url_list = reverse('professor-list')
+        self.matematica = Disciplina.objects.create(nome='Matemática')
+        self.fisica = Disciplina.objects.create(nome='Física')
+        self.hoje = datetime.date.today()
+
+        self.prof_mat = self.criar_professor('mat', self.matematica)
+        self.prof_fis = self.criar_professor('fis', self.fisica)
+
+        self.slot_futuro = self.criar_slot(self.prof_mat, self.matematica, dias=5, nivel='Médio')
+        self.slot_passado = self.criar_slot(self.prof_mat, self.matematica, dias=-5, nivel='Médio')
+        self.slot_reservado = self.criar_slot(self.prof_mat, self.matematica, dias=6, disponivel=False)
+        self.slot_fisica = self.criar_slot(self.prof_fis, self.fisica, dias=10, nivel='Fundamental')
+
+    def criar_professor(self, sufixo, disciplina):
+        prof = Usuario.objects.create(
+            username=f'{sufixo}@teste.com', email=f'{sufixo}@teste.com',
+            nome=f'Prof. {sufixo}', tipo='PROFESSOR'
+        )
+        disciplina.professores.add(prof)
+        return prof
+
+    def criar_slot(self, professor, disciplina, dias, nivel=None, disponivel=True):
+        return Disponibilidade.objects.create(
+            professor=professor, disciplina=disciplina, nivel=nivel, disponivel=disponivel,
+            data=self.hoje + datetime.timedelta(days=dias), horario_inicio=datetime.time(14, 0)
+        )
+
+    def test_listagem_paginada_por_cursor(self):
+        """Teste: A listagem de professores é paginada por cursor (next/previous/results)"""
+        response = self.client.get(self.url_list, {'page_size': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNotNone(response.data['next'])
+
+        segunda = self.client.get(response.data['next'])
+        self.assertEqual(len(segunda.data['results']), 1)
+        self.assertNotEqual(response.data['results'][0]['id'], segunda.data['results'][0]['id'])
+
+    def test_disponivel_aninha_apenas_horarios_futuros_livres(self):
+        """Teste: ?disponivel=true aninha somente horários futuros e não reservados"""
+        response = self.client.get(self.url_list, {'disponivel': 'true'})
+        por_id = {p['id']: p for p in response.data['results']}
+        ids_slots = [d['id'] for d in por_id[self.prof_mat.id]['disponibilidades']]
+        self.assertEqual(ids_slots, [self.slot_futuro.id])
+
+        # Professor sem nenhum horário livre continua no catálogo, com a agenda vazia.
+        sem_horario = self.criar_professor('livre', self.fisica)
+        self.criar_slot(sem_horario, self.fisica, dias=-1)
+        por_id = {p['id']: p for p in self.client.get(self.url_list, {'disponivel': 'true'}).data['results']}
+        self.assertEqual(por_id[sem_horario.id]['disponibilidades'], [])
+
+    def test_filtros_disciplina_e_nivel(self):
+        """Teste: ?disciplina= e ?nivel= restringem professores e horários aninhados"""
+        response = self.client.get(self.url_list, {'disciplina': self.fisica.id})
+        self.assertEqual([p['id'] for p in response.data['results']], [self.prof_fis.id])
+
+        response = self.client.get(self.url_list, {'nivel': 'médio', 'disponivel': 'true'})
+        self.assertEqual([p['id'] for p in response.data['results']], [self.prof_mat.id])
+
+    def test_filtro_por_intervalo_de_datas(self):
+        """Teste: ?data_inicio= e ?data_fim= filtram os horários pelo intervalo"""
+        response = self.client.get(self.url_list, {
+            'data_inicio': (self.hoje + datetime.timedelta(days=6)).isoformat(),
+            'data_fim': (self.hoje + datetime.timedelta(days=30)).isoformat(),
+        })
+        por_id = {p['id']: p for p in response.data['results']}
+        self.assertEqual([d['id'] for d in por_id[self.prof_mat.id]['disponibilidades']], [self.slot_reservado.id])
+        self.assertEqual([d['id'] for d in por_id[self.prof_fis.id]['disponibilidades']], [self.slot_fisica.id])
+
+    def test_data_invalida_retorna_400(self):
+        """Teste: Datas fora do formato AAAA-MM-DD são rejeitadas"""
+        response = self.client.get(self.url_list, {'data_inicio': '31/12/2030'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_numero_de_queries_nao_cresce_com_o_historico(self):
+        """Teste (N+1): O aninhamento vem de prefetches; o histórico não aumenta as queries"""
+        self.client.get(self.url_list, {'disponivel': 'true'}) # Aquece o cache de disciplinas por professor.
+        with CaptureQueriesContext(connection) as antes:
+            self.client.get(self.url_list, {'disponivel': 'true'})
+        for dias in range(-40, 40):
+            self.criar_slot(self.prof_fis, self.fisica, dias=dias)
+        with CaptureQueriesContext(connection) as depois:
+            self.client.get(self.url_list, {'disponivel': 'true'})
+        self.assertEqual(len(antes.captured_queries), len(depois.captured_queries))
+
+
+class MotorDeReservasTests(APITestCase):
+
+    def setUp(self):
+        """
+        Um professor com um horário livre e dois alunos disputando o mesmo horário.
+        """
+        self.url_list = reverse('agendamento-list')
+        self.professor = Usuario.objects.create(
+            username='prof@teste.com', email='prof@teste.com', nome='Prof. Ana', tipo='PROFESSOR'
+        )
+        self.aluno = Usuario.objects.create(
+            username='aluno@teste.com', email='aluno@teste.com', nome='Aluno Beto', tipo='ALUNO'
+        )
+        self.outro_aluno = Usuario.objects.create(
+            username='outro@teste.com', email='outro@teste.com', nome='Aluna Carla', tipo='ALUNO'
+        )
+        self.disponibilidade = Disponibilidade.objects.create(
+            professor=self.professor, data=datetime.date(2030, 1, 1), horario_inicio=datetime.time(10, 0)
+        )
+
+    def reservar(self, aluno):
+        self.client.force_authenticate(user=aluno)
+        return self.client.post(self.url_list, {
+            'aluno': aluno.id, 'disponibilidade': self.disponibilidade.id, 'status': 'AGENDADO'
+        }, format='json')
+
+    def test_reserva_trava_horario_e_gera_link(self):
+        """Teste: A reserva trava o horário e gera a sala virtual automática"""
+        response = self.reservar(self.aluno)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.disponibilidade.refresh_from_db()
+        self.assertFalse(self.disponibilidade.disponivel)
+        self.assertEqual(self.disponibilidade.link, f'https://meet.jit.si/AulaLivre-{self.disponibilidade.id}')
+
+    def test_segunda_reserva_recebe_409(self):
+        """Teste: O pedido que perde a disputa pelo horário recebe 409 (Conflict)"""
+        self.assertEqual(self.reservar(self.aluno).status_code, status.HTTP_201_CREATED)
+        response = self.reservar(self.outro_aluno)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Agendamento.objects.count(), 1)
+
+    def test_cancelamento_libera_e_reativacao_trava_novamente(self):
+        """Teste: Cancelar libera o horário; reativar o agendamento cancelado trava de novo"""
+        ag_id = self.reservar(self.aluno).data['id']
+        response = self.client.patch(reverse('agendamento-detail', args=[ag_id]), {'status': 'CANCELADO'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.disponibilidade.refresh_from_db()
+        self.assertTrue(self.disponibilidade.disponivel)
+
+        response = self.reservar(self.aluno)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['id'], ag_id)
+        self.disponibilidade.refresh_from_db()
+        self.assertFalse(self.disponibilidade.disponivel)
+
+    def test_reativacao_de_horario_ja_ocupado_recebe_409(self):
+        """Teste: Reativar um agendamento cancelado cujo horário foi ocupado retorna 409"""
+        ag_id = self.reservar(self.aluno).data['id']
+        self.client.patch(reverse('agendamento-detail', args=[ag_id]), {'status': 'CANCELADO'}, format='json')
+        self.assertEqual(self.reservar(self.outro_aluno).status_code, status.HTTP_201_CREATED)
+
+        response = self.reservar(self.aluno)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Agendamento.objects.get(id=ag_id).status, 'CANCELADO')
+
+    def test_salvar_cancelado_novamente_nao_libera_horario_de_outro(self):
+        """Teste: Re-salvar um agendamento já CANCELADO não libera o horário reservado por outro aluno"""
+        ag_id = self.reservar(self.aluno).data['id']
+        self.client.patch(reverse('agendamento-detail', args=[ag_id]), {'status': 'CANCELADO'}, format='json')
+        self.reservar(self.outro_aluno)
+
+        Agendamento.objects.get(id=ag_id).save()
+        self.disponibilidade.refresh_from_db()
+        self.assertFalse(self.disponibilidade.disponivel)
+
+
+class ReservaConcorrenteTests(TransactionTestCase):
+
+    def test_benchmark_de_concorrencia_tem_um_vencedor_por_horario(self):
+        """Teste (Concorrência): N reservas paralelas no mesmo horário resultam em exatamente um vencedor"""
+        saida = io.StringIO()
+        call_command('benchmark_reservas', threads=8, rodadas=3, stdout=saida)
+        resultado = json.loads(saida.getvalue())
+
+        self.assertEqual(resultado['vencedores'], 3)
+        self.assertEqual(resultado['conflitos'], 3 * 7)
+        self.assertEqual(resultado['erros'], 0)
+        self.assertEqual(resultado['rodadas_invalidas'], 0)
+        self.assertGreater(resultado['tentativas_por_segundo'], 0)
+
+
+class RecorrenciaDisponibilidadeTests(APITestCase):
+
+    def setUp(self):
+        """
+        Professor logado e uma disciplina para a série de horários.
+        """
+        self.url = reverse('disponibilidade-criar-recorrencia')
+        self.professor = Usuario.objects.create(
+            username='prof@teste.com', email='prof@teste.com', nome='Prof. Ana', tipo='PROFESSOR'
+        )
+        self.disciplina = Disciplina.objects.create(nome='Química')
+        self.client.force_authenticate(user=self.professor)
+        # 2030-01-07 é uma segunda-feira; o intervalo cobre 4 semanas.
+        self.payload = {
+            'disciplina': self.disciplina.id, 'assunto': 'Estequiometria', 'nivel': 'Ensino Médio',
+            'dias_semana': [0, 2], 'horario_inicio': '19:00',
+            'data_inicio': '2030-01-07', 'data_fim': '2030-02-03',
+        }
+
+    def test_cria_serie_com_um_unico_insert(self):
+        """Teste (CREATE em lote): A série inteira é gravada com um único INSERT"""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, self.payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['criados'], 8)
+
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "core_disponibilidade"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(Disponibilidade.objects.filter(serie=response.data['serie']).count(), 8)
+        self.assertEqual(response.data['disponibilidades'][0]['disciplina_nome'], 'Química')
+
+    def test_colisao_com_horario_existente_rejeita_a_serie(self):
+        """Teste: Uma colisão com horário existente do professor rejeita a série inteira"""
+        Disponibilidade.objects.create(
+            professor=self.professor, data=datetime.date(2030, 1, 9), horario_inicio=datetime.time(19, 0)
+        )
+        response = self.client.post(self.url, self.payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('conflitos', response.data)
+        self.assertEqual(Disponibilidade.objects.count(), 1)
+
+    def test_intervalo_invalido_e_aluno_sao_rejeitados(self):
+        """Teste: Intervalo invertido retorna 400 e alunos não podem criar séries (403)"""
+        response = self.client.post(self.url, {**self.payload, 'data_fim': '2029-12-01'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        aluno = Usuario.objects.create(username='a@teste.com', email='a@teste.com', nome='Aluno', tipo='ALUNO')
+        self.client.force_authenticate(user=aluno)
+        response = self.client.post(self.url, self.payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_exclusao_da_serie_mantem_horarios_reservados(self):
+        """Teste (DELETE em lote): Excluir a série remove apenas os horários ainda livres"""
+        serie = self.client.post(self.url, self.payload, format='json').data['serie']
+        aluno = Usuario.objects.create(username='a@teste.com', email='a@teste.com', nome='Aluno', tipo='ALUNO')
+        reservado = Disponibilidade.objects.filter(serie=serie).first()
+        Agendamento.objects.create(aluno=aluno, disponibilidade=reservado)
+
+        url = reverse('disponibilidade-excluir-recorrencia', args=[serie])
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'excluidos': 7, 'mantidos': 1})
+        self.assertEqual(list(Disponibilidade.objects.values_list('id', flat=True)), [reservado.id])
+
+    def test_exclusao_da_serie_mantem_horarios_com_agendamento_cancelado(self):
+        """Teste (DELETE em lote): Um horário livre de novo após um cancelamento fica, com o agendamento e a avaliação"""
+        serie = self.client.post(self.url, self.payload, format='json').data['serie']
+        aluno = Usuario.objects.create(username='a@teste.com', email='a@teste.com', nome='Aluno', tipo='ALUNO')
+        liberado = Disponibilidade.objects.filter(serie=serie).first()
+        cancelado = Agendamento.objects.create(aluno=aluno, disponibilidade=liberado, status='CANCELADO')
+        Avaliacao.objects.create(agendamento=cancelado, tipo_avaliador='ALUNO', nota=2)
+        liberado.refresh_from_db()
+        self.assertTrue(liberado.disponivel)
+
+        response = self.client.delete(reverse('disponibilidade-excluir-recorrencia', args=[serie]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'excluidos': 7, 'mantidos': 1})
+        self.assertTrue(Agendamento.objects.filter(pk=cancelado.pk).exists())
+        self.assertEqual(Avaliacao.objects.filter(agendamento=cancelado).count(), 1)
+
+
+class AcoesEmLoteTests(APITestCase):
+
+    def setUp(self):
+        """
+        Professor logado com agendamentos em estados variados e um agendamento de outro professor.
+        """
+        self.url = reverse('agendamento-acoes-em-lote')
+        self.professor = Usuario.objects.create(
+            username='prof@teste.com', email='prof@teste.com', nome='Prof. Ana', tipo='PROFESSOR'
+        )
+        self.outro_prof = Usuario.objects.create(
+            username='outro@teste.com', email='outro@teste.com', nome='Prof. Bia', tipo='PROFESSOR'
+        )
+        self.aluno = Usuario.objects.create(
+            username='aluno@teste.com', email='aluno@teste.com', nome='Aluno Beto', tipo='ALUNO'
+        )
+        self.client.force_authenticate(user=self.professor)
+
+    def criar_agendamento(self, status_inicial='AGENDADO', professor=None):
+        disp = Disponibilidade.objects.create(
+            professor=professor or self.professor,
+            data=datetime.date(2030, 1, 1) + datetime.timedelta(days=Disponibilidade.objects.count()),
+            horario_inicio=datetime.time(10, 0)
+        )
+        return Agendamento.objects.create(aluno=self.aluno, disponibilidade=disp, status=status_inicial)
+
+    def test_confirma_varios_com_updates_por_conjunto(self):
+        """Teste: Confirmar N agendamentos usa um número fixo de queries"""
+        ids = [self.criar_agendamento().id for _ in range(10)]
+        # SAVEPOINT + SELECT FOR UPDATE + UPDATE + versão (ETag) + RELEASE
+        with self.assertNumQueries(5):
+            response = self.client.post(self.url, {'acao': 'confirmar', 'ids': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(all(r['ok'] for r in response.data['resultados']))
+        self.assertEqual(Agendamento.objects.filter(status='CONFIRMADO').count(), 10)
+
+    def test_rejeitar_libera_os_horarios(self):
+        """Teste: Rejeitar (CANCELADO) libera as disponibilidades, como no Agendamento.save()"""
+        ags = [self.criar_agendamento(), self.criar_agendamento('CONFIRMADO')]
+        response = self.client.post(self.url, {'acao': 'rejeitar', 'ids': [a.id for a in ags]}, format='json')
+        self.assertTrue(all(r['ok'] for r in response.data['resultados']))
+        self.assertEqual(Disponibilidade.objects.filter(disponivel=True).count(), 2)
+
+    def test_resultado_por_id_com_transicoes_invalidas(self):
+        """Teste: IDs inválidos, de outro professor ou com transição proibida são reportados individualmente"""
+        pendente = self.criar_agendamento()
+        concluido = self.criar_agendamento('CONCLUIDO')
+        alheio = self.criar_agendamento(professor=self.outro_prof)
+
+        response = self.client.post(
+            self.url, {'acao': 'concluir', 'ids': [pendente.id, concluido.id, alheio.id, 9999]}, format='json'
+        )
+        resultados = response.data['resultados']
+        self.assertEqual([r['id'] for r in resultados], [pendente.id, concluido.id, alheio.id, 9999])
+        self.assertFalse(any(r['ok'] for r in resultados))
+        self.assertIn('Transição inválida', resultados[0]['detail'])
+        self.assertEqual(resultados[2]['detail'], 'Agendamento de outro professor.')
+        self.assertEqual(resultados[3]['detail'], 'Agendamento não encontrado.')
+
+        pendente.refresh_from_db()
+        self.assertEqual(pendente.status, 'AGENDADO')
+
+    def test_aluno_nao_pode_usar_acoes_em_lote(self):
+        """Teste: Apenas professores podem usar o endpoint de ações em lote"""
+        self.client.force_authenticate(user=self.aluno)
+        response = self.client.post(self.url, {'acao': 'confirmar', 'ids': [1]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class DashboardAgregadoTests(APITestCase):
+
+    def setUp(self):
+        """
+        Professor com horários livres e agendamentos em todos os estados, para um mesmo aluno.
+        """
+        self.url = reverse('api_dashboard')
+        self.professor = Usuario.objects.create(
+            username='prof@teste.com', email='prof@teste.com', nome='Prof. Ana', tipo='PROFESSOR'
+        )
+        self.aluno = Usuario.objects.create(
+            username='aluno@teste.com', email='aluno@teste.com', nome='Aluno Beto', tipo='ALUNO'
+        )
+        self.disciplina = Disciplina.objects.create(nome='Biologia')
+        self.hoje = datetime.date.today()
+        self.dias = 1
+
+    def criar_slot(self, disponivel=True):
+        self.dias += 1
+        return Disponibilidade.objects.create(
+            professor=self.professor, disciplina=self.disciplina, disponivel=disponivel,
+            data=self.hoje + datetime.timedelta(days=self.dias), horario_inicio=datetime.time(8, 0)
+        )
+
+    def criar_agendamentos(self, quantidade_por_status=1):
+        for status_aula in ('AGENDADO', 'CONFIRMADO', 'CONCLUIDO', 'CANCELADO'):
+            for _ in range(quantidade_por_status):
+                Agendamento.objects.create(aluno=self.aluno, disponibilidade=self.criar_slot(), status=status_aula)
+
+    def test_exige_login(self):
+        """Teste: O dashboard exige autenticação"""
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_payload_do_professor(self):
+        """Teste: O professor recebe aulas, horários livres, avaliações pendentes e disciplinas em uma resposta"""
+        self.criar_agendamentos()
+        livre = self.criar_slot()
+        self.client.force_authenticate(user=self.professor)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([a['status'] for a in response.data['proximas_aulas']], ['AGENDADO', 'CONFIRMADO'])
+        self.assertEqual({a['status'] for a in response.data['aulas_passadas']}, {'CONCLUIDO', 'CANCELADO'})
+        # O horário do agendamento CANCELADO também está livre (foi liberado).
+        cancelado = Agendamento.objects.get(status='CANCELADO')
+        self.assertEqual([h['id'] for h in response.data['horarios_livres']], [cancelado.disponibilidade_id, livre.id])
+        self.assertEqual(len(response.data['avaliacoes_pendentes']), 1)
+        self.assertEqual(response.data['disciplinas'][0]['nome'], 'Biologia')
+
+    def test_payload_do_aluno_sem_horarios_livres(self):
+        """Teste: O aluno recebe apenas as suas aulas e avaliações já feitas saem das pendentes"""
+        self.criar_agendamentos()
+        concluido = Agendamento.objects.get(status='CONCLUIDO')
+        Avaliacao.objects.create(agendamento=concluido, tipo_avaliador='ALUNO', nota=5)
+        self.client.force_authenticate(user=self.aluno)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['horarios_livres'], [])
+        self.assertEqual(response.data['avaliacoes_pendentes'], [])
+        self.assertEqual(len(response.data['proximas_aulas']) + len(response.data['aulas_passadas']), 4)
+
+    def test_numero_de_queries_limitado(self):
+        """Teste (N+1): O dashboard usa o mesmo número de queries com 4 ou 40 aulas"""
+        self.client.force_authenticate(user=self.professor)
+        self.criar_agendamentos(1)
+        with CaptureQueriesContext(connection) as antes:
+            self.client.get(self.url)
+        self.criar_agendamentos(10)
+        for _ in range(10):
+            self.criar_slot()
+        with CaptureQueriesContext(connection) as depois:
+            self.client.get(self.url)
+        self.assertEqual(len(antes.captured_queries), len(depois.captured_queries))
+
+
+class ConditionalGetTests(APITestCase):
+
+    def setUp(self):
+        """
+        Uma disciplina e um professor com horário, para testar ETag/Last-Modified nas listagens.
+        """
+        self.disciplina = Disciplina.objects.create(nome='Geografia')
+        self.professor = Usuario.objects.create(
+            username='prof@teste.com', email='prof@teste.com', nome='Prof. Ana', tipo='PROFESSOR'
+        )
+        self.slot = Disponibilidade.objects.create(
+            professor=self.professor, disciplina=self.disciplina,
+            data=datetime.date(2030, 1, 1), horario_inicio=datetime.time(10, 0)
+        )
+
+    def test_304_sem_rodar_o_serializer(self):
+        """Teste: Com o ETag atual, a API responde 304 lendo apenas a tabela de versões"""
+        url = reverse('disciplina-list')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_escrita_invalida_o_etag(self):
+        """Teste: Qualquer escrita na tabela (inclusive M2M) gera um novo ETag"""
+        url = reverse('professor-list')
+        etag = self.client.get(url)['ETag']
+
+        self.disciplina.professores.add(self.professor)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_update_em_lote_da_reserva_invalida_o_etag(self):
+        """Teste: A reserva (UPDATE por queryset, sem sinais) também invalida o ETag das disponibilidades"""
+        url = reverse('disponibilidade-list')
+        etag = self.client.get(url)['ETag']
+        aluno = Usuario.objects.create(username='a@teste.com', email='a@teste.com', nome='Aluno', tipo='ALUNO')
+
+        Agendamento.objects.create(aluno=aluno, disponibilidade=self.slot)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data[0]['disponivel'])
+
+    def test_etag_varia_por_usuario_e_por_filtro(self):
+        """Teste: O ETag depende do usuário logado e da query string"""
+        aluno = Usuario.objects.create(username='a@teste.com', email='a@teste.com', nome='Aluno', tipo='ALUNO')
+        url = reverse('agendamento-list')
+        self.client.force_authenticate(user=aluno)
+        etag_aluno = self.client.get(url)['ETag']
+        etag_filtro = self.client.get(url, {'aluno_id': aluno.id})['ETag']
+        self.client.force_authenticate(user=self.professor)
+        etag_prof = self.client.get(url)['ETag']
+        self.assertEqual(len({etag_aluno, etag_filtro, etag_prof}), 3)
+
+    def test_filtros_pelo_relogio_mudam_o_etag_com_o_tempo(self):
+        """Teste: Horários futuros e dashboard dependem do relógio: sem escrita alguma, o ETag muda com o tempo"""
+        self.client.force_authenticate(user=self.professor)
+        agora = timezone.now()
+        for url, avanco in (
+            (reverse('professor-list') + '?disponivel=true', datetime.timedelta(minutes=1)),
+            (reverse('disponibilidade-buscar') + '?disponivel=true', datetime.timedelta(minutes=1)),
+            (reverse('api_dashboard'), datetime.timedelta(days=1)),
+        ):
+            with mock.patch('django.utils.timezone.now', return_value=agora):
+                etag = self.client.get(url)['ETag']
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+            with mock.patch('django.utils.timezone.now', return_value=agora + avanco):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK, url)
+        # Sem o filtro, a listagem não depende do relógio.
+        etag = self.client.get(reverse('professor-list'))['ETag']
+        with mock.patch('django.utils.timezone.now', return_value=agora + datetime.timedelta(days=1)):
+            response = self.client.get(reverse('professor-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_if_modified_since(self):
+        """Teste: If-Modified-Since com a data da última escrita responde 304"""
+        url = reverse('disciplina-list')
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class CacheDisciplinasTests(APITestCase):
+
+    def setUp(self):
+        """
+        Cache limpo e duas disciplinas; um professor vinculado a uma delas.
+        """
+        cache.clear()
+        self.url_list = reverse('disciplina-list')
+        self.historia = Disciplina.objects.create(nome='História')
+        self.artes = Disciplina.objects.create(nome='Artes')
+        self.professor = Usuario.objects.create(
+            username='prof@teste.com', email='prof@teste.com', nome='Prof. Ana', tipo='PROFESSOR'
+        )
+
+    def test_listagem_servida_do_cache(self):
+        """Teste: A segunda listagem não consulta a tabela de disciplinas"""
+        self.client.get(self.url_list)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url_list)
+        self.assertEqual([d['nome'] for d in response.data], ['História', 'Artes'])
+        self.assertFalse(any('"core_disciplina"' in q['sql'] for q in ctx.captured_queries))
+
+    def test_escrita_via_api_invalida_o_cache(self):
+        """Teste: Uma escrita pela API aparece imediatamente na listagem em cache"""
+        self.client.get(self.url_list)
+        self.client.post(self.url_list, {'nome': 'Filosofia'}, format='json')
+        response = self.client.get(self.url_list)
+        self.assertEqual(len(response.data), 3)
+
+        url_detail = reverse('disciplina-detail', args=[self.artes.id])
+        self.client.get(url_detail)
+        self.client.patch(url_detail, {'nome': 'Artes Visuais'}, format='json')
+        self.assertEqual(self.client.get(url_detail).data['nome'], 'Artes Visuais')
+
+    def test_escrita_pelo_admin_invalida_o_cache(self):
+        """Teste: Editar pelo Django Admin também invalida o cache"""
+        self.client.get(self.url_list)
+        admin_user = Usuario.objects.create_superuser(
+            username='admin@teste.com', email='admin@teste.com', password='senha-forte-123', nome='Admin', tipo='PROFESSOR'
+        )
+        self.client.force_login(admin_user)
+        response = self.client.post(
+            reverse('admin:core_disciplina_change', args=[self.historia.id]),
+            {'nome': 'História do Brasil', 'descricao': ''}
+        )
+        self.assertEqual(response.status_code, 302)
+        nomes = [d['nome'] for d in self.client.get(self.url_list).data]
+        self.assertIn('História do Brasil', nomes)
+
+    def test_vinculo_m2m_invalida_o_mapa_de_professores(self):
+        """Teste: Vincular professor a disciplina (M2M) atualiza o catálogo de professores"""
+        url = reverse('professor-list')
+        self.assertEqual(self.client.get(url).data['results'][0]['disciplinas'], [])
+        self.historia.professores.add(self.professor)
+        self.assertEqual(self.client.get(url).data['results'][0]['disciplinas'], ['História'])
+
+
+class MetricasTests(APITestCase):
+
+    def setUp(self):
+        """
+        Registro de métricas zerado antes de cada teste.
+        """
+        registro_metricas.limpar()
+        Disciplina.objects.create(nome='Sociologia')
+
+    def test_exposicao_no_formato_prometheus(self):
+        """Teste: /api/metrics/ expõe contagem, histograma, queries e tempo de banco por rota"""
+        self.client.get(reverse('disciplina-list'))
+        self.client.get(reverse('disciplina-list'))
+        with override_settings(TOKEN_METRICAS='segredo-do-scrape'):
+            response = self.client.get(reverse('api_metricas'), HTTP_AUTHORIZATION='Bearer segredo-do-scrape')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        texto = response.content.decode()
+        self.assertIn('# TYPE aula_livre_http_request_duration_seconds histogram', texto)
+
+        rota = 'route="api/disciplinas/$",method="GET"'
+        self.assertIn(f'aula_livre_http_requests_total{{{rota},status="200"}} 2', texto)
+        self.assertIn(f'aula_livre_http_request_duration_seconds_bucket{{{rota},le="+Inf"}} 2', texto)
+        self.assertIn(f'aula_livre_http_request_duration_seconds_count{{{rota}}} 2', texto)
+        self.assertIn(f'aula_livre_db_queries_total{{{rota}}}', texto)
+
+    def test_acesso_restrito_ao_prometheus_e_administradores(self):
+        """Teste: Sem token válido ou sessão de administrador, /api/metrics/ responde 401 (anônimo) ou 403"""
+        url = reverse('api_metricas')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+        with override_settings(TOKEN_METRICAS='segredo-do-scrape'):
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer outro').status_code, status.HTTP_401_UNAUTHORIZED)
+        with override_settings(TOKEN_METRICAS=''):
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer ').status_code, status.HTTP_401_UNAUTHORIZED)
+
+        aluno = Usuario.objects.create(username='a@m.com', email='a@m.com', nome='Aluno', tipo='ALUNO')
+        self.client.force_login(aluno)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        aluno.is_staff = True
+        aluno.save()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_conta_queries_da_requisicao(self):
+        """Teste: O número de queries registrado bate com o executado pela view"""
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('professor-list'))
+        texto = registro_metricas.exportar()
+        rota = 'route="api/professores/$",method="GET"'
+        self.assertIn(f'aula_livre_db_queries_total{{{rota}}} {len(ctx.captured_queries)}\n', texto)
+
+    def test_conta_queries_da_requisicao_assincrona(self):
+        """Teste: Sob ASGI, as queries do ORM assíncrono também entram no contador da requisição"""
+        with CaptureQueriesContext(connection) as ctx:
+            response = async_to_sync(AsyncClient().get)(reverse('professor-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(len(ctx.captured_queries), 0)
+        texto = registro_metricas.exportar()
+        rota = 'route="api/professores/$",method="GET"'
+        self.assertIn(f'aula_livre_db_queries_total{{{rota}}} {len(ctx.captured_queries)}\n', texto)
+
+    def test_rota_nao_resolvida(self):
+        """Teste: URLs inexistentes são agrupadas em uma única série (cardinalidade limitada)"""
+        self.client.get('/nao-existe/1/')
+        self.client.get('/nao-existe/2/')
+        texto = registro_metricas.exportar()
+        self.assertIn('aula_livre_http_requests_total{route="nao_resolvida",method="GET",status="404"} 2', texto)
+
+    def test_metodo_desconhecido_agrupado_em_other(self):
+        """Teste: Métodos HTTP fora da lista padrão entram na série method="OTHER" (cardinalidade limitada)"""
+        url = reverse('disciplina-list')
+        self.client.generic('FOO', url)
+        self.client.generic('BAR', url)
+        texto = registro_metricas.exportar()
+        self.assertIn('route="api/disciplinas/$",method="OTHER",status="405"} 2', texto)
+        self.assertNotIn('method="FOO"', texto)
+
+
+class PopularDadosEBenchmarkTests(TestCase):
+
+    def test_popular_dados_e_benchmark_api(self):
+        """Teste: O seeder gera os volumes pedidos e o benchmark reporta percentis por cenário"""
+        saida = io.StringIO()
+        call_command(
+            'popular_dados', professores=5, alunos=10, disponibilidades=200, agendamentos=120, lote=50, stdout=saida
+        )
+        contagens = json.loads(saida.getvalue())
+        self.assertEqual(contagens['usuarios'], 15)
+        self.assertEqual(Disponibilidade.objects.count(), 200)
+        self.assertEqual(Agendamento.objects.count(), 120)
+        # Horários reservados (agendamentos não cancelados) ficam travados, como no motor de reservas.
+        ativos = Agendamento.objects.exclude(status='CANCELADO').count()
+        self.assertEqual(Disponibilidade.objects.filter(disponivel=False).count(), ativos)
+
+        saida = io.StringIO()
+        call_command('benchmark_api', requisicoes=3, aquecimento=1, stdout=saida)
+        resultado = json.loads(saida.getvalue())
+        self.assertEqual(set(resultado['cenarios']), {
+            'professores', 'agendamentos_aluno', 'agendamentos_professor', 'reserva', 'login', 'certificado'
+        })
+        for metricas in resultado['cenarios'].values():
+            self.assertEqual(metricas['requisicoes'], 3)
+            self.assertLessEqual(metricas['p50_ms'], metricas['p99_ms'])
+            self.assertGreater(metricas['queries_por_requisicao'], 0)
+        self.assertEqual(resultado['cenarios']['reserva']['status'], {'201': 3})
+        # O cenário de reserva desfaz os próprios agendamentos.
+        self.assertEqual(Agendamento.objects.count(), 120)
+
+    def test_popular_dados_recusa_rodar_duas_vezes_sem_limpar(self):
+        """Teste: Rodar o seeder de novo sem --limpar é recusado"""
+        call_command('popular_dados', professores=1, alunos=1, disponibilidades=1, agendamentos=1, stdout=io.StringIO())
+        with self.assertRaises(CommandError):
+            call_command('popular_dados', professores=1, alunos=1, disponibilidades=1, agendamentos=1, stdout=io.StringIO())
+
+
+class CanalEventosTests(SimpleTestCase):
+
+    async def test_fan_out_para_muitos_assinantes_concorrentes(self):
+        """Teste (SSE): Uma publicação vinda de outra thread chega a todos os 500 assinantes"""
+        canal = CanalEventos()
+        assinaturas = [canal.assinar() for _ in range(500)]
+        self.assertEqual(canal.total_assinantes, 500)
+
+        await asyncio.to_thread(canal.publicar, 'reservado', {'id': 7, 'professor': 1})
+        recebidos = await asyncio.gather(*(a.proximo(timeout=2) for a in assinaturas))
+
+        self.assertTrue(all(e['tipo'] == 'reservado' and e['dados']['id'] == 7 for e in recebidos))
+        for assinatura in assinaturas:
+            assinatura.cancelar()
+        self.assertEqual(canal.total_assinantes, 0)
+
+    async def test_filtro_por_professor(self):
+        """Teste (SSE): O assinante filtrado só recebe eventos do professor escolhido"""
+        canal = CanalEventos()
+        assinatura = canal.assinar(filtro=lambda dados: dados['professor'] == 2)
+        canal.publicar('aberto', {'id': 1, 'professor': 1})
+        canal.publicar('aberto', {'id': 2, 'professor': 2})
+        evento = await assinatura.proximo(timeout=1)
+        self.assertEqual(evento['dados']['id'], 2)
+        self.assertIsNone(await assinatura.proximo(timeout=0.05))
+
+    async def test_assinante_lento_recebe_ressincronizacao(self):
+        """Teste (SSE): Um assinante com a fila cheia recebe 'ressincronizar' em vez de crescer sem limite"""
+        canal = CanalEventos(capacidade_fila=3)
+        assinatura = canal.assinar()
+        for i in range(10):
+            canal.publicar('aberto', {'id': i})
+        await asyncio.sleep(0)
+        eventos = []
+        while (evento := await assinatura.proximo(timeout=0.05)) is not None:
+            eventos.append(evento)
+        self.assertLessEqual(len(eventos), 3)
+        self.assertIn(RESSINCRONIZAR, [e['tipo'] for e in eventos])
+
+    async def test_reconexao_com_last_event_id_repete_eventos_perdidos(self):
+        """Teste (SSE): Reconectar com o último ID recebido repete apenas os eventos seguintes"""
+        canal = CanalEventos()
+        primeiro = canal.publicar('aberto', {'id': 1})
+        canal.publicar('reservado', {'id': 1})
+        assinatura = canal.assinar(ultimo_id=primeiro['id'])
+        evento = await assinatura.proximo(timeout=1)
+        self.assertEqual(evento['tipo'], 'reservado')
+        self.assertIsNone(await assinatura.proximo(timeout=0.05))
+
+
+class StreamDisponibilidadesViewTests(SimpleTestCase):
+
+    async def test_stream_entrega_eventos_no_formato_sse(self):
+        """Teste (SSE): A view ASGI devolve text/event-stream e repassa os eventos publicados"""
+        request = AsyncRequestFactory().get('/api/eventos/disponibilidades/', {'professor': '5'})
+        response = await stream_disponibilidades(request)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        conteudo = response.streaming_content
+        self.assertEqual(await anext(conteudo), b'retry: 5000\n\n')
+        canal_disponibilidades.publicar('aberto', {'id': 1, 'professor': 4})
+        canal_disponibilidades.publicar('aberto', {'id': 2, 'professor': 5})
+        bloco = (await asyncio.wait_for(anext(conteudo), 2)).decode()
+        self.assertIn('event: aberto\n', bloco)
+        self.assertIn('"id": 2', bloco)
+        await conteudo.aclose()
+
+    def test_stream_sob_wsgi_retorna_501(self):
+        """Teste (SSE): Sob WSGI o endpoint recusa a conexão em vez de prender uma thread"""
+        request = RequestFactory().get('/api/eventos/disponibilidades/')
+        response = asyncio.run(stream_disponibilidades(request))
+        self.assertEqual(response.status_code, 501)
+
+
+class EventosDoMotorDeReservasTests(TestCase):
+
+    def setUp(self):
+        """
+        Professor, aluno e um horário livre para observar os eventos publicados após o COMMIT.
+        """
+        self.professor = Usuario.objects.create(
+            username='prof@teste.com', email='prof@teste.com', nome='Prof. Ana', tipo='PROFESSOR'
+        )
+        self.aluno = Usuario.objects.create(
+            username='aluno@teste.com', email='aluno@teste.com', nome='Aluno Beto', tipo='ALUNO'
+        )
+        self.publicados = []
+        self.publicar_original = canal_disponibilidades.publicar
+        canal_disponibilidades.publicar = lambda tipo, dados: self.publicados.append((tipo, dados['id']))
+
+    def tearDown(self):
+        canal_disponibilidades.publicar = self.publicar_original
+
+    def test_eventos_de_abertura_reserva_e_liberacao(self):
+        """Teste (SSE): Criar, reservar e cancelar publicam aberto, reservado e liberado"""
+        with self.captureOnCommitCallbacks(execute=True):
+            slot = Disponibilidade.objects.create(
+                professor=self.professor, data=datetime.date(2030, 1, 1), horario_inicio=datetime.time(10, 0)
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            ag = Agendamento.objects.create(aluno=self.aluno, disponibilidade=slot)
+        with self.captureOnCommitCallbacks(execute=True):
+            ag.status = 'CANCELADO'
+            ag.save()
+        self.assertEqual(self.publicados, [('aberto', slot.id), ('reservado', slot.id), ('liberado', slot.id)])
+
+    def test_reserva_perdedora_nao_publica_evento(self):
+        """Teste (SSE): Uma reserva que perde a disputa (rollback) não gera evento"""
+        slot = Disponibilidade.objects.create(
+            professor=self.professor, data=datetime.date(2030, 1, 1), horario_inicio=datetime.time(10, 0), disponivel=False
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(HorarioIndisponivel):
+                Agendamento.objects.create(aluno=self.aluno, disponibilidade=slot)
+        self.assertEqual(self.publicados, [])
+
+
+@override_settings(ROOT_URLCONF='Aula_Livre.urls_asgi')
+class LeituraAssincronaTests(APITestCase):
+
+    def setUp(self):
+        """
+        Professor com disciplina (M2M) e horários, aluno com uma aula concluída e avaliada.
+        As respostas do ASGI (AsyncClient + views_async.py) são comparadas às do WSGI (views síncronas).
+        """
+        cache.clear()
+        self.disciplina = Disciplina.objects.create(nome='Química', descricao='Orgânica')
+        self.professor = Usuario.objects.create(
+            username='prof@teste.com', email='prof@teste.com', nome='Prof. Ana', tipo='PROFESSOR'
+        )
+        self.disciplina.professores.add(self.professor)
+        self.aluno = Usuario.objects.create(
+            username='aluno@teste.com', email='aluno@teste.com', nome='Aluno Beto', tipo='ALUNO'
+        )
+        amanha = datetime.date.today() + datetime.timedelta(days=1)
+        for hora in (8, 9, 10):
+            Disponibilidade.objects.create(
+                professor=self.professor, disciplina=self.disciplina, data=amanha, horario_inicio=datetime.time(hora, 0)
+            )
+        slot = Disponibilidade.objects.create(
+            professor=self.professor, data=datetime.date(2024, 1, 1), horario_inicio=datetime.time(8, 0), link='https://meet.jit.si/x'
+        )
+        self.concluido = Agendamento.objects.create(aluno=self.aluno, disponibilidade=slot, status='CONCLUIDO')
+        Avaliacao.objects.create(agendamento=self.concluido, tipo_avaliador='ALUNO', nota=5)
+        self.async_client = AsyncClient()
+
+    def comparar(self, url, user=None):
+        # Mesma URL nos dois servidores: WSGI com Aula_Livre.urls e ASGI com Aula_Livre.urls_asgi.
+        if user:
+            self.client.force_login(user)
+            self.async_client.cookies = self.client.cookies
+        with override_settings(ROOT_URLCONF='Aula_Livre.urls'):
+            sync = self.client.get(url)
+        assincrona = async_to_sync(self.async_client.get)(url)
+        self.assertEqual(assincrona.status_code, sync.status_code)
+        self.assertEqual(assincrona.content, sync.content)
+        for cabecalho in ('Content-Type', 'ETag', 'Allow', 'Vary'):
+            self.assertEqual(assincrona.get(cabecalho), sync.get(cabecalho), cabecalho)
+        return assincrona
+
+    def test_catalogo_de_professores_identico_e_sem_a_view_sincrona(self):
+        """Teste (ASGI): Catálogo, filtros e cursor saem idênticos, sem passar pela view síncrona"""
+        outro = Usuario.objects.create(username='p2@teste.com', email='p2@teste.com', nome='Prof. Caio', tipo='PROFESSOR')
+        Disponibilidade.objects.create(professor=outro, data=datetime.date(2099, 1, 1), horario_inicio=datetime.time(8, 0))
+        resposta = self.comparar('/api/professores/?disponivel=true&page_size=1')
+        with mock.patch.object(ProfessorViewSet, 'list', side_effect=AssertionError('caminho síncrono')):
+            self.assertEqual(async_to_sync(self.async_client.get)('/api/professores/').status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(json.loads(resposta.content)['next'])
+        self.comparar(json.loads(resposta.content)['next'])
+        self.comparar(f'/api/professores/{self.professor.id}/')
+
+    def test_agendamentos_disciplinas_e_certificado_identicos(self):
+        """Teste (ASGI): Listagem de agendamentos, disciplinas e certificado são idênticos aos síncronos"""
+        self.comparar(f'/api/agendamentos/?aluno_id={self.aluno.id}', user=self.aluno)
+        self.comparar('/api/disciplinas/')
+        self.comparar(f'/api/disciplinas/{self.disciplina.id}/')
+        self.comparar(f'/api/certificado/{self.concluido.id}/download/', user=self.aluno)
+        # Sparse fieldsets (?fields=/?expand=) também saem idênticos.
+        self.comparar('/api/professores/?fields=id,nome&expand=disciplinas')
+        self.comparar(f'/api/disciplinas/{self.disciplina.id}/?fields=nome')
+        self.comparar(f'/api/agendamentos/?fields=id,status,avaliacao', user=self.aluno)
+
+    def test_erros_e_304_seguem_a_view_sincrona(self):
+        """Teste (ASGI): Anônimo, 404, filtro inválido e If-None-Match respondem como no WSGI"""
+        self.comparar('/api/agendamentos/')
+        self.comparar('/api/disciplinas/999/')
+        self.comparar('/api/professores/?disciplina=abc')
+        self.assertEqual(self.comparar('/api/professores/?cursor=lixo').status_code, status.HTTP_404_NOT_FOUND)
+        etag = self.comparar('/api/disciplinas/')['ETag']
+        resposta = async_to_sync(self.async_client.get)('/api/disciplinas/', headers={'If-None-Match': etag})
+        self.assertEqual(resposta.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_escritas_continuam_na_view_sincrona(self):
+        """Teste (ASGI): POST na mesma rota é atendido pela view síncrona do DRF"""
+        self.client.force_login(self.professor)
+        self.async_client.cookies = self.client.cookies
+        resposta = async_to_sync(self.async_client.post)(
+            '/api/disciplinas/', {'nome': 'Física'}, content_type='application/json'
+        )
+        self.assertEqual(resposta.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Disciplina.objects.filter(nome='Física').exists())
+
+
+class BenchmarkAsgiTests(TransactionTestCase):
+
+    def test_benchmark_compara_wsgi_e_asgi(self):
+        """Teste: O benchmark mede os dois servidores com requisições concorrentes e todas respondem 200"""
+        call_command('popular_dados', professores=3, alunos=5, disponibilidades=60, agendamentos=40, stdout=io.StringIO())
+        saida = io.StringIO()
+        call_command('benchmark_asgi', concorrencia=4, requisicoes=8, aquecimento=2, stdout=saida)
+        resultado = json.loads(saida.getvalue())
+        self.assertEqual(set(resultado['cenarios']), {'professores', 'agendamentos', 'disciplinas', 'certificado'})
+        for cenario in resultado['cenarios'].values():
+            for servidor in ('wsgi_sync', 'asgi_async'):
+                self.assertEqual(cenario[servidor]['status'], {'200': 8})
+                self.assertLessEqual(cenario[servidor]['p50_ms'], cenario[servidor]['p99_ms'])
+
+
+class CamposDinamicosTests(APITestCase):
+
+    def setUp(self):
+        """
+        Dois professores com horários e disciplina, e um aluno com aulas avaliadas.
+        """
+        self.disciplina = Disciplina.objects.create(nome='Artes')
+        self.aluno = Usuario.objects.create(
+            username='aluno@teste.com', email='aluno@teste.com', nome='Aluno Beto', tipo='ALUNO'
+        )
+        self.professores = []
+        for i in range(2):
+            professor = Usuario.objects.create(
+                username=f'prof{i}@teste.com', email=f'prof{i}@teste.com', nome=f'Prof. {i}', tipo='PROFESSOR'
+            )
+            self.disciplina.professores.add(professor)
+            for hora in (8, 9):
+                slot = Disponibilidade.objects.create(
+                    professor=professor, disciplina=self.disciplina,
+                    data=datetime.date(2030, 1, 1), horario_inicio=datetime.time(hora, 0)
+                )
+            ag = Agendamento.objects.create(aluno=self.aluno, disponibilidade=slot, status='CONCLUIDO')
+            Avaliacao.objects.create(agendamento=ag, tipo_avaliador='ALUNO', nota=4)
+            self.professores.append(professor)
+        cache.clear()
+
+    def test_fields_limita_os_campos_e_pula_o_prefetch(self):
+        """Teste: ?fields=id,nome devolve só esses campos, sem a query das disponibilidades"""
+        with CaptureQueriesContext(connection) as completo:
+            self.client.get('/api/professores/')
+        with CaptureQueriesContext(connection) as enxuto:
+            response = self.client.get('/api/professores/', {'fields': 'id,nome'})
+        self.assertEqual([set(p) for p in response.data['results']], [{'id', 'nome'}] * 2)
+        self.assertLess(len(enxuto.captured_queries), len(completo.captured_queries))
+        self.assertFalse(any('core_disponibilidade' in q['sql'] for q in enxuto.captured_queries))
+
+    def test_expand_escolhe_os_aninhados(self):
+        """Teste: ?expand= mantém os campos simples e inclui apenas os aninhados pedidos"""
+        response = self.client.get('/api/professores/', {'expand': 'disciplinas'})
+        professor = response.data['results'][0]
+        self.assertEqual(professor['disciplinas'], ['Artes'])
+        self.assertNotIn('disponibilidades', professor)
+        self.assertIn('email', professor)
+
+        response = self.client.get('/api/professores/', {'fields': 'id', 'expand': 'disponibilidades'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'disponibilidades'})
+        self.assertEqual(len(response.data['results'][0]['disponibilidades']), 2)
+
+    def test_agendamentos_sem_joins_nem_avaliacao(self):
+        """Teste: ?fields=id,status nos agendamentos não faz JOINs nem o prefetch da avaliação"""
+        self.client.force_authenticate(user=self.aluno)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/agendamentos/', {'fields': 'id,status'})
+        self.assertEqual([set(a) for a in response.data], [{'id', 'status'}] * 2)
+        consultas = [q['sql'] for q in ctx.captured_queries if 'core_agendamento' in q['sql']]
+        self.assertEqual(len(consultas), 1)
+        self.assertNotIn('JOIN', consultas[0])
+        self.assertFalse(any('core_avaliacao' in q['sql'] for q in ctx.captured_queries))
+
+        response = self.client.get('/api/agendamentos/', {'fields': 'id', 'expand': 'avaliacao'})
+        self.assertEqual(response.data[0]['avaliacao']['nota'], 4)
+
+    def test_usuarios_sem_n_mais_1(self):
+        """Teste (N+1): /api/usuarios/ usa o mesmo número de queries com 3 ou 6 usuários"""
+        with CaptureQueriesContext(connection) as antes:
+            self.client.get('/api/usuarios/')
+        for i in range(3):
+            professor = Usuario.objects.create(username=f'novo{i}@t.com', email=f'novo{i}@t.com', nome='N', tipo='PROFESSOR')
+            Disponibilidade.objects.create(professor=professor, data=datetime.date(2030, 1, 2), horario_inicio=datetime.time(8, 0))
+        with CaptureQueriesContext(connection) as depois:
+            response = self.client.get('/api/usuarios/')
+        self.assertEqual(len(response.data), 6)
+        self.assertEqual(len(antes.captured_queries), len(depois.captured_queries))
+
+    def test_escrita_ignora_fields(self):
+        """Teste: Em um POST, ?fields= não recorta a validação nem a resposta"""
+        self.client.force_authenticate(user=self.professores[0])
+        response = self.client.post('/api/disciplinas/?fields=id', {'nome': 'Música', 'descricao': 'Teoria'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(set(response.data), {'id', 'nome', 'descricao'})
+
+
+class ListaRapidaTests(APITestCase):
+
+    def setUp(self):
+        """
+        Horários com e sem disciplina/link, agendamentos em todos os estados e avaliações dos dois lados.
+        """
+        self.professor = Usuario.objects.create(
+            username='prof@teste.com', email='prof@teste.com', nome='Prof. Ana', tipo='PROFESSOR'
+        )
+        self.aluno = Usuario.objects.create(
+            username='aluno@teste.com', email='aluno@teste.com', nome='Aluno Beto', tipo='ALUNO'
+        )
+        disciplina = Disciplina.objects.create(nome='Física')
+        for i, status_aula in enumerate(('AGENDADO', 'CONFIRMADO', 'CONCLUIDO', 'CANCELADO')):
+            slot = Disponibilidade.objects.create(
+                professor=self.professor, disciplina=disciplina if i % 2 else None, assunto='Óptica' if i else None,
+                data=datetime.date(2030, 1, 1 + i), horario_inicio=datetime.time(8, 30)
+            )
+            ag = Agendamento.objects.create(aluno=self.aluno, disponibilidade=slot, status=status_aula)
+            if status_aula == 'CONCLUIDO':
+                Avaliacao.objects.create(agendamento=ag, tipo_avaliador='ALUNO', nota=5, comentario='Ótima')
+                Avaliacao.objects.create(agendamento=ag, tipo_avaliador='PROFESSOR', nota=4)
+
+    def assertJsonIdentico(self, serializer_class, queryset, request=None):
+        contexto = {'request': request} if request else {}
+        normal = serializer_class(queryset, many=True, context=contexto).data
+        rapida = serializer_class.lista_rapida(queryset, contexto)
+        self.assertEqual(JSONRenderer().render(rapida), JSONRenderer().render(normal))
+        return rapida
+
+    def requisicao(self, user, **params):
+        request = Request(RequestFactory().get('/', params))
+        request.user = user
+        return request
+
+    def test_json_identico_ao_serializer(self):
+        """Teste: O modo rápido gera o mesmo JSON (FK nula, link oculto, avaliação do próprio usuário, datas)"""
+        rapida = self.assertJsonIdentico(AgendamentoSerializer, Agendamento.objects.all(), self.requisicao(self.aluno))
+        self.assertEqual(rapida[2]['avaliacao']['comentario'], 'Ótima')
+        self.assertJsonIdentico(AgendamentoSerializer, Agendamento.objects.all(), self.requisicao(self.professor))
+        self.assertJsonIdentico(AgendamentoSerializer, Agendamento.objects.all())
+        rapida = self.assertJsonIdentico(DisponibilidadeSerializer, Disponibilidade.objects.all())
+        self.assertNotIn('disciplina_nome', rapida[0]) # Como no DRF: FK nula omite o campo pontuado.
+        self.assertJsonIdentico(AvaliacaoSerializer, Avaliacao.objects.all())
+
+    def test_json_identico_com_fields(self):
+        """Teste: O modo rápido respeita ?fields=/?expand="""
+        request = self.requisicao(self.aluno, fields='id,hora', expand='avaliacao')
+        rapida = self.assertJsonIdentico(AgendamentoSerializer, Agendamento.objects.all(), request)
+        self.assertEqual(set(rapida[0]), {'id', 'hora', 'avaliacao'})
+
+    def test_listagem_usa_o_modo_rapido(self):
+        """Teste: GET /api/agendamentos/ é montado do .values() (1 query + 1 das avaliações) e não do serializer"""
+        self.client.force_authenticate(user=self.aluno)
+        with mock.patch.object(AgendamentoSerializer, 'get_disciplina_nome', side_effect=AssertionError('serializer')):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get('/api/agendamentos/', {'aluno_id': self.aluno.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 4)
+        dados = [q for q in ctx.captured_queries if 'core_agendamento' in q['sql'] or 'core_avaliacao' in q['sql']]
+        self.assertEqual(len(dados), 2)
+
+    def test_microbenchmark(self):
+        """Teste: O microbenchmark reporta linhas/s dos dois caminhos e confere o JSON"""
+        saida = io.StringIO()
+        call_command('benchmark_serializacao', linhas=20, repeticoes=1, stdout=saida)
+        resultado = json.loads(saida.getvalue())
+        self.assertEqual(set(resultado['listagens']), {'agendamentos', 'disponibilidades', 'avaliacoes'})
+        for listagem in resultado['listagens'].values():
+            self.assertTrue(listagem['json_identico'])
+            self.assertGreater(listagem['rapido_linhas_por_s'], 0)
+        self.assertFalse(Usuario.objects.filter(email__endswith='@bench.local').exists())
+
+
+class BuscaDeHorariosEIndicesTests(APITestCase):
+
+    def setUp(self):
+        """
+        Dois professores, uma disciplina e horários em dias/horas/níveis variados (um deles já reservado).
+        """
+        self.url = reverse('disponibilidade-buscar')
+        self.disciplina = Disciplina.objects.create(nome='Matemática')
+        self.ana = Usuario.objects.create(username='ana@t.com', email='ana@t.com', nome='Ana', tipo='PROFESSOR')
+        self.caio = Usuario.objects.create(username='caio@t.com', email='caio@t.com', nome='Caio', tipo='PROFESSOR')
+        base = datetime.date.today() + datetime.timedelta(days=1)
+
+        def slot(professor, dias, hora, nivel='Médio', disponivel=True, disciplina=None):
+            return Disponibilidade.objects.create(
+                professor=professor, disciplina=disciplina or self.disciplina, nivel=nivel, disponivel=disponivel,
+                data=base + datetime.timedelta(days=dias), horario_inicio=datetime.time(hora, 0)
+            )
+
+        self.tarde = slot(self.ana, 0, 15)
+        self.manha = slot(self.ana, 0, 9)
+        self.reservado = slot(self.ana, 1, 9, disponivel=False)
+        self.fundamental = slot(self.caio, 2, 10, nivel='Fundamental')
+        self.distante = slot(self.caio, 30, 9)
+
+    def ids(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return [h['id'] for h in response.data]
+
+    def test_ordem_do_mais_proximo_e_apenas_livres(self):
+        """Teste (Busca): Resultados ordenados por data e hora; ?disponivel=true exclui os reservados"""
+        self.assertEqual(self.ids(), [self.manha.id, self.tarde.id, self.reservado.id, self.fundamental.id, self.distante.id])
+        self.assertNotIn(self.reservado.id, self.ids(disponivel='true'))
+
+    def test_filtros_de_data_hora_nivel_e_professor(self):
+        """Teste (Busca): Intervalo de datas, janela de horário, nível (sem diferenciar caixa), professor e limite"""
+        hoje = datetime.date.today()
+        self.assertEqual(self.ids(data_fim=(hoje + datetime.timedelta(days=3)).isoformat(), hora_inicio='09:30', hora_fim='12:00'), [self.fundamental.id])
+        self.assertEqual(self.ids(nivel='FUNDAMENTAL'), [self.fundamental.id])
+        self.assertEqual(self.ids(professor=self.caio.id, disciplina=self.disciplina.id), [self.fundamental.id, self.distante.id])
+        self.assertEqual(self.ids(limite=2), [self.manha.id, self.tarde.id])
+
+    def test_parametros_invalidos(self):
+        """Teste (Busca): Formatos e valores inválidos retornam 400 com o campo problemático"""
+        for params, campo in (({'hora_inicio': '25:00'}, 'hora_inicio'), ({'data_inicio': '2025-02-30'}, 'data_inicio'),
+                              ({'limite': '0'}, 'limite'), ({'professor': 'ana'}, 'professor')):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(campo, response.data)
+
+    def plano(self, queryset):
+        # EXPLAIN QUERY PLAN do SQLite.
+        return queryset.explain()
+
+    def test_explain_usa_os_indices_de_disponibilidade(self):
+        """Teste (EXPLAIN): Agenda do professor, busca de livres e disciplina + nível usam os índices compostos/parciais"""
+        inicio = datetime.date.today()
+        self.assertIn('disp_professor_data_idx', self.plano(
+            Disponibilidade.objects.filter(professor=self.ana, data__gte=inicio).order_by('data', 'horario_inicio')
+        ))
+        livres, _ = filtrar_horarios(Disponibilidade.objects.all(), QueryDict('disponivel=true'))
+        plano = self.plano(livres.order_by('data', 'horario_inicio', 'id')[:50])
+        self.assertIn('disp_livres_data_idx', plano)
+        por_nivel, _ = filtrar_horarios(Disponibilidade.objects.all(), QueryDict(f'disciplina={self.disciplina.id}&nivel=medio'))
+        self.assertIn('disp_disciplina_nivel_idx', self.plano(por_nivel))
+
+    def test_explain_usa_os_indices_de_agendamento(self):
+        """Teste (EXPLAIN): Agendamentos por status do aluno e do professor usam os índices compostos"""
+        aluno = Usuario.objects.create(username='al@t.com', email='al@t.com', nome='Al', tipo='ALUNO')
+        self.assertIn('agend_aluno_status_idx', self.plano(Agendamento.objects.filter(aluno=aluno, status='AGENDADO')))
+        self.assertIn('agend_disp_status_idx', self.plano(
+            Agendamento.objects.filter(disponibilidade__professor=self.ana, status='AGENDADO')
+        ))
+
+
+class BuscaTextualTests(APITestCase):
+
+    def setUp(self):
+        """
+        Catálogo pequeno com acentos: duas disciplinas, um professor com nome acentuado, um aluno e horários
+        (um livre, um reservado e um no passado) com o mesmo assunto.
+        """
+        self.url = reverse('api_busca')
+        self.matematica = Disciplina.objects.create(nome='Matemática', descricao='Álgebra, funções e geometria')
+        self.redacao = Disciplina.objects.create(nome='Redação', descricao='Dissertação argumentativa para o ENEM')
+        self.professor = Usuario.objects.create(username='joao@t.com', email='joao@t.com', nome='João Conceição', tipo='PROFESSOR')
+        self.aluno = Usuario.objects.create(username='jose@t.com', email='jose@t.com', nome='José Conceição', tipo='ALUNO')
+        amanha = datetime.date.today() + datetime.timedelta(days=1)
+
+        def slot(data, disponivel=True):
+            return Disponibilidade.objects.create(
+                professor=self.professor, disciplina=self.matematica, assunto='Revisão ENEM', nivel='Médio',
+                descricao='Exercícios de provas anteriores', data=data, horario_inicio=datetime.time(10, 0), disponivel=disponivel
+            )
+
+        self.livre = slot(amanha)
+        self.reservado = slot(amanha + datetime.timedelta(days=1), disponivel=False)
+        self.passado = slot(datetime.date.today() - datetime.timedelta(days=3))
+
+    def resultados(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return [(item['tipo'], item['id']) for item in response.data['resultados']]
+
+    def test_busca_sem_acentos_e_por_prefixo(self):
+        """Teste (Busca Textual): 'matematica' e 'revis enem' encontram os textos acentuados; aluno não é pesquisável"""
+        self.assertEqual(self.resultados(q='matematica', tipos='disciplina'), [('disciplina', self.matematica.id)])
+        self.assertEqual(self.resultados(q='revis enem', tipos='horario'), [('horario', self.livre.id)])
+        self.assertEqual(self.resultados(q='CONCEICAO'), [('professor', self.professor.id)])
+
+    def test_ranking_e_dados_do_horario(self):
+        """Teste (Busca Textual): Casar no título pesa mais que na descrição; horário vem com professor, data e hora"""
+        resultados = self.client.get(self.url, {'q': 'enem'}).json()['resultados']
+        self.assertEqual([(item['tipo'], item['id']) for item in resultados], [('horario', self.livre.id), ('disciplina', self.redacao.id)])
+        self.assertGreater(resultados[0]['relevancia'], resultados[1]['relevancia'])
+        self.assertEqual(resultados[0]['professor_nome'], 'João Conceição')
+        self.assertEqual(resultados[0]['disciplina_nome'], 'Matemática')
+        self.assertEqual(resultados[0]['horario_inicio'], '10:00:00')
+
+    def test_indice_sincronizado_ao_salvar_e_excluir(self):
+        """Teste (Busca Textual): Edição, exclusão, troca de tipo do usuário e criação em lote atualizam o índice"""
+        self.matematica.nome = 'Física'
+        self.matematica.save()
+        self.assertEqual(self.resultados(q='fisica'), [('disciplina', self.matematica.id)])
+        self.assertEqual(self.resultados(q='matematica', tipos='disciplina'), [])
+
+        self.livre.delete()
+        self.assertEqual(self.resultados(q='revisao', tipos='horario'), [])
+
+        self.professor.tipo = 'ALUNO'
+        self.professor.save()
+        self.assertEqual(self.resultados(q='joao'), [])
+
+        professor = Usuario.objects.create(username='bia@t.com', email='bia@t.com', nome='Bia', tipo='PROFESSOR')
+        self.client.force_authenticate(user=professor)
+        inicio = datetime.date.today() + datetime.timedelta(days=7)
+        response = self.client.post(reverse('disponibilidade-criar-recorrencia'), {
+            'assunto': 'Trigonometria', 'dias_semana': [inicio.weekday()], 'horario_inicio': '08:00',
+            'data_inicio': inicio.isoformat(), 'data_fim': (inicio + datetime.timedelta(days=7)).isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(len(self.resultados(q='trigonometria')), 2)
+
+    def test_etag_dos_horarios_muda_com_o_relogio(self):
+        """Teste (Busca Textual): Com horários na busca, o ETag muda a cada minuto (horários que começam saem)"""
+        agora = timezone.now()
+        for tipos, mudou in (('horario,disciplina', True), ('disciplina', False)):
+            params = {'q': 'enem', 'tipos': tipos}
+            with mock.patch('django.utils.timezone.now', return_value=agora):
+                etag = self.client.get(self.url, params)['ETag']
+            with mock.patch('django.utils.timezone.now', return_value=agora + datetime.timedelta(minutes=1)):
+                response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK if mudou else status.HTTP_304_NOT_MODIFIED, tipos)
+
+    def test_parametros_invalidos(self):
+        """Teste (Busca Textual): q vazio ou só com letras soltas, tipo desconhecido e limite inválido retornam 400"""
+        for params in ({}, {'q': 'a e'}, {'q': 'enem', 'tipos': 'aluno'}, {'q': 'enem', 'limite': '0'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, status.HTTP_400_BAD_REQUEST, params)
+        # Sintaxe do FTS5 digitada pelo usuário é tratada como texto comum.
+        self.assertEqual(self.resultados(q='"enem*" ^(:'), [('horario', self.livre.id), ('disciplina', self.redacao.id)])
+
+    def test_comando_reconstruir_busca(self):
+        """Teste (Busca Textual): O comando repovoa o índice a partir do banco (dados gravados sem sinais)"""
+        Disciplina.objects.bulk_create([Disciplina(nome='Química Orgânica')])
+        self.assertEqual(self.resultados(q='quimica'), [])
+
+        saida = io.StringIO()
+        call_command('reconstruir_busca', stdout=saida)
+        contagens = json.loads(saida.getvalue())
+        self.assertEqual((contagens['disciplina'], contagens['horario'], contagens['professor']), (3, 3, 1))
+        self.assertEqual(len(self.resultados(q='quimica')), 1)
+
+
+class ResumoAvaliacoesTests(APITestCase):
+
+    def setUp(self):
+        """
+        Dois professores e dois alunos; aulas concluídas com avaliações mútuas criadas pelo ORM (sinais).
+        """
+        self.ana = Usuario.objects.create(username='ana@r.com', email='ana@r.com', nome='Ana', tipo='PROFESSOR')
+        self.caio = Usuario.objects.create(username='caio@r.com', email='caio@r.com', nome='Caio', tipo='PROFESSOR')
+        self.beto = Usuario.objects.create(username='beto@r.com', email='beto@r.com', nome='Beto', tipo='ALUNO')
+        self.dani = Usuario.objects.create(username='dani@r.com', email='dani@r.com', nome='Dani', tipo='ALUNO')
+
+    def aula(self, professor, aluno, status_inicial='CONCLUIDO'):
+        disp = Disponibilidade.objects.create(
+            professor=professor, horario_inicio=datetime.time(10, 0),
+            data=datetime.date(2030, 1, 1) + datetime.timedelta(days=Disponibilidade.objects.count()),
+        )
+        return Agendamento.objects.create(aluno=aluno, disponibilidade=disp, status=status_inicial)
+
+    def resumo(self, usuario):
+        return ResumoAvaliacoes.objects.get(usuario=usuario)
+
+    def test_deltas_ao_criar_editar_e_excluir(self):
+        """Teste (Resumos): Média, histograma e aulas acompanham criação, edição e exclusão de avaliações e aulas"""
+        aula1, aula2 = self.aula(self.ana, self.beto), self.aula(self.ana, self.dani)
+        nota_beto = Avaliacao.objects.create(agendamento=aula1, tipo_avaliador='ALUNO', nota=5)
+        Avaliacao.objects.create(agendamento=aula2, tipo_avaliador='ALUNO', nota=2)
+        Avaliacao.objects.create(agendamento=aula1, tipo_avaliador='PROFESSOR', nota=4)
+
+        ana = self.resumo(self.ana)
+        self.assertEqual((ana.papel, ana.total_avaliacoes, ana.media, ana.aulas_concluidas), ('PROFESSOR', 2, 3.5, 2))
+        self.assertEqual((ana.estrelas_5, ana.estrelas_2, ana.estrelas_4), (1, 1, 0))
+        beto = self.resumo(self.beto)
+        self.assertEqual((beto.papel, beto.total_avaliacoes, beto.media, beto.estrelas_4, beto.aulas_concluidas), ('ALUNO', 1, 4.0, 1, 1))
+
+        nota_beto.nota = 3
+        nota_beto.save()
+        ana = self.resumo(self.ana)
+        self.assertEqual((ana.media, ana.estrelas_5, ana.estrelas_3), (2.5, 0, 1))
+
+        nota_beto.delete()
+        aula2.delete() # Remove a aula concluída e, em cascata, a avaliação dela.
+        ana = self.resumo(self.ana)
+        self.assertEqual((ana.total_avaliacoes, ana.media, ana.aulas_concluidas), (0, None, 1))
+        self.assertEqual(resumos.calcular()[self.ana.id], {campo: getattr(ana, campo) for campo in resumos.CAMPOS})
+
+    def test_aulas_concluidas_no_save_e_na_acao_em_lote(self):
+        """Teste (Resumos): Concluir pelo save() ou pela ação em lote soma aulas para o professor e o aluno"""
+        aula = self.aula(self.caio, self.beto, status_inicial='CONFIRMADO')
+        aula.status = 'CONCLUIDO'
+        aula.save()
+        lote = [self.aula(self.caio, aluno, status_inicial='CONFIRMADO').id for aluno in (self.beto, self.dani)]
+
+        self.client.force_authenticate(user=self.caio)
+        response = self.client.post(reverse('agendamento-acoes-em-lote'), {'acao': 'concluir', 'ids': lote}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.resumo(self.caio).aulas_concluidas, 3)
+        self.assertEqual((self.resumo(self.beto).aulas_concluidas, self.resumo(self.dani).aulas_concluidas), (2, 1))
+
+    def test_ranking_e_catalogo(self):
+        """Teste (Resumos): Ranking ordenável com mínimo de avaliações; o catálogo expõe o resumo de cada professor"""
+        for nota in (5, 4):
+            Avaliacao.objects.create(agendamento=self.aula(self.ana, self.beto), tipo_avaliador='ALUNO', nota=nota)
+        for nota in (5, 5, 2):
+            Avaliacao.objects.create(agendamento=self.aula(self.caio, self.dani), tipo_avaliador='ALUNO', nota=nota)
+
+        url = reverse('professor-ranking')
+        # Ana: média 4.5 com 2 avaliações; Caio: média 4.0 com 3.
+        self.assertEqual([item['id'] for item in self.client.get(url).data], [self.ana.id, self.caio.id])
+        self.assertEqual([item['id'] for item in self.client.get(url, {'ordenar': 'avaliacoes'}).data], [self.caio.id, self.ana.id])
+        self.assertEqual([item['id'] for item in self.client.get(url, {'minimo': 3}).data], [self.caio.id])
+        primeiro = self.client.get(url, {'ordenar': 'aulas', 'limite': 1}).data
+        self.assertEqual(len(primeiro), 1)
+        self.assertEqual((primeiro[0]['posicao'], primeiro[0]['nome'], primeiro[0]['aulas_concluidas'], primeiro[0]['estrelas']['5']), (1, 'Caio', 3, 2))
+        self.assertEqual(self.client.get(url, {'ordenar': 'nome'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+        with self.assertNumQueries(2): # Página de professores + versões do ETag (resumo no mesmo SELECT).
+            catalogo = self.client.get(reverse('professor-list'), {'fields': 'id,avaliacoes'}).data['results']
+        self.assertEqual(
+            {item['id']: item['avaliacoes']['media'] for item in catalogo},
+            {self.ana.id: 4.5, self.caio.id: 4.0},
+        )
+
+    def test_comando_reconstruir_resumos_corrige_desvios(self):
+        """Teste (Resumos): O comando recalcula os resumos e informa quantos estavam divergentes"""
+        Avaliacao.objects.create(agendamento=self.aula(self.ana, self.beto), tipo_avaliador='ALUNO', nota=5)
+        esperado = {campo: getattr(self.resumo(self.ana), campo) for campo in resumos.CAMPOS}
+        ResumoAvaliacoes.objects.filter(usuario=self.ana).update(total_avaliacoes=7, media=1.0)
+
+        saida = io.StringIO()
+        call_command('reconstruir_resumos', stdout=saida)
+        self.assertEqual(json.loads(saida.getvalue())['corrigidos'], 1)
+        self.assertEqual({campo: getattr(self.resumo(self.ana), campo) for campo in resumos.CAMPOS}, esperado)
+
+
+class HorasVoluntariasTests(APITestCase):
+
+    def setUp(self):
+        """
+        Um professor, dois alunos, duas disciplinas e aulas concluídas em meses diferentes de 2030.
+        """
+        self.matematica = Disciplina.objects.create(nome='Matemática')
+        self.fisica = Disciplina.objects.create(nome='Física')
+        self.ana = Usuario.objects.create(username='ana@h.com', email='ana@h.com', nome='Ana', tipo='PROFESSOR')
+        self.beto = Usuario.objects.create(username='beto@h.com', email='beto@h.com', nome='Beto', tipo='ALUNO')
+        self.dani = Usuario.objects.create(username='dani@h.com', email='dani@h.com', nome='Dani', tipo='ALUNO')
+        self.admin = Usuario.objects.create(username='adm@h.com', email='adm@h.com', nome='Admin', tipo='PROFESSOR', is_staff=True)
+
+    def aula(self, aluno, data, disciplina=None):
+        disp = Disponibilidade.objects.create(
+            professor=self.ana, disciplina=disciplina, data=data, horario_inicio=datetime.time(10, 0)
+        )
+        return Agendamento.objects.create(aluno=aluno, disponibilidade=disp, status='CONCLUIDO')
+
+    def emitir(self, agendamento):
+        # Emissão pelo fluxo real: o aluno baixa o certificado.
+        self.client.force_authenticate(user=agendamento.aluno)
+        response = self.client.get(reverse('api_certificado', args=[agendamento.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return Certificado.objects.get(agendamento=agendamento)
+
+    def test_emissao_lanca_horas_no_livro(self):
+        """Teste (Horas): Cada certificado emitido lança as horas para o professor e o aluno, por disciplina e mês"""
+        self.emitir(self.aula(self.beto, datetime.date(2030, 3, 5), self.matematica))
+        self.emitir(self.aula(self.dani, datetime.date(2030, 3, 20), self.matematica))
+        certificado = self.emitir(self.aula(self.beto, datetime.date(2030, 4, 2)))
+        # Baixar de novo não duplica (get_or_create).
+        self.emitir(certificado.agendamento)
+
+        linha = HorasVoluntarias.objects.get(usuario=self.ana, disciplina=self.matematica)
+        self.assertEqual((linha.papel, linha.mes, linha.horas, linha.certificados), ('PROFESSOR', datetime.date(2030, 3, 1), 2, 2))
+        self.assertEqual(HorasVoluntarias.objects.filter(usuario=self.beto).count(), 2)
+
+        certificado.horas = 2.5
+        certificado.save()
+        certificado.agendamento.delete() # Exclusão em cascata estorna as horas.
+        self.assertEqual(HorasVoluntarias.objects.get(usuario=self.beto, disciplina=None).horas, 0)
+        # As linhas mensais zeradas (do aluno e do professor) somem na reconstrução; as anuais seguem com saldo.
+        self.assertEqual(horas.reconstruir()['corrigidas'], 4)
+
+    def test_lancamento_concorrente_nao_duplica_linhas(self):
+        """Teste (Horas): Dois lançamentos para uma chave ainda inexistente somam na mesma linha, inclusive sob corrida"""
+        com_disciplina = self.aula(self.beto, datetime.date(2030, 3, 5), self.matematica)
+        geral = self.aula(self.dani, datetime.date(2030, 3, 6)) # disciplina NULL: restrição única parcial.
+        originais = {'get': QuerySet.get, 'first': QuerySet.first}
+        atrasados = set()
+
+        def leitura_atrasada(metodo):
+            # Simula a corrida: a primeira leitura de cada nível não vê a linha que "a outra requisição" acabou de inserir.
+            def ler(queryset, *args, **kwargs):
+                if queryset.model in horas.MODELOS.values() and queryset.model not in atrasados:
+                    atrasados.add(queryset.model)
+                    if metodo == 'first':
+                        return None
+                    raise queryset.model.DoesNotExist
+                return originais[metodo](queryset, *args, **kwargs)
+            return ler
+
+        for agendamento in (com_disciplina, geral):
+            horas.lancar(agendamento.id, 1)
+            atrasados.clear()
+            with mock.patch.object(QuerySet, 'get', leitura_atrasada('get')), mock.patch.object(QuerySet, 'first', leitura_atrasada('first')):
+                horas.lancar(agendamento.id, 1)
+
+        self.assertEqual(HorasVoluntarias.objects.count(), 4)
+        self.assertEqual(HorasPorUsuarioAno.objects.count(), 3)
+        self.assertEqual(HorasPorDisciplinaMes.objects.count(), 4)
+        linha = HorasVoluntarias.objects.get(usuario=self.dani, disciplina=None)
+        self.assertEqual((linha.horas, linha.certificados), (2, 2))
+        self.assertEqual(HorasPorUsuarioAno.objects.get(usuario=self.ana).horas, 4)
+
+    def test_relatorio_individual_por_mes_e_disciplina(self):
+        """Teste (Horas): O usuário vê total, meses e disciplinas; filtros de período e acesso a terceiros só para admin"""
+        self.emitir(self.aula(self.beto, datetime.date(2030, 3, 5), self.matematica))
+        self.emitir(self.aula(self.dani, datetime.date(2030, 4, 9), self.fisica))
+        self.emitir(self.aula(self.dani, datetime.date(2031, 1, 9), self.fisica))
+
+        self.client.force_authenticate(user=self.ana)
+        url = reverse('api_horas')
+        with self.assertNumQueries(3): # Versões do ETag + meses + disciplinas (sem JOIN com os Certificados).
+            dados = self.client.get(url, {'ano': 2030}).json()
+        self.assertEqual((dados['total_horas'], dados['certificados']), (2.0, 2))
+        self.assertEqual([linha['mes'] for linha in dados['por_mes']], ['2030-03', '2030-04'])
+        self.assertEqual({linha['disciplina_nome'] for linha in dados['por_disciplina']}, {'Matemática', 'Física'})
+        self.assertEqual(self.client.get(url, {'de': '2030-04', 'ate': '2031-12'}).json()['certificados'], 2)
+        self.assertEqual(self.client.get(url, {'de': '2030-13'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(self.client.get(url, {'usuario': self.dani.id}).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=self.admin)
+        self.assertEqual(self.client.get(url, {'usuario': self.dani.id}).json()['total_horas'], 2.0)
+
+    def test_relatorio_administrativo(self):
+        """Teste (Horas): Relatório geral agrupado por usuário, disciplina ou mês, restrito a administradores"""
+        self.emitir(self.aula(self.beto, datetime.date(2030, 3, 5), self.matematica))
+        self.emitir(self.aula(self.dani, datetime.date(2030, 4, 9), self.matematica))
+        self.emitir(self.aula(self.dani, datetime.date(2030, 4, 10)))
+
+        url = reverse('api_horas_relatorio')
+        self.client.force_authenticate(user=self.ana)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin)
+        with self.assertNumQueries(3): # Versões do ETag + ranking anual + totais (níveis consolidados).
+            dados = self.client.get(url, {'papel': 'ALUNO', 'ano': 2030}).json()
+        self.assertEqual((dados['total_horas'], dados['certificados']), (3.0, 3))
+        self.assertEqual([(linha['nome'], linha['horas']) for linha in dados['linhas']], [('Dani', 2.0), ('Beto', 1.0)])
+        abril = self.client.get(url, {'papel': 'ALUNO', 'de': '2030-04', 'ate': '2030-04'}).json()['linhas']
+        self.assertEqual([(linha['nome'], linha['certificados']) for linha in abril], [('Dani', 2)])
+
+        por_disciplina = self.client.get(url, {'agrupar': 'disciplina', 'papel': 'PROFESSOR'}).json()['linhas']
+        self.assertEqual([(linha['disciplina_nome'], linha['horas']) for linha in por_disciplina], [('Matemática', 2.0), ('Tira-Dúvidas / Geral', 1.0)])
+        por_mes = self.client.get(url, {'agrupar': 'mes', 'papel': 'PROFESSOR', 'de': '2030-04'}).json()['linhas']
+        self.assertEqual([(linha['mes'], linha['certificados']) for linha in por_mes], [('2030-04', 2)])
+        self.assertEqual(self.client.get(url, {'agrupar': 'semana'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_comando_reconstruir_horas(self):
+        """Teste (Horas): O comando refaz o livro a partir dos certificados gravados sem sinais (bulk_create)"""
+        agendamento = self.aula(self.beto, datetime.date(2030, 3, 5), self.fisica)
+        Certificado.objects.bulk_create([Certificado(agendamento=agendamento, codigo_validacao='AL-LOTE-1', horas=3)])
+        self.assertFalse(HorasVoluntarias.objects.exists())
+
+        saida = io.StringIO()
+        call_command('reconstruir_horas', stdout=saida)
+        self.assertEqual(json.loads(saida.getvalue())['linhas'], 6) # Professor e aluno nos três níveis.
+        self.assertEqual(HorasVoluntarias.objects.get(usuario=self.ana).horas, 3)
+
+
+class VerificacaoCertificadoTests(APITestCase):
+
+    def setUp(self):
+        """
+        Uma aula concluída com certificado emitido; caches e contadores do limite por IP zerados.
+        """
+        cache.clear()
+        certificados_verificados.limpar()
+        codigos_inexistentes.limpar()
+        professor = Usuario.objects.create(username='ana@v.com', email='ana@v.com', nome='Ana Prof', tipo='PROFESSOR')
+        self.aluno = Usuario.objects.create(username='beto@v.com', email='beto@v.com', nome='Beto Aluno', tipo='ALUNO')
+        disp = Disponibilidade.objects.create(
+            professor=professor, disciplina=Disciplina.objects.create(nome='Química'),
+            data=datetime.date(2030, 5, 10), horario_inicio=datetime.time(10, 0)
+        )
+        self.agendamento = Agendamento.objects.create(aluno=self.aluno, disponibilidade=disp, status='CONCLUIDO')
+        self.certificado = Certificado.objects.create(agendamento=self.agendamento, codigo_validacao='AL-1-20300510', horas=2)
+
+    def url(self, codigo):
+        return reverse('api_certificado_verificar', args=[codigo])
+
+    def test_verifica_sem_login_em_uma_query_e_depois_pelo_cache(self):
+        """Teste (Verificação): Código válido responde titular, disciplina, professor, data e horas; a repetição não usa o banco"""
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url('AL-1-20300510'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        dados = response.json()
+        self.assertEqual(
+            (dados['valido'], dados['titular'], dados['disciplina'], dados['professor'], dados['data_aula'], dados['horas']),
+            (True, 'Beto Aluno', 'Química', 'Ana Prof', '2030-05-10', 2.0)
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url('AL-1-20300510')).json(), dados)
+
+    def test_cache_negativo_e_invalidacao_na_emissao(self):
+        """Teste (Verificação): Código inexistente fica no cache negativo até um certificado com ele ser emitido"""
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url('AL-9-20300511')).status_code, status.HTTP_404_NOT_FOUND)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url('AL-9-20300511')).status_code, status.HTTP_404_NOT_FOUND)
+            # Fora do formato: 404 direto, sem banco nem cache.
+            self.assertEqual(self.client.get(self.url('codigo com espaço')).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(len(codigos_inexistentes), 1)
+
+        self.certificado.delete()
+        Certificado.objects.create(agendamento=self.agendamento, codigo_validacao='AL-9-20300511')
+        self.assertEqual(self.client.get(self.url('AL-9-20300511')).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(self.url('AL-1-20300510')).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_exclusao_em_outro_worker_expira_pelo_ttl(self):
+        """Teste (Verificação): Certificado excluído sem passar por este worker (sem sinal) deixa de valer em até 60 s"""
+        self.assertEqual(self.client.get(self.url('AL-1-20300510')).status_code, status.HTTP_200_OK)
+        with connection.cursor() as cursor: # Exclusão feita por outro processo: nenhum sinal chega a este.
+            cursor.execute(f'DELETE FROM {Certificado._meta.db_table} WHERE id = %s', [self.certificado.pk])
+        self.assertEqual(self.client.get(self.url('AL-1-20300510')).status_code, status.HTTP_200_OK)
+        depois = time.monotonic() + VALIDADE_VERIFICACAO + 1
+        with mock.patch('core.cache.time.monotonic', return_value=depois):
+            self.assertEqual(self.client.get(self.url('AL-1-20300510')).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_limite_por_ip(self):
+        """Teste (Verificação): Acima da taxa por IP a resposta é 429, mesmo para acertos em cache; outro IP segue livre"""
+        with mock.patch.dict(VerificacaoCertificadoThrottle.THROTTLE_RATES, {'verificacao_certificado': '3/min'}):
+            codigos = [self.client.get(self.url('AL-1-20300510'), REMOTE_ADDR='10.0.0.1').status_code for _ in range(4)]
+            self.assertEqual(codigos, [200, 200, 200, 429])
+            self.assertEqual(self.client.get(self.url('AL-1-20300510'), REMOTE_ADDR='10.0.0.2').status_code, status.HTTP_200_OK)
+
+    def test_cache_lru_limitado_e_com_validade(self):
+        """Teste (Verificação): O CacheLRU descarta o menos usado ao lotar e expira entradas pelo TTL"""
+        lru = CacheLRU(capacidade=2, ttl=60)
+        lru.guardar('a', 1)
+        lru.guardar('b', 2)
+        lru.obter('a') # 'a' passa a ser o mais recente.
+        lru.guardar('c', 3)
+        self.assertEqual((lru.obter('a'), lru.obter('c')), (1, 3))
+        self.assertIs(lru.obter('b'), AUSENTE)
+
+        with mock.patch('core.cache.time.monotonic', return_value=10 ** 9):
+            self.assertIs(lru.obter('a'), AUSENTE)
+
+
+class ExpiracaoAgendamentosTests(TestCase):
+
+    def setUp(self):
+        """
+        Cenário com cada caso do job: pendente perto da aula, pendente distante, confirmado perto da aula,
+        horário livre no passado e duas flags 'disponivel' divergentes (gravadas sem passar pelo save()).
+        """
+        self.professor = Usuario.objects.create(username='p@e.com', email='p@e.com', nome='Prof', tipo='PROFESSOR')
+        self.alunos = [
+            Usuario.objects.create(username=f'a{i}@e.com', email=f'a{i}@e.com', nome=f'Aluno {i}', tipo='ALUNO') for i in range(3)
+        ]
+        agora = timezone.localtime().replace(second=0, microsecond=0)
+
+        def horario(delta, **campos):
+            momento = agora + delta
+            return Disponibilidade.objects.create(professor=self.professor, data=momento.date(), horario_inicio=momento.time(), **campos)
+
+        self.pendente_proximo = Agendamento.objects.create(aluno=self.alunos[0], disponibilidade=horario(datetime.timedelta(hours=1)))
+        self.pendente_distante = Agendamento.objects.create(aluno=self.alunos[0], disponibilidade=horario(datetime.timedelta(days=3)))
+        self.confirmado_proximo = Agendamento.objects.create(
+            aluno=self.alunos[1], disponibilidade=horario(datetime.timedelta(hours=1)), status='CONFIRMADO'
+        )
+        self.passado_livre = horario(-datetime.timedelta(days=1))
+        self.livre_com_reserva = horario(datetime.timedelta(days=2))
+        Agendamento.objects.bulk_create([Agendamento(aluno=self.alunos[2], disponibilidade=self.livre_com_reserva, status='CONFIRMADO')])
+        self.ocupado_sem_reserva = horario(datetime.timedelta(days=2), disponivel=False)
+
+    def executar(self):
+        saida = io.StringIO()
+        call_command('expirar_agendamentos', stdout=saida)
+        return json.loads(saida.getvalue())
+
+    def test_expira_encerra_e_reconcilia(self):
+        """Teste (Expiração): Cada passo altera só as linhas do seu caso e o relatório traz contagens e tempos"""
+        resultado = self.executar()
+        self.assertEqual(
+            {campo: valor for campo, valor in resultado.items() if campo not in ('executado_em', 'duracao_s')},
+            {
+                'agendamentos_expirados': 1, 'horarios_liberados_na_expiracao': 1, 'horarios_passados_encerrados': 1,
+                'flags_corrigidas_ocupado': 1, 'flags_corrigidas_livre': 1,
+            },
+        )
+        self.assertEqual(set(resultado['duracao_s']), {'expiracao', 'encerramento', 'reconciliacao', 'total'})
+
+        status_atual = dict(Agendamento.objects.values_list('id', 'status'))
+        self.assertEqual(status_atual[self.pendente_proximo.id], 'CANCELADO')
+        self.assertEqual(status_atual[self.pendente_distante.id], 'AGENDADO')
+        self.assertEqual(status_atual[self.confirmado_proximo.id], 'CONFIRMADO')
+
+        livres = dict(Disponibilidade.objects.values_list('id', 'disponivel'))
+        self.assertTrue(livres[self.pendente_proximo.disponibilidade_id]) # Cancelado e ainda no futuro: volta ao catálogo.
+        self.assertFalse(livres[self.pendente_distante.disponibilidade_id])
+        self.assertFalse(livres[self.passado_livre.id])
+        self.assertFalse(livres[self.livre_com_reserva.id])
+        self.assertTrue(livres[self.ocupado_sem_reserva.id])
+
+    def test_encerramento_publica_evento_fechado(self):
+        """Teste (Expiração/SSE): Cada horário passado encerrado em lote gera um evento 'fechado' após o COMMIT"""
+        outro_passado = Disponibilidade.objects.create(
+            professor=self.professor, data=datetime.date(2020, 1, 1), horario_inicio=datetime.time(8, 0)
+        )
+        publicados = []
+        with mock.patch.object(canal_disponibilidades, 'publicar', lambda tipo, dados: publicados.append((tipo, dados['id']))):
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('expirar_agendamentos', lote=1, stdout=io.StringIO())
+        fechados = sorted(id_horario for tipo, id_horario in publicados if tipo == 'fechado')
+        self.assertEqual(fechados, sorted([self.passado_livre.id, outro_passado.id]))
+
+    def test_segunda_execucao_nao_altera_nada(self):
+        """Teste (Expiração): O job é idempotente; uma execução sem trabalho não muda as versões (ETags seguem válidos)"""
+        self.executar()
+        versoes = VersaoDados.obter(Agendamento, Disponibilidade)
+        resultado = self.executar()
+        self.assertFalse(any(valor for campo, valor in resultado.items() if campo not in ('executado_em', 'duracao_s')))
+        self.assertEqual(VersaoDados.obter(Agendamento, Disponibilidade), versoes)
+
+    def test_prazo_zero_e_lotes_pequenos(self):
+        """Teste (Expiração): --prazo-horas 0 só expira aulas já iniciadas; lotes de 1 linha chegam ao mesmo resultado"""
+        saida = io.StringIO()
+        call_command('expirar_agendamentos', prazo_horas=0, lote=1, stdout=saida)
+        resultado = json.loads(saida.getvalue())
+        self.assertEqual(resultado['agendamentos_expirados'], 0)
+        self.assertEqual((resultado['flags_corrigidas_ocupado'], resultado['flags_corrigidas_livre']), (1, 1))
+        with self.assertRaises(CommandError):
+            call_command('expirar_agendamentos', lote=0, stdout=io.StringIO())
+
+
+class ArquivoHistoricoTests(APITestCase):
+
+    def setUp(self):
+        """
+        Aula antiga concluída (avaliada e certificada), aula antiga cancelada, aula antiga ainda CONFIRMADO,
+        horário antigo vazio e uma aula concluída recente (dentro do horizonte).
+        """
+        certificados_verificados.limpar()
+        codigos_inexistentes.limpar()
+        self.professor = Usuario.objects.create(username='p@h.com', email='p@h.com', nome='Prof H', tipo='PROFESSOR')
+        self.aluno = Usuario.objects.create(username='a@h.com', email='a@h.com', nome='Aluno H', tipo='ALUNO')
+        disciplina = Disciplina.objects.create(nome='História')
+        hoje = timezone.localdate()
+
+        def aula(dias_atras, status_aula=None):
+            horario = Disponibilidade.objects.create(
+                professor=self.professor, disciplina=disciplina,
+                data=hoje - datetime.timedelta(days=dias_atras), horario_inicio=datetime.time(9, 0),
+            )
+            if status_aula is None:
+                return horario
+            return Agendamento.objects.create(aluno=self.aluno, disponibilidade=horario, status=status_aula)
+
+        self.antiga = aula(400, 'CONCLUIDO')
+        self.avaliacao = Avaliacao.objects.create(agendamento=self.antiga, nota=5, tipo_avaliador='ALUNO')
+        self.certificado = Certificado.objects.create(agendamento=self.antiga, codigo_validacao='AL-H-1', horas=3)
+        self.cancelada = aula(300, 'CANCELADO')
+        self.pendente = aula(300, 'CONFIRMADO')
+        self.vazio = aula(250)
+        self.recente = aula(10, 'CONCLUIDO')
+        self.client.force_authenticate(user=self.aluno)
+
+    def arquivar(self, **opcoes):
+        saida = io.StringIO()
+        call_command('arquivar_historico', stdout=saida, **opcoes)
+        return json.loads(saida.getvalue())
+
+    def test_move_historico_mantendo_referencias_e_agregados(self):
+        """Teste (Arquivo): Horários antigos saem das tabelas quentes com agendamentos, avaliação e certificado; resumos e horas não mudam"""
+        resumo_antes = ResumoAvaliacoes.objects.filter(usuario=self.professor).values('total_avaliacoes', 'media', 'aulas_concluidas').get()
+        horas_antes = list(HorasVoluntarias.objects.order_by('pk').values('usuario', 'horas', 'certificados'))
+
+        resultado = self.arquivar(dias=180, lote=1)
+        self.assertEqual(
+            {campo: resultado[campo] for campo in ('disponibilidade', 'agendamento', 'avaliacao', 'certificado', 'lotes')},
+            {'disponibilidade': 3, 'agendamento': 2, 'avaliacao': 1, 'certificado': 1, 'lotes': 3},
+        )
+        self.assertEqual(set(Agendamento.objects.values_list('id', flat=True)), {self.pendente.id, self.recente.id})
+        self.assertFalse(Disponibilidade.objects.filter(pk__in=[self.vazio.id, self.antiga.disponibilidade_id]).exists())
+
+        # Mesmos ids, FKs válidas dentro do arquivo.
+        certificado = CertificadoArquivado.objects.select_related('agendamento__disponibilidade').get(pk=self.certificado.pk)
+        self.assertEqual(certificado.agendamento.disponibilidade_id, self.antiga.disponibilidade_id)
+        self.assertEqual(AvaliacaoArquivada.objects.get(pk=self.avaliacao.pk).agendamento_id, self.antiga.id)
+        self.assertTrue(DisponibilidadeArquivada.objects.filter(pk=self.vazio.id).exists())
+        self.assertEqual(set(AgendamentoArquivado.objects.values_list('status', flat=True)), {'CONCLUIDO', 'CANCELADO'})
+
+        # Sem sinais de exclusão: nada foi estornado, e a reconstrução (que soma o arquivo) concorda.
+        self.assertEqual(
+            ResumoAvaliacoes.objects.filter(usuario=self.professor).values('total_avaliacoes', 'media', 'aulas_concluidas').get(),
+            resumo_antes,
+        )
+        self.assertEqual(list(HorasVoluntarias.objects.order_by('pk').values('usuario', 'horas', 'certificados')), horas_antes)
+        self.assertEqual(resumos.reconstruir()['corrigidos'], 0)
+        self.assertEqual(horas.reconstruir()['corrigidas'], 0)
+
+        # Segunda execução: nada a mover.
+        self.assertEqual(self.arquivar(dias=180)['lotes'], 0)
+
+    def test_listagem_padrao_e_com_historico(self):
+        """Teste (Arquivo): A listagem padrão só lê a tabela quente; ?incluir_historico=1 junta o arquivo com o mesmo JSON"""
+        url = reverse('agendamento-list')
+        antes = self.client.get(url, {'aluno_id': self.aluno.id}).json()
+        self.arquivar(dias=180)
+
+        padrao = self.client.get(url, {'aluno_id': self.aluno.id})
+        self.assertEqual({item['id'] for item in padrao.json()}, {self.pendente.id, self.recente.id})
+
+        completo = self.client.get(url, {'aluno_id': self.aluno.id, 'incluir_historico': '1'})
+        self.assertEqual(completo.status_code, status.HTTP_200_OK)
+        por_id = lambda itens: {item['id']: item for item in itens}
+        self.assertEqual(por_id(completo.json()), por_id(antes))
+        self.assertEqual(por_id(completo.json())[self.antiga.id]['avaliacao']['nota'], 5)
+        self.assertNotEqual(completo['ETag'], padrao['ETag'])
+
+    def test_certificado_arquivado_continua_verificavel_e_disponivel(self):
+        """Teste (Arquivo): Verificação pública e download do certificado seguem funcionando após o arquivamento"""
+        self.arquivar(dias=180)
+        with self.assertNumQueries(1):
+            verificacao = self.client.get(reverse('api_certificado_verificar', args=['AL-H-1']))
+        self.assertEqual((verificacao.status_code, verificacao.json()['titular']), (200, 'Aluno H'))
+
+        download = self.client.get(f'/api/certificado/{self.antiga.id}/download/')
+        self.assertEqual(download.status_code, status.HTTP_200_OK)
+        self.assertEqual(download.json()['dados']['codigo'], 'AL-H-1')
+        self.assertEqual(self.client.get(f'/api/certificado/{self.cancelada.id}/download/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_aula_concluida_sem_certificado_fica_ate_a_emissao(self):
+        """Teste (Arquivo): Aula antiga concluída sem certificado não é arquivada; o aluno ainda emite, e aí ela sai"""
+        sem_certificado = Agendamento.objects.create(
+            aluno=self.aluno, status='CONCLUIDO', disponibilidade=Disponibilidade.objects.create(
+                professor=self.professor, data=timezone.localdate() - datetime.timedelta(days=500), horario_inicio=datetime.time(9, 0),
+            ),
+        )
+        self.arquivar(dias=180)
+        self.assertTrue(Agendamento.objects.filter(pk=sem_certificado.pk).exists())
+
+        emissao = self.client.get(f'/api/certificado/{sem_certificado.id}/download/')
+        self.assertEqual(emissao.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.arquivar(dias=180)['agendamento'], 1)
+        download = self.client.get(f'/api/certificado/{sem_certificado.id}/download/')
+        self.assertEqual(download.status_code, status.HTTP_200_OK)
+        self.assertEqual(download.json()['dados']['codigo'], emissao.json()['dados']['codigo'])
+
+
+class ExportacaoTests(APITestCase):
+
+    def setUp(self):
+        """
+        Duas aulas concluídas de professores diferentes (uma avaliada e certificada), uma cancelada
+        e um administrador para baixar as exportações.
+        """
+        self.admin = Usuario.objects.create(username='adm@x.com', email='adm@x.com', nome='Coord', tipo='PROFESSOR', is_staff=True)
+        self.ana = Usuario.objects.create(username='ana@x.com', email='ana@x.com', nome='Ana, "Prof"', tipo='PROFESSOR')
+        self.caio = Usuario.objects.create(username='caio@x.com', email='caio@x.com', nome='Caio', tipo='PROFESSOR')
+        self.aluno = Usuario.objects.create(username='bia@x.com', email='bia@x.com', nome='Bia', tipo='ALUNO')
+        self.fisica = Disciplina.objects.create(nome='Física')
+
+        def aula(professor, data, status_aula, disciplina=None):
+            horario = Disponibilidade.objects.create(
+                professor=professor, disciplina=disciplina, data=data, horario_inicio=datetime.time(14, 30),
+            )
+            return Agendamento.objects.create(aluno=self.aluno, disponibilidade=horario, status=status_aula)
+
+        self.aula_ana = aula(self.ana, datetime.date(2030, 3, 5), 'CONCLUIDO', self.fisica)
+        self.aula_caio = aula(self.caio, datetime.date(2030, 4, 9), 'CONCLUIDO')
+        self.cancelada = aula(self.ana, datetime.date(2030, 4, 20), 'CANCELADO')
+        Avaliacao.objects.create(agendamento=self.aula_ana, nota=4, tipo_avaliador='ALUNO', comentario='Boa aula;\nobrigada')
+        Certificado.objects.create(agendamento=self.aula_ana, codigo_validacao='AL-X-1', horas=1.5)
+        self.client.force_authenticate(user=self.admin)
+
+    def baixar(self, nome, **params):
+        response = self.client.get(reverse('api_exportar', args=[nome]), params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_em_streaming_com_filtros(self):
+        """Teste (Exportação): CSV com cabeçalho, nomes dos JOINs, escape correto e filtros de data, professor e disciplina"""
+        response, corpo = self.baixar('agendamentos')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="agendamentos-', response['Content-Disposition'])
+        linhas = list(csv.DictReader(io.StringIO(corpo)))
+        self.assertEqual([int(linha['agendamento_id']) for linha in linhas], [self.aula_ana.id, self.aula_caio.id, self.cancelada.id])
+        self.assertEqual(
+            (linhas[0]['professor_nome'], linhas[0]['disciplina_nome'], linhas[0]['data_aula'], linhas[0]['hora_aula']),
+            ('Ana, "Prof"', 'Física', '2030-03-05', '14:30:00'),
+        )
+        self.assertEqual(linhas[1]['disciplina_nome'], '')
+
+        _, corpo = self.baixar('agendamentos', de='2030-04-01', ate='2030-04-30', professor=self.ana.id)
+        self.assertEqual([linha['status'] for linha in csv.DictReader(io.StringIO(corpo))], ['CANCELADO'])
+        _, corpo = self.baixar('agendamentos', disciplina=self.fisica.id)
+        self.assertEqual(len(list(csv.DictReader(io.StringIO(corpo)))), 1)
+
+        _, corpo = self.baixar('avaliacoes')
+        avaliacao, = csv.DictReader(io.StringIO(corpo))
+        self.assertEqual((avaliacao['nota'], avaliacao['comentario']), ('4', 'Boa aula;\nobrigada'))
+
+    def test_ndjson_e_historico_arquivado(self):
+        """Teste (Exportação): NDJSON com uma linha JSON por registro; ?incluir_historico=1 acrescenta o arquivo"""
+        call_command('arquivar_historico', dias=0, stdout=io.StringIO()) # Datas de 2030: nada é arquivado.
+        response, corpo = self.baixar('certificados', formato='ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        certificado, = [json.loads(linha) for linha in corpo.splitlines()]
+        self.assertEqual(
+            (certificado['codigo_validacao'], certificado['horas'], certificado['aluno_nome'], certificado['data_aula']),
+            ('AL-X-1', '1.50', 'Bia', '2030-03-05'),
+        )
+
+        with mock.patch('core.arquivo.timezone.localdate', return_value=datetime.date(2031, 1, 1)):
+            call_command('arquivar_historico', dias=0, stdout=io.StringIO())
+        self.assertEqual(self.baixar('certificados', formato='ndjson')[1], '')
+        _, corpo = self.baixar('certificados', formato='ndjson', incluir_historico='1')
+        self.assertEqual([json.loads(linha)['codigo_validacao'] for linha in corpo.splitlines()], ['AL-X-1'])
+
+    def test_asgi_usa_iterador_assincrono(self):
+        """Teste (Exportação): Sob ASGI o corpo é um iterador assíncrono com o mesmo conteúdo"""
+        _, sincrono = self.baixar('agendamentos', formato='ndjson')
+        cliente = AsyncClient()
+        self.client.force_login(self.admin)
+        cliente.cookies = self.client.cookies
+
+        async def baixar():
+            response = await cliente.get(reverse('api_exportar', args=['agendamentos']), {'formato': 'ndjson'})
+            return response, b''.join([parte async for parte in response.streaming_content]).decode()
+
+        response, assincrono = async_to_sync(baixar)()
+        self.assertTrue(response.is_async)
+        self.assertEqual(assincrono, sincrono)
+
+    def test_apenas_administradores_e_parametros_validados(self):
+        """Teste (Exportação): 401 sem login, 403 para não administradores, 404 e 400 para nome e parâmetros inválidos"""
+        url = reverse('api_exportar', args=['agendamentos'])
+        self.assertEqual(self.client.get(reverse('api_exportar', args=['usuarios'])).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(url, {'formato': 'xlsx'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'de': '2030-02-30'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'professor': 'ana'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(user=self.aluno)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ImportacaoEmLoteTests(APITestCase):
+
+    SENHA = 'Xq7!pLm29aa'
+
+    def setUp(self):
+        """Um administrador, uma professora já cadastrada com um horário, um aluno e a disciplina Física."""
+        self.admin = Usuario.objects.create(username='adm@x.com', email='adm@x.com', nome='Coord', tipo='PROFESSOR', is_staff=True)
+        self.ana = Usuario.objects.create(username='ana@x.com', email='ana@x.com', nome='Ana', tipo='PROFESSOR')
+        self.aluno = Usuario.objects.create(username='bia@x.com', email='bia@x.com', nome='Bia', tipo='ALUNO')
+        self.fisica = Disciplina.objects.create(nome='Física')
+        Disponibilidade.objects.create(professor=self.ana, data=datetime.date(2030, 5, 6), horario_inicio=datetime.time(10, 0))
+        self.client.force_authenticate(user=self.admin)
+
+    def enviar(self, tipo, nome, conteudo, **params):
+        arquivo = SimpleUploadedFile(nome, conteudo.encode())
+        url = reverse('api_importar', args=[tipo])
+        if params:
+            url += '?' + '&'.join(f'{chave}={valor}' for chave, valor in params.items())
+        return self.client.post(url, {'arquivo': arquivo}, format='multipart')
+
+    def test_usuarios_csv_com_relatorio_por_linha(self):
+        """Teste (Importação): CSV de usuários grava as linhas válidas e relata as inválidas pelo número da linha"""
+        conteudo = (
+            'nome,email,senha,tipo,disciplinas\n'
+            f'Caio,caio@escola.br,{self.SENHA},PROFESSOR,física\n'
+            f'Duda,duda@escola.br,{self.SENHA},ALUNO,\n'
+            'Edu,edu@escola.br,123,ALUNO,\n'
+            f'Fabi,ana@x.com,{self.SENHA},ALUNO,\n'
+            f'Caio 2,caio@escola.br,{self.SENHA},PROFESSOR,Química\n'
+            f'Gil,gil@escola.br,{self.SENHA},DIRETOR,\n'
+        )
+        response = self.enviar('usuarios', 'escola.csv', conteudo)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['linhas'], response.data['importadas'], response.data['rejeitadas']), (6, 2, 4))
+        self.assertGreater(response.data['linhas_por_s'], 0)
+        erros = {erro['linha']: erro['erros'] for erro in response.data['erros']}
+        self.assertEqual(set(erros), {4, 5, 6, 7})
+        self.assertIn('senha', erros[4])
+        self.assertEqual(erros[5]['email'], ['Já existe um usuário com este e-mail.'])
+        self.assertEqual(erros[6], {'email': ['E-mail repetido no arquivo (linha 2).'], 'disciplinas': ['Disciplina não encontrada: Química.']})
+        self.assertIn('tipo', erros[7])
+
+        caio = Usuario.objects.get(email='caio@escola.br')
+        self.assertTrue(caio.check_password(self.SENHA))
+        self.assertEqual((caio.username, caio.tipo), ('caio@escola.br', 'PROFESSOR'))
+        self.assertEqual(list(caio.disciplinas.all()), [self.fisica])
+        self.assertFalse(Usuario.objects.filter(email='edu@escola.br').exists())
+
+    def test_api_limita_o_pool_de_processos(self):
+        """Teste (Importação): Pela API o pool de hash fica em PROCESSOS_IMPORTACAO_HTTP, mesmo com muitas CPUs"""
+        conteudo = f'nome,email,senha,tipo\nCaio,caio@escola.br,{self.SENHA},ALUNO\n'
+        with mock.patch('core.views.os.cpu_count', return_value=32), \
+                mock.patch.object(importacao, 'importar', wraps=importacao.importar) as importar:
+            self.assertEqual(self.enviar('usuarios', 'escola.csv', conteudo).status_code, status.HTTP_200_OK)
+            with override_settings(PROCESSOS_IMPORTACAO_HTTP=4):
+                self.enviar('usuarios', 'escola.csv', conteudo)
+        self.assertEqual([chamada.kwargs['processos'] for chamada in importar.call_args_list], [2, 4])
+
+    def test_disponibilidades_ndjson_valida_professor_e_conflitos(self):
+        """Teste (Importação): NDJSON de horários checa professor, disciplina e horários repetidos no banco e no arquivo"""
+        versao = VersaoDados.obter(Disponibilidade)[0][1]
+        linhas = [
+            {'professor': 'ana@x.com', 'disciplina': 'FÍSICA', 'assunto': 'Óptica', 'data': '2030-05-06', 'horario_inicio': '14:00'},
+            {'professor': 'ana@x.com', 'data': '2030-05-06', 'horario_inicio': '14:00'},
+            {'professor': 'ana@x.com', 'data': '2030-05-06', 'horario_inicio': '10:00'},
+            {'professor': 'bia@x.com', 'data': '2030-05-07', 'horario_inicio': '10:00'},
+            {'professor': 'zeca@x.com', 'data': '2030-05-07', 'horario_inicio': '10:00'},
+            {'professor': 'ana@x.com', 'data': '06/05/2030', 'horario_inicio': '15:00', 'disciplina': 'Química'},
+        ]
+        conteudo = '\n'.join(json.dumps(linha) for linha in linhas) + '\n{quebrado\n'
+        resultado = importacao.importar('disponibilidades', io.StringIO(conteudo), 'ndjson', lote=2)
+        self.assertEqual((resultado['importadas'], resultado['rejeitadas'], resultado['lotes']), (1, 6, 4))
+        erros = {erro['linha']: erro['erros'] for erro in resultado['erros']}
+        self.assertEqual(erros[2], {'horario_inicio': ['Horário repetido no arquivo (linha 1).']})
+        self.assertEqual(erros[3], {'horario_inicio': ['O professor já tem um horário nesta data e hora.']})
+        self.assertEqual(erros[4], {'professor': ['O usuário informado não é professor.']})
+        self.assertEqual(erros[5], {'professor': ['Professor não encontrado.']})
+        self.assertEqual(set(erros[6]), {'data'}) # Formato inválido: a disciplina nem chega a ser consultada.
+        self.assertEqual(erros[7], {'non_field_errors': ['Registro inválido: esperado um objeto JSON.']})
+
+        horario = Disponibilidade.objects.get(professor=self.ana, horario_inicio=datetime.time(14, 0))
+        self.assertEqual((horario.disciplina, horario.assunto, horario.disponivel), (self.fisica, 'Óptica', True))
+        # bulk_create não dispara sinais: a versão (ETags e caches) é incrementada pela importação.
+        self.assertGreater(VersaoDados.obter(Disponibilidade)[0][1], versao)
+
+    def test_array_json_lido_em_blocos(self):
+        """Teste (Importação): O array JSON é decodificado aos poucos; se quebrar no meio, os lotes anteriores ficam gravados"""
+        linhas = [
+            {'professor': 'ana@x.com', 'data': '2030-06-0%d' % dia, 'horario_inicio': '09:00', 'descricao': 'Texto [com], "aspas"'}
+            for dia in range(1, 4)
+        ]
+        conteudo = json.dumps(linhas, indent=1)
+        registros = list(importacao._array_json(io.StringIO(conteudo), tamanho=7))
+        self.assertEqual(registros, list(enumerate(linhas, start=1)))
+        self.assertEqual(list(importacao._array_json(io.StringIO(' [ ] '))), [])
+
+        resultado = importacao.importar('disponibilidades', io.StringIO(conteudo[:-30]), 'json', lote=1)
+        self.assertEqual(resultado['erro_arquivo'], 'JSON inválido no registro 3.')
+        self.assertEqual(resultado['importadas'], 2)
+        self.assertEqual(Disponibilidade.objects.filter(data__month=6).count(), 2)
+
+        resultado = importacao.importar('disponibilidades', io.StringIO('{"professor": "ana@x.com"}'), 'json')
+        self.assertEqual(resultado['erro_arquivo'], 'O arquivo JSON deve conter um array de objetos.')
+
+    def test_hash_de_senhas_em_pool_de_processos(self):
+        """Teste (Importação): As senhas transformadas em hash nos processos do pool são válidas e ficam na ordem"""
+        senhas = ['primeira-senha-1', 'segunda-senha-2', 'terceira-senha-3']
+        with importacao.pool_de_hash(2) as executor:
+            hashes = importacao.hashear(senhas, executor, processos=2)
+        self.assertEqual(len(set(hashes)), 3)
+        for senha, valor in zip(senhas, hashes):
+            self.assertTrue(check_password(senha, valor))
+
+    def test_simulacao_comando_e_acesso(self):
+        """Teste (Importação): ?simular=1 não grava, o comando lê arquivos do disco e o endpoint é só para administradores"""
+        conteudo = f'nome,email,senha,tipo\nCaio,caio@escola.br,{self.SENHA},ALUNO\n'
+        response = self.enviar('usuarios', 'escola.csv', conteudo, simular=1)
+        self.assertEqual((response.data['validas'], response.data['importadas']), (1, 0))
+        self.assertFalse(Usuario.objects.filter(email='caio@escola.br').exists())
+
+        response = self.enviar('usuarios', 'escola.csv', 'nome,email\nCaio,caio@escola.br\n')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['erro_arquivo'], 'Colunas obrigatórias ausentes: senha, tipo.')
+        self.assertEqual(self.enviar('usuarios', 'escola.xlsx', conteudo).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.enviar('alunos', 'escola.csv', conteudo).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.post(reverse('api_importar', args=['usuarios'])).status_code, status.HTTP_400_BAD_REQUEST)
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8-sig', delete=False) as arquivo:
+            arquivo.write(conteudo)
+        self.addCleanup(os.remove, arquivo.name)
+        saida = io.StringIO()
+        call_command('importar_dados', 'usuarios', arquivo.name, processos=1, stdout=saida)
+        self.assertEqual(json.loads(saida.getvalue())['importadas'], 1)
+        self.assertTrue(Usuario.objects.get(email='caio@escola.br').check_password(self.SENHA))
+        with self.assertRaises(CommandError):
+            call_command('importar_dados', 'usuarios', arquivo.name, lote=0, stdout=io.StringIO())
+
+        self.client.force_authenticate(user=self.aluno)
+        self.assertEqual(self.enviar('usuarios', 'escola.csv', conteudo).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.enviar('usuarios', 'escola.csv', conteudo).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(BANCO_LEITURA='leitura', JANELA_LEITURA_PRIMARIO=10)
+class RoteamentoLeituraTests(APITestCase):
+    databases = {'default', 'leitura'}
+
+    def setUp(self):
+        """
+        Primário e réplica em dois arquivos SQLite com conteúdos diferentes: só a réplica tem a disciplina
+        'Só na réplica', e a réplica ainda não recebeu 'Matemática' (atraso de replicação).
+        """
+        cache.clear()
+        Disciplina.objects.create(nome='Matemática')
+        Disciplina.objects.using('leitura').create(nome='Só na réplica')
+        self.aluno = Usuario.objects.create(username='bia@x.com', email='bia@x.com', nome='Bia', tipo='ALUNO')
+
+    def nomes_disciplinas(self):
+        response = self.client.get(reverse('disciplina-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(disciplina['nome'] for disciplina in response.data)
+
+    def test_get_le_da_replica_e_escrita_fixa_no_primario(self):
+        """Teste (Réplica): GET lê da réplica; após uma escrita o cliente lê do primário durante a janela"""
+        self.assertEqual(self.nomes_disciplinas(), ['Só na réplica'])
+
+        response = self.client.post(reverse('disciplina-list'), {'nome': 'Química'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        cookie = response.cookies[roteamento.COOKIE_PRIMARIO]
+        self.assertEqual(cookie['max-age'], 10)
+        self.assertFalse(Disciplina.objects.using('leitura').filter(nome='Química').exists()) # Escrita no primário.
+
+        # Read-your-writes: o próprio cliente vê o que acabou de gravar, mesmo com a réplica atrasada.
+        self.assertEqual(self.nomes_disciplinas(), ['Matemática', 'Química'])
+        # Passada a janela, volta para a réplica.
+        with mock.patch('core.roteamento.time.time', return_value=time.time() + 11):
+            self.assertEqual(self.nomes_disciplinas(), ['Só na réplica'])
+
+    @override_settings(ROOT_URLCONF='Aula_Livre.urls_asgi')
+    def test_leitura_assincrona_segue_a_mesma_regra(self):
+        """Teste (Réplica): Sob ASGI as leituras assíncronas (views_async.py) também vão para a réplica"""
+        response = async_to_sync(AsyncClient().get)(reverse('disciplina-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([disciplina['nome'] for disciplina in json.loads(response.content)], ['Só na réplica'])
+
+    def test_sem_replica_configurada_tudo_vai_para_o_primario(self):
+        """Teste (Réplica): Sem BANCO_LEITURA o roteador não muda nada e nenhum cookie é gravado"""
+        with override_settings(BANCO_LEITURA=None):
+            self.assertEqual(self.nomes_disciplinas(), ['Matemática'])
+            response = self.client.post(reverse('disciplina-list'), {'nome': 'Química'}, format='json')
+        self.assertNotIn(roteamento.COOKIE_PRIMARIO, response.cookies)
+
+    def test_dashboard_le_da_replica_e_escritas_nunca_vao_para_ela(self):
+        """Teste (Réplica): O dashboard consulta só a réplica; save() de objeto lido da réplica grava no primário"""
+        self.client.force_authenticate(user=self.aluno)
+        with CaptureQueriesContext(connections['default']) as primario, CaptureQueriesContext(connections['leitura']) as replica:
+            response = self.client.get(reverse('api_dashboard'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(len(replica), 0)
+        self.assertEqual(len(primario), 0)
+
+        with roteamento.lendo_de('leitura'):
+            disciplina = Disciplina.objects.get(nome='Só na réplica')
+            self.assertEqual(router.db_for_write(Disciplina, instance=disciplina), 'default')
+            # Sessões ficam sempre no primário: um login recém-feito precisa valer na próxima requisição.
+            self.assertEqual(router.db_for_read(Session), 'default')
+        self.assertEqual(router.db_for_read(Disciplina), 'default')
+
+
+@override_settings(BANCO_LEITURA='leitura')
+class SincronizarReplicaTests(TransactionTestCase):
+    databases = {'default', 'leitura'}
+
+    def test_copia_o_primario_para_a_replica(self):
+        """Teste (Réplica): sincronizar_replica copia o arquivo principal para o da réplica (API de backup do SQLite)"""
+        Disciplina.objects.create(nome='Física')
+        self.assertFalse(Disciplina.objects.using('leitura').filter(nome='Física').exists())
+        saida = io.StringIO()
+        call_command('sincronizar_replica', stdout=saida)
+        self.assertGreater(json.loads(saida.getvalue())['bytes'], 0)
+        self.assertTrue(Disciplina.objects.using('leitura').filter(nome='Física').exists())
+
+        with override_settings(BANCO_LEITURA=None), self.assertRaises(CommandError):
+            call_command('sincronizar_replica', stdout=io.StringIO())
+
+
+@mock.patch.object(concorrencia, 'ESPERA_BASE', 0)
+class RetentativaBancoOcupadoTests(TransactionTestCase):
+
+    def setUp(self):
+        """
+        Configuração: Um professor com um horário livre e um aluno autenticado. TransactionTestCase para que a
+        view rode fora de transação, como em produção (dentro de uma transação a retentativa é desligada).
+        """
+        self.professor = Usuario.objects.create(username='prof@x.com', email='prof@x.com', nome='Prof', tipo='PROFESSOR')
+        self.aluno = Usuario.objects.create(username='bia@x.com', email='bia@x.com', nome='Bia', tipo='ALUNO')
+        self.horario = Disponibilidade.objects.create(
+            professor=self.professor, data=datetime.date(2030, 5, 10), horario_inicio=datetime.time(9, 0)
+        )
+        self.client.force_login(self.aluno)
+
+    def reservar(self):
+        return self.client.post(
+            reverse('agendamento-list'), {'aluno': self.aluno.pk, 'disponibilidade': self.horario.pk},
+            content_type='application/json',
+        )
+
+    def test_repete_enquanto_o_banco_esta_travado(self):
+        """Teste (Concorrência): "database is locked" é repetido e a reserva acaba gravada (201)"""
+        save_original, falhas = Agendamento.save, []
+
+        def save_instavel(agendamento, *args, **kwargs):
+            if len(falhas) < 2:
+                falhas.append(1)
+                raise OperationalError('database is locked')
+            return save_original(agendamento, *args, **kwargs)
+
+        with mock.patch.object(Agendamento, 'save', autospec=True, side_effect=save_instavel):
+            response = self.reservar()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(falhas), 2)
+        self.assertEqual(Agendamento.objects.get().status, 'AGENDADO')
+
+    def test_tentativas_esgotadas_viram_503(self):
+        """Teste (Concorrência): Travado em todas as tentativas, o cliente recebe 503 (e não 500)"""
+        with mock.patch.object(Agendamento, 'save', side_effect=OperationalError('database is locked')) as save:
+            response = self.reservar()
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.json()['detail'], BancoOcupado.default_detail)
+        self.assertEqual(save.call_count, concorrencia.TENTATIVAS)
+
+    def test_nao_repete_outros_erros_nem_dentro_de_transacao(self):
+        """Teste (Concorrência): Erros que não são de trava, ou dentro de uma transação externa, sobem na hora"""
+        chamadas = []
+
+        @concorrencia.repetir_se_bloqueado
+        def escrever(mensagem):
+            chamadas.append(mensagem)
+            raise OperationalError(mensagem)
+
+        with self.assertRaises(OperationalError):
+            escrever('no such table: core_agendamento')
+        with transaction.atomic(), self.assertRaises(OperationalError):
+            escrever('database is locked')
+        self.assertEqual(len(chamadas), 2)
+
+
+class ModoSqliteConcorrenteTests(SimpleTestCase):
+
+    def abrir_conexao(self, arquivo):
+        # Conexão nova (fora do registro de conexões) em um arquivo temporário: dispara o connection_created.
+        conexao = type(connections['default'])({**connections['default'].settings_dict, 'NAME': arquivo}, alias='concorrente')
+        conexao.ensure_connection()
+        self.addCleanup(conexao.close)
+        with conexao.cursor() as cursor:
+            return [cursor.execute(f'PRAGMA {pragma}').fetchone()[0] for pragma in ('journal_mode', 'synchronous', 'busy_timeout')]
+
+    def test_pragmas_aplicados_na_conexao(self):
+        """Teste (Concorrência): Com o modo ligado, cada conexão nasce em WAL, synchronous=NORMAL e com busy_timeout"""
+        with tempfile.TemporaryDirectory() as pasta:
+            with override_settings(SQLITE_CONCORRENTE=True, SQLITE_BUSY_TIMEOUT_MS=1234):
+                self.assertEqual(self.abrir_conexao(os.path.join(pasta, 'wal.sqlite3')), ['wal', 1, 1234])
+            with override_settings(SQLITE_CONCORRENTE=False):
+                # Padrões do SQLite (o busy_timeout de 5 s vem do timeout do driver sqlite3 do Python).
+                self.assertEqual(self.abrir_conexao(os.path.join(pasta, 'padrao.sqlite3')), ['delete', 2, 5000])
+
+
+class BenchmarkConcorrenciaTests(TransactionTestCase):
+
+    def test_compara_os_dois_modos_e_restaura_o_banco(self):
+        """Teste: O teste de carga roda os dois modos em processos separados, mede vazão/erros e limpa o que criou"""
+        saida = io.StringIO()
+        call_command('benchmark_concorrencia', processos=2, ciclos=3, stdout=saida)
+        resultado = json.loads(saida.getvalue())
+        self.assertEqual(set(resultado['modos']), {'padrao', 'concorrente'})
+        for medida in resultado['modos'].values():
+            self.assertEqual(medida['leituras'], 6)
+            self.assertGreater(medida['escritas_ok'], 0)
+            self.assertLessEqual(medida['p50_escrita_ms'], medida['p99_escrita_ms'])
+        self.assertEqual(resultado['modos']['concorrente']['erros'], 0)
+
+        # O arquivo volta ao journal_mode de antes (o WAL é persistente) e a massa de dados é apagada.
+        with connection.cursor() as cursor:
+            self.assertEqual(cursor.execute('PRAGMA journal_mode').fetchone()[0], 'delete')
+        self.assertFalse(Usuario.objects.exists())
+        with self.assertRaises(CommandError):
+            call_command('benchmark_concorrencia', processos=0, stdout=io.StringIO())
@@ -0,0 +1,10 @@
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class VerificacaoCertificadoThrottle(SimpleRateThrottle):
+    # Limite por IP (mesmo para usuários logados): protege o banco de verificações em lote.
+    # A taxa vem de REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']['verificacao_certificado'].
+    scope = 'verificacao_certificado'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
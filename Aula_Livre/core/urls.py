@@ -6,7 +6,9 @@ from core.views import (
     ProfessorViewSet, DisponibilidadeViewSet, 
     UsuarioViewSet, AlunoViewSet, 
     login_usuario, cadastro_usuario, logout_usuario,
-    download_certificado  # <--- ADICIONADO AQUI
+    download_certificado,  # <--- ADICIONADO AQUI
+    verificar_certificado, horas_usuario, relatorio_horas, exportar, importar,
+    dashboard, busca_textual, metricas, stream_disponibilidades
 )
 from django.views.generic import TemplateView
 
@@ -34,7 +36,31 @@ urlpatterns = [
 
     # Certificado (Nova Rota)
     path('api/certificado/<int:agendamento_id>/download/', download_certificado, name='api_certificado'),
+    # Verificação pública do código do certificado (sem login, com cache e limite por IP)
+    path('api/certificado/verificar/<str:codigo>/', verificar_certificado, name='api_certificado_verificar'),
     
+    # Horas voluntárias (livro-razão dos certificados)
+    path('api/horas/', horas_usuario, name='api_horas'),
+    path('api/horas/relatorio/', relatorio_horas, name='api_horas_relatorio'),
+
+    # Exportações para a coordenação (CSV/NDJSON em streaming, apenas administradores)
+    path('api/exportar/<str:nome>/', exportar, name='api_exportar'),
+
+    # Importação em lote de usuários e horários (CSV/NDJSON/JSON, apenas administradores)
+    path('api/importar/<str:tipo>/', importar, name='api_importar'),
+
+    # Dashboard (Agregado do usuário logado)
+    path('api/dashboard/', dashboard, name='api_dashboard'),
+
+    # Busca textual (FTS5): disciplinas, horários e professores
+    path('api/busca/', busca_textual, name='api_busca'),
+
+    # Eventos em tempo real das Disponibilidades (SSE, servidor ASGI)
+    path('api/eventos/disponibilidades/', stream_disponibilidades, name='api_eventos_disponibilidades'),
+
+    # Métricas (formato Prometheus)
+    path('api/metrics/', metricas, name='api_metricas'),
+
     # Frontend
     path('', TemplateView.as_view(template_name='index.html'), name='home'),
 ]
\ No newline at end of file
@@ -0,0 +1,21 @@
+from django.urls import path, re_path
+
+from core import views_async
+from core.urls import router, urlpatterns as urlpatterns_sync
+from core.views import download_certificado
+from core.views_async import com_leitura_assincrona
+
+# Rotas usadas sob ASGI (ver Aula_Livre/urls_asgi.py): as leituras mais acessadas ganham uma versão
+# assíncrona e todo o resto continua nas rotas síncronas de core/urls.py, declaradas logo abaixo.
+views_sync = {rota.name: rota.callback for rota in router.urls}
+
+# Detalhes só com pk numérico: ações de lista (ex.: /api/professores/ranking/) seguem para as rotas síncronas.
+
+urlpatterns = [
+    path('api/professores/', com_leitura_assincrona(views_sync['professor-list'], views_async.listar_professores), name='professor-list'),
+    re_path(r'^api/professores/(?P<pk>[0-9]+)/$', com_leitura_assincrona(views_sync['professor-detail'], views_async.detalhar_professor), name='professor-detail'),
+    path('api/agendamentos/', com_leitura_assincrona(views_sync['agendamento-list'], views_async.listar_agendamentos), name='agendamento-list'),
+    path('api/disciplinas/', com_leitura_assincrona(views_sync['disciplina-list'], views_async.listar_disciplinas), name='disciplina-list'),
+    re_path(r'^api/disciplinas/(?P<pk>[0-9]+)/$', com_leitura_assincrona(views_sync['disciplina-detail'], views_async.detalhar_disciplina), name='disciplina-detail'),
+    path('api/certificado/<int:agendamento_id>/download/', com_leitura_assincrona(download_certificado, views_async.baixar_certificado), name='api_certificado'),
+] + urlpatterns_sync
@@ -1,76 +1,448 @@
+import hmac
+import io
+import json
+import os
+import re
+from decimal import Decimal
+
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes, throttle_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated # Módulo essencial para segurança da API.
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny, IsAuthenticated # Módulo essencial para segurança da API.
+from django.conf import settings
 from django.contrib.auth import login, logout             
+from django.db.models import Exists, F, OuterRef, Prefetch, Q, Sum
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404 # Útil para buscar objetos ou retornar 404 de forma concisa.
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
 
-from .models import Disciplina, Agendamento, Avaliacao, Usuario, Disponibilidade, Certificado 
+from .models import (
+    Disciplina, Agendamento, AgendamentoArquivado, Avaliacao, Usuario, Disponibilidade, Certificado, CertificadoArquivado,
+    HorasPorDisciplinaMes, HorasPorUsuarioAno, HorasVoluntarias, ResumoAvaliacoes,
+)
 from .serializers import (
     DisciplinaSerializer, 
     AgendamentoSerializer, 
+    AgendamentoArquivadoSerializer,
     AvaliacaoSerializer, 
     UsuarioSerializer, 
-    DisponibilidadeSerializer
+    DisponibilidadeSerializer,
+    RecorrenciaSerializer,
+    AcaoEmLoteSerializer,
+    ResumoAvaliacoesSerializer,
+    DISCIPLINA_PADRAO
 )
+from . import busca, exportacao, importacao
+from .arquivo import MODELOS_ARQUIVO
+from .exceptions import ArquivoInvalido, ConflitoAgendamento, HorarioIndisponivel
+from .cache import AUSENTE, CacheMixin, certificados_verificados, codigos_inexistentes, mapa_professor_disciplinas
+from .concorrencia import repetir_se_bloqueado
+from .eventos import canal_disponibilidades
+from .metricas import registro as registro_metricas
+from .mixins import ETagMixin, ListagemRapidaMixin, minuto_atual, resposta_condicional
+from .pagination import ProfessorCursorPagination
+from .roteamento import LeituraReplicaMixin, em_replica
+from .throttling import VerificacaoCertificadoThrottle
 
 # --- VIEWSETS (Padrão CRUD de Modelos) ---
 
 # ModelViewSet: Oferece endpoints automáticos para CRUD (GET, POST, PUT/PATCH, DELETE).
-class DisciplinaViewSet(viewsets.ModelViewSet):
+# ETagMixin: list/retrieve respondem 304 (Not Modified) quando as tabelas em 'modelos_etag' não mudaram.
+# CacheMixin: list/retrieve servidos do cache compartilhado, invalidado pela versão da tabela.
+# ListagemRapidaMixin: list() montado a partir de .values() (modo rápido do serializer), com o mesmo JSON.
+# LeituraReplicaMixin: métodos seguros leem da réplica de leitura, quando configurada (core/roteamento.py).
+class DisciplinaViewSet(LeituraReplicaMixin, ETagMixin, CacheMixin, viewsets.ModelViewSet):
     queryset = Disciplina.objects.all()
     serializer_class = DisciplinaSerializer
+    modelos_etag = (Disciplina,)
+    modelos_cache = (Disciplina,)
+
+def usuarios_otimizados(queryset, request):
+    # Prefetch/JOIN das relações aninhadas do UsuarioSerializer, apenas se pedidas (?fields=/?expand=).
+    prefetches = []
+    if UsuarioSerializer.inclui(request, 'disciplinas'):
+        prefetches.append('disciplinas')
+    if UsuarioSerializer.inclui(request, 'disponibilidades'):
+        prefetches.append(Prefetch('disponibilidade_set', queryset=Disponibilidade.objects.select_related('disciplina')))
+    if UsuarioSerializer.inclui(request, 'avaliacoes'):
+        queryset = queryset.select_related('resumo_avaliacoes')
+    return queryset.prefetch_related(*prefetches)
 
-class UsuarioViewSet(viewsets.ModelViewSet):
+class UsuarioViewSet(LeituraReplicaMixin, viewsets.ModelViewSet):
     queryset = Usuario.objects.all()
     serializer_class = UsuarioSerializer
 
+    def get_queryset(self):
+        return usuarios_otimizados(super().get_queryset(), self.request)
+
+def filtrar_horarios(disponibilidades, params):
+    """
+    Filtros de horário da query string, compartilhados pelo catálogo de professores e pela busca de horários:
+    ?disciplina=, ?nivel=, ?data_inicio=/?data_fim= (AAAA-MM-DD), ?hora_inicio=/?hora_fim= (HH:MM) e ?disponivel=true.
+    Retorna (queryset, filtrado): 'filtrado' diz se algum filtro explícito (disciplina, nível, datas ou horas) foi
+    pedido; ?disponivel=true só restringe os horários. Cada filtro corresponde a um índice de Disponibilidade (ver Meta.indexes).
+    """
+    filtrado = False
+
+    disciplina_id = params.get('disciplina')
+    if disciplina_id:
+        if not disciplina_id.isdigit():
+            raise ValidationError({'disciplina': 'Informe o ID numérico da disciplina.'})
+        disponibilidades = disponibilidades.filter(disciplina_id=disciplina_id)
+        filtrado = True
+
+    nivel = params.get('nivel')
+    if nivel:
+        disponibilidades = disponibilidades.filter(nivel__iexact=nivel)
+        filtrado = True
+
+    for campo, lookup, converter, formato in (
+        ('data_inicio', 'data__gte', parse_date, 'AAAA-MM-DD'),
+        ('data_fim', 'data__lte', parse_date, 'AAAA-MM-DD'),
+        ('hora_inicio', 'horario_inicio__gte', parse_time, 'HH:MM'),
+        ('hora_fim', 'horario_inicio__lte', parse_time, 'HH:MM'),
+    ):
+        valor = params.get(campo)
+        if valor:
+            try:
+                convertido = converter(valor)
+            except ValueError: # Formato certo, valor inválido (ex: 2025-02-30 ou 25:00).
+                convertido = None
+            if convertido is None:
+                raise ValidationError({campo: f'Use o formato {formato}.'})
+            disponibilidades = disponibilidades.filter(**{lookup: convertido})
+            filtrado = True
+
+    if params.get('disponivel') in ('true', '1'):
+        # Apenas horários FUTUROS e ainda livres (os únicos que a tela Explorar pode agendar).
+        # O 'data >= hoje' explícito dá ao banco um intervalo sobre o índice parcial dos horários livres.
+        agora = timezone.localtime()
+        disponibilidades = disponibilidades.filter(disponivel=True, data__gte=agora.date()).filter(
+            Q(data__gt=agora.date()) | Q(horario_inicio__gte=agora.time())
+        )
+
+    return disponibilidades, filtrado
+
+def extra_etag_horarios(params):
+    # ?disponivel=true compara com o relógio (só horários futuros): o ETag também precisa mudar quando um horário passa.
+    return minuto_atual() if params.get('disponivel') in ('true', '1') else ''
+
 # ViewSet de filtro especializado: Expõe apenas usuários do tipo 'PROFESSOR'.
-class ProfessorViewSet(viewsets.ModelViewSet):
+class ProfessorViewSet(LeituraReplicaMixin, ETagMixin, viewsets.ModelViewSet):
     # O queryset é filtrado na origem para servir a tela de 'Explorar Professores'.
     queryset = Usuario.objects.filter(tipo='PROFESSOR')
     serializer_class = UsuarioSerializer
+    pagination_class = ProfessorCursorPagination
+    modelos_etag = (Usuario, Disciplina, Disponibilidade, ResumoAvaliacoes)
+
+    def get_disponibilidades_queryset(self):
+        # Filtros de horário vindos da query string (ver filtrar_horarios).
+        # Retorna (queryset, filtrado): 'filtrado' indica se algum filtro explícito de horário foi pedido.
+        disponibilidades = Disponibilidade.objects.select_related('disciplina')
+        disponibilidades, filtrado = filtrar_horarios(disponibilidades, self.request.query_params)
+        return disponibilidades.order_by('data', 'horario_inicio'), filtrado
+
+    def extra_etag(self, request):
+        return extra_etag_horarios(request.query_params)
+
+    def get_queryset(self):
+        # Otimização: o aninhamento (disciplinas e disponibilidades) vem de prefetches, com custo fixo por página.
+        disponibilidades, filtrado = self.get_disponibilidades_queryset()
+        queryset = Usuario.objects.filter(tipo='PROFESSOR')
+
+        if filtrado:
+            # Só lista professores com pelo menos um horário compatível com os filtros explícitos.
+            # ?disponivel=true sozinho não esconde ninguém: quem não tem horário livre aparece com a agenda vazia.
+            # Para ?disciplina=, também vale o vínculo direto (M2M) do professor com a disciplina.
+            possui_horario = Exists(disponibilidades.filter(professor=OuterRef('pk')))
+            disciplina_id = self.request.query_params.get('disciplina')
+            if disciplina_id:
+                possui_horario |= Exists(
+                    Disciplina.professores.through.objects.filter(usuario=OuterRef('pk'), disciplina_id=disciplina_id)
+                )
+            queryset = queryset.filter(possui_horario)
+
+        # Resumo de avaliações (1:1) no mesmo SELECT.
+        if UsuarioSerializer.inclui(self.request, 'avaliacoes'):
+            queryset = queryset.select_related('resumo_avaliacoes')
+
+        # Sem 'disponibilidades' na resposta (?fields=/?expand=), o prefetch é pulado.
+        if not UsuarioSerializer.inclui(self.request, 'disponibilidades'):
+            return queryset
+        return queryset.prefetch_related(
+            Prefetch('disponibilidade_set', queryset=disponibilidades),
+        )
+
+    def get_serializer_context(self):
+        # As disciplinas de cada professor vêm do mapeamento em cache (ver core/cache.py).
+        context = super().get_serializer_context()
+        if UsuarioSerializer.inclui(self.request, 'disciplinas'):
+            context['mapa_disciplinas'] = mapa_professor_disciplinas()
+        return context
+
+    # --- RANKING (Resumos de avaliações) ---
+    ORDENACOES_RANKING = {
+        'media': ('-media', '-total_avaliacoes', 'usuario_id'),
+        'avaliacoes': ('-total_avaliacoes', '-media', 'usuario_id'),
+        'aulas': ('-aulas_concluidas', '-media', 'usuario_id'),
+    }
+    LIMITE_RANKING = 10
+    LIMITE_RANKING_MAXIMO = 100
 
+    @action(detail=False, methods=['get'], url_path='ranking')
+    def ranking(self, request):
+        """
+        Professores mais bem avaliados, lidos de ResumoAvaliacoes (sem agregar a tabela de Avaliações).
+        ?ordenar=media|avaliacoes|aulas (padrão media), ?minimo= avaliações para entrar no ranking (padrão 1)
+        e ?limite= (padrão 10, máximo 100).
+        """
+        params = request.query_params
+        ordenar = params.get('ordenar', 'media')
+        if ordenar not in self.ORDENACOES_RANKING:
+            raise ValidationError({'ordenar': f'Use um de: {", ".join(self.ORDENACOES_RANKING)}.'})
 
-class AlunoViewSet(viewsets.ModelViewSet):
+        numeros = {}
+        for parametro, padrao in (('minimo', 1), ('limite', self.LIMITE_RANKING)):
+            valor = params.get(parametro, str(padrao))
+            if not valor.isdigit():
+                raise ValidationError({parametro: 'Informe um número inteiro não negativo.'})
+            numeros[parametro] = int(valor)
+        if numeros['limite'] < 1:
+            raise ValidationError({'limite': 'Informe um número inteiro positivo.'})
+
+        resumos = (
+            ResumoAvaliacoes.objects.select_related('usuario')
+            .filter(papel='PROFESSOR', total_avaliacoes__gte=numeros['minimo'])
+            .order_by(*self.ORDENACOES_RANKING[ordenar])[:min(numeros['limite'], self.LIMITE_RANKING_MAXIMO)]
+        )
+
+        def gerar():
+            return Response([
+                {'posicao': posicao, 'id': resumo.usuario_id, 'nome': resumo.usuario.nome, **ResumoAvaliacoesSerializer(resumo).data}
+                for posicao, resumo in enumerate(resumos, start=1)
+            ])
+
+        return resposta_condicional(request, (ResumoAvaliacoes, Usuario), gerar)
+
+
+class AlunoViewSet(LeituraReplicaMixin, viewsets.ModelViewSet):
     queryset = Usuario.objects.filter(tipo='ALUNO')
     serializer_class = UsuarioSerializer
     # Regra de Segurança: Garante que apenas usuários logados possam ver dados de Alunos (privacidade).
     permission_classes = [IsAuthenticated] 
 
+    def get_queryset(self):
+        return usuarios_otimizados(super().get_queryset(), self.request)
+
 
-class DisponibilidadeViewSet(viewsets.ModelViewSet):
+class DisponibilidadeViewSet(LeituraReplicaMixin, ETagMixin, ListagemRapidaMixin, viewsets.ModelViewSet):
     # Usado principalmente pelo Professor para criar, listar e excluir seus horários.
     queryset = Disponibilidade.objects.all()
     serializer_class = DisponibilidadeSerializer
+    modelos_etag = (Disponibilidade, Usuario, Disciplina)
+
+    def get_queryset(self):
+        # JOINs apenas para os nomes pedidos na resposta (professor_nome / disciplina_nome).
+        relacionados = [
+            relacao for relacao in ('professor', 'disciplina')
+            if DisponibilidadeSerializer.inclui(self.request, f'{relacao}_nome')
+        ]
+        queryset = super().get_queryset()
+        return queryset.select_related(*relacionados) if relacionados else queryset
+
+    # --- BUSCA DE HORÁRIOS ---
+    LIMITE_BUSCA = 50
+    LIMITE_BUSCA_MAXIMO = 200
+
+    @action(detail=False, methods=['get'], url_path='busca')
+    def buscar(self, request):
+        """
+        Busca de horários com os filtros de filtrar_horarios e ?professor=, ordenada do mais próximo
+        para o mais distante. ?limite= controla a quantidade (padrão 50, máximo 200).
+        """
+        params = request.query_params
+        horarios, _ = filtrar_horarios(Disponibilidade.objects.all(), params)
+
+        professor_id = params.get('professor')
+        if professor_id:
+            if not professor_id.isdigit():
+                raise ValidationError({'professor': 'Informe o ID numérico do professor.'})
+            horarios = horarios.filter(professor_id=professor_id)
+
+        limite = params.get('limite', str(self.LIMITE_BUSCA))
+        if not limite.isdigit() or int(limite) < 1:
+            raise ValidationError({'limite': 'Informe um número inteiro positivo.'})
+        horarios = horarios.order_by('data', 'horario_inicio', 'id')[:min(int(limite), self.LIMITE_BUSCA_MAXIMO)]
+
+        return resposta_condicional(request, self.modelos_etag, lambda: Response(
+            DisponibilidadeSerializer.lista_rapida(horarios, self.get_serializer_context())
+        ), extra_etag_horarios(params))
+
+    # --- RECORRÊNCIA (Criação e exclusão de séries em lote) ---
+    @action(detail=False, methods=['post'], url_path='recorrencia', permission_classes=[IsAuthenticated])
+    def criar_recorrencia(self, request):
+        # Cria todos os horários de um padrão semanal em UMA requisição (bulk_create em uma transação).
+        if request.user.tipo != 'PROFESSOR':
+            return Response({'detail': 'Apenas professores podem publicar horários.'}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = RecorrenciaSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        criados = serializer.save(professor=request.user)
+
+        return Response({
+            'serie': criados[0].serie,
+            'criados': len(criados),
+            'disponibilidades': DisponibilidadeSerializer(criados, many=True).data,
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['delete'], url_path=r'recorrencia/(?P<serie>[0-9a-f-]{36})', permission_classes=[IsAuthenticated])
+    def excluir_recorrencia(self, request, serie=None):
+        # Exclusão em lote de uma série: apenas horários livres e sem histórico são removidos. Os reservados e os que
+        # já tiveram agendamento (ex.: cancelado, talvez avaliado) são mantidos: o DELETE levaria esses registros em cascata.
+        horarios = Disponibilidade.objects.filter(serie=serie, professor=request.user)
+        if not horarios.exists():
+            return Response({'detail': 'Série não encontrada.'}, status=status.HTTP_404_NOT_FOUND)
+
+        com_agendamento = Agendamento.objects.filter(disponibilidade=OuterRef('pk'))
+        _, excluidos_por_modelo = horarios.filter(disponivel=True).exclude(Exists(com_agendamento)).delete()
+        excluidos = excluidos_por_modelo.get(Disponibilidade._meta.label, 0)
+        mantidos = horarios.count()
+        return Response({'excluidos': excluidos, 'mantidos': mantidos}, status=status.HTTP_200_OK)
+
+def agendamentos_otimizados(user, request=None):
+    # Queryset base de Agendamento com tudo o que o AgendamentoSerializer lê, em número fixo de queries.
+    # select_related: Carrega aluno, professor e disciplina no mesmo JOIN (evita N+1 no AgendamentoSerializer).
+    # Com ?fields=/?expand= no request, só entram os JOINs e o prefetch dos campos pedidos.
+    def inclui(*campos):
+        return AgendamentoSerializer.inclui(request, *campos)
+
+    # A avaliação aninhada (AvaliacaoSerializer) também projeta os nomes de aluno, professor e disciplina.
+    relacionados = [
+        relacao for relacao, campos in (
+            ('aluno', ('aluno_nome', 'avaliacao')),
+            ('disponibilidade__professor', ('professor_nome', 'avaliacao')),
+            ('disponibilidade__disciplina', ('disciplina_nome', 'avaliacao')),
+            ('disponibilidade', ('data', 'hora', 'assunto', 'link_aula')),
+        )
+        if inclui(*campos)
+    ]
+    # Atenção: select_related() sem argumentos seguiria TODAS as FKs, por isso o teste da lista vazia.
+    queryset = Agendamento.objects.select_related(*relacionados) if relacionados else Agendamento.objects.all()
+
+    # Prefetch da avaliação do PRÓPRIO usuário logado: uma única query extra, consumida por get_avaliacao.
+    if user.is_authenticated and inclui('avaliacao'):
+        queryset = queryset.prefetch_related(Prefetch(
+            'avaliacao_set',
+            queryset=Avaliacao.objects.filter(tipo_avaliador=user.tipo),
+            to_attr='minhas_avaliacoes',
+        ))
+    return queryset
 
-class AgendamentoViewSet(viewsets.ModelViewSet):
+def filtrar_agendamentos(queryset, params):
+    # Filtros dos dashboards, aplicados igualmente à tabela quente e ao histórico arquivado.
+    aluno_id = params.get('aluno_id')
+    prof_id = params.get('professor_id')
+
+    if aluno_id:
+        # Filtro para o Dashboard do Aluno: Mostra apenas suas aulas.
+        queryset = queryset.filter(aluno_id=aluno_id)
+    if prof_id:
+        # Filtro para o Dashboard do Professor: Mostra aulas agendadas em suas disponibilidades.
+        queryset = queryset.filter(disponibilidade__professor_id=prof_id)
+    return queryset
+
+def incluir_historico(request):
+    return request.query_params.get('incluir_historico', '').lower() in ('1', 'true')
+
+def lista_serializada(serializer_class, queryset, contexto):
+    # Modo rápido (.values()) com fallback para o serializer normal.
+    dados = serializer_class.lista_rapida(queryset, contexto)
+    return dados if dados is not None else list(serializer_class(queryset, many=True, context=contexto).data)
+
+class AgendamentoViewSet(LeituraReplicaMixin, ETagMixin, ListagemRapidaMixin, viewsets.ModelViewSet):
     queryset = Agendamento.objects.all()
     serializer_class = AgendamentoSerializer
     # Regra de Segurança: Todas as operações de agendamento exigem login.
     permission_classes = [IsAuthenticated]
+    modelos_etag = (Agendamento, Disponibilidade, Avaliacao, Usuario, Disciplina)
     
     def get_queryset(self):
         # Otimização de Performance e Filtragem para Dashboards.
         # Permite que o frontend solicite apenas os agendamentos relevantes (do aluno logado OU do professor logado).
-        queryset = Agendamento.objects.all()
-        aluno_id = self.request.query_params.get('aluno_id')
-        prof_id = self.request.query_params.get('professor_id')
-        
-        if aluno_id:
-            # Filtro para o Dashboard do Aluno: Mostra apenas suas aulas.
-            queryset = queryset.filter(aluno_id=aluno_id)
-        if prof_id:
-            # Filtro para o Dashboard do Professor: Mostra aulas agendadas em suas disponibilidades.
-            queryset = queryset.filter(disponibilidade__professor_id=prof_id)
-            
-        return queryset
+        return filtrar_agendamentos(agendamentos_otimizados(self.request.user, self.request), self.request.query_params)
+
+    def list(self, request, *args, **kwargs):
+        # Padrão: só a tabela quente. ?incluir_historico=1 acrescenta os agendamentos arquivados (core/arquivo.py).
+        if not incluir_historico(request):
+            return super().list(request, *args, **kwargs)
+        return resposta_condicional(request, self.modelos_etag + MODELOS_ARQUIVO, lambda: Response(self.listar_com_historico()))
+
+    def listar_com_historico(self):
+        contexto = self.get_serializer_context()
+        arquivados = filtrar_agendamentos(AgendamentoArquivado.objects.order_by('pk'), self.request.query_params)
+        return (
+            lista_serializada(AgendamentoSerializer, self.filter_queryset(self.get_queryset()), contexto)
+            + lista_serializada(AgendamentoArquivadoSerializer, arquivados, contexto)
+        )
+
+    # Reserva, reativação e cancelamento passam pelo motor atômico do Agendamento.save().
+    # O pedido que perde a disputa por um horário recebe 409 (Conflict). Picos de escrita que travam o SQLite
+    # são repetidos (repetir_se_bloqueado, ver core/concorrencia.py) e, esgotadas as tentativas, viram 503.
+    @repetir_se_bloqueado
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    @repetir_se_bloqueado
+    def update(self, request, *args, **kwargs):
+        # Também cobre o PATCH: partial_update() chama update().
+        return super().update(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        try:
+            serializer.save()
+        except HorarioIndisponivel as erro:
+            raise ConflitoAgendamento(erro.messages[0])
 
-class AvaliacaoViewSet(viewsets.ModelViewSet):
+    def perform_update(self, serializer):
+        try:
+            serializer.save()
+        except HorarioIndisponivel as erro:
+            raise ConflitoAgendamento(erro.messages[0])
+
+    @action(detail=False, methods=['post'], url_path='acoes')
+    @repetir_se_bloqueado
+    def acoes_em_lote(self, request):
+        # Confirma, rejeita ou conclui uma lista de agendamentos em UMA requisição (Dashboard do Professor).
+        # Retorna o resultado por ID: os inválidos não impedem a aplicação dos válidos.
+        if request.user.tipo != 'PROFESSOR':
+            return Response({'detail': 'Apenas professores podem gerenciar agendamentos.'}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = AcaoEmLoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        resultados = serializer.save(professor=request.user)
+        return Response({'resultados': resultados}, status=status.HTTP_200_OK)
+
+class AvaliacaoViewSet(LeituraReplicaMixin, ListagemRapidaMixin, viewsets.ModelViewSet):
     queryset = Avaliacao.objects.all()
     serializer_class = AvaliacaoSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_queryset(self):
+        # JOINs para os nomes projetados (aluno, professor, disciplina), apenas se pedidos na resposta.
+        relacionados = [
+            relacao for relacao, campo in (
+                ('agendamento__aluno', 'nome_aluno'),
+                ('agendamento__disponibilidade__professor', 'nome_professor'),
+                ('agendamento__disponibilidade__disciplina', 'disciplina_nome'),
+            )
+            if AvaliacaoSerializer.inclui(self.request, campo)
+        ]
+        queryset = super().get_queryset()
+        return queryset.select_related(*relacionados) if relacionados else queryset
+
     def perform_create(self, serializer):
         # Intercepta o salvamento para definir automaticamente quem está avaliando (ALUNO ou PROFESSOR)
         # baseado no usuário logado. Isso impede que o sistema use o valor padrão 'ALUNO' incorretamente.
@@ -148,7 +520,7 @@ def download_certificado(request, agendamento_id):
     try:
         agendamento = get_object_or_404(Agendamento, pk=agendamento_id)
     except Exception:
-        return Response({'detail': 'Agendamento não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+        return certificado_arquivado(request, agendamento_id)
 
     # Regra: Só pode emitir se a aula CONCLUÍDA e se o usuário logado for o ALUNO.
     if agendamento.status != 'CONCLUIDO' or agendamento.aluno != request.user:
@@ -164,7 +536,25 @@ def download_certificado(request, agendamento_id):
         defaults={'codigo_validacao': codigo_default}
     )
 
-    # 4. CONTEXTO DE RETORNO (para fins de debug/confirmação)
+    # 4 e 5. RESPOSTA: Indica sucesso e informa que a visualização é responsabilidade do cliente.
+    return Response(dados_certificado(agendamento, certificado), status=status.HTTP_200_OK)
+
+
+def certificado_arquivado(request, agendamento_id):
+    # Aula já movida para o histórico (core/arquivo.py): devolve o certificado emitido antes do arquivamento.
+    certificado = (
+        CertificadoArquivado.objects
+        .select_related('agendamento__aluno', 'agendamento__disponibilidade__professor', 'agendamento__disponibilidade__disciplina')
+        .filter(agendamento_id=agendamento_id, agendamento__aluno=request.user)
+        .first()
+    )
+    if certificado is None:
+        return Response({'detail': 'Agendamento não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(dados_certificado(certificado.agendamento, certificado), status=status.HTTP_200_OK)
+
+
+def dados_certificado(agendamento, certificado):
+    # Corpo da resposta do certificado (compartilhado com a leitura assíncrona em views_async.py).
     context = {
         'nome_pessoa': agendamento.aluno.nome,
         'materia': agendamento.disponibilidade.disciplina.nome if agendamento.disponibilidade.disciplina else 'Tira-Dúvidas',
@@ -173,9 +563,491 @@ def download_certificado(request, agendamento_id):
         'horas': certificado.horas,
         'codigo': certificado.codigo_validacao,
     }
-
-    # 5. RESPOSTA: Indica sucesso e informa que a visualização é responsabilidade do cliente.
-    return Response({
+    return {
         'detail': 'Certificado registrado com sucesso. Use a função de impressão do navegador.',
         'dados': context
-    }, status=status.HTTP_200_OK)
\ No newline at end of file
+    }
+
+
+# --- VERIFICAÇÃO PÚBLICA DE CERTIFICADO ---
+FORMATO_CODIGO = re.compile(r'[A-Za-z0-9-]{1,64}')
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+@throttle_classes([VerificacaoCertificadoThrottle])
+def verificar_certificado(request, codigo):
+    """
+    Decisão: Escolas que recebem um certificado conferem o código sem login. A consulta é UMA query
+    com JOINs; acertos e códigos inexistentes ficam em caches LRU com TTL (core/cache.py), e o limite
+    por IP (core/throttling.py) impede que verificações em lote sobrecarreguem o banco.
+    """
+    if not FORMATO_CODIGO.fullmatch(codigo):
+        # Fora do formato nunca existe: responde sem banco e sem ocupar o cache negativo.
+        return Response({'valido': False, 'detail': 'Certificado não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+
+    dados = certificados_verificados.obter(codigo)
+    if dados is AUSENTE:
+        if codigos_inexistentes.obter(codigo) is not AUSENTE:
+            dados = None
+        else:
+            dados = dados_verificacao(codigo)
+            if dados is None:
+                codigos_inexistentes.guardar(codigo, True)
+            else:
+                certificados_verificados.guardar(codigo, dados)
+
+    if dados is None:
+        return Response({'valido': False, 'detail': 'Certificado não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(dados, status=status.HTTP_200_OK)
+
+
+def dados_verificacao(codigo):
+    # Titular, disciplina, professor, data e horas em uma única query (JOINs até Usuario e Disciplina),
+    # com UNION ALL no histórico arquivado: certificados de aulas antigas continuam verificáveis.
+    def consulta(modelo):
+        return modelo.objects.filter(codigo_validacao=codigo).values(
+            'codigo_validacao', 'horas', 'data_emissao',
+            titular=F('agendamento__aluno__nome'),
+            professor=F('agendamento__disponibilidade__professor__nome'),
+            disciplina=F('agendamento__disponibilidade__disciplina__nome'),
+            data_aula=F('agendamento__disponibilidade__data'),
+        )
+
+    linhas = list(consulta(Certificado).union(consulta(CertificadoArquivado), all=True)[:1])
+    if not linhas:
+        return None
+    linha = linhas[0]
+    return {
+        'valido': True,
+        'codigo': linha['codigo_validacao'],
+        'titular': linha['titular'],
+        'disciplina': linha['disciplina'] or 'Tira-Dúvidas',
+        'professor': linha['professor'],
+        'data_aula': linha['data_aula'].isoformat(),
+        'data_emissao': timezone.localtime(linha['data_emissao']).date().isoformat(),
+        'horas': linha['horas'],
+    }
+
+
+# --- HORAS VOLUNTÁRIAS (Relatórios do livro-razão, ver core/horas.py) ---
+MODELOS_HORAS = (HorasVoluntarias, HorasPorUsuarioAno, HorasPorDisciplinaMes, Usuario, Disciplina)
+AGRUPAMENTOS_HORAS = {
+    'usuario': ('usuario', 'usuario__nome', 'papel'),
+    'disciplina': ('disciplina', 'disciplina__nome'),
+    'mes': ('mes',),
+}
+LIMITE_RELATORIO_HORAS = 100
+LIMITE_RELATORIO_HORAS_MAXIMO = 1000
+
+def filtrar_horas(lancamentos, params):
+    """
+    Filtros dos relatórios de horas: ?ano=AAAA, ?de=/?ate=AAAA-MM (meses inclusivos) e ?disciplina=.
+    Servem aos níveis mensais do livro (HorasVoluntarias e HorasPorDisciplinaMes).
+    """
+    ano = params.get('ano')
+    if ano:
+        if not (ano.isdigit() and len(ano) == 4):
+            raise ValidationError({'ano': 'Use o formato AAAA.'})
+        lancamentos = lancamentos.filter(mes__year=int(ano))
+
+    for campo, lookup in (('de', 'mes__gte'), ('ate', 'mes__lte')):
+        valor = params.get(campo)
+        if valor:
+            try:
+                mes = parse_date(f'{valor}-01')
+            except ValueError:
+                mes = None
+            if mes is None:
+                raise ValidationError({campo: 'Use o formato AAAA-MM.'})
+            lancamentos = lancamentos.filter(**{lookup: mes})
+
+    disciplina_id = params.get('disciplina')
+    if disciplina_id:
+        if not disciplina_id.isdigit():
+            raise ValidationError({'disciplina': 'Informe o ID numérico da disciplina.'})
+        lancamentos = lancamentos.filter(disciplina_id=disciplina_id)
+    return lancamentos
+
+
+def somar_horas(lancamentos, *campos):
+    # Agregação sobre as linhas já consolidadas do livro, nunca sobre os Certificados.
+    return lancamentos.values(*campos).annotate(horas=Sum('horas'), certificados=Sum('certificados'))
+
+
+def linha_horas(linha):
+    # Formato de saída: mês como AAAA-MM e disciplina nula como a padrão.
+    if 'mes' in linha:
+        linha['mes'] = linha['mes'].strftime('%Y-%m')
+    if 'disciplina__nome' in linha:
+        linha['disciplina_nome'] = linha.pop('disciplina__nome') or DISCIPLINA_PADRAO
+    if 'usuario__nome' in linha:
+        linha['nome'] = linha.pop('usuario__nome')
+    return linha
+
+
+@api_view(['GET'])
+def horas_usuario(request):
+    """
+    Horas voluntárias do usuário logado (professor: lecionadas; aluno: assistidas), com total,
+    quebra por mês e por disciplina. Administradores podem consultar outro usuário com ?usuario=<id>.
+    """
+    if not request.user.is_authenticated:
+        return Response({'detail': 'Autenticação necessária.'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    usuario = request.user
+    usuario_id = request.query_params.get('usuario')
+    if usuario_id and usuario_id != str(usuario.id):
+        if not usuario.is_staff:
+            return Response({'detail': 'Apenas administradores consultam outros usuários.'}, status=status.HTTP_403_FORBIDDEN)
+        if not usuario_id.isdigit():
+            raise ValidationError({'usuario': 'Informe o ID numérico do usuário.'})
+        usuario = get_object_or_404(Usuario, pk=usuario_id)
+
+    lancamentos = filtrar_horas(HorasVoluntarias.objects.filter(usuario=usuario), request.query_params)
+
+    def gerar():
+        por_mes = [linha_horas(linha) for linha in somar_horas(lancamentos, 'mes').order_by('mes')]
+        por_disciplina = [
+            linha_horas(linha) for linha in somar_horas(lancamentos, 'disciplina', 'disciplina__nome').order_by('-horas', 'disciplina')
+        ]
+        return Response({
+            'usuario': usuario.id,
+            'nome': usuario.nome,
+            'papel': usuario.tipo,
+            'total_horas': sum((linha['horas'] for linha in por_mes), Decimal(0)),
+            'certificados': sum(linha['certificados'] for linha in por_mes),
+            'por_mes': por_mes,
+            'por_disciplina': por_disciplina,
+        })
+
+    return resposta_condicional(request, MODELOS_HORAS, gerar, extra=str(usuario.id))
+
+
+@api_view(['GET'])
+def relatorio_horas(request):
+    """
+    Relatório geral (apenas administradores): horas agrupadas por ?agrupar=usuario|disciplina|mes
+    (padrão usuario), com os filtros de filtrar_horas, ?papel=PROFESSOR|ALUNO e ?limite= (padrão 100, máximo 1000).
+    """
+    if not request.user.is_authenticated:
+        return Response({'detail': 'Autenticação necessária.'}, status=status.HTTP_401_UNAUTHORIZED)
+    if not request.user.is_staff:
+        return Response({'detail': 'Apenas administradores.'}, status=status.HTTP_403_FORBIDDEN)
+
+    params = request.query_params
+    agrupar = params.get('agrupar', 'usuario')
+    if agrupar not in AGRUPAMENTOS_HORAS:
+        raise ValidationError({'agrupar': f'Use um de: {", ".join(AGRUPAMENTOS_HORAS)}.'})
+
+    papel = params.get('papel')
+    if papel and papel not in dict(Usuario.TIPO_CHOICES):
+        raise ValidationError({'papel': 'Use PROFESSOR ou ALUNO.'})
+
+    limite = params.get('limite', str(LIMITE_RELATORIO_HORAS))
+    if not limite.isdigit() or int(limite) < 1:
+        raise ValidationError({'limite': 'Informe um número inteiro positivo.'})
+    limite = min(int(limite), LIMITE_RELATORIO_HORAS_MAXIMO)
+
+    # Totais, séries por mês e por disciplina: nível (papel, disciplina, mês), poucas centenas de linhas.
+    consolidado = filtrar_horas(HorasPorDisciplinaMes.objects.all(), params)
+    # Ranking por usuário: nível (usuário, ano) quando o período é o ano inteiro (ou todo o histórico);
+    # recortes por mês ou disciplina descem ao livro mensal.
+    if agrupar != 'usuario':
+        lancamentos = consolidado
+    elif any(params.get(campo) for campo in ('de', 'ate', 'disciplina')):
+        lancamentos = filtrar_horas(HorasVoluntarias.objects.all(), params)
+    else:
+        lancamentos = HorasPorUsuarioAno.objects.all()
+        if params.get('ano'):
+            lancamentos = lancamentos.filter(ano=int(params['ano'])) # Formato já validado em filtrar_horas.
+    if papel:
+        consolidado = consolidado.filter(papel=papel)
+        lancamentos = lancamentos.filter(papel=papel)
+
+    def gerar():
+        campos = AGRUPAMENTOS_HORAS[agrupar]
+        ordem = ('mes',) if agrupar == 'mes' else ('-horas', campos[0])
+        linhas = [linha_horas(linha) for linha in somar_horas(lancamentos, *campos).order_by(*ordem)[:limite]]
+        totais = consolidado.aggregate(horas=Sum('horas'), certificados=Sum('certificados'))
+        return Response({
+            'agrupar': agrupar,
+            'total_horas': totais['horas'] or Decimal(0),
+            'certificados': totais['certificados'] or 0,
+            'linhas': linhas,
+        })
+
+    return resposta_condicional(request, MODELOS_HORAS, gerar)
+
+
+# --- EXPORTAÇÕES (CSV/NDJSON em streaming, ver core/exportacao.py) ---
+@api_view(['GET'])
+def exportar(request, nome):
+    """
+    Extração completa (apenas administradores) de agendamentos, avaliações ou certificados, em
+    ?formato=csv (padrão) ou ndjson. Filtros: ?de=/?ate= (AAAA-MM-DD, data da aula), ?professor=,
+    ?disciplina= e ?incluir_historico=1 (acrescenta o histórico arquivado).
+    """
+    if not request.user.is_authenticated:
+        return Response({'detail': 'Autenticação necessária.'}, status=status.HTTP_401_UNAUTHORIZED)
+    if not request.user.is_staff:
+        return Response({'detail': 'Apenas administradores.'}, status=status.HTTP_403_FORBIDDEN)
+    if nome not in exportacao.EXPORTACOES:
+        return Response({'detail': 'Exportação não encontrada.'}, status=status.HTTP_404_NOT_FOUND)
+
+    params = request.query_params
+    formato = params.get('formato', 'csv')
+    if formato not in exportacao.FORMATOS:
+        raise ValidationError({'formato': f'Use um de: {", ".join(exportacao.FORMATOS)}.'})
+
+    filtros = {}
+    for campo in ('de', 'ate'):
+        valor = params.get(campo)
+        if valor:
+            try:
+                filtros[campo] = parse_date(valor)
+            except ValueError:
+                filtros[campo] = None
+            if filtros[campo] is None:
+                raise ValidationError({campo: 'Use o formato AAAA-MM-DD.'})
+    for campo in ('professor', 'disciplina'):
+        valor = params.get(campo)
+        if valor:
+            if not valor.isdigit():
+                raise ValidationError({campo: 'Informe um ID numérico.'})
+            filtros[campo] = int(valor)
+
+    consultas = exportacao.querysets(nome, filtros, incluir_historico(request))
+    cabecalho, formatar = exportacao.formatador(nome, formato)
+    if isinstance(request._request, ASGIRequest):
+        conteudo = exportacao.alinhas(consultas, cabecalho, formatar)
+    else:
+        conteudo = exportacao.linhas(consultas, cabecalho, formatar)
+
+    response = StreamingHttpResponse(conteudo, content_type=exportacao.FORMATOS[formato])
+    arquivo = f'{nome}-{timezone.localtime():%Y%m%d-%H%M%S}.{formato}'
+    response['Content-Disposition'] = f'attachment; filename="{arquivo}"'
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+# --- IMPORTAÇÃO EM LOTE (onboarding de escolas parceiras, ver core/importacao.py) ---
+@api_view(['POST'])
+def importar(request, tipo):
+    """
+    Importa 'usuarios' ou 'disponibilidades' de um arquivo enviado em multipart (campo 'arquivo'), em CSV,
+    NDJSON ou array JSON (?formato=, padrão: pela extensão). ?simular=1 só valida. Apenas administradores.
+    Responde com o relatório (erros por linha e linhas/s); 400 se o arquivo em si for inválido.
+    """
+    if not request.user.is_authenticated:
+        return Response({'detail': 'Autenticação necessária.'}, status=status.HTTP_401_UNAUTHORIZED)
+    if not request.user.is_staff:
+        return Response({'detail': 'Apenas administradores.'}, status=status.HTTP_403_FORBIDDEN)
+    if tipo not in importacao.IMPORTACOES:
+        return Response({'detail': 'Importação não encontrada.'}, status=status.HTTP_404_NOT_FOUND)
+
+    enviado = request.FILES.get('arquivo')
+    if enviado is None:
+        raise ValidationError({'arquivo': 'Envie o arquivo no campo "arquivo" (multipart/form-data).'})
+    try:
+        formato = importacao.formato_do_arquivo(enviado.name, request.query_params.get('formato'))
+    except ArquivoInvalido as erro:
+        raise ValidationError({'formato': str(erro)})
+
+    # O upload é lido em streaming (TextIOWrapper sobre o arquivo enviado), sem decodificar tudo de uma vez.
+    arquivo = io.TextIOWrapper(enviado.file, encoding='utf-8-sig', newline='')
+    simular = request.query_params.get('simular', '').lower() in ('1', 'true')
+    # Pool de hash limitado (PROCESSOS_IMPORTACAO_HTTP): uploads simultâneos não multiplicam processos por CPU.
+    processos = max(1, min(settings.PROCESSOS_IMPORTACAO_HTTP, os.cpu_count() or 1))
+    resultado = importacao.importar(tipo, arquivo, formato, processos=processos, simular=simular)
+    codigo = status.HTTP_400_BAD_REQUEST if 'erro_arquivo' in resultado else status.HTTP_200_OK
+    return Response(resultado, status=codigo)
+
+
+# --- DASHBOARD (Agregado em uma única requisição) ---
+@api_view(['GET'])
+@em_replica
+def dashboard(request):
+    """
+    Decisão: O painel (Aluno ou Professor) é montado no backend em UMA requisição,
+    com número fixo de queries, em vez de 2-3 chamadas paralelas do dashboard.js.
+    """
+    if not request.user.is_authenticated:
+        return Response({'detail': 'Autenticação necessária.'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    # GET condicional: responde 304 sem montar o painel se nada mudou desde a última visita.
+    # A data entra no ETag: os horários livres de ontem saem do painel sem que nenhuma tabela mude.
+    modelos = (Agendamento, Disponibilidade, Avaliacao, Usuario, Disciplina)
+    return resposta_condicional(request, modelos, lambda: montar_dashboard(request), timezone.localdate().isoformat())
+
+
+def montar_dashboard(request):
+    user = request.user
+    is_professor = user.tipo == 'PROFESSOR'
+
+    # 1. AGENDAMENTOS (1 query + 1 prefetch): do aluno logado OU das disponibilidades do professor logado.
+    agendamentos = agendamentos_otimizados(user)
+    if is_professor:
+        agendamentos = agendamentos.filter(disponibilidade__professor=user)
+    else:
+        agendamentos = agendamentos.filter(aluno=user)
+    agendamentos = list(agendamentos.order_by('disponibilidade__data', 'disponibilidade__horario_inicio'))
+
+    # A divisão entre próximas e passadas é feita em memória para não repetir a query.
+    proximas = [ag for ag in agendamentos if ag.status in ('AGENDADO', 'CONFIRMADO')]
+    passadas = [ag for ag in reversed(agendamentos) if ag.status in ('CONCLUIDO', 'CANCELADO')]
+    avaliacoes_pendentes = [ag.id for ag in passadas if ag.status == 'CONCLUIDO' and not ag.minhas_avaliacoes]
+
+    # 2. HORÁRIOS LIVRES (apenas Professor, 1 query): futuros e ainda não reservados.
+    horarios_livres = []
+    if is_professor:
+        horarios_livres = (
+            Disponibilidade.objects.select_related('professor', 'disciplina')
+            .filter(professor=user, disponivel=True, data__gte=timezone.localdate())
+            .order_by('data', 'horario_inicio')
+        )
+
+    contexto = {'request': request}
+    return Response({
+        'usuario': {'id': user.id, 'nome': user.nome, 'tipo': user.tipo},
+        'proximas_aulas': AgendamentoSerializer(proximas, many=True, context=contexto).data,
+        'aulas_passadas': AgendamentoSerializer(passadas, many=True, context=contexto).data,
+        'horarios_livres': DisponibilidadeSerializer(horarios_livres, many=True).data,
+        'avaliacoes_pendentes': avaliacoes_pendentes,
+        # 3. DISCIPLINAS (1 query): usadas no modal de "Novo Horário".
+        'disciplinas': DisciplinaSerializer(Disciplina.objects.all(), many=True).data,
+    })
+
+
+# --- BUSCA TEXTUAL (Disciplinas, Horários e Professores) ---
+LIMITE_BUSCA_TEXTUAL = 20
+LIMITE_BUSCA_TEXTUAL_MAXIMO = 100
+
+@api_view(['GET'])
+def busca_textual(request):
+    """
+    Decisão: A busca é feita no índice FTS5 (core/busca.py), sem acentos e sem diferenciar maiúsculas,
+    ordenada por relevância, em vez de o frontend baixar tudo e filtrar em memória.
+    Parâmetros: ?q= (obrigatório), ?tipos=disciplina,horario,professor e ?limite= (padrão 20, máximo 100).
+    """
+    if not busca.suportada():
+        return Response({'detail': 'A busca textual exige o SQLite (FTS5).'}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+    params = request.query_params
+    consulta = busca.montar_consulta(params.get('q', ''))
+    if not consulta:
+        raise ValidationError({'q': 'Informe ao menos uma palavra com duas letras ou mais.'})
+
+    tipos = tuple(params.get('tipos', ','.join(busca.TIPOS)).split(','))
+    invalidos = [tipo for tipo in tipos if tipo not in busca.TIPOS]
+    if invalidos:
+        raise ValidationError({'tipos': f'Tipos inválidos: {", ".join(invalidos)}. Use {", ".join(busca.TIPOS)}.'})
+
+    limite = params.get('limite', str(LIMITE_BUSCA_TEXTUAL))
+    if not limite.isdigit() or int(limite) < 1:
+        raise ValidationError({'limite': 'Informe um número inteiro positivo.'})
+    limite = min(int(limite), LIMITE_BUSCA_TEXTUAL_MAXIMO)
+
+    def gerar():
+        resultados = busca.buscar(consulta, tipos, limite)
+        completar_horarios(resultados)
+        return Response({'q': params.get('q'), 'resultados': resultados})
+
+    # Horários só aparecem enquanto livres e futuros (ver busca.buscar): o relógio também entra no ETag.
+    extra = minuto_atual() if busca.HORARIO in tipos else ''
+    return resposta_condicional(request, (Disciplina, Disponibilidade, Usuario), gerar, extra)
+
+
+def completar_horarios(resultados):
+    # Dados para exibir/agendar o horário encontrado (1 query para todos os horários da página).
+    horarios = [item for item in resultados if item['tipo'] == busca.HORARIO]
+    if not horarios:
+        return
+    linhas = {
+        linha['id']: linha for linha in Disponibilidade.objects.filter(id__in=[item['id'] for item in horarios]).values(
+            'id', 'professor', 'professor__nome', 'disciplina', 'disciplina__nome', 'nivel', 'data', 'horario_inicio'
+        )
+    }
+    for item in horarios:
+        linha = linhas[item['id']]
+        item.update({
+            'professor': linha['professor'],
+            'professor_nome': linha['professor__nome'],
+            'disciplina': linha['disciplina'],
+            'disciplina_nome': linha['disciplina__nome'] if linha['disciplina'] is not None else DISCIPLINA_PADRAO,
+            'nivel': linha['nivel'],
+            'data': linha['data'],
+            'horario_inicio': linha['horario_inicio'],
+        })
+        # Horário sem assunto: o título exibido é o nome da disciplina.
+        item['titulo'] = item['titulo'] or item['disciplina_nome']
+
+
+# --- MÉTRICAS (Prometheus) ---
+def metricas(request):
+    # Exposição em texto do Prometheus com os agregados deste processo (um registro por worker).
+    # Latência e tráfego por rota não são públicos: token do Prometheus (TOKEN_METRICAS) ou administrador logado.
+    if not (token_metricas_valido(request) or request.user.is_staff):
+        if request.user.is_authenticated:
+            return JsonResponse({'detail': 'Apenas administradores.'}, status=403)
+        response = JsonResponse({'detail': 'Autenticação necessária.'}, status=401)
+        response['WWW-Authenticate'] = 'Bearer realm="metricas"'
+        return response
+    return HttpResponse(registro_metricas.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def token_metricas_valido(request):
+    # Comparação em tempo constante: o tempo de resposta não revela quantos caracteres do token acertaram.
+    if not settings.TOKEN_METRICAS:
+        return False
+    enviado = request.headers.get('Authorization', '').encode()
+    return hmac.compare_digest(enviado, f'Bearer {settings.TOKEN_METRICAS}'.encode())
+
+
+# --- STREAM DE DISPONIBILIDADES (Server-Sent Events, apenas ASGI) ---
+INTERVALO_HEARTBEAT = 15 # segundos: mantém a conexão viva através de proxies.
+
+async def stream_disponibilidades(request):
+    """
+    Decisão: Em vez de recarregar o catálogo inteiro, a tela Explorar assina um stream SSE
+    com os eventos aberto/reservado/liberado/removido/fechado das Disponibilidades.
+    Filtros opcionais: ?professor=<id> e ?disciplina=<id>.
+    """
+    if not isinstance(request, ASGIRequest):
+        # Sob WSGI cada conexão aberta prenderia uma thread do servidor: o stream exige o asgi.py.
+        return JsonResponse({'detail': 'O stream de eventos exige o servidor ASGI (Aula_Livre/asgi.py).'}, status=501)
+
+    filtros = {}
+    for parametro in ('professor', 'disciplina'):
+        valor = request.GET.get(parametro)
+        if valor:
+            if not valor.isdigit():
+                return JsonResponse({parametro: 'Informe um ID numérico.'}, status=400)
+            filtros[parametro] = int(valor)
+
+    ultimo_id = request.headers.get('Last-Event-ID') or request.GET.get('ultimo_id')
+    ultimo_id = int(ultimo_id) if ultimo_id and ultimo_id.isdigit() else None
+
+    # A assinatura é feita ANTES de devolver a resposta para não perder eventos no intervalo.
+    assinatura = canal_disponibilidades.assinar(
+        filtro=lambda dados: all(dados.get(campo) == valor for campo, valor in filtros.items()),
+        ultimo_id=ultimo_id,
+    )
+
+    async def eventos():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                evento = await assinatura.proximo(timeout=INTERVALO_HEARTBEAT)
+                if evento is None:
+                    yield ': ping\n\n'
+                    continue
+                yield f"id: {evento['id']}\nevent: {evento['tipo']}\ndata: {json.dumps(evento['dados'])}\n\n"
+        finally:
+            # Cliente desconectou (o handler ASGI cancela o gerador): libera a fila do assinante.
+            assinatura.cancelar()
+
+    response = StreamingHttpResponse(eventos(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no' # Desliga o buffer do nginx para entregar cada evento na hora.
+    return response
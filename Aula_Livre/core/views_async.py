@@ -0,0 +1,215 @@
+"""
+Leituras assíncronas (ORM assíncrono) dos endpoints GET mais acessados, servidas sob ASGI.
+
+Decisão: Sob o asgi.py, cada view síncrona do DRF roda em uma thread do pool do servidor.
+Estas versões atendem o caminho feliz (GET com JSON) direto no event loop; qualquer outro caso
+(outros métodos, API navegável, Basic Auth, erros 4xx) é repassado à view síncrona original,
+de modo que a saída é sempre idêntica à do WSGI. As rotas ficam em core/urls_async.py.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .cache import amapa_professor_disciplinas, aobter_ou_calcular
+from .mixins import aplicar_validadores, validadores
+from .models import Agendamento, Certificado, Disciplina, VersaoDados
+from .pagination import ProfessorCursorPagination
+from .roteamento import LeituraReplicaMixin, banco_de_leitura, lendo_de
+from .serializers import AgendamentoSerializer, DisciplinaSerializer, UsuarioSerializer
+from .views import AgendamentoViewSet, DisciplinaViewSet, ProfessorViewSet, dados_certificado
+
+renderizador_json = JSONRenderer()
+
+
+def com_leitura_assincrona(view_sync, leitura):
+    """
+    Junta uma leitura assíncrona ao view síncrono do DRF. A leitura recebe (request, user, **kwargs)
+    e devolve a resposta ou None para pedir o fallback síncrono.
+    """
+    view_sync_async = sync_to_async(view_sync)
+    metodos_permitidos = _metodos_permitidos(view_sync)
+    # Réplica de leitura só onde a view síncrona também a usa (ViewSets com LeituraReplicaMixin).
+    usa_replica = issubclass(view_sync.cls, LeituraReplicaMixin)
+
+    async def view(request, *args, **kwargs):
+        if _leitura_json(request):
+            user = await request.auser()
+            # Mesma regra de réplica das views síncronas: o contexto acompanha o sync_to_async do ORM assíncrono.
+            with lendo_de(banco_de_leitura(request) if usa_replica else None):
+                response = await leitura(request, user, **kwargs)
+            if response is not None:
+                response['Allow'] = metodos_permitidos
+                patch_vary_headers(response, ('Accept',))
+                return response
+        return await view_sync_async(request, *args, **kwargs)
+
+    # As views do DRF são isentas do CSRF do Django (a SessionAuthentication aplica o próprio).
+    return csrf_exempt(view)
+
+
+def _leitura_json(request):
+    # Só o caminho feliz: GET, resposta JSON (sem ?format= nem API navegável) e autenticação por sessão.
+    return (
+        request.method == 'GET'
+        and 'format' not in request.GET
+        and 'text/html' not in request.headers.get('Accept', '')
+        and 'Authorization' not in request.headers
+    )
+
+
+def _metodos_permitidos(view_sync):
+    # Mesmo cabeçalho 'Allow' que o DRF monta para a view original.
+    acoes = getattr(view_sync, 'actions', None)
+    classe = view_sync.cls
+    metodos = set(acoes) if acoes else {m for m in classe.http_method_names if hasattr(classe, m)}
+    metodos.add('options')
+    if 'get' in metodos:
+        metodos.add('head')
+    return ', '.join(m.upper() for m in classe.http_method_names if m in metodos)
+
+
+def _resposta_json(dados, status=200):
+    # Mesma renderização do JSONRenderer do DRF (compacta, UTF-8, sem escapar acentos).
+    return HttpResponse(renderizador_json.render(dados), status=status, content_type=renderizador_json.media_type)
+
+
+async def _condicional(request, user, modelos, gerar_resposta, extra=''):
+    # Equivalente assíncrono do resposta_condicional (core/mixins.py). O formato é sempre 'json' neste caminho.
+    versoes = await VersaoDados.aobter(*modelos)
+    etag, last_modified, nao_modificado = validadores(request, user, 'json', versoes, extra)
+    if nao_modificado:
+        response = HttpResponse(status=304, content_type=renderizador_json.media_type)
+    else:
+        response = await gerar_resposta()
+        if response is None:
+            return None
+    return aplicar_validadores(response, etag, last_modified)
+
+
+def _instanciar(viewset, request, user, action, **kwargs):
+    # Instancia o ViewSet só para reaproveitar get_queryset() (filtros da query string), sem dispatch.
+    drf_request = Request(request)
+    drf_request.user = user
+    return viewset(request=drf_request, format_kwarg=None, action=action, args=(), kwargs=kwargs)
+
+
+# --- CATÁLOGO DE PROFESSORES ---
+
+async def _contexto_professores(view):
+    # Mesmo contexto de ProfessorViewSet.get_serializer_context, com o mapa de disciplinas lido de forma assíncrona.
+    contexto = {'request': view.request, 'format': None, 'view': view}
+    if UsuarioSerializer.inclui(view.request, 'disciplinas'):
+        contexto['mapa_disciplinas'] = await amapa_professor_disciplinas()
+    return contexto
+
+
+async def listar_professores(request, user):
+    view = _instanciar(ProfessorViewSet, request, user, 'list')
+
+    async def gerar():
+        # Paginação do próprio DRF (uma thread do pool só para a query da página): cursores idênticos aos do WSGI.
+        # Filtro ou ?cursor= inválidos (ValidationError/NotFound) ficam com a view síncrona.
+        paginador = ProfessorCursorPagination()
+        try:
+            pagina = await sync_to_async(paginador.paginate_queryset)(view.get_queryset(), view.request, view)
+        except APIException:
+            return None
+        contexto = await _contexto_professores(view)
+        dados = UsuarioSerializer(pagina, many=True, context=contexto).data
+        return _resposta_json(paginador.get_paginated_response(dados).data)
+
+    return await _condicional(request, user, ProfessorViewSet.modelos_etag, gerar, view.extra_etag(view.request))
+
+
+async def detalhar_professor(request, user, pk):
+    view = _instanciar(ProfessorViewSet, request, user, 'retrieve', pk=pk)
+
+    async def gerar():
+        try:
+            professor = await view.get_queryset().filter(pk=pk).afirst()
+        except (APIException, ValueError):
+            return None
+        if professor is None:
+            return None
+        contexto = await _contexto_professores(view)
+        return _resposta_json(UsuarioSerializer(professor, context=contexto).data)
+
+    return await _condicional(request, user, ProfessorViewSet.modelos_etag, gerar, view.extra_etag(view.request))
+
+
+# --- AGENDAMENTOS ---
+
+async def listar_agendamentos(request, user):
+    # ?incluir_historico=1 (tabelas do arquivo) fica com a view síncrona.
+    if not user.is_authenticated or 'incluir_historico' in request.GET:
+        return None
+    view = _instanciar(AgendamentoViewSet, request, user, 'list')
+
+    async def gerar():
+        try:
+            agendamentos = [agendamento async for agendamento in view.get_queryset()]
+        except ValueError:
+            return None
+        contexto = {'request': view.request, 'format': None, 'view': view}
+        return _resposta_json(AgendamentoSerializer(agendamentos, many=True, context=contexto).data)
+
+    return await _condicional(request, user, AgendamentoViewSet.modelos_etag, gerar)
+
+
+# --- DISCIPLINAS (ETag + cache compartilhado com o CacheMixin) ---
+
+async def listar_disciplinas(request, user):
+    contexto = {'request': Request(request)}
+
+    async def calcular():
+        disciplinas = [disciplina async for disciplina in Disciplina.objects.all()]
+        return DisciplinaSerializer(disciplinas, many=True, context=contexto).data
+
+    async def gerar():
+        chave = f'disciplina:list:{request.get_full_path()}'
+        return _resposta_json(await aobter_ou_calcular(chave, DisciplinaViewSet.modelos_cache, calcular))
+
+    return await _condicional(request, user, DisciplinaViewSet.modelos_etag, gerar)
+
+
+async def detalhar_disciplina(request, user, pk):
+    contexto = {'request': Request(request)}
+
+    async def calcular():
+        disciplina = await Disciplina.objects.filter(pk=pk).afirst()
+        return DisciplinaSerializer(disciplina, context=contexto).data if disciplina else None
+
+    async def gerar():
+        try:
+            chave = f'disciplina:detail:{request.get_full_path()}'
+            dados = await aobter_ou_calcular(chave, DisciplinaViewSet.modelos_cache, calcular)
+        except ValueError:
+            return None
+        return _resposta_json(dados) if dados is not None else None
+
+    return await _condicional(request, user, DisciplinaViewSet.modelos_etag, gerar)
+
+
+# --- CERTIFICADO ---
+
+async def baixar_certificado(request, user, agendamento_id):
+    # Apenas o caminho feliz (aluno dono de aula CONCLUÍDA); 401/403/404 ficam com a view síncrona.
+    if not user.is_authenticated:
+        return None
+    agendamento = await (
+        Agendamento.objects.select_related('aluno', 'disponibilidade__professor', 'disponibilidade__disciplina')
+        .filter(pk=agendamento_id).afirst()
+    )
+    if agendamento is None or agendamento.status != 'CONCLUIDO' or agendamento.aluno_id != user.pk:
+        return None
+
+    codigo_default = f'AL-{agendamento_id}-{agendamento.disponibilidade.data.strftime("%Y%m%d")}'
+    certificado, _ = await Certificado.objects.aget_or_create(
+        agendamento=agendamento,
+        defaults={'codigo_validacao': codigo_default}
+    )
+    return _resposta_json(dados_certificado(agendamento, certificado))
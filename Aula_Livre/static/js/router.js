@@ -252,7 +252,8 @@ function configurarGestaoHorarios() {
             disciplina: document.getElementById('horario-disciplina').value,
             nivel: document.getElementById('horario-nivel').value,
             assunto: document.getElementById('horario-assunto').value,
-            link: document.getElementById('horario-link').value
+            link: document.getElementById('horario-link').value,
+            repetirAte: document.getElementById('horario-repetir-ate').value
         };
 
         // Chama a função de negócio (adicionarHorario) do dashboard.js.
@@ -4,7 +4,7 @@ import { authService } from '../services/auth.js'; // Importa o serviço de aute
 // Estas variáveis são essenciais para o fluxo de Single Page Application (SPA),
 // salvando o contexto (ID e Ação) antes de abrir modais de confirmação.
 let acaoPendente = null;         // Armazena a ação a ser executada ('confirmar_agendamento', 'excluir', etc.).
-let idPendente = null;           // Armazena o ID da entidade (Agendamento ou Disponibilidade) alvo da ação.
+let idPendente = null;           // Armazena o ID (ou a lista de IDs, nas ações em lote) da entidade alvo da ação.
 let modalConfirmacaoInstance = null; // Referência à instância do modal de confirmação do Bootstrap.
 let idAulaSendoAvaliada = null;  // Armazena o ID do agendamento que está sendo avaliado no momento.
 
@@ -59,8 +59,11 @@ function notificarSeguro(msg, tipo) {
 }
 
 // --- API (Busca de Dados para a Dashboard) ---
+let disciplinasCache = null; // Preenchido pelo /api/dashboard/ para evitar uma requisição extra no modal.
+
 async function buscarDisciplinas() {
     // Busca a lista completa de disciplinas para popular o modal de "Novo Horário".
+    if (disciplinasCache) return disciplinasCache;
     try {
         const response = await fetch('/api/disciplinas/');
         if(response.ok) return await response.json();
@@ -69,34 +72,19 @@ async function buscarDisciplinas() {
 }
 
 async function buscarMinhasAulas(usuario) {
-    // Função central que orquestra a busca de dados, usando filtros específicos para Aluno ou Professor.
-    const timestamp = new Date().getTime(); // Parâmetro anti-cache.
+    // Função central: UMA requisição ao endpoint agregado /api/dashboard/ (Aluno ou Professor).
     const isProfessor = usuario.tipo === 'PROFESSOR' || usuario.tipo === 'professor';
 
     try {
-        if (isProfessor) {
-            // Otimização de Performance: Busca Disponibilidades e Agendamentos em paralelo (Promise.all).
-            const [respDisp, respAgend] = await Promise.all([
-                // 1. Busca as disponibilidades aninhadas no perfil do professor.
-                fetch(`/api/professores/${usuario.id}/?t=${timestamp}`),
-                // 2. Busca os agendamentos filtrados pelo ID do professor (usando query param).
-                fetch(`/api/agendamentos/?professor_id=${usuario.id}&t=${timestamp}`)
-            ]);
-            
-            let disponibilidades = [];
-            let agendamentos = [];
-            
-            if (respDisp.ok) {
-                const dados = await respDisp.json();
-                disponibilidades = dados.disponibilidades || []; // Dados aninhados do Serializer.
-            }
-            if (respAgend.ok) agendamentos = await respAgend.json();
-            
-            return { disponibilidades, agendamentos };
-        } else {
-            // Fluxo do Aluno: Busca agendamentos filtrados apenas pelo ID do aluno.
-            const response = await fetch(`/api/agendamentos/?aluno_id=${usuario.id}&t=${timestamp}`);
-            if (response.ok) return await response.json();
+        // Sem parâmetro anti-cache: a API usa ETag e responde 304 quando o painel não mudou.
+        const response = await fetch('/api/dashboard/');
+        if (response.ok) {
+            const dados = await response.json();
+            disciplinasCache = dados.disciplinas;
+            const agendamentos = dados.proximas_aulas.concat(dados.aulas_passadas);
+
+            // Mantém o formato esperado pelos renderizadores (gerarTabelaProfessor / gerarTabelaAluno).
+            return isProfessor ? { disponibilidades: dados.horarios_livres, agendamentos } : agendamentos;
         }
     } catch (e) { console.error("Erro:", e); }
     
@@ -119,6 +107,7 @@ window.solicitarGerenciamento = function(id, acao) {
     };
 
     if (mensagens[acao]) txtConfirmacao.innerText = mensagens[acao];
+    if (Array.isArray(id)) txtConfirmacao.innerText += ` (${id.length} aulas)`;
 
     const modalEl = document.getElementById('modal-confirmacao');
     if (!modalConfirmacaoInstance) modalConfirmacaoInstance = new bootstrap.Modal(modalEl);
@@ -126,38 +115,46 @@ window.solicitarGerenciamento = function(id, acao) {
 }
 
 window.confirmarAcaoPendente = async function() {
-    // Executa a requisição real de alteração de estado (PATCH/DELETE) na API.
+    // Executa a requisição real de alteração de estado (POST em lote/DELETE) na API.
     const headers = { 'Content-Type': 'application/json', 'X-CSRFToken': getCookie('csrftoken') };
     let endpoint = '';
-    let method = 'PATCH';
+    let method = 'POST';
     let body = {};
 
+    // Ações sobre agendamentos usam o endpoint em lote (uma requisição para 1 ou N aulas).
+    const acoesEmLote = {
+        'confirmar_agendamento': 'confirmar', // Altera o status, ativando o link da aula (backend).
+        'rejeitar_agendamento': 'rejeitar',   // Cancela, liberando a disponibilidade (backend).
+        'concluir_aula': 'concluir'           // Permite Avaliação/Certificado.
+    };
+
     try {
         // Mapeia a ação pendente para o endpoint, método e payload corretos da API REST.
-        switch (acaoPendente) {
-            case 'excluir':
-                endpoint = `/api/disponibilidades/${idPendente}/`;
-                method = 'DELETE'; // Exclui um horário livre.
-                body = null;
-                break;
-            case 'confirmar_agendamento':
-                endpoint = `/api/agendamentos/${idPendente}/`;
-                body = { status: 'CONFIRMADO' }; // Altera o status, ativando o link da aula (backend).
-                break;
-            case 'rejeitar_agendamento':
-                endpoint = `/api/agendamentos/${idPendente}/`;
-                body = { status: 'CANCELADO' }; // Cancela, liberando a disponibilidade (backend).
-                break;
-            case 'concluir_aula':
-                endpoint = `/api/agendamentos/${idPendente}/`;
-                body = { status: 'CONCLUIDO' }; // Permite Avaliação/Certificado.
-                break;
+        if (acaoPendente === 'excluir') {
+            endpoint = `/api/disponibilidades/${idPendente}/`;
+            method = 'DELETE'; // Exclui um horário livre.
+            body = null;
+        } else if (acoesEmLote[acaoPendente]) {
+            endpoint = '/api/agendamentos/acoes/';
+            method = 'POST';
+            body = { acao: acoesEmLote[acaoPendente], ids: [].concat(idPendente) };
         }
 
         const options = { method, headers };
         if (body) options.body = JSON.stringify(body);
 
-        await fetch(endpoint, options);
+        const response = await fetch(endpoint, options);
+        if (response.ok && method === 'POST') {
+            // Resultado por ID: avisa se alguma aula não pôde ser atualizada.
+            const { resultados } = await response.json();
+            const falhas = resultados.filter(r => !r.ok);
+            if (falhas.length > 0) {
+                notificarSeguro(`${falhas.length} aula(s) não puderam ser atualizadas.`, 'erro');
+                document.getElementById('conteudo-principal').innerHTML = await obterConteudoDashboard();
+                if (modalConfirmacaoInstance) modalConfirmacaoInstance.hide();
+                return;
+            }
+        }
         notificarSeguro('Operação realizada com sucesso!', 'sucesso');
         
         // Atualização reativa (SPA): Recarrega os dados e renderiza o novo estado do dashboard.
@@ -410,6 +407,12 @@ export const adicionarHorario = async (dados) => {
     const descEl = document.getElementById('horario-descricao');
     const descricaoValor = descEl ? descEl.value : '';
 
+    // Série recorrente: um único POST gera todos os horários semanais até a data informada (bulk no backend).
+    if (dados.repetirAte) {
+        await adicionarSerieDeHorarios(dados, descricaoValor);
+        return;
+    }
+
     const payload = {
         professor: usuario.id, 
         disciplina: disciplinaId,
@@ -444,6 +447,65 @@ export const adicionarHorario = async (dados) => {
     }
 }
 
+async function adicionarSerieDeHorarios(dados, descricaoValor) {
+    // Dias da semana no padrão do backend (Python): 0 = Segunda ... 6 = Domingo.
+    const diasBackend = { 'Segunda': 0, 'Terça': 1, 'Quarta': 2, 'Quinta': 3, 'Sexta': 4, 'Sábado': 5, 'Domingo': 6 };
+    const payload = {
+        disciplina: dados.disciplina,
+        assunto: dados.assunto,
+        nivel: dados.nivel,
+        descricao: descricaoValor,
+        link: dados.link,
+        dias_semana: [diasBackend[dados.dia]],
+        horario_inicio: dados.hora,
+        data_inicio: obterProximaData(dados.dia),
+        data_fim: dados.repetirAte
+    };
+
+    try {
+        const response = await fetch('/api/disponibilidades/recorrencia/', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', 'X-CSRFToken': getCookie('csrftoken') },
+            body: JSON.stringify(payload)
+        });
+        const resultado = await response.json();
+
+        if (!response.ok) {
+            // Colisões com horários existentes voltam listadas em 'conflitos'.
+            const detalhe = resultado.conflitos ? resultado.conflitos.join('\n') : JSON.stringify(resultado);
+            alert("Erro ao criar a série de horários:\n" + detalhe);
+            return;
+        }
+
+        document.getElementById('conteudo-principal').innerHTML = await obterConteudoDashboard();
+        notificarSeguro(`${resultado.criados} horários publicados!`, 'sucesso');
+        const modal = bootstrap.Modal.getInstance(document.getElementById('modal-novo-horario'));
+        if (modal) modal.hide();
+
+    } catch (e) {
+        console.error("Erro:", e);
+        alert("Erro ao criar a série de horários.");
+    }
+}
+
+window.excluirSerie = async function(serie) {
+    // Exclusão em lote: remove todos os horários LIVRES da série (os já reservados são mantidos pelo backend).
+    if (!confirm('Excluir todos os horários livres desta série?')) return;
+    try {
+        const response = await fetch(`/api/disponibilidades/recorrencia/${serie}/`, {
+            method: 'DELETE',
+            headers: { 'X-CSRFToken': getCookie('csrftoken') }
+        });
+        if (!response.ok) throw new Error("Falha");
+        const resultado = await response.json();
+        notificarSeguro(`${resultado.excluidos} horários excluídos.`, 'sucesso');
+        document.getElementById('conteudo-principal').innerHTML = await obterConteudoDashboard();
+    } catch (e) {
+        notificarSeguro('Erro ao excluir a série.', 'erro');
+        console.error(e);
+    }
+}
+
 function gerarTabelaProfessor(dados) {
     // Renderiza a tabela de gerenciamento de aulas para a área do Professor, separando por status.
     const horariosLivres = dados.disponibilidades.filter(d => d.disponivel === true);
@@ -455,7 +517,9 @@ function gerarTabelaProfessor(dados) {
     
     // 1. PEDIDOS PENDENTES (Ação imediata: Aceitar/Rejeitar)
     if (agendamentosPendentes.length > 0) {
-        html += `<tr class="table-warning"><td colspan="4" class="fw-bold text-dark"><i class="bi bi-exclamation-circle-fill me-2"></i> Pedidos Pendentes</td></tr>`;
+        const idsPendentes = JSON.stringify(agendamentosPendentes.map(ag => ag.id));
+        html += `<tr class="table-warning"><td colspan="3" class="fw-bold text-dark"><i class="bi bi-exclamation-circle-fill me-2"></i> Pedidos Pendentes</td>
+            <td class="text-end"><button class="btn btn-sm btn-outline-success" onclick="window.solicitarGerenciamento(${idsPendentes}, 'confirmar_agendamento')">Aceitar todos</button></td></tr>`;
         html += agendamentosPendentes.map(ag => `
             <tr>
                 <td>
@@ -473,7 +537,9 @@ function gerarTabelaProfessor(dados) {
 
     // 2. AULAS CONFIRMADAS (Ação: Entrar na sala e Concluir)
     if (agendamentosConfirmados.length > 0) {
-        html += `<tr class="table-success"><td colspan="4" class="fw-bold text-dark"><i class="bi bi-check-circle-fill me-2"></i> Aulas Confirmadas</td></tr>`;
+        const idsConfirmados = JSON.stringify(agendamentosConfirmados.map(ag => ag.id));
+        html += `<tr class="table-success"><td colspan="3" class="fw-bold text-dark"><i class="bi bi-check-circle-fill me-2"></i> Aulas Confirmadas</td>
+            <td class="text-end"><button class="btn btn-sm btn-outline-success" onclick="window.solicitarGerenciamento(${idsConfirmados}, 'concluir_aula')">Concluir todas</button></td></tr>`;
         html += agendamentosConfirmados.map(ag => {
             const botaoEntrar = ag.link_aula 
                 ? `<a href="${ag.link_aula}" target="_blank" class="btn btn-sm btn-primary me-1"><i class="bi bi-camera-video-fill"></i> Entrar</a>` 
@@ -545,6 +611,7 @@ function gerarTabelaProfessor(dados) {
             <td>${formatarDataBr(item.data)} - ${item.horario_inicio.slice(0,5)}</td>
             <td><span class="badge bg-info text-dark">Disponível</span></td>
             <td class="text-end">
+                ${item.serie ? `<button class="btn btn-sm btn-outline-secondary me-1" title="Excluir série" onclick="window.excluirSerie('${item.serie}')"><i class="bi bi-calendar-x"></i></button>` : ''}
                 <button class="btn btn-sm btn-outline-danger" onclick="window.solicitarGerenciamento(${item.id}, 'excluir')"><i class="bi bi-trash"></i></button>
             </td>
         </tr>`).join('');
@@ -3,6 +3,8 @@ import { authService } from '../services/auth.js'; // Importa o serviço de aute
 // Inicializa a lista global - Funciona como um cache local dos professores.
 // É usado para buscar rapidamente os dados de um professor ao abrir o modal de agendamento.
 window.listaDeProfessores = []; 
+let professorModalAberto = null; // ID do professor cujo modal de horários está aberto (atualizado pelo stream SSE).
+let fonteEventos = null;         // Conexão EventSource com o stream de disponibilidades.
 
 function getCookie(name) {
     // Função auxiliar para obter o token CSRF, necessário para a requisição POST (agendamento).
@@ -20,6 +22,41 @@ function getCookie(name) {
     return cookieValue;
 }
 
+function criarCardHorario(item, professor) {
+    // Card de um horário livre no modal de agendamento (o id permite remover/inserir via stream SSE).
+    const card = document.createElement('div');
+    card.className = 'card mb-3 border-primary';
+    
+    card.innerHTML = `
+        <div class="card-body">
+            <div class="d-flex justify-content-between align-items-start mb-2">
+                <div>
+                    <h6 class="card-title fw-bold text-primary mb-0">
+                        <i class="bi bi-book-half me-1"></i> ${item.disciplina}
+                    </h6>
+                    <span class="badge bg-light text-dark border mt-1">${item.nivel || 'Nível Geral'}</span>
+                </div>
+                <div class="text-end">
+                    <h5 class="fw-bold mb-0 text-success">${item.hora}</h5>
+                    <small class="text-muted d-block">${item.dataExtenso}</small>
+                </div>
+            </div>
+            
+            <p class="card-text mb-2">
+                <strong>Tema:</strong> ${item.assunto || 'Não informado'}
+            </p>
+            
+            ${item.descricao ? `<p class="card-text small text-muted bg-light p-2 rounded"><em>"${item.descricao}"</em></p>` : ''}
+            
+            <button class="btn botao-verde w-100 mt-2" onclick="window.confirmarAgendamentoReal(${item.id}, '${professor.nome}', '${item.dataFormatada}', '${item.hora}')">
+                Agendar Aula
+            </button>
+        </div>
+    `;
+    card.id = `horario-${item.id}`;
+    return card;
+}
+
 window.abrirModalAgendamento = function(id) {
     // GATE DE SEGURANÇA (Regra de Negócio):
     // Se o usuário não estiver logado, ele é impedido de ver os horários e é redirecionado para o login.
@@ -33,6 +70,7 @@ window.abrirModalAgendamento = function(id) {
     const professor = window.listaDeProfessores.find(p => p.id === id);
     if (!professor) return;
 
+    professorModalAberto = professor.id;
     document.getElementById('titulo-modal-agendamento').innerText = `Agenda de ${professor.nome}`;
 
     const divHorarios = document.getElementById('lista-horarios');
@@ -45,39 +83,7 @@ window.abrirModalAgendamento = function(id) {
         divHorarios.innerHTML = '<p class="text-muted text-center">Sem horários livres no momento.</p>';
     } else {
         // Renderiza um card de agendamento para cada horário disponível.
-        horariosDisponiveis.forEach(item => {
-            const card = document.createElement('div');
-            card.className = 'card mb-3 border-primary';
-            
-            card.innerHTML = `
-                <div class="card-body">
-                    <div class="d-flex justify-content-between align-items-start mb-2">
-                        <div>
-                            <h6 class="card-title fw-bold text-primary mb-0">
-                                <i class="bi bi-book-half me-1"></i> ${item.disciplina}
-                            </h6>
-                            <span class="badge bg-light text-dark border mt-1">${item.nivel || 'Nível Geral'}</span>
-                        </div>
-                        <div class="text-end">
-                            <h5 class="fw-bold mb-0 text-success">${item.hora}</h5>
-                            <small class="text-muted d-block">${item.dataExtenso}</small>
-                        </div>
-                    </div>
-                    
-                    <p class="card-text mb-2">
-                        <strong>Tema:</strong> ${item.assunto || 'Não informado'}
-                    </p>
-                    
-                    ${item.descricao ? `<p class="card-text small text-muted bg-light p-2 rounded"><em>"${item.descricao}"</em></p>` : ''}
-                    
-                    <button class="btn botao-verde w-100 mt-2" onclick="window.confirmarAgendamentoReal(${item.id}, '${professor.nome}', '${item.dataFormatada}', '${item.hora}')">
-                        Agendar Aula
-                    </button>
-                </div>
-            `;
-            
-            divHorarios.appendChild(card);
-        });
+        horariosDisponiveis.forEach(item => divHorarios.appendChild(criarCardHorario(item, professor)));
     }
 
     const modalElemento = document.getElementById('modal-agendamento');
@@ -182,71 +188,182 @@ function criarCardProfessor(professor) {
     `;
 }
 
+// Cursor da próxima página do catálogo (paginação por cursor da API). null = não há mais páginas.
+let proximaPaginaProfessores = null;
+
+function mapearHorario(d) {
+    // Formata os campos de data e hora para exibição no modal.
+    const partesData = d.data.split('-'); 
+    const dia = partesData[2];
+    const mes = partesData[1];
+    return {
+        id: d.id, 
+        disciplina: d.disciplina_nome || 'Geral',
+        assunto: d.assunto,
+        nivel: d.nivel,
+        descricao: d.descricao,
+        hora: d.horario_inicio.slice(0, 5),
+        dataFormatada: `${dia}/${mes}`,
+        dataExtenso: `${dia}/${mes}`,
+        disponivel: d.disponivel
+    };
+}
+
+// --- TEMPO REAL (Stream SSE de Disponibilidades) ---
+function removerHorarioDaTela(evento) {
+    // 'reservado' / 'removido' / 'fechado': o horário sai do cache e, se o modal estiver aberto, o card some na hora.
+    const dados = JSON.parse(evento.data);
+    const professor = window.listaDeProfessores.find(p => p.id === dados.professor);
+    if (professor) professor.horarios = professor.horarios.filter(h => h.id !== dados.id);
+    const card = document.getElementById(`horario-${dados.id}`);
+    if (card) card.remove();
+}
+
+function inserirHorarioNaTela(evento) {
+    // 'aberto' / 'liberado': o horário entra no cache do professor (e no modal aberto, se for o dele).
+    const dados = JSON.parse(evento.data);
+    const professor = window.listaDeProfessores.find(p => p.id === dados.professor);
+    if (!professor) {
+        incluirProfessorNaTela(dados.professor);
+        return;
+    }
+    if (professor.horarios.some(h => h.id === dados.id)) return;
+
+    const horario = mapearHorario(dados);
+    professor.horarios.push(horario);
+    if (professorModalAberto === professor.id) {
+        const divHorarios = document.getElementById('lista-horarios');
+        if (divHorarios) divHorarios.appendChild(criarCardHorario(horario, professor));
+    }
+}
+
+const professoresEmCarregamento = new Set(); // Evita buscar o mesmo professor a cada evento de uma série.
+
+async function incluirProfessorNaTela(id) {
+    // Professor fora do cache (ex.: cadastrado depois que a tela abriu): busca o card dele, já com o horário novo.
+    // Se ele ainda vai chegar em uma próxima página (o cursor ordena por id), a página trará o horário.
+    const ultimo = window.listaDeProfessores[window.listaDeProfessores.length - 1];
+    if ((proximaPaginaProfessores && ultimo && id > ultimo.id) || professoresEmCarregamento.has(id)) return;
+
+    professoresEmCarregamento.add(id);
+    try {
+        const response = await fetch(`/api/professores/${id}/?disponivel=true`);
+        if (!response.ok || window.listaDeProfessores.some(p => p.id === id)) return;
+        const professor = mapearProfessor(await response.json());
+        window.listaDeProfessores.push(professor);
+
+        const grade = document.getElementById('grade-professores');
+        if (!grade) return;
+        const vazio = document.getElementById('sem-professores');
+        if (vazio) vazio.remove();
+        const botao = document.getElementById('carregar-mais-professores');
+        if (botao) botao.insertAdjacentHTML('beforebegin', criarCardProfessor(professor));
+        else grade.insertAdjacentHTML('beforeend', criarCardProfessor(professor));
+    } catch (error) {
+        console.error(error);
+    } finally {
+        professoresEmCarregamento.delete(id);
+    }
+}
+
+function assinarEventosDisponibilidade() {
+    // Uma única conexão por página; o navegador reconecta sozinho (com Last-Event-ID) se ela cair.
+    if (fonteEventos || !window.EventSource) return;
+    fonteEventos = new EventSource('/api/eventos/disponibilidades/');
+    fonteEventos.addEventListener('reservado', removerHorarioDaTela);
+    fonteEventos.addEventListener('removido', removerHorarioDaTela);
+    fonteEventos.addEventListener('fechado', removerHorarioDaTela);
+    fonteEventos.addEventListener('aberto', inserirHorarioNaTela);
+    fonteEventos.addEventListener('liberado', inserirHorarioNaTela);
+    fonteEventos.addEventListener('ressincronizar', async () => {
+        // Eventos perdidos: recarrega a lista a partir da API.
+        const conteudo = document.getElementById('conteudo-principal');
+        if (conteudo) conteudo.innerHTML = await obterConteudoExplorar();
+    });
+    fonteEventos.onerror = () => {
+        // Servidor sem ASGI (501) ou indisponível: a tela continua funcionando sem tempo real.
+        if (fonteEventos && fonteEventos.readyState === EventSource.CLOSED) fonteEventos = null;
+    };
+}
+
+function mapearProfessor(prof) {
+    // Mapeamento e Transformação de Dados: Converte a resposta da API para o formato esperado pelo frontend (cache).
+    let materiasLista = prof.disciplinas || [];
+    
+    const listaHorarios = prof.disponibilidades 
+        ? prof.disponibilidades.map(d => {
+            // Lógica para garantir que o 'materiaPrincipal' do card reflita os horários cadastrados.
+            if (materiasLista.length === 0 && d.disciplina_nome) {
+                if (!materiasLista.includes(d.disciplina_nome)) materiasLista.push(d.disciplina_nome);
+            }
+            return mapearHorario(d);
+          }) 
+        : []; // Se não houver disponibilidades, a lista fica vazia.
+
+    const materiaPrincipal = materiasLista.length > 0 ? materiasLista[0] : 'Multidisciplinar';
+    const textoDescricao = materiasLista.length > 0 
+        ? `Professor de ${materiasLista.join(', ')}` 
+        : 'Professor voluntário disponível.';
+
+    return {
+        id: prof.id,
+        nome: prof.nome,
+        materia: materiaPrincipal,
+        descricao: textoDescricao,
+        corBadge: 'bg-primary', // Estilo visual para o badge.
+        horarios: listaHorarios 
+    };
+}
+
+async function buscarPaginaProfessores(url) {
+    // Busca UMA página do catálogo. O servidor já aninha apenas horários futuros e livres (?disponivel=true).
+    const response = await fetch(url);
+    const dadosApi = await response.json();
+    proximaPaginaProfessores = dadosApi.next;
+    return dadosApi.results.map(mapearProfessor);
+}
+
+function gerarBotaoCarregarMais() {
+    if (!proximaPaginaProfessores) return '';
+    return `
+        <div class="col-12 text-center" id="carregar-mais-professores">
+            <button class="btn btn-outline-primary" onclick="window.carregarMaisProfessores()">Carregar mais professores</button>
+        </div>`;
+}
+
+window.carregarMaisProfessores = async function() {
+    // Anexa a próxima página ao grid sem re-renderizar os cards já exibidos.
+    if (!proximaPaginaProfessores) return;
+    try {
+        const novos = await buscarPaginaProfessores(proximaPaginaProfessores);
+        window.listaDeProfessores = window.listaDeProfessores.concat(novos);
+
+        const botao = document.getElementById('carregar-mais-professores');
+        if (botao) botao.outerHTML = novos.map(prof => criarCardProfessor(prof)).join('') + gerarBotaoCarregarMais();
+    } catch (error) {
+        console.error(error);
+        alert("Erro ao carregar mais professores.");
+    }
+}
+
 export async function obterConteudoExplorar() {
     // Função principal exportada: Busca dados e renderiza a tela de Exploração.
     let htmlProfessores = '';
 
     try {
-        const timestamp = new Date().getTime(); // Parâmetro anti-cache.
-        // Busca todos os professores e suas disponibilidades aninhadas (otimização de API).
-        const response = await fetch(`/api/professores/?t=${timestamp}`);
-        const dadosApi = await response.json();
-
-        // Mapeamento e Transformação de Dados: Converte a resposta da API para o formato esperado pelo frontend (cache).
-        window.listaDeProfessores = dadosApi.map(prof => {
-            let materiasLista = prof.disciplinas || [];
-            
-            const listaHorarios = prof.disponibilidades 
-                ? prof.disponibilidades.map(d => {
-                    // Formata os campos de data e hora para exibição no modal.
-                    const partesData = d.data.split('-'); 
-                    const dia = partesData[2];
-                    const mes = partesData[1];
-                    const hora = d.horario_inicio.slice(0, 5); 
-                    const nomeDisc = d.disciplina_nome || 'Geral';
-                    
-                    // Lógica para garantir que o 'materiaPrincipal' do card reflita os horários cadastrados.
-                    if (materiasLista.length === 0 && d.disciplina_nome) {
-                        if (!materiasLista.includes(d.disciplina_nome)) materiasLista.push(d.disciplina_nome);
-                    }
-
-                    return {
-                        id: d.id, 
-                        disciplina: nomeDisc,
-                        assunto: d.assunto,
-                        nivel: d.nivel,
-                        descricao: d.descricao,
-                        hora: hora,
-                        dataFormatada: `${dia}/${mes}`,
-                        dataExtenso: `${dia}/${mes}`,
-                        disponivel: d.disponivel
-                    };
-                  }) 
-                : []; // Se não houver disponibilidades, a lista fica vazia.
-
-            const materiaPrincipal = materiasLista.length > 0 ? materiasLista[0] : 'Multidisciplinar';
-            const textoDescricao = materiasLista.length > 0 
-                ? `Professor de ${materiasLista.join(', ')}` 
-                : 'Professor voluntário disponível.';
-
-            return {
-                id: prof.id,
-                nome: prof.nome,
-                materia: materiaPrincipal,
-                descricao: textoDescricao,
-                corBadge: 'bg-primary', // Estilo visual para o badge.
-                horarios: listaHorarios 
-            };
-        });
+        // Busca a primeira página de professores com as disponibilidades livres aninhadas (otimização de API).
+        // Sem parâmetro anti-cache: o navegador revalida com If-None-Match (ETag) e recebe 304 se nada mudou.
+        window.listaDeProfessores = await buscarPaginaProfessores('/api/professores/?disponivel=true');
+        assinarEventosDisponibilidade();
 
         if (window.listaDeProfessores.length === 0) {
             htmlProfessores = `
-                <div class="col-12 text-center py-5">
+                <div class="col-12 text-center py-5" id="sem-professores">
                     <p class="text-muted">Nenhum professor encontrado.</p>
                 </div>`;
         } else {
             // Gera o HTML final a partir do mapeamento.
-            htmlProfessores = window.listaDeProfessores.map(prof => criarCardProfessor(prof)).join('');
+            htmlProfessores = window.listaDeProfessores.map(prof => criarCardProfessor(prof)).join('') + gerarBotaoCarregarMais();
         }
     } catch (error) {
         console.error(error);
@@ -256,7 +373,7 @@ export async function obterConteudoExplorar() {
     return `
     <div class="container py-5">
         <h2 class="mb-4 fw-bold text-primary">Professores Disponíveis</h2>
-        <div class="row">
+        <div class="row" id="grade-professores">
             ${htmlProfessores}
         </div>
     </div>